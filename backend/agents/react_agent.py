@@ -4,6 +4,8 @@ import os
 import ollama
 from typing import Dict, List, Optional
 
+from core.spans import bind, span
+
 logger = logging.getLogger(__name__)
 
 MAX_STEPS = 5
@@ -111,12 +113,12 @@ def _execute_tool(tool_name: str, arg: str, user_name: str = "User") -> str:
         elif tool_name == "graph_lookup":
             from knowledge.graph import get_relations
 
-            rels = get_relations(arg, depth=1)
+            rels = get_relations(arg, depth=1, limit=6)
             if not rels:
                 return f"No graph data for '{arg}'."
             lines = [
                 f"• {r['subject']} {r['relation'].replace('_', ' ')} {r['object']}"
-                for r in rels[:6]
+                for r in rels
             ]
             return "\n".join(lines)
         elif tool_name == "calculate":
@@ -196,11 +198,12 @@ Be concise. Max {MAX_STEPS} cycles."""
     try:
         client = _get_client()
         for step in range(MAX_STEPS):
-            response = client.chat(
-                model=model,
-                messages=messages,
-                options={"temperature": 0.35, "num_predict": MAX_TOKENS},
-            )
+            with span("react.llm", model=model, step=step):
+                response = client.chat(
+                    model=model,
+                    messages=messages,
+                    options={"temperature": 0.35, "num_predict": MAX_TOKENS},
+                )
             output = response["message"]["content"].strip()
             full_out += output + "\n"
             for line in output.split("\n"):
@@ -217,7 +220,8 @@ Be concise. Max {MAX_STEPS} cycles."""
             if parsed:
                 tool_name, arg = parsed
                 logger.info(f"Tool call: {tool_name}({arg[:40]})")
-                observation = _execute_tool(tool_name, arg, user_name)
+                with span("react.tool", tool=tool_name):
+                    observation = _execute_tool(tool_name, arg, user_name)
                 steps.append({"type": "observe", "content": observation[:200]})
                 messages.append({"role": "assistant", "content": output})
                 messages.append(
@@ -295,13 +299,16 @@ async def react_async(
     loop = asyncio.get_event_loop()
     result = await loop.run_in_executor(
         None,
-        lambda: react_solve(
-            user_input, model=model, context=context, user_name=user_name
-        ),
+        bind(react_solve, user_input, model=model, context=context, user_name=user_name),
     )
     return result["answer"] if result["success"] else ""
 
 
+
+def _traced_tool(tool_name: str, arg: str, user_name: str) -> str:
+    with span("react.tool", tool=tool_name, parallel=True):
+        return _execute_tool(tool_name, arg, user_name)
+
 async def execute_tools_parallel(tool_calls: list, user_name: str = "User") -> list:
     """
     Execute multiple tool calls in parallel using asyncio.gather.
@@ -314,7 +321,7 @@ async def execute_tools_parallel(tool_calls: list, user_name: str = "User") -> l
 
     async def _run_one(tool_name, arg):
         return await loop.run_in_executor(
-            None, lambda: _execute_tool(tool_name, arg, user_name)
+            None, bind(_traced_tool, tool_name, arg, user_name)
         )
 
     return await asyncio.gather(
@@ -4,6 +4,8 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from api.deps import require_api_key
 from auth.rate_limiter import rate_limit
+from core.activity import interactive
+from core.spans import bind
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -43,10 +45,11 @@ async def chat(request: Request, body: ChatRequest, _=Depends(require_api_key)):
         session_id = (_jwt_sub or request.headers.get("X-API-Key", "default"))[:32]
         logger.info("💬 User: %s", user_input[:50])
         loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: brain.process(user_input, history=history, session_id=session_id),
-        )
+        with interactive():
+            result = await loop.run_in_executor(
+                None,
+                bind(brain.process, user_input, history=history, session_id=session_id),
+            )
         logger.info("🤖 ASTRA: %s", result["reply"][:50])
         return result
     except Exception as e:
@@ -8,6 +8,7 @@ import logging
 from fastapi import APIRouter, Depends, Request
 from api.deps import require_api_key
 from auth.rate_limiter import rate_limit
+from core.activity import interactive
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
@@ -18,6 +19,13 @@ _TOKEN_TIMEOUT = 30
 _HEARTBEAT = 15
 
 
+async def _interactive(stream):
+    """Hold the in-flight mark until the last token has been sent."""
+    with interactive():
+        async for chunk in stream:
+            yield chunk
+
+
 class ChatRequest(BaseModel):
     message: str = ""
     session_id: str = "default"
@@ -42,6 +50,7 @@ async def chat_stream(
     async def event_stream():
         from core.brain_singleton import get_brain
         from core.llm_backend import get_backend
+        from core.context_assembler import context_window
         from personality.modes import get_temperature, get_token_budget
 
         brain = get_brain()
@@ -80,6 +89,7 @@ async def chat_stream(
             options = {
                 "temperature": get_temperature(),
                 "num_predict": get_token_budget(query_intent),
+                "num_ctx": context_window(selected_model),
             }
 
             async for token in backend.astream(messages, selected_model, options):
@@ -96,7 +106,7 @@ async def chat_stream(
             yield f"data: {json.dumps({'type':'error','message':'Stream failed'})}\n\n"
 
     return StreamingResponse(
-        event_stream(),
+        _interactive(event_stream()),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
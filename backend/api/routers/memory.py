@@ -15,10 +15,10 @@ def _load():
     return load_memory()
 
 
-def _save(memory):
-    from memory.memory_engine import save_memory
+def _transact(mutate):
+    from memory.memory_transaction import run_transaction
 
-    save_memory(memory)
+    return run_transaction(mutate)
 
 
 @router.get("/memory")
@@ -39,12 +39,14 @@ class MemoryUpdate(BaseModel):
 async def update_memory(body: MemoryUpdate, current_user=Depends(require_permission("memory_write"))):
     try:
         loop = asyncio.get_event_loop()
-        memory = await loop.run_in_executor(None, _load)
-        if body.user_facts is not None:
-            memory["user_facts"] = body.user_facts
-        if body.preferences is not None:
-            memory["preferences"].update(body.preferences)
-        await loop.run_in_executor(None, _save, memory)
+
+        def mutate(memory):
+            if body.user_facts is not None:
+                memory["user_facts"] = body.user_facts
+            if body.preferences is not None:
+                memory["preferences"].update(body.preferences)
+
+        await loop.run_in_executor(None, _transact, mutate)
         return {"status": "success"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -54,18 +56,20 @@ async def update_memory(body: MemoryUpdate, current_user=Depends(require_permiss
 async def clear_memory(current_user=Depends(require_permission("memory_wipe"))):
     try:
         loop = asyncio.get_event_loop()
-        cur = await loop.run_in_executor(None, _load)
-        name = cur.get("preferences", {}).get("name", "User")
-        await loop.run_in_executor(
-            None,
-            _save,
-            {
-                "user_facts": [],
-                "preferences": {"name": name},
-                "conversation_summary": [],
-                "emotional_patterns": {},
-            },
-        )
+
+        def mutate(memory):
+            name = memory.get("preferences", {}).get("name", "User")
+            memory.clear()
+            memory.update(
+                {
+                    "user_facts": [],
+                    "preferences": {"name": name},
+                    "conversation_summary": [],
+                    "emotional_patterns": {},
+                }
+            )
+
+        await loop.run_in_executor(None, _transact, mutate)
         return {"status": "cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,18 @@
+import asyncio
 import logging
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+
+from auth.rbac import require_permission
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 @router.get("/api/traces")
-async def get_traces():
+async def get_traces(_=Depends(require_permission("view_traces"))):
     from core.observability import get_store
 
     return {
@@ -15,6 +21,34 @@ async def get_traces():
     }
 
 
+@router.get("/api/traces/summary")
+async def get_trace_summary(window: str = "5m", dimension: Optional[str] = None):
+    from core.observability import WINDOWS, get_store
+
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {list(WINDOWS)}")
+    return {"window": window, "summary": get_store().summary(window, dimension)}
+
+
+@router.get("/api/traces/query")
+def query_traces(
+    limit: int = Query(50, ge=1, le=1000),
+    since: Optional[float] = None,
+    handler: Optional[str] = None,
+    model: Optional[str] = None,
+    intent: Optional[str] = None,
+    min_ms: Optional[float] = None,
+    _=Depends(require_permission("view_traces")),
+):
+    from core.observability import get_store
+
+    return {
+        "traces": get_store().query(
+            limit=limit, since=since, handler=handler, model=model, intent=intent, min_ms=min_ms
+        )
+    }
+
+
 @router.get("/api/events")
 async def get_events():
     from core.event_bus import get_history, get_stats
@@ -25,6 +59,115 @@ async def get_events():
     }
 
 
+@router.get("/api/profile")
+async def get_profile(
+    seconds: float = Query(10, ge=0, le=300),
+    hz: Optional[int] = Query(None, ge=1, le=250),
+    format: str = Query("svg", pattern="^(svg|folded|json)$"),
+    idle: bool = False,
+    thread: Optional[str] = None,
+    _=Depends(require_permission("profile")),
+):
+    """Sample every thread for `seconds`; seconds=0 returns the continuous profile."""
+    from core.profiler import ProfilerBusy, flamegraph_svg, get_profiler
+
+    profiler = get_profiler()
+    if seconds == 0:
+        profile = profiler.continuous()
+        if profile is None:
+            raise HTTPException(status_code=404, detail="continuous profiling is off (PROFILE_CONTINUOUS_HZ)")
+    else:
+        try:
+            profile = await asyncio.to_thread(profiler.record, seconds, hz)
+        except ProfilerBusy as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    if format == "folded":
+        return PlainTextResponse(profile.folded(idle, thread))
+    if format == "json":
+        return {"stats": profile.stats(), "top": profile.top(30, idle), "profiler": profiler.stats()}
+    stats = profile.stats()
+    title = f"ASTRA {stats['wall_s']}s @ {stats['hz']}Hz, overhead {stats['overhead_pct']}%"
+    return Response(flamegraph_svg(profile.filtered(idle, thread), title), media_type="image/svg+xml")
+
+
+@router.get("/api/embeddings")
+async def get_embedding_stats():
+    from core.embedding_service import get_embedding_service
+
+    return get_embedding_service().stats()
+
+
+@router.get("/api/vectors")
+async def get_vector_stats():
+    import asyncio
+    from memory.vector_maintenance import get_stats
+
+    return await asyncio.to_thread(get_stats)
+
+
+@router.get("/api/rag")
+async def get_rag_stats():
+    from rag.rag_engine import get_stats
+
+    return get_stats()
+
+
+@router.get("/api/context")
+async def get_context_stats():
+    from core.context_assembler import get_stats
+
+    return get_stats()
+
+
+@router.get("/api/memory-db")
+async def get_memory_db_stats():
+    from memory_db import get_stats
+
+    return get_stats()
+
+
+@router.get("/api/memory-tx")
+async def get_memory_tx_stats():
+    from memory.memory_transaction import get_stats
+
+    return get_stats()
+
+
+@router.get("/api/graph")
+async def get_graph_stats():
+    from knowledge.graph import get_stats
+
+    return get_stats()
+
+
+@router.get("/api/extractor")
+async def get_extractor_stats():
+    from knowledge.auto_extractor import get_worker
+
+    return get_worker().stats()
+
+
+@router.get("/api/history")
+async def get_history_stats():
+    from memory.history_compactor import get_compactor
+
+    return get_compactor().stats()
+
+
+@router.get("/api/watch")
+async def get_watch_stats():
+    from core.file_watcher import get_file_watcher
+
+    return get_file_watcher().stats()
+
+
+@router.get("/api/logging")
+async def get_logging_stats():
+    from utils.logger import get_stats
+
+    return get_stats()
+
+
 @router.get("/api/self-improve")
 async def self_improve_report():
     try:
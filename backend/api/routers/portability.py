@@ -0,0 +1,57 @@
+"""
+Account data export / import — streaming NDJSON (memory/portability).
+  GET    /data/export       stream my memory, facts, history, threads
+                            (?gzip=true, ?resume=<checkpoint token>)
+  POST   /data/import       upload an export (NDJSON or gzip) into my account
+"""
+
+import asyncio
+import logging
+import time
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from auth.rbac import require_permission
+from memory.portability import Importer, encode_ndjson, export_records, parse_resume
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/data", tags=["data"])
+
+
+@router.get("/export")
+def export(
+    gzip: bool = False,
+    resume: Optional[str] = None,
+    current_user=Depends(require_permission("memory_read")),
+):
+    if resume:
+        try:
+            parse_resume(resume)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    name = f"astra-export-{current_user['id']}-{int(time.time())}.ndjson" + (".gz" if gzip else "")
+    return StreamingResponse(
+        encode_ndjson(export_records(current_user["id"], resume), gzip=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
+
+
+@router.post("/import")
+async def import_data(
+    request: Request, current_user=Depends(require_permission("memory_write"))
+):
+    imp = Importer(current_user["id"])
+    try:
+        async for chunk in request.stream():
+            await asyncio.to_thread(imp.feed, chunk)
+        summary = await asyncio.to_thread(imp.finish)
+    except Exception as e:
+        logger.error("import for %s failed: %s", current_user["id"], e)
+        raise HTTPException(
+            status_code=400,
+            detail={"error": str(e), "last_checkpoint": imp.last_checkpoint},
+        )
+    logger.info("import for %s: %s", current_user["id"], summary)
+    return summary
@@ -1,17 +1,18 @@
 """
 Conversation thread endpoints.
   POST   /threads/                    create thread
-  GET    /threads/                    list my threads
-  GET    /threads/{id}/messages       get messages
+  GET    /threads/                    list my threads (?limit=&before=<cursor>)
+  GET    /threads/search              full-text search my threads (?q=&limit=&after=<cursor>)
+  GET    /threads/{id}/messages       get messages (?limit=&after=|before=<cursor>)
   POST   /threads/{id}/messages       add message + get AI reply
   PATCH  /threads/{id}                rename thread
-  DELETE /threads/{id}                archive thread
+  DELETE /threads/{id}                archive thread (?purge=true deletes it)
   POST   /threads/{id}/fork           fork from message
 """
 
 import uuid
 import logging
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import Optional
 
@@ -22,10 +23,13 @@ from memory.threads_db import (
     get_threads,
     get_thread,
     get_messages,
+    get_recent_messages,
     add_message,
     rename_thread,
     archive_thread,
+    delete_thread,
     fork_thread,
+    search_messages,
 )
 
 logger = logging.getLogger(__name__)
@@ -58,16 +62,45 @@ def create(body: CreateThread, current_user=Depends(require_permission("chat")))
 
 
 @router.get("/")
-def list_threads(current_user=Depends(require_permission("chat"))):
-    return get_threads(current_user["id"])
+def list_threads(
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before: Optional[str] = None,
+    current_user=Depends(require_permission("chat")),
+):
+    try:
+        return get_threads(current_user["id"], limit=limit, before=before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/search")
+def search(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+    current_user=Depends(require_permission("chat")),
+):
+    try:
+        return search_messages(current_user["id"], q, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{thread_id}/messages")
-def messages(thread_id: str, current_user=Depends(require_permission("chat"))):
+def messages(
+    thread_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    current_user=Depends(require_permission("chat")),
+):
     thread = get_thread(thread_id, current_user["id"])
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
-    return get_messages(thread_id)
+    try:
+        return get_messages(thread_id, limit=limit, after=after, before=before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/{thread_id}/messages")
@@ -85,16 +118,18 @@ def send(
     reply = ""
     if body.use_ai:
         try:
+            from core.activity import interactive
             from core.brain_singleton import get_brain
 
             history = [
                 {"role": m["role"], "content": m["content"]}
-                for m in get_messages(thread_id, limit=20)[
+                for m in get_recent_messages(thread_id, limit=21)[
                     :-1
                 ]  # exclude just-added msg
             ]
             brain = get_brain()
-            result = brain.process(body.content, history=history, session_id=thread_id)
+            with interactive():
+                result = brain.process(body.content, history=history, session_id=thread_id)
             reply = result.get("reply", "")
         except Exception as e:
             logger.error("Brain error in thread %s: %s", thread_id, e)
@@ -115,7 +150,13 @@ def rename(
 
 
 @router.delete("/{thread_id}")
-def archive(thread_id: str, current_user=Depends(require_permission("chat"))):
+def archive(
+    thread_id: str, purge: bool = False, current_user=Depends(require_permission("chat"))
+):
+    if purge:
+        if not delete_thread(thread_id, current_user["id"]):
+            raise HTTPException(status_code=404, detail="Thread not found")
+        return {"message": "Deleted"}
     if not archive_thread(thread_id, current_user["id"]):
         raise HTTPException(status_code=404, detail="Thread not found")
     return {"message": "Archived"}
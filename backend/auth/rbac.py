@@ -28,6 +28,7 @@ PERMISSIONS = {
     "system_stats": ["admin", "owner"],
     "ingest_knowledge": ["admin", "owner"],
     "view_traces": ["admin", "owner"],
+    "profile": ["admin", "owner"],
 }
 
 
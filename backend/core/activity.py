@@ -0,0 +1,54 @@
+# core/activity.py
+# Counts user-facing requests in flight so background LLM work (knowledge
+# extraction, …) can step aside while a reply is being generated.
+import threading
+import time
+from contextlib import contextmanager
+
+_active = 0
+_last_end = float("-inf")
+_cond = threading.Condition()
+
+
+@contextmanager
+def interactive():
+    """Wrap a chat request: from brain.process through the last streamed token."""
+    global _active, _last_end
+    with _cond:
+        _active += 1
+    try:
+        yield
+    finally:
+        with _cond:
+            _active -= 1
+            _last_end = time.monotonic()
+            if not _active:
+                _cond.notify_all()
+
+
+def in_flight() -> int:
+    return _active
+
+
+def idle_for() -> float:
+    """Seconds since the last interactive request finished; 0 while one is running."""
+    with _cond:
+        return 0.0 if _active else time.monotonic() - _last_end
+
+
+def wait_idle(timeout: float, quiet: float = 0.0) -> bool:
+    """
+    Block until no interactive request has run for `quiet` seconds.
+    False if timeout expires first.
+    """
+    deadline = time.monotonic() + timeout
+    with _cond:
+        while True:
+            now = time.monotonic()
+            calm = None if _active else _last_end + quiet - now
+            if calm is not None and calm <= 0:
+                return True
+            remaining = deadline - now
+            if remaining <= 0:
+                return False
+            _cond.wait(remaining if calm is None else min(remaining, calm))
@@ -120,18 +120,43 @@ async def start_all(broadcast_fn) -> list:
     except Exception as e:
         logger.warning("GpuHealth task failed: %s", e)
 
-    # ── RAG doc watcher ───────────────────────────────────────────────────────
+    # ── RAG doc watcher (event-driven via core/file_watcher) ─────────────────
     try:
-        from rag.watcher import _scan_and_ingest
+        from rag.watcher import start_watcher
 
         tasks.append(
             asyncio.create_task(
-                _poll("DocWatcher", _scan_and_ingest, 30), name="doc_watcher"
+                _run_threaded("DocWatcher", start_watcher), name="doc_watcher"
             )
         )
     except Exception as e:
         logger.warning("DocWatcher task failed: %s", e)
 
+    # ── Vector store maintenance (batched flush, retention, compaction) ─────
+    try:
+        from memory.vector_maintenance import maintenance_tick
+
+        tasks.append(
+            asyncio.create_task(
+                _poll("VectorMaintenance", maintenance_tick, 5),
+                name="vector_maintenance",
+            )
+        )
+    except Exception as e:
+        logger.warning("VectorMaintenance task failed: %s", e)
+
+    # ── RAG re-embed migration (one-shot, no-op once chunks are current) ─────
+    try:
+        from rag.vector_store import reembed_chunks
+
+        tasks.append(
+            asyncio.create_task(
+                _run_threaded("RagReembed", reembed_chunks), name="rag_reembed"
+            )
+        )
+    except Exception as e:
+        logger.warning("RagReembed task failed: %s", e)
+
     logger.info("🚀 %d background tasks started", len(tasks))
     return tasks
 
@@ -21,8 +21,7 @@ from intents.classifier import is_question_like
 from personality.modes import get_token_budget, get_temperature
 from utils.cleaner import clean_text
 from core.event_bus import publish as _publish
-from utils.telemetry import start_span
-from core.observability import RequestTrace, get_store as _obs_store
+from core import spans as _spans
 from config import config
 from websearch.search_agent import WebSearchAgent
 from tools.tool_router import detect_tool, detect_compound
@@ -30,7 +29,6 @@ from tools.tool_router import detect_tool, detect_compound
 logger = logging.getLogger(__name__)
 from core.pipeline.base import RequestContext
 from core.pipeline.builder import build_pipeline
-from core.request_trace import new_trace, step as _step, finish as _finish
 
 _LOCAL_QUERY_WORDS = {
     "my project",
@@ -137,11 +135,8 @@ class Brain:
         history: list = None,
         session_id: str = "default",
     ) -> Dict:
+        _root = _spans.start_trace("brain.process", log_text=user_input)
         try:
-            _trace_id = new_trace(user_input)
-            import uuid as _uuid
-
-            _obs = RequestTrace(_uuid.uuid4().hex[:8], user_input)
             _publish("request_start", {"input": user_input[:80]})
             user_input = clean_text(user_input)
             user_input = _sanitize_input(user_input)
@@ -157,7 +152,7 @@ class Brain:
             if not vision_mode:
                 cached = self._cache.get(user_input, session_id)
                 if cached:
-                    _step("cache_hit")
+                    _spans.finish_trace(_root, intent=cached.get("intent", ""), agent="cache")
                     return cached
 
             chain_reply = self._exit.check_chain(user_input, self)
@@ -190,41 +185,36 @@ class Brain:
                 }
 
             user_name = self._mem.user_name(memory)
-            _obs.step_start("llm")
             _publish("llm_start", {"model": self.model_manager.default_model})
-            with start_span(
-                "brain.resolve", {"intent": "pending", "vision": str(vision_mode)}
-            ):
-                _history = history if history is not None else []
-            result = self._resolve(
-                user_input,
-                memory,
-                user_name,
-                vision_mode=vision_mode,
-                history=_history,
-                session_id=session_id,
-            )
-            _obs.step_end("llm", meta=result.get("agent", ""))
-            _publish("llm_done", {"reply_len": len(result.get("reply", ""))})
-            _finish(intent=result.get("intent", ""), agent=result.get("agent", ""))
-            _obs_store().add(
-                _obs.finish(
-                    intent=result.get("intent", ""), agent=result.get("agent", "")
+            _history = history if history is not None else []
+            with _spans.span("brain.resolve", vision=vision_mode) as _sp:
+                result = self._resolve(
+                    user_input,
+                    memory,
+                    user_name,
+                    vision_mode=vision_mode,
+                    history=_history,
+                    session_id=session_id,
                 )
+                if _sp:
+                    _sp.set(agent=result.get("agent", ""))
+            _publish("llm_done", {"reply_len": len(result.get("reply", ""))})
+            trace = _spans.finish_trace(
+                _root, intent=result.get("intent", ""), agent=result.get("agent", "")
             )
             _publish(
                 "response_done",
-                {"intent": result.get("intent"), "ms": _obs.to_dict()["elapsed_ms"]},
+                {"intent": result.get("intent"), "ms": trace.get("total_ms", 0)},
             )
             return result
 
         except Exception as e:
             logger.error("Brain.process error: %s", e, exc_info=True)
-            try:
-                _obs_store().add(_obs.finish(intent="error", agent="error"))
-            except Exception:
-                pass
+            _spans.finish_trace(_root, intent="error", agent="error")
             return self._error_reply("Something went wrong.")
+        finally:
+            # other early exits (mode switch, chain, briefing) are not recorded
+            _spans.discard_trace(_root)
 
     # ── Shared dispatch — used by both process() and process_stream() ─────
 
@@ -305,6 +295,7 @@ class Brain:
                 emotion_label,
                 history or [],
                 reply_obj.agent.replace("ollama/", ""),
+                session_id=session_id,
             )
             self._cache.set(user_input, reply_obj.to_dict(emotion_label), session_id)
             try:
@@ -347,7 +338,9 @@ class Brain:
         chain_reply = self._exit.check_chain(user_input, self)
         if chain_reply:
             self._add_to_history("user", user_input, self._history)
-            self._add_to_history("assistant", chain_reply, self._history)
+            self._add_to_history(
+                "assistant", chain_reply, self._history, session_id, user_name
+            )
             self._mem.save(memory)
             for word in chain_reply.split(" "):
                 yield {"token": word + " "}
@@ -385,6 +378,8 @@ class Brain:
                 emotion_label,
                 query_intent,
                 history or [],
+                model=selected_model,
+                session_id=session_id,
             )
             self._add_to_history("user", user_input, history)
             full_reply = ""
@@ -402,7 +397,9 @@ class Brain:
                     yield item
                 elif "__full_reply__" in item:
                     full_reply = item["__full_reply__"]
-            self._add_to_history("assistant", full_reply, history)
+            self._add_to_history(
+                "assistant", full_reply, history, session_id, user_name
+            )
             final_conf = result.get("confidence", 0.6)
             yield {
                 "meta": {
@@ -419,50 +416,46 @@ class Brain:
 
         # Non-LLM result — word-tokenise for streaming consistency
         self._add_to_history("user", user_input, self._history)
-        self._add_to_history("assistant", reply, self._history)
+        self._add_to_history("assistant", reply, self._history, session_id, user_name)
         for word in reply.split(" "):
             yield {"token": word + " "}
 
     # ── Helpers ───────────────────────────────────────────────────────────
 
-    def _add_to_history(self, role: str, content: str, history: list = None) -> None:
+    def _add_to_history(
+        self,
+        role: str,
+        content: str,
+        history: list = None,
+        session_id: str = "default",
+        user_name: str = "User",
+    ) -> None:
         """Append to the per-request history list. Never touches shared state."""
         if history is not None:
             history.append({"role": role, "content": content})
         if role == "assistant" and history and len(history) >= 2:
+            last_user = next(
+                (m["content"] for m in reversed(history[:-1]) if m["role"] == "user"),
+                "",
+            )
             try:
                 from memory_db import save_exchange
 
-                last_user = next(
-                    (
-                        m["content"]
-                        for m in reversed(history[:-1])
-                        if m["role"] == "user"
-                    ),
-                    "",
-                )
                 save_exchange(last_user, content)
             except Exception as e:
                 logger.warning("save_exchange failed: %s", e)
+            keep = 12
             try:
-                from memory.summarizer import (
-                    should_summarize,
-                    summarize_conversation,
-                    store_summary,
-                )
+                from memory.history_compactor import RAW_TURNS, get_compactor
 
-                if len(history) > 12 and should_summarize(history):
-                    _mem = self._mem.load()
-                    _user = self._mem.user_name(_mem)
-                    _summary = summarize_conversation(history, _mem, _user)
-                    if _summary:
-                        _mem = store_summary(_mem, _summary)
-                        self._mem.save(_mem)
+                # Older turns live on as rolling summaries built off the request path
+                keep = 2 * RAW_TURNS
+                get_compactor().record_turn(session_id, last_user, content, user_name)
             except Exception as _e:
-                logger.debug("brain summarizer: %s", _e)
+                logger.debug("brain history compactor: %s", _e)
             # Trim in-place so callers see the trimmed list
-            if len(history) > 12:
-                del history[:-12]
+            if len(history) > keep:
+                del history[:-keep]
 
     def _build_reply(
         self,
@@ -0,0 +1,369 @@
+# core/context_assembler.py — Token-budgeted prompt context
+# Every context source (semantic memory, episodic, summaries, knowledge graph,
+# RAG, visual, ambient, style) hands in scored Candidates; assemble():
+#   1. counts tokens per candidate (count_tokens — tokenizer-backed when one is
+#      configured, otherwise an estimate calibrated against the prompt_eval_count
+#      Ollama reports for each call)
+#   2. drops near-duplicate snippets (word-shingle overlap), keeping the better one
+#   3. extractively compresses long candidates to their most query-relevant sentences
+#   4. fills the budget — required items first, then best score per token —
+#      shrinking a candidate that doesn't fit instead of skipping it outright
+# The budget is the model's context window minus the reply reservation
+# (_TOKEN_BUDGETS), the history and the fixed prompt, so Ollama never has to
+# truncate. Per-source token usage for each request is kept for /api/context.
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SAFETY_TOKENS = int(os.getenv("CONTEXT_SAFETY_TOKENS", 64))
+MAX_CANDIDATE_TOKENS = int(os.getenv("CONTEXT_MAX_CANDIDATE_TOKENS", 240))
+MIN_CANDIDATE_TOKENS = int(os.getenv("CONTEXT_MIN_CANDIDATE_TOKENS", 24))
+DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", 0.6))
+# "phi3:mini=4096,llama3.2:3b=8192" — falls back to OLLAMA_NUM_CTX
+_WINDOWS_ENV = os.getenv("CONTEXT_WINDOWS", "")
+# "phi3:mini=microsoft/Phi-3-mini-4k-instruct,…" (HF id or tokenizer.json path)
+_TOKENIZERS_ENV = os.getenv("CONTEXT_TOKENIZERS", "")
+_MESSAGE_OVERHEAD = 4  # chat-template tokens per message
+_CALIBRATION_ALPHA = 0.3
+
+# Section order and headings in the final prompt
+SECTIONS = [
+    ("summary", "PREVIOUS CONVERSATION CONTEXT:", "\n"),
+    ("semantic", "SEMANTIC CONTEXT:", "\n"),
+    ("episodic", "RELEVANT PAST:", "\n"),
+    ("graph", "KNOWLEDGE GRAPH:", "\n"),
+    ("rag", "RELEVANT KNOWLEDGE:", "\n\n---\n\n"),
+    ("visual", "WHAT I'VE SEEN RECENTLY:", "\n"),
+    ("ambient", "CURRENT ENVIRONMENT:", " | "),
+    ("style", "STYLE:", " "),
+]
+_SECTION = {name: (header, sep) for name, header, sep in SECTIONS}
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]|\n+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def _parse_map(spec: str) -> Dict[str, str]:
+    out = {}
+    for part in spec.split(","):
+        if "=" in part:
+            k, v = part.rsplit("=", 1)
+            out[k.strip()] = v.strip()
+    return out
+
+
+# ── Token counting ────────────────────────────────────────────────────────────
+
+_tokenizers: Dict[str, object] = {}
+_ratios: Dict[str, float] = {}  # model → observed / estimated tokens
+_tok_lock = threading.Lock()
+
+
+def _tokenizer(model: Optional[str]):
+    if not model:
+        return None
+    with _tok_lock:
+        if model in _tokenizers:
+            return _tokenizers[model]
+        spec = _parse_map(_TOKENIZERS_ENV).get(model)
+        tok = None
+        if spec:
+            try:
+                from tokenizers import Tokenizer
+
+                tok = (
+                    Tokenizer.from_file(spec)
+                    if os.path.exists(spec)
+                    else Tokenizer.from_pretrained(spec)
+                )
+            except Exception as e:
+                logger.warning("tokenizer for %s unavailable, estimating: %s", model, e)
+        _tokenizers[model] = tok
+        return tok
+
+
+def _estimate(text: str) -> int:
+    n = 0
+    for tok in _TOKEN_RE.findall(text):
+        c = tok[0]
+        if c.isalpha():
+            n += 1 if len(tok) <= 6 else math.ceil(len(tok) / 5)
+        elif c.isdigit():
+            n += math.ceil(len(tok) / 3)
+        else:
+            n += 1
+    return n
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Tokens `text` costs with `model` (exact with a tokenizer, else calibrated)."""
+    if not text:
+        return 0
+    tok = _tokenizer(model)
+    if tok is not None:
+        return len(tok.encode(text, add_special_tokens=False).ids)
+    return max(1, round(_estimate(text) * _ratios.get(model, 1.0)))
+
+
+def count_messages(messages: List[Dict], model: str = None) -> int:
+    return sum(
+        count_tokens(m.get("content", ""), model) + _MESSAGE_OVERHEAD for m in messages
+    )
+
+
+def calibrate(model: str, messages: List[Dict], prompt_eval_count: int) -> None:
+    """Fold the server's prompt token count for `messages` into the model's ratio."""
+    if not model or not isinstance(prompt_eval_count, int) or _tokenizer(model) is not None:
+        return
+    est = sum(_estimate(m.get("content", "")) + _MESSAGE_OVERHEAD for m in messages)
+    if est < 32:
+        return
+    ratio = prompt_eval_count / est
+    if not 0.5 <= ratio <= 2.5:  # prompt-cache hits report fewer tokens
+        return
+    with _tok_lock:
+        old = _ratios.get(model)
+        _ratios[model] = (
+            ratio if old is None else _CALIBRATION_ALPHA * ratio + (1 - _CALIBRATION_ALPHA) * old
+        )
+
+
+# ── Budget ────────────────────────────────────────────────────────────────────
+
+
+def context_window(model: str = None) -> int:
+    windows = _parse_map(_WINDOWS_ENV)
+    if model and model in windows:
+        return int(windows[model])
+    try:
+        import config as cfg
+
+        return cfg.OLLAMA_NUM_CTX
+    except Exception:
+        return 8192
+
+
+def reply_reservation(intent: str) -> int:
+    from core.llm_engine import _TOKEN_BUDGETS
+
+    return _TOKEN_BUDGETS.get(intent, 512)
+
+
+def budget_for(model: str, intent: str, fixed_tokens: int = 0) -> int:
+    """Tokens left for optional context once the reply, history and fixed prompt fit."""
+    return max(
+        0, context_window(model) - reply_reservation(intent) - fixed_tokens - SAFETY_TOKENS
+    )
+
+
+# ── Candidates ────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Candidate:
+    source: str
+    text: str
+    score: float = 0.5
+    required: bool = False
+    tokens: int = 0
+    compressed: bool = False
+    order: int = 0
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    budget: int
+    used: int
+    usage: Dict[str, int] = field(default_factory=dict)
+    selected: List[Candidate] = field(default_factory=list)
+    dropped: Dict[str, int] = field(default_factory=dict)
+    duplicates: int = 0
+    compressed: int = 0
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < 3:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + 3]) for i in range(len(words) - 2)}
+
+
+def dedupe(candidates: List[Candidate]) -> tuple:
+    """Drop near-duplicates (Jaccard or containment ≥ threshold). → (kept, n dropped)"""
+    kept: List[Candidate] = []
+    sigs: List[set] = []
+    dropped = 0
+    ranked = sorted(candidates, key=lambda c: (not c.required, -c.score))
+    for cand in ranked:
+        sig = _shingles(cand.text)
+        dup = False
+        for other in sigs:
+            if not sig or not other:
+                continue
+            inter = len(sig & other)
+            if inter / len(sig | other) >= DEDUP_THRESHOLD or inter / min(len(sig), len(other)) >= 0.8:
+                dup = True
+                break
+        if dup and not cand.required:
+            dropped += 1
+            continue
+        kept.append(cand)
+        sigs.append(sig)
+    kept.sort(key=lambda c: c.order)
+    return kept, dropped
+
+
+def compress(text: str, query: str, max_tokens: int, model: str = None) -> str:
+    """Keep the sentences most relevant to `query` (in original order) within max_tokens."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    from core.context_engine_v2 import _relevance_score
+
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda i: _relevance_score(sentences[i], query) + (0.05 if i == 0 else 0.0),
+        reverse=True,
+    )
+    keep, used = [], 0
+    for i in ranked:
+        cost = count_tokens(sentences[i], model) + 1
+        if used + cost <= max_tokens:
+            keep.append(i)
+            used += cost
+    if not keep:  # one long sentence: cut it at a word boundary
+        words = sentences[ranked[0]].split() if sentences else text.split()
+        while words and count_tokens(" ".join(words), model) + 1 > max_tokens:
+            words = words[: max(0, int(len(words) * 0.8))]
+        return " ".join(words) + " …" if words else ""
+    return " ".join(sentences[i] for i in sorted(keep))
+
+
+# ── Usage stats ───────────────────────────────────────────────────────────────
+
+_recent: deque = deque(maxlen=200)
+_totals: Dict[str, int] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(model: str, intent: str, result: AssembledContext, elapsed_ms: float) -> None:
+    entry = {
+        "ts": time.time(),
+        "model": model,
+        "intent": intent,
+        "budget": result.budget,
+        "used": result.used,
+        "usage": dict(result.usage),
+        "dropped": dict(result.dropped),
+        "duplicates": result.duplicates,
+        "compressed": result.compressed,
+        "ms": round(elapsed_ms, 2),
+    }
+    with _stats_lock:
+        _recent.append(entry)
+        for src, n in result.usage.items():
+            _totals[src] = _totals.get(src, 0) + n
+
+
+def get_stats() -> Dict:
+    with _stats_lock:
+        recent = list(_recent)
+        totals = dict(_totals)
+    n = len(recent)
+    return {
+        "requests": n,
+        "avg_used": round(sum(r["used"] for r in recent) / n, 1) if n else 0,
+        "avg_budget": round(sum(r["budget"] for r in recent) / n, 1) if n else 0,
+        "tokens_by_source": totals,
+        "token_ratios": {m: round(r, 3) for m, r in _ratios.items()},
+        "last": recent[-1] if recent else None,
+    }
+
+
+# ── Assembly ──────────────────────────────────────────────────────────────────
+
+
+def assemble(
+    query: str,
+    candidates: List[Candidate],
+    budget: int,
+    model: str = None,
+    intent: str = "",
+) -> AssembledContext:
+    t0 = time.perf_counter()
+    for i, c in enumerate(candidates):
+        c.order = i
+        c.text = c.text.strip()
+    candidates = [c for c in candidates if c.text]
+    candidates, duplicates = dedupe(candidates)
+    result = AssembledContext(text="", budget=budget, used=0, duplicates=duplicates)
+
+    for c in candidates:
+        c.tokens = count_tokens(c.text, model)
+        if c.tokens > MAX_CANDIDATE_TOKENS and not c.required:
+            c.text = compress(c.text, query, MAX_CANDIDATE_TOKENS, model)
+            c.tokens = count_tokens(c.text, model)
+            c.compressed = True
+
+    header_cost = {name: count_tokens(header, model) + 2 for name, header, _ in SECTIONS}
+    opened: set = set()
+    selected: List[Candidate] = []
+
+    def take(c: Candidate) -> bool:
+        header = 0 if c.source in opened else header_cost.get(c.source, 2)
+        left = budget - result.used
+        if c.tokens + header > left:
+            room = left - header
+            if room < MIN_CANDIDATE_TOKENS:
+                return False
+            text = compress(c.text, query, room, model)
+            if not text:
+                return False
+            c.text, c.compressed = text, True
+            c.tokens = count_tokens(text, model)
+            if c.tokens + header > left:
+                return False
+        cost = c.tokens + header
+        opened.add(c.source)
+        selected.append(c)
+        result.used += cost
+        result.usage[c.source] = result.usage.get(c.source, 0) + cost
+        return True
+
+    required = [c for c in candidates if c.required]
+    optional = sorted(
+        (c for c in candidates if not c.required),
+        key=lambda c: c.score / max(c.tokens, 1),
+        reverse=True,
+    )
+    for c in required + optional:
+        if not take(c):
+            result.dropped[c.source] = result.dropped.get(c.source, 0) + 1
+
+    parts = []
+    for name, header, sep in SECTIONS:
+        items = sorted((c for c in selected if c.source == name), key=lambda c: c.order)
+        if items:
+            parts.append(f"{header}\n" + sep.join(c.text for c in items))
+    for name in sorted({c.source for c in selected} - set(_SECTION)):
+        items = sorted((c for c in selected if c.source == name), key=lambda c: c.order)
+        parts.append(f"{name.upper()}:\n" + "\n".join(c.text for c in items))
+    result.text = "\n\n".join(parts)
+    result.selected = selected
+    result.compressed = sum(1 for c in selected if c.compressed)
+    elapsed = (time.perf_counter() - t0) * 1000
+    _record(model, intent, result, elapsed)
+    logger.info(
+        "context: %d/%d tokens for %s/%s | %s | dropped=%s dup=%d",
+        result.used, budget, model, intent, result.usage, result.dropped, duplicates,
+    )
+    return result
@@ -1,9 +1,16 @@
 # core/context_builder.py
+# The persona/rules prompt is fixed; everything else (memory, summaries,
+# knowledge graph, RAG, visual, ambient, style) is gathered as scored
+# candidates and fitted to the model's context window by core/context_assembler.
 import logging
 from typing import Dict, List, Tuple
 
+from core.spans import span
+
 logger = logging.getLogger(__name__)
 
+_VISION_KEYWORDS = ["screen", "see", "show", "camera", "error", "what's on"]
+
 
 class ContextBuilder:
     def build(
@@ -14,94 +21,166 @@ class ContextBuilder:
         emotion_label: str,
         query_intent: str,
         conversation_history: List[Dict],
+        model: str = None,
+        session_id: str = None,
     ) -> Tuple[str, float]:
         """Returns (system_prompt, semantic_confidence)."""
         sem_conf = 0.0
         try:
-            from personality.system import build_system_prompt
-            from memory.semantic_recall import build_semantic_context
-            from memory.episodic import build_episodic_context
+            from core.context_assembler import assemble, budget_for, count_messages
             from personality.modes import get_system_addon
+            from personality.system import build_system_prompt
 
-            # v2: ranked context selection
-            try:
-                from core.context_engine_v2 import (
-                    build_ranked_context,
-                    context_quality_report,
+            # summaries are candidates below, not part of the fixed prompt
+            base_prompt = build_system_prompt(
+                user_name=user_name,
+                memory={**memory, "conversation_summary": []},
+                emotion=emotion_label,
+                intent=query_intent,
+                addon=get_system_addon(),
+            )
+            with span("retrieval"):
+                candidates, sem_conf = self._candidates(
+                    user_input, user_name, memory, query_intent, session_id
                 )
-
-                semantic_ctx, sem_conf = build_ranked_context(
-                    user_input, user_name, query_intent
+            fixed = count_messages(
+                [{"content": base_prompt}]
+                + list(conversation_history or [])
+                + [{"content": user_input}],
+                model,
+            )
+            with span("context.assemble", candidates=len(candidates)):
+                ctx = assemble(
+                    user_input,
+                    candidates,
+                    budget_for(model, query_intent, fixed),
+                    model=model,
+                    intent=query_intent,
                 )
-                episodic_ctx = ""  # already included in v2
-                report = context_quality_report(user_input, semantic_ctx)
-                logger.info("�� ctx_quality: %s", report)
-            except Exception as _v2e:
-                logger.warning("context_v2 failed, using v1: %s", _v2e)
-                semantic_ctx, sem_conf = build_semantic_context(user_input, user_name)
-                episodic_ctx = build_episodic_context(user_input, user_name)
-            addon = get_system_addon()
+            if not ctx.text:
+                return base_prompt, sem_conf
+            return base_prompt + "\n\n" + ctx.text, sem_conf
 
-            # Inject long-term conversation summaries
-            summary_ctx = ""
-            try:
-                from memory.summarizer import get_recent_context
+        except Exception as e:
+            logger.warning("ContextBuilder.build failed: %s", e)
+            fallback = (
+                f"You are ASTRA, a smart personal AI assistant for {user_name}. "
+                "Be concise, accurate, and direct."
+            )
+            return fallback, sem_conf
 
-                summary_ctx = get_recent_context(memory, max_summaries=3)
-            except Exception as _e:
-                logger.debug("context_builder: %s", _e)
+    def _candidates(
+        self,
+        user_input: str,
+        user_name: str,
+        memory: Dict,
+        query_intent: str,
+        session_id: str = None,
+    ) -> Tuple[list, float]:
+        from core.context_assembler import Candidate
 
-            system_prompt = build_system_prompt(
-                user_name=user_name,
-                memory=memory,
-                emotion=emotion_label,
-                intent=query_intent,
-                semantic_ctx=semantic_ctx,
-                episodic_ctx=episodic_ctx,
-                addon=addon,
-            )
+        out: list = []
+        sem_conf = 0.0
 
-            if summary_ctx:
-                system_prompt = summary_ctx + "\n\n" + system_prompt
+        # v2: ranked semantic + episodic memory
+        with span("retrieval.memory"):
+            try:
+                from core.context_engine_v2 import collect_candidates
 
-            # Inject visual memory context for vision-related queries
-            vision_keywords = ["screen", "see", "show", "camera", "error", "what's on"]
-            if any(w in user_input.lower() for w in vision_keywords):
+                mem, sem_conf = collect_candidates(user_input, user_name, query_intent)
+                out.extend(mem)
+            except Exception as _v2e:
+                logger.warning("context_v2 failed, using v1: %s", _v2e)
                 try:
-                    from core.visual_memory import build_visual_context
-
-                    visual_ctx = build_visual_context(user_input)
-                    if visual_ctx:
-                        system_prompt += visual_ctx
+                    from memory.episodic import build_episodic_context
+                    from memory.semantic_recall import build_semantic_context
+
+                    semantic_ctx, sem_conf = build_semantic_context(user_input, user_name)
+                    out.append(Candidate("semantic", semantic_ctx, 0.6))
+                    out.append(
+                        Candidate("episodic", build_episodic_context(user_input, user_name), 0.4)
+                    )
                 except Exception as _e:
                     logger.debug("context_builder: %s", _e)
 
-            # Inject adaptive personality style
+        # This session's rolling digest (memory/history_compactor) — read only;
+        # summaries are built in the background
+        if session_id:
             try:
-                from core.adaptive_personality import get_style_addon
+                from memory.history_compactor import get_compactor
 
-                style_addon = get_style_addon()
-                if style_addon:
-                    system_prompt += f"\n\nSTYLE: {style_addon}"
+                base = {"session": 0.6, "segment": 0.5, "turn": 0.45}
+                for level, text in get_compactor().context_lines(session_id):
+                    out.append(Candidate("summary", f"• {text}", base[level]))
             except Exception as _e:
                 logger.debug("context_builder: %s", _e)
 
-            # Inject live ambient context
+        # Long-term conversation summaries — newer ones score higher
+        try:
+            summaries = memory.get("conversation_summary", [])[-3:]
+            for i, s in enumerate(summaries):
+                ts = s.get("timestamp", "")[:10]
+                score = 0.35 + 0.1 * (i + 1) / len(summaries)
+                out.append(Candidate("summary", f"• [{ts}] {s['summary']}", score))
+        except Exception as _e:
+            logger.debug("context_builder: %s", _e)
+
+        # Knowledge graph facts
+        with span("retrieval.graph"):
             try:
-                from core.ambient import get_context_string
+                from core.context_engine_v2 import _relevance_score
+                from knowledge.graph import build_graph_context
+
+                graph_ctx = build_graph_context(user_input, user_name)
+                for line in graph_ctx.splitlines()[1:]:
+                    out.append(
+                        Candidate("graph", line, 0.3 + 0.5 * _relevance_score(line, user_input))
+                    )
+            except Exception as _e:
+                logger.debug("context_builder: %s", _e)
 
-                ambient_ctx = get_context_string()
-                if ambient_ctx:
-                    system_prompt += f"\n\nCURRENT ENVIRONMENT: {ambient_ctx}"
+        # RAG document chunks
+        with span("retrieval.rag"):
+            try:
+                from rag.rag_engine import retrieve, should_use_rag
+
+                if should_use_rag(user_input):
+                    for rank, r in enumerate(retrieve(user_input, top_k=3)):
+                        text = f"[{r.get('source', 'unknown')}]\n{r['text'].strip()}"
+                        out.append(Candidate("rag", text, 0.75 - 0.1 * rank))
+            except Exception as _e:
+                logger.debug("RAG: %s", _e)
+
+        # Visual memory for vision-related queries
+        if any(w in user_input.lower() for w in _VISION_KEYWORDS):
+            try:
+                from core.visual_memory import build_visual_context
+
+                visual_ctx = build_visual_context(user_input)
+                for line in visual_ctx.strip().splitlines()[1:]:
+                    out.append(Candidate("visual", line, 0.6))
             except Exception as _e:
                 logger.debug("context_builder: %s", _e)
 
-            return system_prompt, sem_conf
+        # Adaptive personality style — small, always kept
+        try:
+            from core.adaptive_personality import get_style_addon
 
-        except Exception as e:
-            logger.warning("ContextBuilder.build failed: %s", e)
-            fallback = (
-                f"You are ASTRA, a smart personal AI assistant for {user_name}. "
-                "Be concise, accurate, and direct."
-            )
-            return fallback, sem_conf
+            style_addon = get_style_addon()
+            if style_addon:
+                out.append(Candidate("style", style_addon, 1.0, required=True))
+        except Exception as _e:
+            logger.debug("context_builder: %s", _e)
+
+        # Live ambient context
+        try:
+            from core.ambient import get_context_string
+
+            ambient_ctx = get_context_string()
+            if ambient_ctx:
+                score = 0.7 if "Error on screen" in ambient_ctx else 0.4
+                out.append(Candidate("ambient", ambient_ctx, score))
+        except Exception as _e:
+            logger.debug("context_builder: %s", _e)
+
+        return out, sem_conf
@@ -70,7 +70,9 @@ def _compress_text(text: str, max_words: int = 40) -> str:
 
 
 def _count_tokens(text: str) -> int:
-    return int(len(text.split()) * 1.3)
+    from core.context_assembler import count_tokens
+
+    return count_tokens(text)
 
 
 def select_best_chunks(
@@ -172,6 +174,40 @@ def build_ranked_context(
     return context, confidence_boost
 
 
+def collect_candidates(
+    query: str, user_name: str, query_intent: str = "general"
+) -> Tuple[List, float]:
+    """
+    Memory candidates for core/context_assembler: every fact, exchange and
+    the episodic summary, scored but not yet cut to a token budget.
+    """
+    from core.context_assembler import Candidate
+    from memory.vector_store import semantic_search
+
+    facts, exchanges = semantic_search(query, top_k=8)
+    confidence_boost = 0.0
+    out: List = []
+    for f in select_best_chunks(query, facts, max_tokens=1 << 30, top_k=8):
+        out.append(Candidate("semantic", f"  * {f['text']}", f["combined_score"]))
+        if f.get("combined_score", 0) >= 0.65:
+            confidence_boost = 0.85
+    for ex in select_best_chunks(query, exchanges, max_tokens=1 << 30, top_k=6):
+        # past exchanges rank below facts of the same relevance
+        out.append(Candidate("semantic", f"  * {ex['text']}", 0.8 * ex["combined_score"]))
+
+    try:
+        from memory.episodic import build_episodic_context
+
+        ep_ctx = build_episodic_context(query, user_name)
+        if ep_ctx and len(ep_ctx.strip()) > 10:
+            rel = _relevance_score(ep_ctx, query)
+            if rel > 0.2 or query_intent in ("memory", "casual"):
+                out.append(Candidate("episodic", ep_ctx, 0.3 + 0.5 * rel))
+    except Exception as e:
+        logger.debug("context_v2 episodic: %s", e)
+    return out, confidence_boost
+
+
 def context_quality_report(query: str, context: str) -> Dict:
     return {
         "query_words": len(query.split()),
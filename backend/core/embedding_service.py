@@ -0,0 +1,233 @@
+"""
+core/embedding_service.py — One embedding model per process.
+
+Memory (memory/vector_store.py) and RAG (rag/embeddings.py) both write into
+the same 384-dim LanceDB `vector` column, so they must embed with the same
+model. This service owns that model and adds:
+
+  * a content-hash LRU cache — the same query is embedded once per turn even
+    though context_v2, semantic_recall, ReAct memory_recall and store_fact's
+    dedup search all ask for it
+  * a micro-batcher — concurrent embed() calls from different threads are
+    coalesced into a single encode() batch within a small time window
+  * batch-size / latency / hit-rate metrics via stats()
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+EMBED_DIM = 384
+_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", 2048))
+_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", 5))
+_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", 32))
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "ignore")).hexdigest()
+
+
+class EmbeddingService:
+    def __init__(
+        self,
+        model_name: str = EMBED_MODEL,
+        cache_size: int = _CACHE_SIZE,
+        batch_window_ms: float = _BATCH_WINDOW_MS,
+        max_batch: int = _MAX_BATCH,
+    ):
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch = max_batch
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        # metrics
+        self._hits = 0
+        self._misses = 0
+        self._batches = 0
+        self._batched_texts = 0
+        self._max_batch_seen = 0
+        self._encode_ms: deque = deque(maxlen=256)
+
+    # ── Model ─────────────────────────────────────────────────────────────
+
+    def _load_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    self._model = SentenceTransformer(self.model_name)
+                    logger.info("Embedder loaded: %s", self.model_name)
+        return self._model
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        model = self._load_model()
+        t0 = time.perf_counter()
+        vecs = model.encode(
+            texts, normalize_embeddings=True, show_progress_bar=False
+        )
+        self._encode_ms.append((time.perf_counter() - t0) * 1000)
+        self._batches += 1
+        self._batched_texts += len(texts)
+        self._max_batch_seen = max(self._max_batch_seen, len(texts))
+        return np.asarray(vecs, dtype=np.float32).reshape(len(texts), -1)
+
+    # ── Cache ─────────────────────────────────────────────────────────────
+
+    def _cache_get(self, key: str) -> Optional[np.ndarray]:
+        with self._cache_lock:
+            vec = self._cache.get(key)
+            if vec is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+            return vec
+
+    def _cache_put(self, key: str, vec: np.ndarray) -> None:
+        vec.flags.writeable = False  # shared between callers
+        with self._cache_lock:
+            self._cache[key] = vec
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ── Micro-batcher ─────────────────────────────────────────────────────
+
+    def _ensure_worker(self) -> None:
+        if self._worker and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._batch_loop, name="embed-batcher", daemon=True
+            )
+            self._worker.start()
+
+    def _batch_loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            pending = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(pending)
+
+    def _run_batch(self, pending: List[tuple]) -> None:
+        # Identical texts queued concurrently are encoded once
+        unique: Dict[str, str] = {}
+        for key, text, _ in pending:
+            unique.setdefault(key, text)
+        keys = list(unique)
+        try:
+            vecs = self._encode([unique[k] for k in keys])
+        except Exception as e:
+            logger.error("Embed batch error: %s", e)
+            for _, _, fut in pending:
+                fut.set_exception(e)
+            return
+        by_key = {}
+        for i, k in enumerate(keys):
+            by_key[k] = vecs[i]
+            self._cache_put(k, vecs[i])
+        for key, _, fut in pending:
+            fut.set_result(by_key[key])
+
+    # ── Public API ────────────────────────────────────────────────────────
+
+    def embed(self, text: str, timeout: float = 30.0) -> Optional[np.ndarray]:
+        """Embed one string → normalized float32 (384,). None on failure."""
+        key = _hash(text)
+        vec = self._cache_get(key)
+        if vec is not None:
+            return vec
+        fut: Future = Future()
+        self._ensure_worker()
+        self._queue.put((key, text, fut))
+        try:
+            return fut.result(timeout=timeout)
+        except Exception as e:
+            logger.error("Embed error: %s", e)
+            return None
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed many strings in one encode() call (cache-aware) → (N, 384)."""
+        if not texts:
+            return np.zeros((0, EMBED_DIM), dtype=np.float32)
+        keys = [_hash(t) for t in texts]
+        out: List[Optional[np.ndarray]] = [self._cache_get(k) for k in keys]
+        missing: Dict[str, str] = {}
+        for i, vec in enumerate(out):
+            if vec is None:
+                missing.setdefault(keys[i], texts[i])
+        if missing:
+            miss_keys = list(missing)
+            vecs = self._encode([missing[k] for k in miss_keys])
+            fresh = {}
+            for i, k in enumerate(miss_keys):
+                fresh[k] = vecs[i]
+                self._cache_put(k, vecs[i])
+            out = [v if v is not None else fresh[keys[i]] for i, v in enumerate(out)]
+        return np.vstack(out).astype(np.float32, copy=False)
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict:
+        lookups = self._hits + self._misses
+        lat = sorted(self._encode_ms)
+        return {
+            "model": self.model_name,
+            "loaded": self._model is not None,
+            "cache_size": len(self._cache),
+            "cache_capacity": self.cache_size,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            "batches": self._batches,
+            "avg_batch_size": (
+                round(self._batched_texts / self._batches, 2) if self._batches else 0.0
+            ),
+            "max_batch_size": self._max_batch_seen,
+            "encode_avg_ms": round(sum(lat) / len(lat), 2) if lat else 0.0,
+            "encode_p95_ms": round(lat[int(len(lat) * 0.95)], 2) if lat else 0.0,
+            "queue_depth": self._queue.qsize(),
+        }
+
+
+_service: Optional[EmbeddingService] = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
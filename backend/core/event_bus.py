@@ -1,22 +1,138 @@
 # core/event_bus.py — Lightweight async event bus for ASTRA
+# A fixed pool of EVENT_WORKERS threads delivers events; publish() only
+# appends to queues and never runs handlers itself. Each subscriber has its
+# own bounded queue per topic (EVENT_QUEUE_MAX, configure_topic() to override)
+# with an overflow policy:
+#   drop_oldest  the oldest pending event is discarded (default)
+#   coalesce     at most one pending event; a newer one replaces it
+#   block        publish() waits up to EVENT_BLOCK_TIMEOUT_MS for room, then
+#                drops the new event — keep it off the request path
+# ordered=True subscribers get their events one at a time, in publish order;
+# others may run on several workers at once. Depth, drops and handler
+# latency per subscriber are in get_stats().
+import os
 import threading
 import time
 import logging
-from typing import Callable, Dict, List, Any
-from collections import defaultdict, deque
+from typing import Callable, Dict, List, Any, Optional
+from collections import deque
+
+from core.sketch import DDSketch
 
 logger = logging.getLogger(__name__)
 
+WORKERS = int(os.getenv("EVENT_WORKERS", 4))
+QUEUE_MAX = int(os.getenv("EVENT_QUEUE_MAX", 1000))
+OVERFLOW = os.getenv("EVENT_OVERFLOW", "drop_oldest")
+BLOCK_TIMEOUT = int(os.getenv("EVENT_BLOCK_TIMEOUT_MS", 50)) / 1000
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "block")
+
+
+class _Subscription:
+    __slots__ = (
+        "event", "handler", "name", "ordered", "queue", "tokens", "running",
+        "active", "delivered", "dropped", "coalesced", "errors", "latency",
+    )
+
+    def __init__(self, event: str, handler: Callable, name: str, ordered: bool):
+        self.event = event
+        self.handler = handler
+        self.name = name
+        self.ordered = ordered
+        self.queue: deque = deque()
+        self.tokens = 0  # entries in the bus's ready queue
+        self.running = 0
+        self.active = True
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.latency = DDSketch()
+
+    def stats(self) -> Dict:
+        p50, p95 = self.latency.quantiles((0.5, 0.95))
+        return {
+            "event": self.event,
+            "handler": self.name,
+            "ordered": self.ordered,
+            "depth": len(self.queue),
+            "running": self.running,
+            "lag_s": round(time.time() - self.queue[0]["ts"], 3) if self.queue else 0.0,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "avg_ms": round(self.latency.sum / self.latency.count, 2) if self.latency.count else 0.0,
+            "p50_ms": round(p50, 2),
+            "p95_ms": round(p95, 2),
+            "max_ms": round(self.latency.max, 2) if self.latency.count else 0.0,
+        }
+
 
 class EventBus:
-    def __init__(self):
-        self._subscribers: Dict[str, List[Callable]] = defaultdict(list)
+    def __init__(self, workers: int = WORKERS):
+        self._subscribers: Dict[str, List[_Subscription]] = {}
+        self._topics: Dict[str, Dict] = {}
         self._history: deque = deque(maxlen=100)
         self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)  # ready queue non-empty
+        self._space = threading.Condition(self._lock)  # a queue shrank (block policy)
+        self._done = threading.Condition(self._lock)  # a delivery finished (flush)
+        self._ready: deque = deque()
+        self._n_workers = workers
+        self._workers: List[threading.Thread] = []
+
+    def configure_topic(self, event: str, maxsize: int = None, overflow: str = None):
+        if overflow is not None and overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        with self._lock:
+            topic = self._topic(event)
+            if maxsize is not None:
+                topic["maxsize"] = max(1, maxsize)
+            if overflow is not None:
+                topic["overflow"] = overflow
+
+    def _topic(self, event: str) -> Dict:
+        topic = self._topics.get(event)
+        if topic is None:
+            topic = self._topics[event] = {
+                "maxsize": QUEUE_MAX,
+                "overflow": OVERFLOW,
+                "published": 0,
+                "dropped": 0,
+            }
+        return topic
 
-    def subscribe(self, event: str, handler: Callable):
+    def subscribe(self, event: str, handler: Callable, ordered: bool = False, name: str = None):
+        sub = _Subscription(
+            event, handler, name or getattr(handler, "__qualname__", repr(handler)), ordered
+        )
         with self._lock:
-            self._subscribers[event].append(handler)
+            self._subscribers.setdefault(event, []).append(sub)
+            self._topic(event)
+            self._start_workers()
+        return sub
+
+    def unsubscribe(self, event: str, handler: Callable) -> bool:
+        """Stop delivering to handler; its pending events are discarded."""
+        with self._lock:
+            subs = self._subscribers.get(event, [])
+            for sub in subs:
+                if sub.handler == handler:
+                    subs.remove(sub)
+                    sub.active = False
+                    sub.queue.clear()
+                    self._space.notify_all()
+                    return True
+        return False
+
+    def _start_workers(self) -> None:
+        while len(self._workers) < self._n_workers:
+            t = threading.Thread(
+                target=self._run, name=f"event-worker-{len(self._workers)}", daemon=True
+            )
+            self._workers.append(t)
+            t.start()
 
     def publish(self, event: str, data: Any = None):
         payload = {
@@ -28,22 +144,110 @@ class EventBus:
         logger.debug("📡 event: %s | %s", event, str(data)[:80])
 
         with self._lock:
-            handlers = list(self._subscribers.get(event, []))
+            subs = self._subscribers.get(event)
+            if not subs:
+                return
+            topic = self._topics[event]
+            topic["published"] += 1
+            for sub in list(subs):
+                self._offer(sub, payload, topic)
 
-        for handler in handlers:
+    def _offer(self, sub: _Subscription, payload: Dict, topic: Dict) -> None:
+        """Queue payload for one subscriber (caller holds _lock)."""
+        q, overflow = sub.queue, topic["overflow"]
+        if overflow == "coalesce" and q:
+            q[-1] = payload
+            sub.coalesced += 1
+            return
+        if len(q) >= topic["maxsize"]:
+            if overflow == "block":
+                deadline = time.monotonic() + BLOCK_TIMEOUT
+                while len(q) >= topic["maxsize"] and sub.active:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        sub.dropped += 1
+                        topic["dropped"] += 1
+                        return
+                    self._space.wait(remaining)
+                if not sub.active:
+                    return
+            else:
+                q.popleft()
+                sub.dropped += 1
+                topic["dropped"] += 1
+                q.append(payload)  # same length: its ready entry is already there
+                return
+        q.append(payload)
+        self._schedule(sub)
+
+    def _schedule(self, sub: _Subscription) -> None:
+        if sub.ordered and (sub.tokens or sub.running):
+            return  # the worker that finishes the current one reschedules
+        sub.tokens += 1
+        self._ready.append(sub)
+        self._work.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._ready:
+                    self._work.wait()
+                sub = self._ready.popleft()
+                sub.tokens -= 1
+                if not sub.queue:
+                    continue  # unsubscribed meanwhile
+                payload = sub.queue.popleft()
+                sub.running += 1
+                self._space.notify_all()
+            t0 = time.perf_counter()
+            failed = False
             try:
-                threading.Thread(target=handler, args=(payload,), daemon=True).start()
+                sub.handler(payload)
             except Exception as e:
-                logger.warning("event handler error [%s]: %s", event, e)
+                failed = True
+                logger.warning("event handler error [%s → %s]: %s", sub.event, sub.name, e)
+            ms = (time.perf_counter() - t0) * 1000
+            with self._lock:
+                sub.running -= 1
+                sub.delivered += 1
+                sub.errors += failed
+                sub.latency.add(ms)
+                if sub.ordered and sub.queue and sub.active:
+                    self._schedule(sub)
+                self._done.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued event has been handled (shutdown, tests)."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._ready or any(
+                s.queue or s.running for subs in self._subscribers.values() for s in subs
+            ):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._done.wait(remaining)
+        return True
 
     def get_history(self, limit: int = 20) -> list:
         return list(self._history)[-limit:]
 
     def get_stats(self) -> dict:
         with self._lock:
+            subs = [s for v in self._subscribers.values() for s in v]
             return {
                 "subscriptions": {k: len(v) for k, v in self._subscribers.items()},
                 "history_count": len(self._history),
+                "workers": len(self._workers),
+                "busy_workers": sum(s.running for s in subs),
+                "ready": len(self._ready),
+                "topics": {
+                    k: {**t, "depth": sum(len(s.queue) for s in self._subscribers.get(k, []))}
+                    for k, t in self._topics.items()
+                },
+                "subscribers": sorted(
+                    (s.stats() for s in subs), key=lambda s: s["p95_ms"], reverse=True
+                ),
             }
 
 
@@ -55,8 +259,16 @@ def publish(event: str, data: Any = None):
     _bus.publish(event, data)
 
 
-def subscribe(event: str, handler: Callable):
-    _bus.subscribe(event, handler)
+def subscribe(event: str, handler: Callable, ordered: bool = False, name: Optional[str] = None):
+    return _bus.subscribe(event, handler, ordered=ordered, name=name)
+
+
+def unsubscribe(event: str, handler: Callable) -> bool:
+    return _bus.unsubscribe(event, handler)
+
+
+def configure_topic(event: str, maxsize: int = None, overflow: str = None):
+    _bus.configure_topic(event, maxsize=maxsize, overflow=overflow)
 
 
 def get_history(limit: int = 20) -> list:
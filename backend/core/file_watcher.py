@@ -0,0 +1,445 @@
+"""
+core/file_watcher.py — One file-watch service for every directory consumer.
+
+Used by rag/watcher.py (documents) and tools/plugin_watcher.py (plugins).
+
+Backends:
+  * inotify (Linux) — via libc through ctypes, no extra dependency. The loop
+    blocks in select() until the kernel has events or a debounce deadline is
+    due, so an idle watcher does not wake up at all.
+  * poll — a single shared thread diffs (mtime, size) snapshots every
+    FILE_WATCH_POLL_INTERVAL seconds. Used on other platforms, or when
+    inotify is unavailable or FILE_WATCH_BACKEND=poll.
+
+Raw events are coalesced per path before delivery:
+  created + modified → created     created + deleted → (dropped)
+  deleted + created  → modified    modified + deleted → deleted
+A rename arrives as deleted(old) + created(new), so an editor's atomic
+"write temp file, rename over target" save is a single change to the target:
+the temp file's create + rename-away cancel out. A subscription's batch is delivered FILE_WATCH_DEBOUNCE_MS after
+its last event, but never later than FILE_WATCH_MAX_DELAY_MS after its first.
+Callbacks get {path: "created" | "modified" | "deleted"}. After a kernel
+queue overflow they get {root: "rescan"}. Each subscription's callback runs
+on its own thread, never concurrently with itself.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKEND = os.getenv("FILE_WATCH_BACKEND", "auto")  # auto | inotify | poll
+DEBOUNCE = float(os.getenv("FILE_WATCH_DEBOUNCE_MS", 300)) / 1000.0
+MAX_DELAY = float(os.getenv("FILE_WATCH_MAX_DELAY_MS", 2000)) / 1000.0
+POLL_INTERVAL = float(os.getenv("FILE_WATCH_POLL_INTERVAL", 3))
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+_MERGE = {
+    ("created", "modified"): "created",
+    ("created", "deleted"): None,
+    ("deleted", "created"): "modified",
+    ("deleted", "modified"): "modified",
+    ("modified", "created"): "modified",
+    ("modified", "deleted"): "deleted",
+}
+
+
+def _merge(changes: Dict[str, str], path: str, kind: str) -> None:
+    old = changes.get(path)
+    new = kind if old is None or old == kind else _MERGE.get((old, kind), kind)
+    if new is None:
+        changes.pop(path, None)
+    else:
+        changes[path] = new
+
+
+class _Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm = libc.inotify_rm_watch
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self._add(self.fd, os.fsencode(path), _MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {path}")
+        return wd
+
+    def read(self) -> List[tuple]:
+        """[(wd, mask, name)] — empty when nothing is pending."""
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        out, i = [], 0
+        while i + _EVENT.size <= len(buf):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buf, i)
+            name = buf[i + _EVENT.size : i + _EVENT.size + length].rstrip(b"\0")
+            out.append((wd, mask, os.fsdecode(name)))
+            i += _EVENT.size + length
+        return out
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class _Subscription:
+    def __init__(self, name: str, root: str, callback: Callable, recursive: bool, accept):
+        self.name = name
+        self.root = root
+        self.callback = callback
+        self.recursive = recursive
+        self.accept = accept
+        self.pending: Dict[str, str] = {}
+        self.first_event = 0.0
+        self.last_event = 0.0
+        self.snapshot: Dict[str, tuple] = {}
+        self.inbox: Dict[str, str] = {}
+        self.running = False
+        self.lock = threading.Lock()
+        self.batches = 0
+
+    def owns(self, path: str) -> bool:
+        if path == self.root:
+            return True
+        if not path.startswith(self.root + os.sep):
+            return False
+        return self.recursive or os.path.dirname(path) == self.root
+
+    def due(self, now: float) -> Optional[float]:
+        if not self.pending:
+            return None
+        return min(self.last_event + DEBOUNCE, self.first_event + MAX_DELAY) - now
+
+
+class FileWatcher:
+    def __init__(self, backend: str = BACKEND):
+        self.backend = backend
+        self._subs: List[_Subscription] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._inotify: Optional[_Inotify] = None
+        self._wd_dirs: Dict[int, str] = {}
+        self._wake_r, self._wake_w = os.pipe()
+        self._next_poll = 0.0
+        self._stats = {
+            "raw_events": 0,
+            "batches": 0,
+            "paths_delivered": 0,
+            "wakeups": 0,
+            "overflows": 0,
+            "errors": 0,
+            "last_latency_ms": None,
+        }
+
+    # ── Setup ─────────────────────────────────────────────────────────────
+
+    def _select_backend(self) -> None:
+        if self.backend in ("auto", "inotify") and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+                self.backend = "inotify"
+                return
+            except Exception as e:
+                logger.warning("inotify unavailable, polling instead: %s", e)
+        self.backend = "poll"
+
+    def start(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            self._select_backend()
+            self._running = True
+            self._thread = threading.Thread(
+                target=self._loop, name="file-watcher", daemon=True
+            )
+            self._thread.start()
+        logger.info("👀 File watcher started (backend=%s)", self.backend)
+
+    def stop(self) -> None:
+        self._running = False
+        os.write(self._wake_w, b"x")
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+            self._wd_dirs.clear()
+
+    def watch(
+        self,
+        name: str,
+        root: str,
+        callback: Callable[[Dict[str, str]], None],
+        recursive: bool = False,
+        accept: Callable[[str], bool] = None,
+    ) -> None:
+        """Deliver coalesced changes under `root` (files passing `accept`) to callback."""
+        self.start()
+        root = os.path.abspath(root)
+        os.makedirs(root, exist_ok=True)
+        sub = _Subscription(name, root, callback, recursive, accept or (lambda p: True))
+        if self.backend == "inotify":
+            self._add_tree(root, recursive)
+        else:
+            sub.snapshot = self._snapshot(sub)
+        with self._lock:
+            self._subs.append(sub)
+        os.write(self._wake_w, b"x")  # recompute timeouts
+
+    def unwatch(self, name: str) -> None:
+        """Drop a subscription (kernel watches stay until stop())."""
+        with self._lock:
+            self._subs = [s for s in self._subs if s.name != name]
+
+    def _add_tree(self, root: str, recursive: bool) -> List[str]:
+        """Watch root (and subdirectories). Returns files found in new subdirectories."""
+        found = []
+        dirs = [root]
+        if recursive:
+            for dirpath, dirnames, files in os.walk(root):
+                dirs.extend(os.path.join(dirpath, d) for d in dirnames)
+                if dirpath != root:
+                    found.extend(os.path.join(dirpath, f) for f in files)
+        for d in dirs:
+            if d in self._wd_dirs.values():
+                continue
+            try:
+                self._wd_dirs[self._inotify.add_watch(d)] = d
+            except OSError as e:
+                logger.warning("file watch on %s failed: %s", d, e)
+        return found
+
+    # ── Event intake ──────────────────────────────────────────────────────
+
+    def _record(self, path: str, kind: str, now: float) -> None:
+        self._stats["raw_events"] += 1
+        with self._lock:
+            subs = [s for s in self._subs if s.owns(path)]
+        for sub in subs:
+            if kind != "rescan" and not sub.accept(path):
+                continue
+            if not sub.pending:
+                sub.first_event = now
+            sub.last_event = now
+            if kind == "rescan":
+                sub.pending[sub.root] = "rescan"
+            else:
+                _merge(sub.pending, path, kind)
+
+    def _read_inotify(self, now: float) -> None:
+        for wd, mask, name in self._inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                self._stats["overflows"] += 1
+                for sub in list(self._subs):
+                    self._record(sub.root, "rescan", now)
+                continue
+            base = self._wd_dirs.get(wd)
+            if base is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF):
+                if mask & IN_IGNORED:
+                    self._wd_dirs.pop(wd, None)
+                continue
+            path = os.path.join(base, name) if name else base
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    recursive = any(s.recursive and s.owns(path) for s in self._subs)
+                    if recursive:
+                        try:
+                            files = self._add_tree(path, True) + [
+                                os.path.join(path, f) for f in os.listdir(path)
+                                if os.path.isfile(os.path.join(path, f))
+                            ]
+                        except OSError as e:  # already gone again
+                            logger.debug("file watch %s: %s", path, e)
+                            continue
+                        for f in files:
+                            self._record(f, "created", now)
+                continue
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._record(path, "created", now)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._record(path, "deleted", now)
+            elif mask & (IN_MODIFY | IN_CLOSE_WRITE):
+                self._record(path, "modified", now)
+
+    def _snapshot(self, sub: _Subscription) -> Dict[str, tuple]:
+        snap = {}
+        walker = os.walk(sub.root) if sub.recursive else [
+            (sub.root, None, [e.name for e in os.scandir(sub.root) if e.is_file()])
+        ]
+        for dirpath, _, files in walker:
+            for f in files:
+                path = os.path.join(dirpath, f)
+                if not sub.accept(path):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snap[path] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def _poll(self, now: float) -> None:
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            try:
+                snap = self._snapshot(sub)
+            except OSError as e:
+                logger.debug("file watch poll %s: %s", sub.root, e)
+                continue
+            old, sub.snapshot = sub.snapshot, snap
+            for path, sig in snap.items():
+                if path not in old:
+                    self._record(path, "created", now)
+                elif old[path] != sig:
+                    self._record(path, "modified", now)
+            for path in old.keys() - snap.keys():
+                self._record(path, "deleted", now)
+
+    # ── Delivery ──────────────────────────────────────────────────────────
+
+    def _flush_due(self, now: float) -> Optional[float]:
+        """Deliver ripe batches; return seconds until the next deadline (None = idle)."""
+        nxt = None
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            wait = sub.due(now)
+            if wait is None:
+                continue
+            if wait > 0:
+                nxt = wait if nxt is None else min(nxt, wait)
+                continue
+            batch, sub.pending = sub.pending, {}
+            self._stats["batches"] += 1
+            self._stats["paths_delivered"] += len(batch)
+            self._stats["last_latency_ms"] = round((now - sub.first_event) * 1000, 1)
+            self._deliver(sub, batch)
+        return nxt
+
+    def _deliver(self, sub: _Subscription, batch: Dict[str, str]) -> None:
+        with sub.lock:
+            for path, kind in batch.items():
+                if kind == "rescan":
+                    sub.inbox[path] = kind
+                else:
+                    _merge(sub.inbox, path, kind)
+            if sub.running:
+                return
+            sub.running = True
+        threading.Thread(
+            target=self._drain, args=(sub,), name=f"watch-{sub.name}", daemon=True
+        ).start()
+
+    def _drain(self, sub: _Subscription) -> None:
+        while True:
+            with sub.lock:
+                if not sub.inbox:
+                    sub.running = False
+                    return
+                batch, sub.inbox = sub.inbox, {}
+            sub.batches += 1
+            try:
+                sub.callback(batch)
+            except Exception as e:
+                logger.warning("file watch callback %s failed: %s", sub.name, e)
+
+    # ── Loop ──────────────────────────────────────────────────────────────
+
+    def _loop(self) -> None:
+        while self._running:
+            try:
+                if not self._tick():
+                    break
+            except Exception as e:  # one bad event must not end the watcher
+                self._stats["errors"] += 1
+                logger.warning("file watcher loop error: %s", e)
+                time.sleep(0.05)
+
+    def _tick(self) -> bool:
+        """One wait-and-dispatch round; False when the wake fds are gone."""
+        now = time.monotonic()
+        timeout = self._flush_due(now)
+        if self.backend == "poll":
+            until_poll = max(0.0, self._next_poll - now)
+            timeout = until_poll if timeout is None else min(timeout, until_poll)
+        fds = [self._wake_r] + ([self._inotify.fd] if self._inotify else [])
+        try:
+            ready, _, _ = select.select(fds, [], [], timeout)
+        except (OSError, ValueError):
+            return False
+        self._stats["wakeups"] += 1
+        now = time.monotonic()
+        if self._wake_r in ready:
+            os.read(self._wake_r, 1024)
+        if self._inotify and self._inotify.fd in ready:
+            self._read_inotify(now)
+        if self.backend == "poll" and now >= self._next_poll:
+            self._next_poll = now + POLL_INTERVAL
+            self._poll(now)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            subs = [
+                {"name": s.name, "root": s.root, "batches": s.batches, "pending": len(s.pending)}
+                for s in self._subs
+            ]
+        return {
+            **self._stats,
+            "backend": self.backend,
+            "running": self._running,
+            "watched_dirs": len(self._wd_dirs) if self.backend == "inotify" else None,
+            "debounce_ms": DEBOUNCE * 1000,
+            "subscriptions": subs,
+        }
+
+
+_watcher: Optional[FileWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def get_file_watcher() -> FileWatcher:
+    global _watcher
+    if _watcher is None:
+        with _watcher_lock:
+            if _watcher is None:
+                _watcher = FileWatcher()
+    return _watcher
@@ -5,6 +5,8 @@ import threading
 from typing import Generator, List, Dict
 import ollama
 
+from core.spans import span
+
 
 def _cloud_fallback(prompt: str, system: str = "") -> str:
     import config as cfg
@@ -124,7 +126,8 @@ class LLMEngine:
             try:
                 from agents.reasoner import reason
 
-                processed = reason(user_input, model=selected_model)
+                with span("llm.reason", model=selected_model):
+                    processed = reason(user_input, model=selected_model)
             except Exception as e:
                 logger.warning("reasoner failed: %s", e)
 
@@ -135,16 +138,26 @@ class LLMEngine:
         )
         token_budget = _TOKEN_BUDGETS.get(query_intent, 512)
         try:
-            resp = _client().chat(
-                model=selected_model,
-                messages=messages,
-                options={
-                    "temperature": 0.65,
-                    "num_predict": token_budget,
-                    "top_p": 0.9,
-                    "repeat_penalty": 1.1,
-                },
-            )
+            from core.context_assembler import calibrate, context_window
+
+            with span("llm.chat", model=selected_model) as s:
+                resp = _client().chat(
+                    model=selected_model,
+                    messages=messages,
+                    options={
+                        "temperature": 0.65,
+                        "num_predict": token_budget,
+                        "num_ctx": context_window(selected_model),
+                        "top_p": 0.9,
+                        "repeat_penalty": 1.1,
+                    },
+                )
+                if s:
+                    s.set(
+                        prompt_tokens=resp.get("prompt_eval_count"),
+                        tokens=resp.get("eval_count"),
+                    )
+            calibrate(selected_model, messages, resp.get("prompt_eval_count"))
             return resp["message"]["content"]
         except Exception as e:
             if "Connection refused" in str(e) or "Errno 61" in str(e):
@@ -170,12 +183,20 @@ class LLMEngine:
         # TTS handled by global persistent worker thread
 
         try:
+            from core.context_assembler import calibrate, context_window
+
             for chunk in _client().chat(
                 model=selected_model,
                 messages=messages,
                 stream=True,
-                options={"temperature": temperature, "num_predict": token_budget},
+                options={
+                    "temperature": temperature,
+                    "num_predict": token_budget,
+                    "num_ctx": context_window(selected_model),
+                },
             ):
+                if chunk.get("done"):
+                    calibrate(selected_model, messages, chunk.get("prompt_eval_count"))
                 token = chunk["message"]["content"]
                 if not token:
                     continue
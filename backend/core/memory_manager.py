@@ -2,6 +2,8 @@
 import logging
 from typing import Dict, List, Optional, Tuple
 
+from core.spans import traced
+
 logger = logging.getLogger(__name__)
 
 
@@ -105,6 +107,7 @@ class MemoryManager:
             logger.warning("MemoryManager.recall failed: %s", e)
         return None
 
+    @traced("post_turn")
     def post_turn(
         self,
         user_input: str,
@@ -115,6 +118,7 @@ class MemoryManager:
         emotion_label: str,
         history: List[Dict],
         selected_model: str,
+        session_id: str = "default",
     ) -> None:
         try:
             from memory.episodic import store_episode
@@ -129,20 +133,14 @@ class MemoryManager:
         except Exception as e:
             logger.warning("index_exchange failed: %s", e)
         try:
-            from memory.summarizer import (
-                should_summarize,
-                summarize_conversation,
-                store_summary,
-            )
+            from memory.history_compactor import get_compactor
 
-            if should_summarize(history):
-                summary = summarize_conversation(
-                    history, memory, user_name, model=selected_model
-                )
-                store_summary(summary, memory)
-                self.save(memory)
+            # summarised on the compactor's worker thread, not on this turn
+            get_compactor().record_turn(
+                session_id, user_input, reply, user_name, model=selected_model
+            )
         except Exception as e:
-            logger.warning("summarizer failed: %s", e)
+            logger.warning("history compactor failed: %s", e)
         try:
             from knowledge.graph import update_graph
 
@@ -1,150 +1,264 @@
-# core/observability.py — Per-request step timing
+# core/observability.py — Trace store
+# Finished traces (span trees from core/spans.py) are appended to rotated
+# JSONL segments (data/traces/); the newest few stay in memory. Latencies feed
+# windowed DDSketches (core/sketch.py) per handler, model, HTTP route and span
+# ("step"), so the dashboard's summary polls never touch raw traces. Older
+# traces are read back from the segments on demand, newest first.
+import glob
+import json
+import os
 import time
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from collections import deque
 import threading
 
+from core.sketch import WindowedSketch
+
 logger = logging.getLogger(__name__)
 
 
-class RequestTrace:
-    def __init__(self, request_id: str, user_input: str):
-        self.request_id = request_id
-        self.user_input = user_input[:80]
-        self.steps: List[Dict] = []
-        self.start_time = time.time()
-        self._step_start: Optional[float] = None
-        self._current_step: Optional[str] = None
-
-    def step_start(self, name: str):
-        self._current_step = name
-        self._step_start = time.time()
-
-    def step_end(self, name: str = None, meta: str = ""):
-        name = name or self._current_step or "unknown"
-        duration_ms = round(
-            (time.time() - (self._step_start or self.start_time)) * 1000
-        )
-        self.steps.append(
-            {
-                "step": name,
-                "ms": duration_ms,
-                "meta": meta,
-            }
-        )
-        logger.info(
-            "⏱  [%s] %s: %dms%s",
-            self.request_id[:8],
-            name,
-            duration_ms,
-            f" ({meta})" if meta else "",
-        )
-        self._step_start = None
-        self._current_step = None
-
-    def finish(self, intent: str = "", agent: str = "") -> Dict:
-        total_ms = round((time.time() - self.start_time) * 1000)
-        result = {
-            "request_id": self.request_id,
-            "total_ms": total_ms,
-            "intent": intent,
-            "agent": agent,
-            "steps": self.steps,
-        }
-        logger.info(
-            "✅ [%s] total: %dms | intent=%s agent=%s",
-            self.request_id[:8],
-            total_ms,
-            intent,
-            agent,
-        )
-        return result
-
-    def to_dict(self) -> Dict:
-        return {
-            "request_id": self.request_id,
-            "input": self.user_input,
-            "steps": self.steps,
-            "elapsed_ms": round((time.time() - self.start_time) * 1000),
-        }
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRACE_DIR = os.path.join(_BACKEND, "data", "traces")
+_LEGACY_FILE = os.path.join(_BACKEND, "data", "traces.json")
+SEGMENT_BYTES = int(os.getenv("TRACE_SEGMENT_BYTES", 4 * 1024 * 1024))
+SEGMENTS_KEEP = int(os.getenv("TRACE_SEGMENTS", 16))
+TAIL = 50
+WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
 
 
-import json
-import os
-import collections
+def _split_agent(agent: str) -> Tuple[str, str]:
+    """'ollama/phi3:mini' → ('ollama', 'phi3:mini'); 'chain_executor' → ('chain_executor', '')."""
+    handler, _, model = (agent or "unknown").partition("/")
+    return handler, model
+
 
-_TRACE_FILE = os.path.join(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "traces.json"
-)
+def _reverse_lines(path: str, block: int = 64 * 1024) -> Iterator[str]:
+    """Lines of a file, last first, reading backwards in blocks."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos, rest = f.tell(), b""
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + rest).split(b"\n")
+            rest = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line.decode("utf-8", "replace")
+        if rest:
+            yield rest.decode("utf-8", "replace")
 
 
 class ObservabilityStore:
     """
-    In-memory ring buffer for traces — O(1) writes, no disk I/O on hot path.
-    Flushes to disk only every N writes or on explicit flush().
+    Append-only trace store. add() is one buffered line write plus a few
+    sketch updates; summaries cost O(buckets) whatever the trace volume.
     """
 
-    def __init__(self, maxlen: int = 50, flush_every: int = 10):
-        self.maxlen = maxlen
-        self.flush_every = flush_every
+    def __init__(self, directory: str = TRACE_DIR, maxlen: int = TAIL):
+        self.dir = directory
         self._lock = threading.Lock()
-        self._buffer: collections.deque = collections.deque(maxlen=maxlen)
-        self._write_count = 0
-        os.makedirs(os.path.dirname(_TRACE_FILE), exist_ok=True)
-        # Load existing traces into buffer on startup
+        self._tail: deque = deque(maxlen=maxlen)
+        self._sketches: Dict[Tuple[str, str], WindowedSketch] = {}
+        self._fh = None
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        self._migrate_legacy()
+        self._replay()
+
+    # ── Segments ──────────────────────────────────────────────────────────
+
+    def _segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.dir, "traces-*.jsonl")))
+
+    def _open_locked(self, fresh: bool = False) -> None:
+        segs = self._segments()
+        if fresh or not segs or os.path.getsize(segs[-1]) >= SEGMENT_BYTES:
+            path = os.path.join(self.dir, f"traces-{time.time_ns() // 1000:016d}.jsonl")
+        else:
+            path = segs[-1]
+        self._fh = open(path, "a", encoding="utf-8")
+        self._size = self._fh.tell()
+
+    def _rotate_locked(self) -> None:
+        self._fh.close()
+        self._open_locked(fresh=True)
+        for old in self._segments()[:-SEGMENTS_KEEP]:
+            try:
+                os.remove(old)
+            except OSError as e:
+                logger.warning("trace segment cleanup failed (%s): %s", old, e)
+
+    def _migrate_legacy(self) -> None:
+        """One-time move of the old traces.json ring into a segment."""
+        if self.dir != TRACE_DIR or not os.path.exists(_LEGACY_FILE):
+            return
         try:
-            with open(_TRACE_FILE) as f:
-                for t in json.load(f):
-                    self._buffer.append(t)
-        except Exception:
-            pass
+            ts = os.path.getmtime(_LEGACY_FILE)
+            with open(_LEGACY_FILE) as f:
+                traces = json.load(f)
+            with self._lock:
+                self._open_locked()
+                for t in traces:
+                    self._fh.write(json.dumps({"ts": ts, **t}) + "\n")
+                self._fh.close()
+                self._fh = None
+            os.replace(_LEGACY_FILE, _LEGACY_FILE + ".migrated")
+        except Exception as e:
+            logger.warning("traces.json migration failed: %s", e)
+
+    def _replay(self) -> None:
+        """Rebuild the windows and the in-memory tail from the newest segments."""
+        horizon = time.time() - max(WINDOWS.values())
+        recent = self.query(limit=None, since=horizon)
+        with self._lock:
+            for t in reversed(recent):
+                self._index_locked(t)
+        self._tail.extend(reversed(self.query(limit=self._tail.maxlen)))
+
+    # ── Write path ────────────────────────────────────────────────────────
+
+    def _observe_locked(self, dimension: str, key: str, ms: float, ts: float) -> None:
+        sketch = self._sketches.get((dimension, key))
+        if sketch is None:
+            sketch = self._sketches[(dimension, key)] = WindowedSketch()
+        sketch.add(ms, ts)
+
+    def _index_locked(self, trace: Dict) -> None:
+        ts, total = trace.get("ts") or time.time(), trace.get("total_ms")
+        if total is None:
+            return
+        handler, model = _split_agent(trace.get("agent", ""))
+        self._observe_locked("all", "requests", total, ts)
+        self._observe_locked("handler", handler, total, ts)
+        if model:
+            self._observe_locked("model", model, total, ts)
+        for s in trace.get("steps", []):
+            self._observe_locked("step", s["step"], s["ms"], ts)
+
+    def observe(self, dimension: str, key: str, ms: float, ts: float = None) -> None:
+        """Record a latency that has no trace of its own (e.g. an HTTP route)."""
+        with self._lock:
+            self._observe_locked(dimension, key, ms, ts or time.time())
 
     def add(self, trace: Dict):
+        trace = {"ts": round(time.time(), 3), **trace}
+        line = json.dumps(trace, default=str) + "\n"
         with self._lock:
-            self._buffer.append(trace)
-            self._write_count += 1
-            # Flush to disk every N writes — amortizes I/O cost
-            if self._write_count % self.flush_every == 0:
-                self._flush_locked()
-
-    def _flush_locked(self):
-        """Write buffer to disk. Must be called with _lock held."""
-        try:
-            with open(_TRACE_FILE, "w") as f:
-                json.dump(list(self._buffer), f)
-        except Exception:
-            pass
+            try:
+                if self._fh is None:
+                    self._open_locked()
+                self._fh.write(line)
+                self._fh.flush()
+                self._size += len(line)
+                if self._size >= SEGMENT_BYTES:
+                    self._rotate_locked()
+            except OSError as e:
+                logger.warning("trace append failed: %s", e)
+            self._tail.append(trace)
+            self._index_locked(trace)
 
     def flush(self):
         """Explicit flush — call at shutdown."""
         with self._lock:
-            self._flush_locked()
+            if self._fh is not None:
+                self._fh.flush()
+
+    # ── Read path ─────────────────────────────────────────────────────────
 
     def get_recent(self, n: int = 10) -> List[Dict]:
         with self._lock:
-            return list(self._buffer)[-n:]
+            if n <= len(self._tail):
+                return list(self._tail)[-n:]
+        return list(reversed(self.query(limit=n)))
+
+    def query(
+        self,
+        limit: Optional[int] = 50,
+        since: float = None,
+        handler: str = None,
+        model: str = None,
+        intent: str = None,
+        min_ms: float = None,
+    ) -> List[Dict]:
+        """Raw traces, newest first, read backwards from the segments until `limit` match."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+            segments = self._segments()
+        out: List[Dict] = []
+        for path in reversed(segments):
+            try:
+                for line in _reverse_lines(path):
+                    try:
+                        t = json.loads(line)
+                    except ValueError:
+                        continue
+                    if since is not None and t.get("ts", 0) < since:
+                        return out  # segments are written in time order
+                    h, m = _split_agent(t.get("agent", ""))
+                    if (
+                        (handler and h != handler)
+                        or (model and m != model)
+                        or (intent and t.get("intent") != intent)
+                        or (min_ms is not None and t.get("total_ms", 0) < min_ms)
+                    ):
+                        continue
+                    out.append(t)
+                    if limit is not None and len(out) >= limit:
+                        return out
+            except FileNotFoundError:
+                continue  # rotated away while we were reading
+        return out
+
+    def summary(self, window: str = "5m", dimension: str = None) -> Dict:
+        """{dimension: {key: {count, avg_ms, p50_ms, p95_ms, p99_ms, max_ms}}} over the window."""
+        seconds, now = WINDOWS[window], time.time()
+        out: Dict[str, Dict] = {}
+        with self._lock:
+            for (dim, key), sketch in self._sketches.items():
+                if dimension and dim != dimension:
+                    continue
+                merged = sketch.window(seconds, now)
+                if merged.count:
+                    out.setdefault(dim, {})[key] = merged.summary()
+        return out
 
     def get_stats(self) -> Dict:
+        now = time.time()
         with self._lock:
-            traces = list(self._buffer)
-        if not traces:
+            requests = self._sketches.get(("all", "requests"))
+            if requests is None:
+                return {}
+            hour = requests.window(3600, now)
+            windows = {w: requests.window(s, now).summary() for w, s in WINDOWS.items()}
+            steps = {}
+            for (dim, key), sketch in self._sketches.items():
+                if dim == "step":
+                    s = sketch.window(3600, now)
+                    if s.count:
+                        steps[key] = round(s.sum / s.count)
+        if not hour.count:
             return {}
-        totals = [t["total_ms"] for t in traces]
-        step_times: Dict[str, List[int]] = {}
-        for t in traces:
-            for s in t.get("steps", []):
-                step_times.setdefault(s["step"], []).append(s["ms"])
         return {
-            "requests": len(traces),
-            "avg_total_ms": round(sum(totals) / len(totals)),
-            "p95_ms": sorted(totals)[int(len(totals) * 0.95)] if totals else 0,
-            "per_step_avg": {k: round(sum(v) / len(v)) for k, v in step_times.items()},
+            "requests": hour.count,
+            "avg_total_ms": round(hour.sum / hour.count),
+            "p95_ms": round(hour.quantiles((0.95,))[0]),
+            "per_step_avg": steps,
+            "windows": windows,
         }
 
 
-_store = ObservabilityStore()
+_store: Optional[ObservabilityStore] = None
+_store_lock = threading.Lock()
 
 
 def get_store() -> ObservabilityStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ObservabilityStore()
     return _store
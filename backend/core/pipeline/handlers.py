@@ -343,18 +343,9 @@ class LLMHandler(Handler):
                 ctx.emotion_label,
                 query_intent,
                 ctx.history,
-            )
-
-            # Inject RAG context
-            try:
-                from rag.rag_engine import query_rag, should_use_rag
-
-                if should_use_rag(ctx.user_input):
-                    rag_ctx = query_rag(ctx.user_input, top_k=3)
-                    if rag_ctx:
-                        system_prompt += f"\n\nRELEVANT KNOWLEDGE:\n{rag_ctx}"
-            except Exception as _e:
-                logger.debug("RAG: %s", _e)
+                model=selected_model,
+                session_id=ctx.session_id,
+            )  # RAG chunks are budgeted in with the other context sources
 
             if ctx.streaming:
                 # Return sentinel — caller streams directly
@@ -9,6 +9,7 @@ from __future__ import annotations
 import logging
 from typing import List, Optional
 from core.pipeline.base import Handler, RequestContext, Reply
+from core.spans import span
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,10 @@ class PipelineRegistry:
     def run(self, ctx: RequestContext) -> Optional[Reply]:
         for handler in self._handlers:
             try:
-                result = handler.handle(ctx)
+                with span(f"handler.{handler.name}") as s:
+                    result = handler.handle(ctx)
+                    if s and result is not None:
+                        s.set(handled=True)
                 if result is not None:
                     logger.debug("Pipeline: %s handled request", handler)
                     return result
@@ -8,6 +8,7 @@ from utils.polisher import polish_reply
 from utils.limiter import limit_words, detect_intent_for_limit
 from emotion.emotion_responder import choose_reply as emotion_reply
 from core.proactive import get_proactive_suggestion
+from core.spans import span
 
 logger = logging.getLogger(__name__)
 
@@ -28,23 +29,24 @@ class PostProcessor:
         emotion_score,
         truth_guard=None,
     ) -> str:
-        for step in [
-            lambda r: self._critic(
+        for name, step in [
+            ("critic", lambda r: self._critic(
                 r, user_name, memory, user_input, selected_model, query_intent
-            ),
-            lambda r: self._refine(r, memory, user_name),
-            lambda r: self._truth_guard(r),
-            lambda r: self._polish(r),
-            lambda r: self._limit(r, user_input),
-            lambda r: self._emotion_prefix(
+            )),
+            ("refine", lambda r: self._refine(r, memory, user_name)),
+            ("truth_guard", lambda r: self._truth_guard(r)),
+            ("polish", lambda r: self._polish(r)),
+            ("limit", lambda r: self._limit(r, user_input)),
+            ("emotion", lambda r: self._emotion_prefix(
                 r, emotion_label, emotion_score, user_name, memory
-            ),
+            )),
             # proactive disabled — was appending to every reply
         ]:
             try:
-                reply = step(reply)
+                with span(f"post.{name}"):
+                    reply = step(reply)
             except Exception as e:
-                logger.warning("post_processor step failed: %s", e)
+                logger.warning("post_processor step %s failed: %s", name, e)
         return reply
 
     def _critic(self, r, un, m, ui, model, intent):
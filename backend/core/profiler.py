@@ -0,0 +1,376 @@
+# core/profiler.py — In-process sampling profiler (all threads)
+# A daemon thread wakes PROFILE_HZ times a second, walks every other thread's
+# Python stack via sys._current_frames() and counts the collapsed stack
+# ("thread;file:func;file:func"). Nothing is installed in the profiled code —
+# no sys.setprofile, no tracing — so the cost is the sampler's own time with
+# the GIL held, which it measures and reports as overhead_pct.
+#
+#   record(seconds, hz)    bounded on-demand session (one at a time)
+#   start_continuous()     PROFILE_CONTINUOUS_HZ > 0: low-rate, always on,
+#                          kept as one Counter per minute for the last
+#                          PROFILE_CONTINUOUS_MIN minutes
+#
+# Overhead grows with threads × stack depth. scripts/bench_profiler.py (18
+# threads, 20–45 frames): ~350–400 µs per sample (~20 µs per thread, GIL
+# waits and the CPU clock read included) → overhead_pct ≈ 0.4% at 10 Hz and
+# ≈ 2% at 100 Hz, and the workload's throughput stayed within run-to-run
+# noise. With many more threads lower PROFILE_HZ; overhead_pct in every
+# result says what it cost.
+# Served as folded text or a self-contained SVG flamegraph by /api/profile.
+import html
+import inspect
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HZ = int(os.getenv("PROFILE_HZ", 100))
+MAX_SECONDS = int(os.getenv("PROFILE_MAX_S", 60))
+MAX_DEPTH = int(os.getenv("PROFILE_MAX_DEPTH", 96))
+CONTINUOUS_HZ = int(os.getenv("PROFILE_CONTINUOUS_HZ", 0))
+CONTINUOUS_MIN = int(os.getenv("PROFILE_CONTINUOUS_MIN", 15))
+
+# A thread counts as busy for a tick when its own CPU clock advanced by at
+# least this share of the wall time since the previous tick — so threads
+# parked in time.sleep(), sqlite or blocking I/O are idle wherever they wait.
+# A thread's first tick only records that baseline. Where per-thread CPU
+# clocks are unavailable the leaf frame decides: these files mean "parked".
+_BUSY_SHARE = 0.05
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "socket.py", "ssl.py")
+_GEN_FLAGS = inspect.CO_GENERATOR | inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR
+_THREAD_NUM = re.compile(r"(?:[-_]\d+)+")  # "ThreadPoolExecutor-0_3" → "ThreadPoolExecutor"
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+class Profile:
+    """Collapsed stacks from one session (or a merge of several)."""
+
+    def __init__(self, hz: int = 0):
+        self.hz = hz
+        self.stacks: Counter = Counter()
+        self.samples = 0  # sampler ticks
+        self.sample_s = 0.0  # time spent sampling
+        self.started = time.time()
+        self.wall_s = 0.0
+
+    def merge(self, other: "Profile") -> "Profile":
+        self.stacks.update(other.stacks)
+        self.samples += other.samples
+        self.sample_s += other.sample_s
+        self.wall_s += other.wall_s
+        return self
+
+    def filtered(self, idle: bool = True, thread: str = None) -> Counter:
+        if idle and not thread:
+            return self.stacks
+        out = Counter()
+        for stack, n in self.stacks.items():
+            if not idle and stack.endswith("#idle"):
+                continue
+            if thread and not stack.startswith(thread + ";"):
+                continue
+            out[stack] = n
+        return out
+
+    def folded(self, idle: bool = True, thread: str = None) -> str:
+        """Brendan Gregg's collapsed format: one "frame;frame;frame count" line per stack."""
+        return "".join(
+            f"{_strip(s)} {n}\n" for s, n in sorted(self.filtered(idle, thread).items())
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "hz": self.hz,
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+            "frames_counted": sum(self.stacks.values()),
+            "wall_s": round(self.wall_s, 2),
+            "sampling_ms": round(self.sample_s * 1000, 1),
+            "overhead_pct": round(100 * self.sample_s / self.wall_s, 3) if self.wall_s else 0.0,
+            "avg_sample_us": round(self.sample_s / self.samples * 1e6, 1) if self.samples else 0.0,
+        }
+
+    def top(self, n: int = 20, idle: bool = False) -> List[Dict]:
+        """Hottest leaf frames (self time) — the quick answer without a flamegraph."""
+        leaves: Counter = Counter()
+        for stack, count in self.filtered(idle).items():
+            leaves[_strip(stack).rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [
+            {"frame": f, "samples": c, "pct": round(100 * c / total, 2)}
+            for f, c in leaves.most_common(n)
+        ]
+
+
+def _strip(stack: str) -> str:
+    return stack[:-5] if stack.endswith("#idle") else stack
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._labels: Dict[object, str] = {}  # code object → "file:func"
+        self._threads: Dict[int, str] = {}  # ident → normalised thread name
+        self._session: Optional[Profile] = None
+        self._session_done = threading.Event()
+        self._continuous: deque = deque(maxlen=max(1, CONTINUOUS_MIN))
+        self._continuous_hz = 0
+        self._thread: Optional[threading.Thread] = None  # None once _run has returned
+        self._stop = threading.Event()
+        self._session_seconds = 0.0
+        self._cpu_ns: Dict[int, int] = {}  # ident → thread CPU time at the last tick
+        self._last_tick = 0.0
+
+    # ── Sampling ──────────────────────────────────────────────────────────
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+            if len(self._labels) < 100_000:
+                self._labels[code] = label
+        return label
+
+    @staticmethod
+    def _thread_cpu_ns(ident: int) -> Optional[int]:
+        try:
+            return time.clock_gettime_ns(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError, OverflowError):  # not Unix, or the thread just exited
+            return None
+
+    def _sample(self, into: Iterable[Profile]) -> None:
+        t0 = time.perf_counter()
+        me = threading.get_ident()
+        frames = sys._current_frames()
+        busy_ns = (t0 - self._last_tick) * 1e9 * _BUSY_SHARE
+        prev_cpu, cpu = self._cpu_ns, {}
+        self._last_tick = t0
+        names = self._threads
+        if any(ident not in names for ident in frames):
+            names = self._threads = {
+                t.ident: _THREAD_NUM.sub("", t.name) or "thread" for t in threading.enumerate()
+            }
+        stacks = []
+        for ident, frame in frames.items():
+            if ident == me:
+                continue
+            now_ns = cpu[ident] = self._thread_cpu_ns(ident)
+            if now_ns is None:
+                idle = frame.f_code.co_filename.endswith(_IDLE_FILES)
+            elif ident in prev_cpu:
+                idle = now_ns - prev_cpu[ident] < busy_ns
+            else:
+                continue  # first tick for this thread: only its CPU baseline
+            parts = []
+            code = None
+            while frame is not None and len(parts) < MAX_DEPTH:
+                code = frame.f_code
+                parts.append(self._label(code))
+                frame = frame.f_back
+            if frame is None and code.co_flags & _GEN_FLAGS:
+                continue  # caught mid-resume: a generator frame not linked to its caller yet
+            parts.append(names.get(ident, "thread"))
+            parts.reverse()
+            stacks.append(";".join(parts) + ("#idle" if idle else ""))
+        self._cpu_ns = cpu
+        spent = time.perf_counter() - t0
+        for prof in into:
+            prof.stacks.update(stacks)
+            prof.samples += 1
+            prof.sample_s += spent
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.is_set():
+            with self._lock:
+                session = self._session
+                bucket = None
+                if self._continuous_hz:
+                    minute = int(time.time() // 60)
+                    if not self._continuous or self._continuous[-1][0] != minute:
+                        self._continuous.append((minute, Profile(self._continuous_hz)))
+                    bucket = self._continuous[-1][1]
+                if session is None and bucket is None:
+                    self._thread = None
+                    return
+                hz = session.hz if session else self._continuous_hz
+            targets = [session] if session else []
+            # during a faster session the continuous profile keeps its own rate
+            if bucket is not None and (session is None or bucket.samples < bucket.wall_s * bucket.hz):
+                targets.append(bucket)
+            self._sample(targets)
+            now = time.perf_counter()
+            for prof in (session, bucket):
+                if prof is not None:
+                    prof.wall_s += now - last
+            last = now
+            if session is not None and session.wall_s >= self._session_seconds:
+                with self._lock:
+                    self._session = None
+                self._session_done.set()
+            self._stop.wait(1.0 / hz)
+        with self._lock:
+            self._thread = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+
+    # ── Public API ────────────────────────────────────────────────────────
+
+    def record(self, seconds: float, hz: int = None) -> Profile:
+        """Sample all threads for `seconds` (capped at PROFILE_MAX_S); blocks until done."""
+        hz = max(1, min(int(hz or HZ), 250))
+        seconds = max(0.1, min(float(seconds), MAX_SECONDS))
+        with self._lock:
+            if self._session is not None:
+                raise ProfilerBusy("a profiling session is already running")
+            session = self._session = Profile(hz)
+            self._session_seconds = seconds
+            self._session_done.clear()
+            self._ensure_thread()
+        if not self._session_done.wait(seconds + 5):
+            with self._lock:
+                if self._session is session:
+                    self._session = None
+        logger.info(
+            "profile: %.1fs at %dHz, %d samples, overhead %.2f%%",
+            seconds, hz, session.samples, session.stats()["overhead_pct"],
+        )
+        return session
+
+    def start_continuous(self, hz: int = None) -> bool:
+        hz = CONTINUOUS_HZ if hz is None else hz
+        if hz <= 0:
+            return False
+        with self._lock:
+            self._continuous_hz = min(int(hz), 100)
+            self._ensure_thread()
+        logger.info("profiler: continuous sampling at %dHz", self._continuous_hz)
+        return True
+
+    def stop(self) -> None:
+        with self._lock:
+            self._continuous_hz = 0
+            self._session = None
+            thread = self._thread
+        self._stop.set()
+        self._session_done.set()
+        if thread is not None:
+            thread.join(2)
+
+    def continuous(self, minutes: int = None) -> Optional[Profile]:
+        """Merged continuous profile for the last `minutes` (all kept if None)."""
+        with self._lock:
+            if not self._continuous_hz and not self._continuous:
+                return None
+            buckets = list(self._continuous)
+            hz = self._continuous_hz
+        if minutes:
+            cutoff = int(time.time() // 60) - minutes + 1
+            buckets = [b for b in buckets if b[0] >= cutoff]
+        out = Profile(hz)
+        if buckets:
+            out.started = buckets[0][0] * 60
+        for _, prof in buckets:
+            out.merge(prof)
+        return out
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "session": self._session.stats() if self._session else None,
+                "continuous_hz": self._continuous_hz,
+                "continuous_minutes": len(self._continuous),
+            }
+
+
+# ── Flamegraph ────────────────────────────────────────────────────────────────
+
+_ROW = 16
+_WIDTH = 1200
+_MIN_PX = 0.3
+
+
+def _tree(stacks: Dict[str, int]) -> Tuple[Dict, int]:
+    root: Dict = {"n": 0, "c": {}}
+    for stack, count in stacks.items():
+        root["n"] += count
+        node = root
+        for frame in _strip(stack).split(";"):
+            node = node["c"].setdefault(frame, {"n": 0, "c": {}})
+            node["n"] += count
+    depth = max((_strip(s).count(";") + 1 for s in stacks), default=0)
+    return root, depth
+
+
+def _color(name: str) -> str:
+    h = zlib.crc32(name.encode())
+    return f"rgb({205 + h % 50},{80 + (h >> 8) % 120},{40 + (h >> 16) % 40})"
+
+
+def flamegraph_svg(stacks: Dict[str, int], title: str = "ASTRA profile") -> str:
+    """Self-contained SVG flamegraph (root at the bottom); hover a frame for its share."""
+    root, depth = _tree(stacks)
+    total = root["n"] or 1
+    height = (depth + 3) * _ROW
+    scale = _WIDTH / total
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_WIDTH}" height="{height}" '
+        f'viewBox="0 0 {_WIDTH} {height}" font-family="Verdana,sans-serif" font-size="11">',
+        '<rect width="100%" height="100%" fill="#f8f8f8"/>',
+        f'<text x="{_WIDTH / 2}" y="14" text-anchor="middle" font-size="14">'
+        f"{html.escape(title)} — {total} samples</text>",
+    ]
+
+    def walk(node: Dict, name: str, x: float, level: int) -> None:
+        w = node["n"] * scale
+        if w < _MIN_PX:
+            return
+        y = height - (level + 1) * _ROW
+        if level >= 0:
+            pct = 100 * node["n"] / total
+            label = html.escape(name)
+            out.append(
+                f'<g><title>{label} ({node["n"]} samples, {pct:.2f}%)</title>'
+                f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{_ROW - 1}" '
+                f'fill="{_color(name)}" rx="2"/>'
+            )
+            chars = int(w / 7)
+            if chars >= 3:
+                text = name if len(name) <= chars else name[: chars - 2] + ".."
+                out.append(f'<text x="{x + 3:.1f}" y="{y + _ROW - 4}">{html.escape(text)}</text>')
+            out.append("</g>")
+        for child_name, child in sorted(node["c"].items()):
+            walk(child, child_name, x, level + 1)
+            x += child["n"] * scale
+
+    walk(root, "all", 0.0, -1)
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+_profiler: Optional[SamplingProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> SamplingProfiler:
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = SamplingProfiler()
+    return _profiler
@@ -0,0 +1,138 @@
+# core/sketch.py — Mergeable latency quantiles
+# DDSketch: values land in log-spaced buckets, so any quantile is within
+# SKETCH_ALPHA relative error, two sketches merge by adding bucket counts,
+# and size depends on the value range, not on how many values were added.
+# WindowedSketch keeps one sketch per time slot for sliding-window queries.
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ALPHA = float(os.getenv("SKETCH_ALPHA", 0.01))
+MAX_BINS = 2048
+_MIN_VALUE = 1e-3  # anything at or below lands in the zero bucket
+
+
+class DDSketch:
+    __slots__ = ("alpha", "_log_gamma", "bins", "zeros", "count", "sum", "min", "max")
+
+    def __init__(self, alpha: float = ALPHA):
+        self.alpha = alpha
+        self._log_gamma = math.log((1 + alpha) / (1 - alpha))
+        self.bins: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        if value <= _MIN_VALUE:
+            self.zeros += 1
+        else:
+            k = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[k] = self.bins.get(k, 0) + 1
+            if len(self.bins) > MAX_BINS:
+                self._collapse()
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def _collapse(self) -> None:
+        """Fold the lowest buckets together; only the smallest values lose accuracy."""
+        keys = sorted(self.bins)
+        spill = keys[: len(keys) - MAX_BINS + 1]
+        self.bins[spill[-1]] = sum(self.bins.pop(k) for k in spill[:-1]) + self.bins[spill[-1]]
+
+    def merge(self, other: "DDSketch") -> "DDSketch":
+        bins = self.bins
+        for k, n in other.bins.items():
+            bins[k] = bins.get(k, 0) + n
+        if len(bins) > MAX_BINS:
+            self._collapse()
+        self.zeros += other.zeros
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def copy(self) -> "DDSketch":
+        s = DDSketch(self.alpha)
+        s.merge(self)
+        return s
+
+    def quantiles(self, qs: Iterable[float]) -> List[float]:
+        """Values at each quantile in qs (ascending), one pass over the buckets."""
+        if not self.count:
+            return [0.0 for _ in qs]
+        gamma = math.exp(self._log_gamma)
+        ranks = [q * (self.count - 1) for q in qs]
+        out: List[float] = []
+        seen = self.zeros
+        it = iter(sorted(self.bins.items()))
+        k = None
+        for rank in ranks:
+            if rank < seen and k is None:  # inside the zero bucket
+                out.append(0.0)
+                continue
+            while seen <= rank:
+                k, n = next(it)
+                seen += n
+            value = 2 * gamma ** k / (gamma + 1)
+            out.append(min(max(value, self.min), self.max))
+        return out
+
+    def summary(self) -> Dict:
+        p50, p95, p99 = self.quantiles((0.5, 0.95, 0.99))
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count, 1) if self.count else 0.0,
+            "p50_ms": round(p50, 1),
+            "p95_ms": round(p95, 1),
+            "p99_ms": round(p99, 1),
+            "max_ms": round(self.max, 1) if self.count else 0.0,
+        }
+
+
+class WindowedSketch:
+    """Per-slot sketches; a window merges the current slot with the slots before it."""
+
+    __slots__ = ("slot_s", "slots", "_ring", "_closed", "total")
+
+    def __init__(self, slot_s: int = 60, slots: int = 60):
+        self.slot_s = slot_s
+        self.slots = slots
+        self._ring: Dict[int, DDSketch] = {}  # slot start → sketch
+        self._closed: Dict[int, Tuple[int, DDSketch]] = {}  # window → (current slot, merged past)
+        self.total = DDSketch()
+
+    def add(self, value: float, ts: float) -> None:
+        start = int(ts // self.slot_s) * self.slot_s
+        sketch = self._ring.get(start)
+        if sketch is None:
+            sketch = self._ring[start] = DDSketch()
+            horizon = start - self.slot_s * self.slots
+            for old in [s for s in self._ring if s <= horizon]:
+                del self._ring[old]
+        sketch.add(value)
+        self.total.add(value)
+        for seconds, (current, _) in list(self._closed.items()):
+            if start < current:  # a late value landed in a slot this cache covers
+                del self._closed[seconds]
+
+    def window(self, seconds: int, now: float) -> DDSketch:
+        current = int(now // self.slot_s) * self.slot_s
+        cached = self._closed.get(seconds)
+        if cached is None or cached[0] != current:
+            past = DDSketch()
+            first = current - seconds + self.slot_s
+            for start, sketch in self._ring.items():
+                if first <= start < current:
+                    past.merge(sketch)
+            cached = self._closed[seconds] = (current, past)
+        merged = cached[1].copy()
+        now_slot: Optional[DDSketch] = self._ring.get(current)
+        return merged.merge(now_slot) if now_slot else merged
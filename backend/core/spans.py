@@ -0,0 +1,239 @@
+# core/spans.py — Request spans that follow the work across threads and tasks
+# The current span lives in a ContextVar, so asyncio tasks and
+# asyncio.to_thread() inherit it. loop.run_in_executor() and
+# ThreadPoolExecutor.submit() do not copy the context — pass the callable
+# through bind() there.
+#
+#   root = start_trace("brain.process", log_text=text)  # text: log line only
+#   with span("retrieval.graph"):           # nests under whatever is current
+#       ...
+#   finish_trace(root, intent=..., agent=...)   # → trace store (+ OTel spans)
+#
+# TRACE_SAMPLE_RATE decides per request whether spans are kept; unsampled
+# requests still record their total, and span() costs one ContextVar lookup.
+# With OTEL_ENABLED every kept span is also an OTel span.
+import contextvars
+import functools
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from utils import telemetry
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 1.0))
+MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", 256))
+
+_current: contextvars.ContextVar = contextvars.ContextVar("astra_span", default=None)
+
+
+class Trace:
+    __slots__ = ("request_id", "sampled", "start", "spans", "dropped", "done", "_ids")
+
+    def __init__(self, request_id: str, sampled: bool):
+        self.request_id = request_id
+        self.sampled = sampled
+        self.start = time.perf_counter()
+        self.spans: List["Span"] = []
+        self.dropped = 0
+        self.done = False
+        self._ids = itertools.count(1)
+
+    def elapsed_ms(self, t: float = None) -> float:
+        return ((t or time.perf_counter()) - self.start) * 1000
+
+
+class Span:
+    __slots__ = ("trace", "id", "parent", "name", "attrs", "start", "end", "thread", "error")
+
+    def __init__(self, trace: Trace, name: str, parent: Optional["Span"], attrs: Dict):
+        self.trace = trace
+        self.id = next(trace._ids)  # atomic under the GIL; spans may open on several threads
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.thread = threading.current_thread().name
+        self.error: Optional[str] = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    @property
+    def ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def to_dict(self) -> Dict:
+        d = {
+            "id": self.id,
+            "parent": self.parent.id if self.parent else None,
+            "name": self.name,
+            "start_ms": round(self.trace.elapsed_ms(self.start), 2),
+            "ms": round(self.ms, 2),
+            "thread": self.thread,
+        }
+        if self.attrs:
+            d["attrs"] = {k: str(v)[:80] for k, v in self.attrs.items()}
+        if self.error:
+            d["error"] = self.error
+        return d
+
+
+def start_trace(name: str, request_id: str = None, log_text: str = "", **attrs) -> Span:
+    """
+    Open a request trace and make its root span current in this context.
+    log_text (e.g. the user's message) only goes to the START log line;
+    attrs are exported with the trace, so keep user content out of them.
+    """
+    if request_id is None:
+        from utils.request_id import get_request_id, set_request_id
+
+        rid = get_request_id()
+        request_id = rid if rid != "-" else set_request_id()  # so log lines carry it too
+    trace = Trace(request_id, random.random() < SAMPLE_RATE)
+    root = Span(trace, name, None, attrs)
+    _current.set(root)
+    logger.info("▶ [%s] START: %s", request_id, (log_text or name)[:60])
+    return root
+
+
+def finish_trace(root: Span, intent: str = "", agent: str = "", export: bool = True) -> Dict:
+    """Close the trace, record it in the trace store and return it. Idempotent."""
+    trace = root.trace
+    if trace.done:
+        return {}
+    trace.done = True
+    root.end = time.perf_counter()
+    cur = _current.get()
+    if cur is not None and cur.trace is trace:
+        _current.set(None)
+    if not export:
+        return {}
+    total = round(root.ms)
+    logger.info("◀ [%s] DONE %dms intent=%s agent=%s", trace.request_id, total, intent, agent)
+    spans = list(trace.spans)
+    record = {
+        "request_id": trace.request_id,
+        "total_ms": total,
+        "intent": intent,
+        "agent": agent,
+        "steps": [
+            {"step": s.name, "ms": round(s.ms), "meta": s.parent.name if s.parent else ""}
+            for s in spans
+        ],
+    }
+    if trace.sampled:
+        record["spans"] = [root.to_dict()] + [s.to_dict() for s in spans]
+        if trace.dropped:
+            record["spans_dropped"] = trace.dropped
+    try:
+        from core.observability import get_store
+
+        get_store().add(record)
+    except Exception as e:
+        logger.warning("trace export failed: %s", e)
+    return record
+
+
+def discard_trace(root: Span) -> None:
+    """Close a trace without recording it (early exits that never ran the pipeline)."""
+    finish_trace(root, export=False)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _OpenSpan:
+    """Context manager for a kept span (a class, not @contextmanager: ~3x cheaper)."""
+
+    __slots__ = ("parent", "name", "attrs", "span", "token", "otel")
+
+    def __init__(self, parent: Span, name: str, attrs: Dict):
+        self.parent, self.name, self.attrs = parent, name, attrs
+
+    def __enter__(self) -> Span:
+        self.span = Span(self.parent.trace, self.name, self.parent, self.attrs)
+        self.token = _current.set(self.span)
+        self.otel = None
+        if telemetry.is_enabled():
+            self.otel = telemetry.start_span(self.name, self.attrs)
+            self.otel.__enter__()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        s, trace = self.span, self.parent.trace
+        s.end = time.perf_counter()
+        if exc_type is not None:
+            s.error = f"{exc_type.__name__}: {exc}"[:120]
+        if self.otel is not None:
+            self.otel.__exit__(exc_type, exc, tb)
+        _current.reset(self.token)
+        if len(trace.spans) < MAX_SPANS:
+            trace.spans.append(s)
+        else:
+            trace.dropped += 1
+        logger.debug("  [%s] %s: %.1fms", trace.request_id, s.name, s.ms)
+        return False
+
+
+def span(name: str, **attrs):
+    """Time a block as a child of the current span; a no-op outside a sampled trace.
+
+    Use as `with span("retrieval.graph") as s:` — s is None when nothing is kept.
+    """
+    parent = _current.get()
+    if parent is None or not parent.trace.sampled or parent.trace.done:
+        return _NO_SPAN
+    return _OpenSpan(parent, name, attrs)
+
+
+def event(name: str, detail: str = "") -> None:
+    """A zero-length span marking a point in the current trace."""
+    with span(name, **({"detail": detail} if detail else {})):
+        pass
+
+
+def traced(name: str = None):
+    """Decorator form of span(); the name defaults to the function's qualname."""
+
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def bind(fn: Callable, *args, **kwargs) -> Callable:
+    """fn(*args, **kwargs) to run in a copy of this context (run_in_executor, submit)."""
+    return functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+def current_request_id() -> Optional[str]:
+    s = _current.get()
+    return s.trace.request_id if s is not None else None
@@ -1,97 +1,300 @@
-import ollama
+# knowledge/auto_extractor.py — LLM entity/relation extraction into the graph
+# extract_and_store() only queues the text. One low-priority worker thread
+# drains the queue:
+#   - batches up to EXTRACT_BATCH queued texts from the same user into one
+#     prompt and asks for JSON output (format="json")
+#   - at most one LLM call per EXTRACT_MIN_INTERVAL_MS; texts arriving in
+#     between join the next batch
+#   - waits until no chat request has run for EXTRACT_IDLE_GRACE_MS
+#     (core/activity.py), so it never starts in the gap between two turns of
+#     a burst, but for at most EXTRACT_MAX_DEFER_S so a busy server still
+#     makes progress
+# The backlog is a bounded deque (EXTRACT_QUEUE_MAX, oldest dropped first)
+# mirrored in SQLite, so queued texts survive a restart. A batch leaves the
+# backlog only once its triples are in the graph or the reply was unusable;
+# only transport errors (Ollama unreachable/erroring) keep it for a retry.
 import json
-import re
 import logging
+import os
+import re
+import sqlite3
 import threading
-from typing import List, Dict
+import time
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import ollama
 
 logger = logging.getLogger(__name__)
 
-EXTRACT_PROMPT = """Extract entities and relationships from this text.
-Return ONLY valid JSON, no markdown:
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUEUE_DB = os.getenv(
+    "EXTRACT_QUEUE_DB", os.path.join(_BACKEND_DIR, "memory", "data", "extract_queue.db")
+)
+EXTRACT_MODEL = os.getenv("EXTRACT_MODEL", "phi3:mini")
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+BATCH = int(os.getenv("EXTRACT_BATCH", 4))
+QUEUE_MAX = int(os.getenv("EXTRACT_QUEUE_MAX", 500))
+MIN_INTERVAL = int(os.getenv("EXTRACT_MIN_INTERVAL_MS", 2000)) / 1000
+MAX_DEFER = float(os.getenv("EXTRACT_MAX_DEFER_S", 60))
+IDLE_GRACE = int(os.getenv("EXTRACT_IDLE_GRACE_MS", 1000)) / 1000
+RETRY_MAX = 60.0  # back-off ceiling while Ollama is unreachable
+TEXT_CHARS = 600
+# Errors worth retrying the same batch for; anything else (a reply that
+# parses but doesn't fit the schema) would fail the same way again.
+_TRANSPORT_ERRORS = (ollama.ResponseError, httpx.HTTPError, OSError)
+
+EXTRACT_PROMPT = """Extract entities and relationships from these messages by {user_name}.
+"I", "me" and "my" refer to {user_name}.
+Return ONLY valid JSON:
 {{"entities": [{{"name": "...", "type": "person|place|tech|project|concept|tool|event"}}],
  "relations": [{{"from": "...", "to": "...", "relation": "..."}}]}}
 
 Keep names short (1-3 words). Skip trivial words.
-Text: {text}"""
+Messages:
+{texts}"""
 
-_queue: List[Dict] = []
-_lock = threading.Lock()
-_worker_running = False
+Item = Tuple[int, str, str, float]  # (row id, text, user_name, queued_at)
 
 
-def _worker_loop():
-    global _worker_running
-    import time
+def _complete(prompt: str, n_texts: int) -> str:
+    response = ollama.Client(host=OLLAMA_HOST).chat(
+        model=EXTRACT_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        format="json",
+        options={"temperature": 0.1, "num_predict": 150 + 100 * n_texts},
+    )
+    return response["message"]["content"]
 
-    while True:
-        item = None
-        with _lock:
-            if _queue:
-                item = _queue.pop(0)
-        if item:
-            _do_extract(item["text"], item["user_name"])
-        else:
-            time.sleep(2)
-            with _lock:
-                if not _queue:
-                    _worker_running = False
-                    return
 
+def _parse(raw: str) -> Optional[Dict]:
+    raw = re.sub(r"```json|```", "", raw).strip()
+    match = re.search(r"\{.*\}", raw, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
 
-def _ensure_worker():
-    global _worker_running
-    with _lock:
-        if not _worker_running:
-            _worker_running = True
-            threading.Thread(target=_worker_loop, daemon=True).start()
 
+def _list(value) -> list:
+    return value if isinstance(value, list) else []
 
-def _do_extract(text: str, user_name: str = "User"):
-    try:
-        prompt = EXTRACT_PROMPT.format(text=text[:600])
-        response = ollama.chat(
-            model="phi3:mini",
-            messages=[{"role": "user", "content": prompt}],
-            options={"temperature": 0.1, "num_predict": 250},
-        )
-        raw = response["message"]["content"].strip()
-        raw = re.sub(r"```json|```", "", raw).strip()
-        match = re.search(r"\{.*\}", raw, re.DOTALL)
-        if not match:
-            return
-        data = json.loads(match.group())
 
-        from knowledge.graph import add_entity, add_relation, save_graph
+def _store(data: Dict) -> int:
+    from knowledge.graph import add_entity, add_relation, batch
 
-        added = 0
-        for e in data.get("entities", []):
-            name = e.get("name", "").strip()
+    added = 0
+    with batch():  # one transaction per extraction
+        for e in _list(data.get("entities")):
+            if not isinstance(e, dict):
+                continue
+            name = str(e.get("name") or "").strip()
             if name and len(name) > 1:
-                add_entity(name, e.get("type", "concept"))
+                add_entity(name, str(e.get("type") or "concept"))
                 added += 1
-        for r in data.get("relations", []):
-            frm = r.get("from", "").strip()
-            to = r.get("to", "").strip()
-            rel = r.get("relation", "related_to").strip().replace(" ", "_")
+        for r in _list(data.get("relations")):
+            if not isinstance(r, dict):
+                continue
+            frm = str(r.get("from") or "").strip()
+            to = str(r.get("to") or "").strip()
+            rel = str(r.get("relation") or "related_to").strip().replace(" ", "_")
             if frm and to and rel:
                 add_relation(frm, rel, to)
                 added += 1
+    return added
+
+
+class ExtractionWorker:
+    def __init__(self, db_path: str = QUEUE_DB):
+        self.db_path = db_path
+        self._q: "deque[Item]" = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread: Optional[threading.Thread] = None
+        self._last_call = 0.0
+        self._stats = {
+            "enqueued": 0,
+            "processed": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "dropped": 0,
+            "deferred": 0,
+            "items_added": 0,
+            "llm_calls": 0,
+            "llm_ms_total": 0.0,
+            "parse_failures": 0,
+            "errors": 0,
+        }
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS backlog ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT NOT NULL, "
+            "user_name TEXT NOT NULL, queued_at REAL NOT NULL)"
+        )
+        rows = self._db.execute(
+            "SELECT id, text, user_name, queued_at FROM backlog ORDER BY id"
+        ).fetchall()
+        excess = len(rows) - QUEUE_MAX
+        if excess > 0:  # QUEUE_MAX was lowered since the last run
+            self._db.execute("DELETE FROM backlog WHERE id <= ?", (rows[excess - 1][0],))
+            rows = rows[excess:]
+            self._stats["dropped"] += excess
+        self._q.extend(rows)
+
+    # ── Request path ──────────────────────────────────────────────────────
+
+    def enqueue(self, text: str, user_name: str = "User") -> None:
+        """Queue text for extraction; the oldest entry is dropped when full."""
+        now = time.time()
+        with self._lock:
+            if len(self._q) >= QUEUE_MAX:
+                old = self._q.popleft()
+                self._db.execute("DELETE FROM backlog WHERE id = ?", (old[0],))
+                self._stats["dropped"] += 1
+            cur = self._db.execute(
+                "INSERT INTO backlog (text, user_name, queued_at) VALUES (?,?,?)",
+                (text, user_name, now),
+            )
+            self._q.append((cur.lastrowid, text, user_name, now))
+            self._stats["enqueued"] += 1
+            self._start_locked()
+        self._wake.set()
+
+    def start(self) -> None:
+        """Resume a backlog left by the previous run."""
+        with self._lock:
+            if self._q:
+                self._start_locked()
+        self._wake.set()
+
+    def _start_locked(self) -> None:
+        self._idle.clear()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="graph-extractor", daemon=True)
+            self._thread.start()
+
+    # ── Worker ────────────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        retry = 0.0
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while True:
+                with self._lock:
+                    if not self._q:
+                        self._idle.set()
+                        break
+                self._yield()
+                items = self._next_batch()
+                try:
+                    self._extract(items)
+                    retry = 0.0
+                except _TRANSPORT_ERRORS as e:
+                    # Ollama down or erroring: keep the batch and back off
+                    self._stats["errors"] += 1
+                    retry = min(RETRY_MAX, retry * 2 or MIN_INTERVAL or 1.0)
+                    logger.warning("graph extraction failed, retrying in %.0fs: %s", retry, e)
+                    time.sleep(retry)
+                    continue
+                except Exception as e:
+                    # the reply itself is unusable: retrying would get the same one
+                    self._stats["parse_failures"] += 1
+                    retry = 0.0
+                    logger.warning("graph extraction reply unusable, skipping batch: %s", e)
+                self._done(items)
+
+    def _yield(self) -> None:
+        """Rate limit, then step aside while chat requests are being served."""
+        from core.activity import idle_for, wait_idle
+
+        wait = self._last_call + MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        if idle_for() < IDLE_GRACE:
+            self._stats["deferred"] += 1
+            wait_idle(MAX_DEFER, quiet=IDLE_GRACE)
+
+    def _next_batch(self) -> List[Item]:
+        with self._lock:
+            user = self._q[0][2]
+            return [it for it in islice(self._q, BATCH) if it[2] == user]
+
+    def _extract(self, items: List[Item]) -> None:
+        user_name = items[0][2]
+        texts = "\n".join(f"{i}. {it[1][:TEXT_CHARS]}" for i, it in enumerate(items, 1))
+        t0 = time.perf_counter()
+        self._last_call = time.monotonic()
+        raw = _complete(EXTRACT_PROMPT.format(user_name=user_name, texts=texts), len(items))
+        self._stats["llm_calls"] += 1
+        self._stats["llm_ms_total"] += (time.perf_counter() - t0) * 1000
+        data = _parse(raw)
+        if data is None:
+            self._stats["parse_failures"] += 1
+            return
+        added = _store(data)
+        self._stats["items_added"] += added
         if added:
-            save_graph()
-            logger.info(f"Graph updated: +{added} items")
-    except json.JSONDecodeError:
-        pass
-    except Exception as e:
-        logger.debug(f"Extraction error: {e}")
+            logger.info("Graph updated: +%d items from %d message(s)", added, len(items))
+
+    def _done(self, items: List[Item]) -> None:
+        ids = [it[0] for it in items]
+        with self._lock:
+            done = set(ids)
+            # the batch may have been dropped from the front meanwhile
+            self._q = deque(it for it in self._q if it[0] not in done)
+            self._db.executemany("DELETE FROM backlog WHERE id = ?", [(i,) for i in ids])
+            self._stats["processed"] += len(items)
+            self._stats["batches"] += 1
+            self._stats["last_batch_size"] = len(items)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait for the backlog to drain (tests, benchmarks)."""
+        return self._idle.wait(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            depth = len(self._q)
+            oldest = self._q[0][3] if self._q else None
+        batches, calls = self._stats["batches"], self._stats["llm_calls"]
+        return {
+            **self._stats,
+            "queued": depth,
+            "lag_s": round(time.time() - oldest, 1) if oldest else 0.0,
+            "avg_batch_size": round(self._stats["processed"] / batches, 2) if batches else 0.0,
+            "avg_llm_ms": round(self._stats["llm_ms_total"] / calls, 1) if calls else 0.0,
+            "batch": BATCH,
+            "queue_max": QUEUE_MAX,
+        }
+
+
+_worker: Optional[ExtractionWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_worker() -> ExtractionWorker:
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                os.makedirs(os.path.dirname(QUEUE_DB), exist_ok=True)
+                _worker = ExtractionWorker()
+    return _worker
 
 
 def extract_and_store(text: str, user_name: str = "User"):
     if not text or len(text.strip()) < 20:
         return
-    with _lock:
-        _queue.append({"text": text, "user_name": user_name})
-    _ensure_worker()
+    get_worker().enqueue(text, user_name)
 
 
 def extract_from_exchange(user_msg: str, assistant_msg: str, user_name: str = "User"):
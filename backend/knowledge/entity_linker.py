@@ -0,0 +1,161 @@
+# ==========================================
+# knowledge/entity_linker.py
+# Finds graph entities mentioned in free text
+#
+# Aho-Corasick over word tokens: node names and aliases are folded into
+# token sequences, so word boundaries come for free and "New York" matches
+# "new  york" or "NEW YORK!" alike. One pass over the text yields every
+# match; overlapping ones are resolved leftmost-longest.
+#
+# Automata are immutable once built. New names go into a small delta
+# automaton that is rebuilt on the next lookup; when it outgrows
+# GRAPH_LINK_DELTA_RATIO of the main one the two are merged in a full rebuild.
+# ==========================================
+
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+MIN_CHARS = int(os.getenv("GRAPH_LINK_MIN_CHARS", 3))
+DELTA_RATIO = float(os.getenv("GRAPH_LINK_DELTA_RATIO", 0.1))
+_DELTA_FLOOR = 256
+
+# letters/digits, with a trailing +/# so "c++" and "c#" stay distinct from "c"
+_TOKEN = re.compile(r"[^\W_]+[+#]*")
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    node_id: str
+
+
+def tokens(name: str) -> Tuple[str, ...]:
+    return tuple(t.casefold() for t in _TOKEN.findall(name))
+
+
+class _Automaton:
+    """Word-level Aho-Corasick; state 0 is the root."""
+
+    __slots__ = ("goto", "fail", "depth", "out", "link", "size")
+
+    def __init__(self, patterns: Dict[Tuple[str, ...], Set[str]]):
+        goto: List[Dict[str, int]] = [{}]
+        depth = [0]
+        out: List[Optional[Set[str]]] = [None]
+        for words, ids in patterns.items():
+            s = 0
+            for w in words:
+                nxt = goto[s].get(w)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][w] = nxt
+                    goto.append({})
+                    depth.append(depth[s] + 1)
+                    out.append(None)
+                s = nxt
+            out[s] = ids  # shared with the linker's table, so new ids show up
+
+        fail = [0] * len(goto)
+        link = [0] * len(goto)  # nearest proper suffix state that has output
+        queue = deque(goto[0].values())
+        while queue:
+            s = queue.popleft()
+            for w, t in goto[s].items():
+                f = fail[s]
+                while f and w not in goto[f]:
+                    f = fail[f]
+                fail[t] = goto[f].get(w, 0)
+                link[t] = fail[t] if out[fail[t]] else link[fail[t]]
+                queue.append(t)
+        self.goto, self.fail, self.depth, self.out, self.link = goto, fail, depth, out, link
+        self.size = len(patterns)
+
+    def scan(self, toks: List[str], found: List[Tuple[int, int, Set[str]]]) -> None:
+        """Append (first_token, last_token, ids) for every pattern occurrence."""
+        goto, fail, depth, out, link = self.goto, self.fail, self.depth, self.out, self.link
+        s = 0
+        for i, w in enumerate(toks):
+            while s and w not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(w, 0)
+            t = s if out[s] else link[s]
+            while t:
+                found.append((i - depth[t] + 1, i, out[t]))
+                t = link[t]
+
+
+class EntityLinker:
+    """Maps names → node ids and finds them in text."""
+
+    def __init__(self, names: Iterable[Tuple[str, str]] = ()):
+        self._lock = threading.Lock()
+        self._patterns: Dict[Tuple[str, ...], Set[str]] = {}
+        self._fresh: Dict[Tuple[str, ...], Set[str]] = {}  # not in _main yet
+        self._delta: Optional[_Automaton] = None
+        self._dirty = False
+        self.rebuilds = 0
+        self.add_many(names)
+        self._rebuild()
+
+    def add(self, node_id: str, name: str) -> None:
+        self.add_many([(node_id, name)])
+
+    def add_many(self, names: Iterable[Tuple[str, str]]) -> None:
+        """Register (node_id, name) pairs; already-known pairs cost one dict lookup."""
+        with self._lock:
+            for node_id, name in names:
+                words = tokens(name)
+                if sum(map(len, words)) < MIN_CHARS:
+                    continue
+                ids = self._patterns.get(words)
+                if ids is None:
+                    self._patterns[words] = self._fresh[words] = {node_id}
+                    self._dirty = True
+                else:
+                    ids.add(node_id)  # automata hold this same set
+
+    def _rebuild(self) -> None:
+        self._main = _Automaton(self._patterns)
+        self._fresh, self._delta, self._dirty = {}, None, False
+        self.rebuilds += 1
+
+    def _automata(self) -> List[_Automaton]:
+        with self._lock:
+            if self._dirty:
+                if len(self._fresh) > max(_DELTA_FLOOR, DELTA_RATIO * self._main.size):
+                    self._rebuild()
+                else:
+                    self._delta, self._dirty = _Automaton(self._fresh), False
+            return [self._main] if self._delta is None else [self._main, self._delta]
+
+    def find(self, text: str) -> List[Match]:
+        """Non-overlapping mentions in text order, leftmost-longest first."""
+        spans = [(m.start(), m.end()) for m in _TOKEN.finditer(text)]
+        if not spans:
+            return []
+        toks = [text[a:b].casefold() for a, b in spans]
+        found: List[Tuple[int, int, Set[str]]] = []
+        for automaton in self._automata():
+            automaton.scan(toks, found)
+        found.sort(key=lambda f: (f[0], f[0] - f[1]))
+        matches: List[Match] = []
+        taken = -1
+        for first, last, ids in found:
+            if first <= taken:
+                continue
+            taken = last
+            start, end = spans[first][0], spans[last][1]
+            matches.extend(Match(start, end, node_id) for node_id in sorted(ids))
+        return matches
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "names": len(self._patterns),
+                "pending": len(self._fresh),
+                "states": len(self._main.goto) + (len(self._delta.goto) if self._delta else 0),
+                "rebuilds": self.rebuilds,
+            }
@@ -1,25 +1,75 @@
 # ==========================================
 # knowledge/graph.py
-# NetworkX knowledge graph with persistence
-# Stores: entities, relations, attributes
+# SQLite knowledge graph
+# Stores: entities (nodes), relations (edges), attributes
+#
+# Every write is an upsert committed in its own transaction, or in the
+# caller's `with batch():` — nothing rewrites the whole graph. Edges are
+# keyed (src, dst, relation) and indexed by dst and relation, so lookups
+# touch only the rows they return. Materialized 1–2 hop neighbourhoods of
+# hot nodes live in an LRU (GRAPH_CACHE_NODES); each remembers which nodes it
+# was read from and is dropped when a write touches any of them.
+# Mentions in user text are found by knowledge/entity_linker.py, which is
+# fed new names and aliases as writes commit.
+# A legacy knowledge_graph.json is imported once on first open.
 # ==========================================
 
 import os
 import json
 import logging
-import networkx as nx
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
+from knowledge.entity_linker import EntityLinker, Match
 from utils.logger import system_logger, log_event
 
 logger = logging.getLogger(__name__)
 
 _BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 GRAPH_FILE = os.path.join(_BACKEND_DIR, "memory", "data", "knowledge_graph.json")
-
-# Singleton graph
-_graph: Optional[nx.DiGraph] = None
+GRAPH_DB = os.getenv(
+    "GRAPH_DB", os.path.join(_BACKEND_DIR, "memory", "data", "knowledge_graph.db")
+)
+CACHE_NODES = int(os.getenv("GRAPH_CACHE_NODES", 2048))
+MAX_WEIGHT = 2.0
+
+_local = threading.local()
+_write_lock = threading.RLock()
+_ready: Set[str] = set()
+_init_lock = threading.Lock()
+
+# (node_id, depth) → (rows, nodes they were read from)
+_hood: "OrderedDict[Tuple[str, int], List[Dict]]" = OrderedDict()
+_dependents: Dict[str, Set[Tuple[str, int]]] = {}
+_cache_lock = threading.Lock()
+_gen = 0  # bumped on every commit; a read that raced a write is not cached
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "commits": 0}
+_linkers: Dict[str, EntityLinker] = {}  # GRAPH_DB → linker, built on first lookup
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS nodes (
+        id          TEXT PRIMARY KEY,
+        label       TEXT NOT NULL,
+        entity_type TEXT NOT NULL DEFAULT 'concept',
+        attrs       TEXT NOT NULL DEFAULT '{}',
+        created_at  TEXT NOT NULL,
+        updated_at  TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS edges (
+        src       TEXT NOT NULL,
+        dst       TEXT NOT NULL,
+        relation  TEXT NOT NULL,
+        weight    REAL NOT NULL DEFAULT 1.0,
+        ts        TEXT NOT NULL,
+        PRIMARY KEY (src, dst, relation)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_edges_dst ON edges(dst, src);
+    CREATE INDEX IF NOT EXISTS idx_edges_relation ON edges(relation COLLATE NOCASE);
+"""
 
 
 def _utcnow() -> str:
@@ -27,71 +77,168 @@ def _utcnow() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _node_id(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
 # ══════════════════════════════════════════
 # PERSISTENCE
 # ══════════════════════════════════════════
 
 
-def _get_graph() -> nx.DiGraph:
-    global _graph
-    if _graph is None:
-        _graph = _load_graph()
-    return _graph
-
-
-def _load_graph() -> nx.DiGraph:
-    os.makedirs(os.path.dirname(GRAPH_FILE), exist_ok=True)
-    if not os.path.exists(GRAPH_FILE):
-        log_event(system_logger, "graph_created")
-        return nx.DiGraph()
+def _conn() -> sqlite3.Connection:
+    c = getattr(_local, "conn", None)
+    if c is None or getattr(_local, "path", None) != GRAPH_DB:
+        os.makedirs(os.path.dirname(GRAPH_DB), exist_ok=True)
+        c = sqlite3.connect(GRAPH_DB, check_same_thread=False, timeout=30, isolation_level=None)
+        c.row_factory = sqlite3.Row
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        _local.conn, _local.path = c, GRAPH_DB
+        with _init_lock:
+            if GRAPH_DB not in _ready:
+                c.executescript(_SCHEMA)
+                _migrate_json(c)
+                _ready.add(GRAPH_DB)
+    return c
+
+
+def _migrate_json(c: sqlite3.Connection) -> None:
+    """One-time import of the old NetworkX JSON dump."""
+    if not os.path.exists(GRAPH_FILE) or c.execute("SELECT 1 FROM nodes LIMIT 1").fetchone():
+        return
     try:
         with open(GRAPH_FILE) as f:
             data = json.load(f)
-        G = nx.DiGraph()
+        now = _utcnow()
+        c.execute("BEGIN")
         for node in data.get("nodes", []):
-            G.add_node(node["id"], **node.get("attrs", {}))
-        for edge in data.get("edges", []):
-            G.add_edge(
-                edge["src"],
-                edge["dst"],
-                relation=edge["relation"],
-                weight=edge.get("weight", 1.0),
-                ts=edge.get("ts", _utcnow()),
+            attrs = dict(node.get("attrs", {}))
+            label = attrs.pop("label", node["id"])
+            etype = attrs.pop("entity_type", "concept")
+            created = attrs.pop("created_at", now)
+            c.execute(
+                "INSERT OR IGNORE INTO nodes VALUES (?,?,?,?,?,?)",
+                (node["id"], label, etype, json.dumps(attrs), created, attrs.get("updated_at", created)),
             )
-        log_event(
-            system_logger,
-            "graph_loaded",
-            nodes=G.number_of_nodes(),
-            edges=G.number_of_edges(),
-        )
-        return G
+        for e in data.get("edges", []):
+            for nid in (e["src"], e["dst"]):
+                c.execute(
+                    "INSERT OR IGNORE INTO nodes VALUES (?,?,'concept','{}',?,?)", (nid, nid, now, now)
+                )
+            c.execute(
+                "INSERT OR REPLACE INTO edges VALUES (?,?,?,?,?)",
+                (e["src"], e["dst"], e.get("relation", "related_to"), e.get("weight", 1.0), e.get("ts", now)),
+            )
+        c.execute("COMMIT")
+        os.replace(GRAPH_FILE, GRAPH_FILE + ".migrated")
+        log_event(system_logger, "graph_migrated", nodes=len(data.get("nodes", [])), edges=len(data.get("edges", [])))
     except Exception as e:
-        logger.error(f"Graph load error: {e}")
-        return nx.DiGraph()
+        if c.in_transaction:
+            c.execute("ROLLBACK")
+        logger.error(f"Graph JSON migration failed: {e}")
+
+
+@contextmanager
+def batch():
+    """Group writes into one transaction; caches are invalidated on commit."""
+    with _write_lock:
+        c = _conn()
+        depth = getattr(_local, "depth", 0)
+        if depth == 0:
+            c.execute("BEGIN IMMEDIATE")
+            _local.touched = set()
+            _local.named = []
+        _local.depth = depth + 1
+        try:
+            yield
+        except BaseException:
+            _local.depth = depth
+            if depth == 0:
+                c.execute("ROLLBACK")
+            raise
+        _local.depth = depth
+        if depth == 0:
+            c.execute("COMMIT")
+            _invalidate(_local.touched)
+            linker = _linkers.get(GRAPH_DB)
+            if linker is not None and _local.named:
+                linker.add_many(_local.named)
 
 
 def save_graph() -> bool:
-    try:
-        G = _get_graph()
-        data = {
-            "nodes": [{"id": n, "attrs": dict(G.nodes[n])} for n in G.nodes],
-            "edges": [
-                {
-                    "src": u,
-                    "dst": v,
-                    "relation": d.get("relation", "related_to"),
-                    "weight": d.get("weight", 1.0),
-                    "ts": d.get("ts", _utcnow()),
-                }
-                for u, v, d in G.edges(data=True)
-            ],
-        }
-        with open(GRAPH_FILE, "w") as f:
-            json.dump(data, f, indent=2)
-        return True
-    except Exception as e:
-        logger.error(f"Graph save error: {e}")
-        return False
+    """Writes are committed as they happen; kept for callers that still flush."""
+    return True
+
+
+# ══════════════════════════════════════════
+# CACHE
+# ══════════════════════════════════════════
+
+
+def _invalidate(nodes: Set[str]) -> None:
+    global _gen
+    with _cache_lock:
+        _gen += 1
+        _stats["commits"] += 1
+        for n in nodes:
+            for key in _dependents.pop(n, ()):
+                if _hood.pop(key, None) is not None:
+                    _stats["invalidations"] += 1
+
+
+def _cached(key: Tuple[str, int]) -> Optional[List[Dict]]:
+    with _cache_lock:
+        rows = _hood.get(key)
+        if rows is not None:
+            _hood.move_to_end(key)
+            _stats["hits"] += 1
+        else:
+            _stats["misses"] += 1
+        return rows
+
+
+def _store(key: Tuple[str, int], rows: List[Dict], deps: Set[str], gen: int) -> None:
+    with _cache_lock:
+        if gen != _gen:
+            return
+        _hood[key] = rows
+        for n in deps:
+            _dependents.setdefault(n, set()).add(key)
+        while len(_hood) > CACHE_NODES:
+            _hood.popitem(last=False)  # stale _dependents entries are harmless
+
+
+def _reset_cache() -> None:
+    with _cache_lock:
+        _hood.clear()
+        _dependents.clear()
+    _linkers.clear()
+
+
+def _linker() -> EntityLinker:
+    linker = _linkers.get(GRAPH_DB)
+    if linker is None:
+        with _write_lock:  # no commit can slip between the scan and the install
+            linker = _linkers.get(GRAPH_DB)
+            if linker is None:
+                names = []
+                for node_id, label, aliases in _conn().execute(
+                    "SELECT id, label, json_extract(attrs, '$.aliases') FROM nodes"
+                ):
+                    names += [(node_id, node_id), (node_id, label)]
+                    names += [(node_id, a) for a in _aliases(aliases)]
+                linker = _linkers[GRAPH_DB] = EntityLinker(names)
+    return linker
+
+
+def _aliases(value) -> List[str]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return [value]
+    return [str(a) for a in value] if isinstance(value, list) else []
 
 
 # ══════════════════════════════════════════
@@ -103,17 +250,19 @@ def add_entity(name: str, entity_type: str = "concept", **attrs) -> str:
     """
     Add or update a node.
     node_id = lowercase name, spaces → underscores
+    aliases=[...] are extra names the entity linker matches in user text.
     """
-    G = _get_graph()
-    node_id = name.lower().replace(" ", "_")
-
-    if G.has_node(node_id):
-        G.nodes[node_id].update(attrs)
-        G.nodes[node_id]["updated_at"] = _utcnow()
-    else:
-        G.add_node(
-            node_id, label=name, entity_type=entity_type, created_at=_utcnow(), **attrs
+    node_id = _node_id(name)
+    now = _utcnow()
+    with batch():
+        _conn().execute(
+            "INSERT INTO nodes (id, label, entity_type, attrs, created_at, updated_at) "
+            "VALUES (?,?,?,?,?,?) ON CONFLICT(id) DO UPDATE SET "
+            "attrs = json_patch(nodes.attrs, excluded.attrs), updated_at = excluded.updated_at",
+            (node_id, name, entity_type, json.dumps(attrs), now, now),
         )
+        _local.touched.add(node_id)
+        _local.named += [(node_id, name)] + [(node_id, a) for a in _aliases(attrs.get("aliases"))]
 
     log_event(system_logger, "graph_add_entity", node=node_id, type=entity_type)
     return node_id
@@ -123,98 +272,109 @@ def add_relation(subject: str, relation: str, obj: str, weight: float = 1.0) ->
     """
     Add directed edge: subject –[relation]→ object
     Example: add_relation("arnav", "works_on", "astra")
+    Re-adding an existing edge strengthens it (+0.1, capped) and refreshes ts.
     """
-    G = _get_graph()
-    src = subject.lower().replace(" ", "_")
-    dst = obj.lower().replace(" ", "_")
-
-    # Auto-create nodes if missing
-    if not G.has_node(src):
-        add_entity(subject)
-    if not G.has_node(dst):
-        add_entity(obj)
-
-    # Strengthen weight if relation already exists
-    if G.has_edge(src, dst):
-        existing = G[src][dst]
-        if existing.get("relation") == relation:
-            G[src][dst]["weight"] = min(existing["weight"] + 0.1, 2.0)
-            G[src][dst]["ts"] = _utcnow()
-            return True
-
-    G.add_edge(src, dst, relation=relation, weight=weight, ts=_utcnow())
-
-    log_event(system_logger, "graph_add_relation", src=src, relation=relation, dst=dst)
-    save_graph()
+    src, dst = _node_id(subject), _node_id(obj)
+    now = _utcnow()
+    with batch():
+        c = _conn()
+        # Auto-create nodes if missing
+        c.executemany(
+            "INSERT OR IGNORE INTO nodes (id, label, entity_type, attrs, created_at, updated_at) "
+            "VALUES (?, ?, 'concept', '{}', ?, ?)",
+            [(src, subject, now, now), (dst, obj, now, now)],
+        )
+        existing = c.execute(
+            "SELECT weight FROM edges WHERE src=? AND dst=? AND relation=?", (src, dst, relation)
+        ).fetchone()
+        if existing:
+            c.execute(
+                "UPDATE edges SET weight=?, ts=? WHERE src=? AND dst=? AND relation=?",
+                (min(existing[0] + 0.1, MAX_WEIGHT), now, src, dst, relation),
+            )
+        else:
+            c.execute("INSERT INTO edges VALUES (?,?,?,?,?)", (src, dst, relation, weight, now))
+        _local.touched.update((src, dst))
+        _local.named += [(src, subject), (dst, obj)]
+
+    if not existing:
+        log_event(system_logger, "graph_add_relation", src=src, relation=relation, dst=dst)
     return True
 
 
+def update_graph(user_input: str, reply: str = "", user_name: str = "User") -> int:
+    """Per-turn hook: rule-based triples from the user's message, one transaction."""
+    from knowledge.entity_extractor import extract_and_store
+
+    with batch():
+        return extract_and_store(user_input, user_name=user_name)
+
+
 # ══════════════════════════════════════════
 # READ
 # ══════════════════════════════════════════
 
 
-def get_relations(entity: str, depth: int = 1) -> List[Dict]:
+def _neighbourhood(node_id: str, depth: int) -> List[Dict]:
+    """Materialized relations of node_id; the node's own side is left as None."""
+    key = (node_id, min(depth, 2))
+    rows = _cached(key)
+    if rows is not None:
+        return rows
+    gen = _gen
+    c = _conn()
+    out = c.execute(
+        "SELECT e.dst, e.relation, e.weight, n.label FROM edges e "
+        "LEFT JOIN nodes n ON n.id = e.dst WHERE e.src = ? ORDER BY e.weight DESC",
+        (node_id,),
+    ).fetchall()
+    rows = [
+        {"subject": None, "relation": r[1], "object": r[3] or r[0], "weight": r[2], "dir": "out"}
+        for r in out
+    ]
+    rows += [
+        {"subject": r[3] or r[0], "relation": r[1], "object": None, "weight": r[2], "dir": "in"}
+        for r in c.execute(
+            "SELECT e.src, e.relation, e.weight, n.label FROM edges e "
+            "LEFT JOIN nodes n ON n.id = e.src WHERE e.dst = ?",
+            (node_id,),
+        )
+    ]
+    deps = {node_id}
+    # Depth 2 — neighbours of neighbours
+    if depth >= 2:
+        for nb, _, _, nb_label in out[:3]:  # cap at 3 to avoid explosion
+            deps.add(nb)
+            rows += [
+                {"subject": nb_label or nb, "relation": r[1], "object": r[2] or r[0], "weight": r[3], "dir": "out2"}
+                for r in c.execute(
+                    "SELECT e.dst, e.relation, n.label, e.weight FROM edges e "
+                    "LEFT JOIN nodes n ON n.id = e.dst WHERE e.src = ? AND e.dst != ?",
+                    (nb, node_id),
+                )
+            ]
+    rows.sort(key=lambda x: x["weight"], reverse=True)
+    _store(key, rows, deps, gen)
+    return rows
+
+
+def get_relations(entity: str, depth: int = 1, limit: Optional[int] = None) -> List[Dict]:
     """
-    Get all relations for an entity up to `depth` hops.
+    Get relations for an entity up to `depth` hops, strongest first.
     Returns list of {subject, relation, object, weight} dicts.
     """
-    G = _get_graph()
-    node_id = entity.lower().replace(" ", "_")
-
-    if not G.has_node(node_id):
-        return []
-
-    results = []
-
-    # Outgoing edges
-    for _, dst, data in G.out_edges(node_id, data=True):
-        dst_label = G.nodes[dst].get("label", dst)
-        results.append(
-            {
-                "subject": entity,
-                "relation": data.get("relation", "related_to"),
-                "object": dst_label,
-                "weight": data.get("weight", 1.0),
-                "dir": "out",
-            }
-        )
+    return _resolve(_neighbourhood(_node_id(entity), depth)[:limit], entity)
 
-    # Incoming edges
-    for src, _, data in G.in_edges(node_id, data=True):
-        src_label = G.nodes[src].get("label", src)
-        results.append(
-            {
-                "subject": src_label,
-                "relation": data.get("relation", "related_to"),
-                "object": entity,
-                "weight": data.get("weight", 1.0),
-                "dir": "in",
-            }
-        )
 
-    # Depth 2 — neighbours of neighbours
-    if depth >= 2:
-        neighbours = [
-            r["object"].lower().replace(" ", "_") for r in results if r["dir"] == "out"
-        ]
-        for nb in neighbours[:3]:  # cap at 3 to avoid explosion
-            for _, dst, data in G.out_edges(nb, data=True):
-                if dst != node_id:
-                    dst_label = G.nodes[dst].get("label", dst)
-                    nb_label = G.nodes[nb].get("label", nb)
-                    results.append(
-                        {
-                            "subject": nb_label,
-                            "relation": data.get("relation", "related_to"),
-                            "object": dst_label,
-                            "weight": data.get("weight", 1.0),
-                            "dir": "out2",
-                        }
-                    )
-
-    results.sort(key=lambda x: x["weight"], reverse=True)
-    return results
+def _resolve(rows: List[Dict], entity: str) -> List[Dict]:
+    return [
+        {
+            **r,
+            "subject": entity if r["subject"] is None else r["subject"],
+            "object": entity if r["object"] is None else r["object"],
+        }
+        for r in rows
+    ]
 
 
 def query_graph(
@@ -226,27 +386,30 @@ def query_graph(
     Flexible graph query — any combination of subject/relation/object.
     Pass None to match anything.
     """
-    G = _get_graph()
-    results = []
-
-    for u, v, data in G.edges(data=True):
-        r = data.get("relation", "")
-        match_subject = (subject is None) or (subject.lower().replace(" ", "_") == u)
-        match_relation = (relation is None) or (relation.lower() == r.lower())
-        match_object = (obj is None) or (obj.lower().replace(" ", "_") == v)
-
-        if match_subject and match_relation and match_object:
-            results.append(
-                {
-                    "subject": G.nodes[u].get("label", u),
-                    "relation": r,
-                    "object": G.nodes[v].get("label", v),
-                    "weight": data.get("weight", 1.0),
-                }
-            )
+    sql = (
+        "SELECT e.src, e.dst, e.relation, e.weight, s.label, o.label FROM edges e "
+        "LEFT JOIN nodes s ON s.id = e.src LEFT JOIN nodes o ON o.id = e.dst WHERE 1=1"
+    )
+    args: list = []
+    if subject is not None:
+        sql += " AND e.src = ?"
+        args.append(_node_id(subject))
+    if relation is not None:
+        sql += " AND e.relation = ? COLLATE NOCASE"
+        args.append(relation)
+    if obj is not None:
+        sql += " AND e.dst = ?"
+        args.append(_node_id(obj))
+    sql += " ORDER BY e.weight DESC"
+    return [
+        {"subject": r[4] or r[0], "relation": r[2], "object": r[5] or r[1], "weight": r[3]}
+        for r in _conn().execute(sql, args)
+    ]
 
-    results.sort(key=lambda x: x["weight"], reverse=True)
-    return results
+
+def link_entities(text: str) -> List[Match]:
+    """Graph entities mentioned in text: (start, end, node_id), in text order."""
+    return _linker().find(text)
 
 
 def build_graph_context(user_input: str, user_name: str = "User") -> str:
@@ -254,22 +417,16 @@ def build_graph_context(user_input: str, user_name: str = "User") -> str:
     Given user input, find relevant graph facts and
     return as a natural language context string.
     """
-    G = _get_graph()
-    if G.number_of_nodes() == 0:
-        return ""
-
-    words = [w.lower().strip(".,?!") for w in user_input.split() if len(w) > 3]
     hits: List[Dict] = []
-
-    for word in words:
-        node_id = word.replace(" ", "_")
-        if G.has_node(node_id):
-            rels = get_relations(word, depth=1)
-            hits.extend(rels[:3])
+    linked = list(dict.fromkeys(m.node_id for m in link_entities(user_input)))
+    if linked:
+        marks = ",".join("?" * len(linked))
+        labels = dict(_conn().execute(f"SELECT id, label FROM nodes WHERE id IN ({marks})", linked))
+        for node_id in linked:
+            hits.extend(_resolve(_neighbourhood(node_id, 1)[:3], labels.get(node_id, node_id)))
 
     # Always include user relations
-    user_rels = get_relations(user_name, depth=1)
-    hits.extend(user_rels[:4])
+    hits.extend(get_relations(user_name, depth=1, limit=4))
 
     if not hits:
         return ""
@@ -292,22 +449,25 @@ def build_graph_context(user_input: str, user_name: str = "User") -> str:
 
 
 def get_stats() -> Dict:
-    G = _get_graph()
-    relation_counts: Dict[str, int] = {}
-    for _, _, data in G.edges(data=True):
-        r = data.get("relation", "related_to")
-        relation_counts[r] = relation_counts.get(r, 0) + 1
-
-    degrees: Dict[str, int] = dict(G.degree())
-    top_nodes = sorted(
-        [{"node": n, "degree": degrees[n]} for n in G.nodes],
-        key=lambda x: x["degree"],
-        reverse=True,
-    )[:5]
-
+    c = _conn()
+    relation_counts = dict(
+        c.execute("SELECT relation, COUNT(*) FROM edges GROUP BY relation").fetchall()
+    )
+    top_nodes = [
+        {"node": r[0], "degree": r[1]}
+        for r in c.execute(
+            "SELECT node, COUNT(*) AS degree FROM "
+            "(SELECT src AS node FROM edges UNION ALL SELECT dst FROM edges) "
+            "GROUP BY node ORDER BY degree DESC LIMIT 5"
+        )
+    ]
+    with _cache_lock:
+        cache = {**_stats, "cached_neighbourhoods": len(_hood)}
     return {
-        "nodes": G.number_of_nodes(),
-        "edges": G.number_of_edges(),
+        "nodes": c.execute("SELECT COUNT(*) FROM nodes").fetchone()[0],
+        "edges": sum(relation_counts.values()),
         "relations": relation_counts,
         "top_nodes": top_nodes,
+        "cache": cache,
+        "linker": _linker().stats(),
     }
@@ -1,6 +1,7 @@
 import os
 import logging
 import sys
+import time
 from contextlib import asynccontextmanager
 
 sys.path.insert(0, os.path.dirname(__file__))
@@ -19,6 +20,7 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from utils.telemetry import init_telemetry, instrument_fastapi
+from core.observability import get_store as get_trace_store
 from config import config
 
 logging.basicConfig(level=logging.INFO)
@@ -73,6 +75,18 @@ async def lifespan(app: FastAPI):
     from core.background import start_all
 
     _tasks = await start_all(_ws_broadcast)
+    try:
+        from knowledge.auto_extractor import get_worker
+
+        get_worker().start()  # pick up extraction backlog from the last run
+    except Exception as e:
+        logging.warning("Graph extraction worker: %s", e)
+    try:
+        from core.profiler import get_profiler
+
+        get_profiler().start_continuous()  # no-op unless PROFILE_CONTINUOUS_HZ > 0
+    except Exception as e:
+        logging.warning("Continuous profiler: %s", e)
 
     yield  # ── App is running ─────────────────────────────────────────────────
 
@@ -81,6 +95,29 @@ async def lifespan(app: FastAPI):
     from core.background import stop_all
 
     await stop_all(_tasks)
+    try:
+        from memory.vector_store import flush_writes
+        from memory.vector_maintenance import _save_dedup_index
+        from memory.vector_index import save_index
+
+        flush_writes()
+        _save_dedup_index()
+        save_index()
+    except Exception as e:
+        logging.warning("Vector flush on shutdown: %s", e)
+    try:
+        from memory_db import flush as _flush_memory_db
+
+        if not _flush_memory_db(timeout=5):
+            logging.warning("memory_db flush on shutdown: some rows were not written")
+    except Exception as e:
+        logging.warning("memory_db flush on shutdown: %s", e)
+    try:
+        from memory.history_compactor import get_compactor
+
+        get_compactor().flush(timeout=5)
+    except Exception as e:
+        logging.warning("History compactor flush on shutdown: %s", e)
     try:
         from core.brain_singleton import teardown_brain
 
@@ -93,6 +130,12 @@ async def lifespan(app: FastAPI):
         get_store().flush()
     except Exception:
         pass
+    try:
+        from utils.logger import flush as _flush_logs
+
+        _flush_logs(timeout=5)  # the listener thread stops at exit
+    except Exception:
+        pass
 
 
 app = FastAPI(title="ASTRA", version="5.1", lifespan=lifespan)
@@ -105,8 +148,15 @@ class RequestIDMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         rid = request.headers.get("X-Request-ID") or set_request_id()
         set_request_id(rid)
+        t0 = time.perf_counter()
         response = await call_next(request)
         response.headers["X-Request-ID"] = rid
+        route = request.scope.get("route")  # set by the router on match; None for 404s
+        if route is not None:
+            # streaming responses are timed to their first byte
+            get_trace_store().observe(
+                "route", f"{request.method} {route.path}", (time.perf_counter() - t0) * 1000
+            )
         return response
 
 
@@ -128,6 +178,7 @@ app.add_middleware(
 from api.routers.auth import router as auth_router
 from api.routers.users import router as users_router
 from api.routers.threads import router as threads_router
+from api.routers.portability import router as portability_router
 from api.routers.dashboard import router as dashboard_router
 from auth.usage_middleware import UsageMiddleware
 from api.routers import (
@@ -145,6 +196,7 @@ app.add_middleware(UsageMiddleware)
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(threads_router)
+app.include_router(portability_router)
 app.include_router(chat.router)
 app.include_router(chat_stream.router)
 app.include_router(memory.router)
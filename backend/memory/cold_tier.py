@@ -0,0 +1,494 @@
+"""
+memory/cold_tier.py — Compressed segment for cold memory vectors.
+
+Hot rows live in LanceDB as float32. Once a row is older than
+VECTOR_COLD_AFTER_DAYS (and its source is in VECTOR_COLD_SOURCES) the
+maintenance job moves it here:
+
+  codes.bin    compressed vectors, loaded in RAM
+                 float16 — 768 B/row, near-exact
+                 pq      — VECTOR_COLD_PQ_M bytes/row (product quantized,
+                           256 centroids per sub-space, ADC search)
+  codebook.npy PQ centroids (pq only)
+  exact.f32    float32 originals, memory-mapped and read only for the top
+               candidates during re-ranking (VECTOR_COLD_KEEP_EXACT=false
+               drops them to save disk; re-ranking then uses the codes)
+  rows.jsonl   row metadata + text, read by byte offset for final hits only
+  state.json   codec, tombstones
+
+With VECTOR_COLD_CODEC=pq the segment stays float16 until it holds
+VECTOR_COLD_PQ_MIN_TRAIN live rows; then the codebook is trained on all of
+them and the segment re-encoded. Compaction retrains it on what is left
+(falling back to float16 below the minimum), so the codebook never stays
+fitted to a small first tiering batch.
+
+Search = approximate distance over all live codes (chunked, bounded RAM) →
+top k × VECTOR_COLD_RERANK candidates → exact re-rank → metadata fetch.
+Distances are squared L2, the same metric LanceDB reports in `_distance`.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COLD_AFTER_DAYS = float(os.getenv("VECTOR_COLD_AFTER_DAYS", 90))
+COLD_SOURCES = [
+    s.strip() for s in os.getenv("VECTOR_COLD_SOURCES", "exchange").split(",") if s.strip()
+]
+CODEC = os.getenv("VECTOR_COLD_CODEC", "float16")  # float16 | pq
+PQ_M = int(os.getenv("VECTOR_COLD_PQ_M", 48))
+PQ_MIN_TRAIN = int(os.getenv("VECTOR_COLD_PQ_MIN_TRAIN", 1024))  # 4 rows per centroid
+RERANK_FACTOR = int(os.getenv("VECTOR_COLD_RERANK", 10))
+KEEP_EXACT = os.getenv("VECTOR_COLD_KEEP_EXACT", "true").lower() == "true"
+DIM = 384
+_SCAN_CHUNK = 8192
+_META_FIELDS = ["id", "text", "source", "user", "user_id", "fact_type", "priority", "ts"]
+
+
+# ── Product quantization ─────────────────────────────────────────────────────
+
+
+def train_pq(
+    vectors: np.ndarray, m: int = PQ_M, iters: int = 12, seed: int = 0, sample: int = 8192
+) -> np.ndarray:
+    """k-means per sub-space → codebook (m, k, DIM // m), k = min(256, n)."""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample:
+        vectors = vectors[rng.choice(len(vectors), sample, replace=False)]
+    n, dim = vectors.shape
+    dsub = dim // m
+    k = min(256, n)
+    book = np.empty((m, k, dsub), dtype=np.float32)
+    for j in range(m):
+        sub = vectors[:, j * dsub : (j + 1) * dsub]
+        cent = sub[rng.choice(n, k, replace=False)].copy()
+        for _ in range(iters):
+            d = (cent**2).sum(1)[None] - 2 * sub @ cent.T
+            assign = d.argmin(1)
+            counts = np.bincount(assign, minlength=k)
+            sums = np.stack(
+                [np.bincount(assign, weights=sub[:, d], minlength=k) for d in range(dsub)],
+                axis=1,
+            )
+            filled = counts > 0
+            cent[filled] = sums[filled] / counts[filled, None]
+        book[j] = cent
+    return book
+
+
+def pq_encode(vectors: np.ndarray, book: np.ndarray) -> np.ndarray:
+    m, k, dsub = book.shape
+    codes = np.empty((len(vectors), m), dtype=np.uint8)
+    for j in range(m):
+        sub = vectors[:, j * dsub : (j + 1) * dsub]
+        cent = book[j]
+        d = (cent**2).sum(1)[None] - 2 * sub @ cent.T
+        codes[:, j] = d.argmin(1)
+    return codes
+
+
+def pq_decode(codes: np.ndarray, book: np.ndarray) -> np.ndarray:
+    m = book.shape[0]
+    return np.concatenate([book[j][codes[:, j]] for j in range(m)], axis=1)
+
+
+# ── Segment ──────────────────────────────────────────────────────────────────
+
+
+class ColdSegment:
+    def __init__(
+        self,
+        path: str,
+        codec: str = CODEC,
+        pq_m: int = PQ_M,
+        keep_exact: bool = KEEP_EXACT,
+        rerank_factor: int = RERANK_FACTOR,
+        pq_min_train: int = PQ_MIN_TRAIN,
+    ):
+        self.path = path
+        self.target_codec = codec
+        self.codec = "float16" if codec == "pq" else codec  # until there is enough to train on
+        self.pq_min_train = pq_min_train
+        self.pq_m = pq_m
+        self.keep_exact = keep_exact
+        self.rerank_factor = rerank_factor
+        self._lock = threading.RLock()
+        self._book: Optional[np.ndarray] = None
+        self._recover(path)
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self._codes = np.zeros((0, self._code_width()), dtype=self._code_dtype())
+        self._norms = np.zeros(0, dtype=np.float32)  # ||code||² (float16 codec)
+        self._ids: List[str] = []
+        self._users: List[str] = []
+        self._user_codes = np.zeros(0, dtype=np.int32)
+        self._user_index: Dict[str, int] = {}
+        self._sources: List[str] = []
+        self._ts = np.zeros(0, dtype=np.float64)
+        self._offsets = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._slot: Dict[str, int] = {}
+
+    # ── Layout ────────────────────────────────────────────────────────────
+
+    def _f(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _code_width(self) -> int:
+        return self.pq_m if self.codec == "pq" else DIM
+
+    def _code_dtype(self):
+        return np.uint8 if self.codec == "pq" else np.float16
+
+    def _load(self) -> None:
+        try:
+            with open(self._f("state.json")) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("cold tier state unreadable: %s", e)
+            return
+        self.codec = state.get("codec", self.codec)
+        self.pq_m = state.get("pq_m", self.pq_m)
+        self.keep_exact = state.get("keep_exact", self.keep_exact)
+        if self.codec == "pq" and os.path.exists(self._f("codebook.npy")):
+            self._book = np.load(self._f("codebook.npy"))
+        codes = np.fromfile(self._f("codes.bin"), dtype=self._code_dtype())
+        self._codes = codes.reshape(-1, self._code_width())
+        offsets, ts = [], []
+        with open(self._f("rows.jsonl"), "rb") as f:
+            pos = 0
+            for line in f:
+                row = json.loads(line)
+                offsets.append(pos)
+                pos += len(line)
+                self._slot[row["id"]] = len(self._ids)
+                self._ids.append(row["id"])
+                self._users.append(row.get("user_id", "default"))
+                self._sources.append(row.get("source", ""))
+                ts.append(row.get("ts", 0.0))
+        n = min(len(self._ids), len(self._codes))
+        self._codes = self._codes[:n]
+        self._offsets = np.asarray(offsets[:n], dtype=np.int64)
+        self._ts = np.asarray(ts[:n], dtype=np.float64)
+        self._alive = np.ones(n, dtype=bool)
+        self._user_codes = np.asarray(
+            [self._user_code(u) for u in self._users[:n]], dtype=np.int32
+        )
+        self._norms = self._code_norms(self._codes)
+        for row_id in state.get("deleted", []):
+            slot = self._slot.pop(row_id, None)
+            if slot is not None:
+                self._alive[slot] = False
+
+    def _user_code(self, user_id: str) -> int:
+        return self._user_index.setdefault(user_id, len(self._user_index))
+
+    def _code_norms(self, codes: np.ndarray) -> np.ndarray:
+        if self.codec == "pq":
+            return np.zeros(len(codes), dtype=np.float32)
+        out = np.empty(len(codes), dtype=np.float32)
+        for i in range(0, len(codes), _SCAN_CHUNK):
+            c = codes[i : i + _SCAN_CHUNK].astype(np.float32)
+            out[i : i + _SCAN_CHUNK] = (c * c).sum(1)
+        return out
+
+    def _save_state(self) -> None:
+        deleted = [self._ids[i] for i in np.flatnonzero(~self._alive)]
+        state = {
+            "codec": self.codec,
+            "pq_m": self.pq_m,
+            "keep_exact": self.keep_exact,
+            "count": len(self._ids),
+            "deleted": deleted,
+        }
+        tmp = self._f("state.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._f("state.json"))
+
+    def _exact(self) -> Optional[np.ndarray]:
+        f = self._f("exact.f32")
+        if not self.keep_exact or not os.path.exists(f) or not os.path.getsize(f):
+            return None
+        return np.memmap(self._f("exact.f32"), dtype=np.float32, mode="r").reshape(-1, DIM)
+
+    # ── Writes ────────────────────────────────────────────────────────────
+
+    def _encode(self, vecs: np.ndarray) -> np.ndarray:
+        if self.codec == "pq":
+            if self._book is None:
+                self._book = train_pq(vecs, self.pq_m)
+                np.save(self._f("codebook.npy"), self._book)
+            return pq_encode(vecs, self._book)
+        return vecs.astype(np.float16)
+
+    def append(self, rows: List[Dict]) -> int:
+        """Add rows (LanceDB dicts incl. `vector`). Returns rows added."""
+        with self._lock:
+            rows = [r for r in rows if r["id"] not in self._slot]
+            if not rows:
+                return 0
+            if (
+                self.target_codec == "pq"
+                and self.codec != "pq"
+                and self.count() + len(rows) >= self.pq_min_train
+            ):
+                self._rewrite(rows, "pq")  # enough rows now: train and re-encode all
+                return len(rows)
+            os.makedirs(self.path, exist_ok=True)
+            vecs = np.asarray([r["vector"] for r in rows], dtype=np.float32)
+            codes = self._encode(vecs)
+            with open(self._f("codes.bin"), "ab") as f:
+                f.write(codes.tobytes())
+            if self.keep_exact:
+                with open(self._f("exact.f32"), "ab") as f:
+                    f.write(vecs.tobytes())
+            offsets = []
+            with open(self._f("rows.jsonl"), "ab") as f:
+                pos = f.tell()
+                for r in rows:
+                    line = (json.dumps({k: r.get(k) for k in _META_FIELDS}) + "\n").encode()
+                    offsets.append(pos)
+                    f.write(line)
+                    pos += len(line)
+            base = len(self._ids)
+            for i, r in enumerate(rows):
+                self._slot[r["id"]] = base + i
+                self._ids.append(r["id"])
+                self._users.append(r.get("user_id", "default"))
+                self._sources.append(r.get("source", ""))
+            self._codes = np.concatenate([self._codes, codes])
+            self._norms = np.concatenate([self._norms, self._code_norms(codes)])
+            self._user_codes = np.concatenate(
+                [
+                    self._user_codes,
+                    np.asarray(
+                        [self._user_code(r.get("user_id", "default")) for r in rows],
+                        dtype=np.int32,
+                    ),
+                ]
+            )
+            self._offsets = np.concatenate([self._offsets, np.asarray(offsets, dtype=np.int64)])
+            self._ts = np.concatenate([self._ts, np.asarray([r["ts"] for r in rows], dtype=np.float64)])
+            self._alive = np.concatenate([self._alive, np.ones(len(rows), dtype=bool)])
+            self._save_state()
+            return len(rows)
+
+    def delete(self, ids: List[str]) -> int:
+        """Tombstone rows; compacts once more than a fifth of slots are dead."""
+        with self._lock:
+            n = 0
+            for row_id in ids:
+                slot = self._slot.pop(row_id, None)
+                if slot is not None:
+                    self._alive[slot] = False
+                    n += 1
+            if n:
+                self._save_state()  # tombstones are durable before any compaction
+                if (~self._alive).sum() > 0.2 * len(self._alive):
+                    try:
+                        self.compact()
+                    except Exception as e:  # the old segment is still intact
+                        logger.warning("cold tier compaction failed: %s", e)
+            return n
+
+    def compact(self) -> None:
+        """Rewrite the segment without tombstoned rows (retraining the PQ codebook)."""
+        with self._lock:
+            codec = self.codec
+            if self.target_codec == "pq" or codec == "pq":
+                codec = "pq" if self.count() >= self.pq_min_train else "float16"
+            self._rewrite([], codec)
+
+    def _rewrite(self, extra: List[Dict], codec: str) -> None:
+        """
+        Re-encode the live rows (+ extra) with `codec`. The new segment is
+        built beside this one and swapped in only once it is fully written —
+        for rows already deleted from LanceDB this is the only copy.
+        """
+        keep = np.flatnonzero(self._alive)
+        rows = self._read_rows(keep) if len(keep) else []
+        if rows:
+            exact = self._exact()
+            vecs = exact[keep] if exact is not None else self._decode(self._codes[keep])
+            for r, v in zip(rows, np.asarray(vecs)):
+                r["vector"] = v
+        rows += extra
+        tmp, old = self.path + ".rewrite", self.path + ".old"
+        shutil.rmtree(tmp, ignore_errors=True)
+        try:
+            new = ColdSegment(
+                tmp, self.target_codec, self.pq_m, self.keep_exact,
+                self.rerank_factor, self.pq_min_train,
+            )
+            new.codec = codec
+            new._reset()
+            os.makedirs(tmp, exist_ok=True)
+            if rows:
+                new.append(rows)
+            else:
+                new._save_state()
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        if os.path.exists(self.path):
+            os.replace(self.path, old)
+        os.replace(tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+        self._book = None
+        self._reset()
+        self._load()
+
+    @staticmethod
+    def _recover(path: str) -> None:
+        """Finish or roll back a _rewrite() interrupted by a crash."""
+        tmp, old = path + ".rewrite", path + ".old"
+        shutil.rmtree(tmp, ignore_errors=True)  # never swapped in: incomplete
+        if os.path.exists(old):
+            if os.path.exists(path):
+                shutil.rmtree(old, ignore_errors=True)  # swap done, cleanup wasn't
+            else:
+                os.replace(old, path)  # crashed between the two renames
+
+    # ── Reads ─────────────────────────────────────────────────────────────
+
+    def _decode(self, codes: np.ndarray) -> np.ndarray:
+        if self.codec == "pq":
+            return pq_decode(codes, self._book)
+        return codes.astype(np.float32)
+
+    def _read_rows(self, slots) -> List[Dict]:
+        out = []
+        with open(self._f("rows.jsonl"), "rb") as f:
+            for s in slots:
+                f.seek(int(self._offsets[s]))
+                out.append(json.loads(f.readline()))
+        return out
+
+    def _approx_dist(self, q: np.ndarray, slots: np.ndarray) -> np.ndarray:
+        out = np.empty(len(slots), dtype=np.float32)
+        if len(slots) == len(self._codes):  # no filtering → cheap slices, no gather
+            slots = slice(None)
+            take = lambda a, i: a[i : i + _SCAN_CHUNK]  # noqa: E731
+        else:
+            take = lambda a, i: a[slots[i : i + _SCAN_CHUNK]]  # noqa: E731
+        if self.codec == "pq":
+            m, k, dsub = self._book.shape
+            table = ((self._book - q.reshape(m, 1, dsub)) ** 2).sum(-1).ravel()
+            offsets = (np.arange(m) * k).astype(np.int32)
+            for i in range(0, len(out), _SCAN_CHUNK):
+                out[i : i + _SCAN_CHUNK] = table[take(self._codes, i) + offsets].sum(1)
+        else:
+            qq = float(q @ q)
+            for i in range(0, len(out), _SCAN_CHUNK):
+                c = take(self._codes, i).astype(np.float32)
+                out[i : i + _SCAN_CHUNK] = take(self._norms, i) - 2 * (c @ q) + qq
+        return out
+
+    def search(self, vector, limit: int, user_id: str = None) -> List[Dict]:
+        """Top-`limit` rows as LanceDB-style dicts with `_distance`."""
+        with self._lock:
+            mask = self._alive.copy()
+            if user_id:
+                code = self._user_index.get(user_id)
+                if code is None:
+                    return []
+                mask &= self._user_codes == code
+            slots = np.flatnonzero(mask)
+            if not len(slots) or limit <= 0:
+                return []
+            q = np.asarray(vector, dtype=np.float32).reshape(-1)
+            approx = self._approx_dist(q, slots)
+            n_cand = min(len(slots), limit * max(1, self.rerank_factor))
+            cand = np.argpartition(approx, n_cand - 1)[:n_cand]
+            cand_slots = slots[cand]
+            exact = self._exact()
+            if exact is not None:
+                order = np.sort(cand_slots)  # sequential mmap reads
+                vecs = np.asarray(exact[order])
+                dists = ((vecs - q) ** 2).sum(1)
+                cand_slots, cand_d = order, dists
+            else:
+                cand_d = approx[cand]
+            top = np.argsort(cand_d)[:limit]
+            rows = self._read_rows(cand_slots[top])
+            for r, d in zip(rows, cand_d[top]):
+                r["_distance"] = float(d)
+                r["tier"] = "cold"
+            return rows
+
+    def scan(self, source: str = None, before: float = None) -> List[Dict]:
+        """Live (id, user_id, source, ts) rows — no text, no vectors."""
+        with self._lock:
+            out = []
+            for slot in np.flatnonzero(self._alive):
+                if source and self._sources[slot] != source:
+                    continue
+                if before is not None and self._ts[slot] >= before:
+                    continue
+                out.append(
+                    {
+                        "id": self._ids[slot],
+                        "user_id": self._users[slot],
+                        "source": self._sources[slot],
+                        "ts": float(self._ts[slot]),
+                    }
+                )
+            return out
+
+    def read_text(self, ids: List[str]) -> List[Dict]:
+        slots = [self._slot[i] for i in ids if i in self._slot]
+        with self._lock:
+            return self._read_rows(slots) if slots else []
+
+    def count(self) -> int:
+        return int(self._alive.sum())
+
+    def stats(self) -> Dict:
+        disk = 0
+        for name in ("codes.bin", "exact.f32", "rows.jsonl", "codebook.npy", "state.json"):
+            try:
+                disk += os.path.getsize(self._f(name))
+            except OSError:
+                pass
+        book = self._book.nbytes if self._book is not None else 0
+        ram = self._codes.nbytes + book
+        return {
+            "codec": self.codec,
+            "rows": self.count(),
+            "tombstones": int((~self._alive).sum()),
+            "keep_exact": self.keep_exact,
+            "ram_bytes": int(ram),
+            "codebook_bytes": int(book),
+            "disk_bytes": disk,
+            # per-row code size; the codebook is a fixed cost on top
+            "bytes_per_row_ram": (
+                round(self._codes.nbytes / len(self._codes), 1) if len(self._codes) else 0
+            ),
+        }
+
+
+_segment: Optional[ColdSegment] = None
+_segment_lock = threading.Lock()
+
+
+def get_cold_tier() -> ColdSegment:
+    global _segment
+    if _segment is None:
+        with _segment_lock:
+            if _segment is None:
+                from memory.vector_store import DB_DIR
+
+                _segment = ColdSegment(os.path.join(DB_DIR, "cold"))
+    return _segment
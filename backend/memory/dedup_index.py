@@ -0,0 +1,272 @@
+"""
+memory/dedup_index.py — Pre-embedding near-duplicate detection.
+
+64-bit SimHash signatures of every stored fact/exchange, indexed per
+(user_id, source). A lookup splits the query signature into 4 × 16-bit bands;
+by pigeonhole any signature within Hamming distance < 4 shares at least one
+band exactly, so only a handful of bucket candidates are compared — no
+embedding, no vector search.
+
+Digits are normalized away before hashing so "CPU is at 23%" and
+"CPU is at 41%" collapse to the same signature. Facts are the exception:
+there a number change is an update ("I am 31 years old"), so the digit
+sequence is hashed and XORed into the signature — same numbers keep the
+Hamming distance, different numbers move it ~32 bits away.
+
+Persisted to dedup_index.json beside the LanceDB table; saved from the
+vector maintenance tick when dirty and rebuilt from the table if missing
+or written by an older signature scheme (FORMAT_VERSION).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HAMMING_THRESHOLD = int(os.getenv("DEDUP_HAMMING", 3))
+MAX_PER_USER = int(os.getenv("DEDUP_MAX_PER_USER", 10000))
+FORMAT_VERSION = 2  # 2: digits hashed into fact signatures
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+_WORD = re.compile(r"[a-z0-9#]+")
+_DIGITS = re.compile(r"\d+")
+_NUMBERED_SOURCES = ("fact",)  # sources where a changed number is new information
+
+
+def _features(text: str) -> List[str]:
+    words = _WORD.findall(_DIGITS.sub("#", text.lower()))
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _h64(token: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(token.encode(), digest_size=8).digest(), "little"
+    )
+
+
+def simhash(text: str, numbers: bool = False) -> int:
+    """64-bit SimHash over word unigrams + bigrams (numbers=True: digits must match too)."""
+    toks = _features(text)
+    if not toks:
+        return 0
+    hs = np.fromiter((_h64(t) for t in toks), dtype="<u8", count=len(toks))
+    bits = np.unpackbits(hs.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int32) * 2 - len(toks)
+    sig = int(np.packbits(votes > 0, bitorder="little").view("<u8")[0])
+    if numbers:
+        digits = _DIGITS.findall(text)
+        if digits:
+            sig ^= _h64(" ".join(digits))
+    return sig
+
+
+def _bands(sig: int) -> Iterable[Tuple[int, int]]:
+    for b in range(_BANDS):
+        yield b, (sig >> (b * _BAND_BITS)) & _BAND_MASK
+
+
+class _Bucket:
+    """Signatures for one (user_id, source) — insertion-ordered, bounded."""
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, int]" = OrderedDict()  # row_id → sig
+        self.bands: Dict[Tuple[int, int], set] = {}
+
+    def add(self, row_id: str, sig: int) -> None:
+        self.entries[row_id] = sig
+        for band in _bands(sig):
+            self.bands.setdefault(band, set()).add(row_id)
+
+    def remove(self, row_id: str) -> None:
+        sig = self.entries.pop(row_id, None)
+        if sig is None:
+            return
+        for band in _bands(sig):
+            ids = self.bands.get(band)
+            if ids:
+                ids.discard(row_id)
+                if not ids:
+                    del self.bands[band]
+
+    def nearest(self, sig: int, threshold: int) -> Optional[str]:
+        best, best_d = None, threshold + 1
+        seen = set()
+        for band in _bands(sig):
+            for row_id in self.bands.get(band, ()):
+                if row_id in seen:
+                    continue
+                seen.add(row_id)
+                d = (self.entries[row_id] ^ sig).bit_count()
+                if d < best_d:
+                    best, best_d = row_id, d
+        return best
+
+
+class DedupIndex:
+    def __init__(self, path: str, threshold: int = HAMMING_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._owner: Dict[str, Tuple[str, str]] = {}  # row_id → bucket key
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._checks = 0
+        self._suppressed: Dict[str, int] = {}
+        self._check_us = 0.0
+
+    # ── Lookup / update ───────────────────────────────────────────────────
+
+    def find_duplicate(self, user_id: str, source: str, text: str) -> Optional[str]:
+        """Return the row id of a near-duplicate already stored, else None."""
+        t0 = time.perf_counter()
+        sig = simhash(text, source in _NUMBERED_SOURCES)
+        with self._lock:
+            self._checks += 1
+            bucket = self._buckets.get((user_id, source))
+            hit = bucket.nearest(sig, self.threshold) if bucket else None
+            if hit:
+                self._suppressed[source] = self._suppressed.get(source, 0) + 1
+            self._check_us += (time.perf_counter() - t0) * 1e6
+        return hit
+
+    def add(self, user_id: str, source: str, text: str, row_id: str) -> None:
+        sig = simhash(text, source in _NUMBERED_SOURCES)
+        key = (user_id, source)
+        with self._lock:
+            bucket = self._buckets.setdefault(key, _Bucket())
+            bucket.add(row_id, sig)
+            self._owner[row_id] = key
+            while len(bucket.entries) > MAX_PER_USER:
+                oldest = next(iter(bucket.entries))
+                bucket.remove(oldest)
+                self._owner.pop(oldest, None)
+            self._dirty = True
+
+    def remove(self, row_ids: Iterable[str]) -> None:
+        with self._lock:
+            for row_id in row_ids:
+                key = self._owner.pop(row_id, None)
+                if key and key in self._buckets:
+                    self._buckets[key].remove(row_id)
+                    self._dirty = True
+
+    # ── Persistence ───────────────────────────────────────────────────────
+
+    def load(self) -> bool:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning("dedup index unreadable, rebuilding: %s", e)
+            return False
+        if data.get("version") != FORMAT_VERSION:
+            logger.info("dedup index format %s is outdated, rebuilding", data.get("version"))
+            return False
+        with self._lock:
+            for item in data.get("buckets", []):
+                bucket = self._buckets.setdefault(
+                    (item["user_id"], item["source"]), _Bucket()
+                )
+                for row_id, sig_hex in item["entries"]:
+                    bucket.add(row_id, int(sig_hex, 16))
+                    self._owner[row_id] = (item["user_id"], item["source"])
+        return True
+
+    def save(self, force: bool = False) -> bool:
+        with self._lock:
+            if not (self._dirty or force):
+                return False
+            data = {
+                "version": FORMAT_VERSION,
+                "buckets": [
+                    {
+                        "user_id": user_id,
+                        "source": source,
+                        "entries": [[r, format(s, "x")] for r, s in b.entries.items()],
+                    }
+                    for (user_id, source), b in self._buckets.items()
+                ]
+            }
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            return True
+        except Exception as e:
+            logger.warning("dedup index save failed: %s", e)
+            self._dirty = True
+            return False
+
+    def rebuild(self, rows: Iterable[Dict]) -> int:
+        """Rebuild from (id, text, user_id, source, ts) rows, oldest first."""
+        n = 0
+        for r in sorted(rows, key=lambda r: r.get("ts", 0)):
+            self.add(r.get("user_id", "default"), r["source"], r["text"], r["id"])
+            n += 1
+        return n
+
+    def stats(self) -> Dict:
+        with self._lock:
+            suppressed = sum(self._suppressed.values())
+            return {
+                "signatures": len(self._owner),
+                "users": len({u for u, _ in self._buckets}),
+                "checks": self._checks,
+                "suppressed": suppressed,
+                "suppressed_by_source": dict(self._suppressed),
+                "suppression_rate": (
+                    round(suppressed / self._checks, 3) if self._checks else 0.0
+                ),
+                "avg_check_us": (
+                    round(self._check_us / self._checks, 1) if self._checks else 0.0
+                ),
+                "hamming_threshold": self.threshold,
+            }
+
+
+_index: Optional[DedupIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_dedup_index() -> DedupIndex:
+    """Process-wide index, loaded from disk (or rebuilt from LanceDB) on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from memory.vector_store import DB_DIR, _scan
+
+                idx = DedupIndex(os.path.join(DB_DIR, "dedup_index.json"))
+                if not idx.load():
+                    try:
+                        from memory.cold_tier import get_cold_tier
+
+                        rows = _scan(
+                            "source IN ('fact', 'exchange')",
+                            ["id", "text", "user_id", "source", "ts"],
+                        )
+                        cold = get_cold_tier()
+                        rows += cold.read_text([r["id"] for r in cold.scan()])
+                        n = idx.rebuild(rows)
+                        idx.save(force=True)
+                        logger.info("dedup index rebuilt from %d rows", n)
+                    except Exception as e:
+                        logger.warning("dedup index rebuild failed: %s", e)
+                _index = idx
+    return _index
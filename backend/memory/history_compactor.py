@@ -0,0 +1,227 @@
+# memory/history_compactor.py — Rolling conversation summaries, off the request path
+# Three levels, per session:
+#   turn     each finished exchange becomes a one-line note (extractive, no LLM)
+#   segment  every SUMMARY_SEGMENT_TURNS notes that have left the verbatim window
+#            are folded into one segment summary (LLM)
+#   session  once more than SUMMARY_SESSION_SEGMENTS segments exist, the oldest
+#            are folded into the running session summary (LLM)
+# record_turn() only queues the exchange; one worker thread does the LLM work,
+# so a reply never waits on summarization. Each session's digest is persisted
+# to memory/data/sessions/<id>.json and only new turns are ever processed. The
+# prompt path reads context_lines(), which is served from memory.
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESSIONS_DIR = os.path.join(_BACKEND_DIR, "memory", "data", "sessions")
+SEGMENT_TURNS = int(os.getenv("SUMMARY_SEGMENT_TURNS", 8))
+SESSION_SEGMENTS = int(os.getenv("SUMMARY_SESSION_SEGMENTS", 4))
+RAW_TURNS = int(os.getenv("SUMMARY_RAW_TURNS", 6))  # newest turns replayed verbatim
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "")  # empty → the model that served the turn
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _first_sentence(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    text = _SENTENCE_END.split(text, 1)[0]
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def turn_note(user_msg: str, reply: str, user_name: str = "User") -> str:
+    return f"{user_name}: {_first_sentence(user_msg, 140)} → ASTRA: {_first_sentence(reply, 140)}"
+
+
+class HistoryCompactor:
+    def __init__(self, directory: str = SESSIONS_DIR):
+        self.dir = directory
+        self._sessions: Dict[str, Dict] = {}
+        self._pending: Dict[str, List[Tuple[str, str]]] = {}
+        self._meta: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "turns_recorded": 0,
+            "turns_compacted": 0,
+            "segments_built": 0,
+            "session_rollups": 0,
+            "llm_calls": 0,
+            "llm_ms_total": 0.0,
+            "errors": 0,
+        }
+
+    # ── Persistence ───────────────────────────────────────────────────────
+
+    def _path(self, session_id: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)[:80] or "default"
+        return os.path.join(self.dir, f"{safe}.json")
+
+    def _state(self, session_id: str) -> Dict:
+        """Cached digest for a session (caller holds _lock)."""
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = {"turns": 0, "notes": [], "segments": [], "session": "", "updated_at": 0}
+            try:
+                with open(self._path(session_id)) as f:
+                    state.update(json.load(f))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning("session digest %s unreadable, starting fresh: %s", session_id, e)
+            self._sessions[session_id] = state
+        return state
+
+    def _save(self, session_id: str, state: Dict) -> None:
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            path = self._path(session_id)
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({**state, "session_id": session_id}, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning("session digest save failed (%s): %s", session_id, e)
+
+    # ── Request path ──────────────────────────────────────────────────────
+
+    def record_turn(
+        self,
+        session_id: str,
+        user_msg: str,
+        reply: str,
+        user_name: str = "User",
+        model: str = None,
+    ) -> None:
+        """Queue a finished exchange. Never blocks on summarization."""
+        with self._lock:
+            self._pending.setdefault(session_id, []).append((user_msg, reply))
+            self._meta[session_id] = (user_name, model)
+            self._stats["turns_recorded"] += 1
+            self._idle.clear()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="history-compactor", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def context_lines(self, session_id: str) -> List[Tuple[str, str]]:
+        """[(level, text)] oldest first: session summary, segments, older turn notes."""
+        with self._lock:
+            state = self._state(session_id)
+            out = [("session", state["session"])] if state["session"] else []
+            out += [("segment", s) for s in state["segments"]]
+            notes = state["notes"][:-RAW_TURNS] if RAW_TURNS else state["notes"]
+            out += [("turn", n) for n in notes]
+        return out
+
+    def latest(self, session_id: str) -> str:
+        return "\n".join(text for _, text in self.context_lines(session_id))
+
+    # ── Worker ────────────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._idle.set()
+                        break
+                    session_id = next(iter(self._pending))
+                    turns = self._pending.pop(session_id)
+                    user_name, model = self._meta.get(session_id, ("User", None))
+                try:
+                    self.compact(session_id, turns, user_name, model)
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    logger.warning("history compaction failed (%s): %s", session_id, e)
+
+    def _summarize(self, lines: List[str], user_name: str, model: str, **kw) -> str:
+        from memory.summarizer import summarize_lines
+
+        t0 = time.perf_counter()
+        text = summarize_lines(lines, user_name, model=SUMMARY_MODEL or model or "phi3:mini", **kw)
+        self._stats["llm_calls"] += 1
+        self._stats["llm_ms_total"] += (time.perf_counter() - t0) * 1000
+        return text
+
+    def compact(
+        self, session_id: str, turns: List[Tuple[str, str]], user_name: str = "User", model: str = None
+    ) -> None:
+        """Fold new turns into the session digest (worker thread; also used directly in tests)."""
+        notes = [turn_note(u, r, user_name) for u, r in turns]
+        with self._lock:
+            state = self._state(session_id)
+            state["notes"].extend(notes)
+            state["turns"] += len(turns)
+            self._stats["turns_compacted"] += len(turns)
+        while True:
+            with self._lock:
+                ready = len(state["notes"]) - RAW_TURNS >= SEGMENT_TURNS
+                batch = list(state["notes"][:SEGMENT_TURNS]) if ready else None
+            if batch is None:
+                break
+            segment = self._summarize(batch, user_name, model)
+            with self._lock:
+                del state["notes"][: len(batch)]
+                state["segments"].append(segment)
+                self._stats["segments_built"] += 1
+        while True:
+            with self._lock:
+                excess = len(state["segments"]) - SESSION_SEGMENTS
+                old = list(state["segments"][:excess]) if excess > 0 else None
+                prior = state["session"]
+            if old is None:
+                break
+            rolled = self._summarize(old, user_name, model, prior=prior, sentences="3-5")
+            with self._lock:
+                del state["segments"][: len(old)]
+                state["session"] = rolled
+                self._stats["session_rollups"] += 1
+        with self._lock:
+            state["updated_at"] = time.time()
+            snapshot = json.loads(json.dumps(state))
+        self._save(session_id, snapshot)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait for queued turns to be compacted (shutdown, tests)."""
+        return self._idle.wait(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = sum(len(v) for v in self._pending.values())
+            sessions = len(self._sessions)
+        calls = self._stats["llm_calls"]
+        return {
+            **self._stats,
+            "pending_turns": pending,
+            "sessions_loaded": sessions,
+            "avg_llm_ms": round(self._stats["llm_ms_total"] / calls, 1) if calls else 0.0,
+            "segment_turns": SEGMENT_TURNS,
+            "raw_turns": RAW_TURNS,
+        }
+
+
+_compactor: Optional[HistoryCompactor] = None
+_compactor_lock = threading.Lock()
+
+
+def get_compactor() -> HistoryCompactor:
+    global _compactor
+    if _compactor is None:
+        with _compactor_lock:
+            if _compactor is None:
+                _compactor = HistoryCompactor()
+    return _compactor
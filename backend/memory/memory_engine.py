@@ -6,6 +6,9 @@
 #   load_memory("alice")    → alice's memory
 # MEMORY_FILE kept so tests can monkeypatch it.
 # _CACHE_MAX_AGE TTL now actually enforced.
+# Locks are per user, and every user's memory carries a version that bumps
+# on each write (or when another process rewrites the file), so
+# memory_transaction can commit optimistically via compare_and_save().
 # ==========================================
 import json
 import copy
@@ -13,7 +16,7 @@ import os
 import time
 import logging
 import threading
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +25,12 @@ DATA_DIR = os.path.join(BASE_DIR, "memory", "data", "users")
 MEMORY_FILE = os.path.join(DATA_DIR, "default", "memory.json")
 LOCK_FILE = MEMORY_FILE + ".lock"
 
-_thread_lock = threading.Lock()
+_thread_lock = threading.Lock()  # guards the per-user lock table only
 _CACHE_MAX_AGE = 30
 
 _user_caches: Dict[str, Dict[str, Any]] = {}
+_user_locks: Dict[str, threading.Lock] = {}
+_versions: Dict[str, list] = {}  # user_id → [version, file mtime_ns seen]
 
 DEFAULT_MEMORY = {
     "user_facts": [],
@@ -66,42 +71,74 @@ def _cache_invalidate(user_id: str):
         _user_caches[user_id]["valid"] = False
 
 
+def _lock_for(user_id: str) -> threading.Lock:
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        with _thread_lock:
+            lock = _user_locks.setdefault(user_id, threading.Lock())
+    return lock
+
+
+def _mtime_ns(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _current_version(user_id: str) -> int:
+    """Caller holds the user's lock. A file changed behind our back counts as a write."""
+    entry = _versions.setdefault(user_id, [0, None])
+    mtime = _mtime_ns(_resolve_path(user_id))
+    if entry[1] != mtime:
+        if entry[1] is not None:
+            entry[0] += 1
+            _cache_invalidate(user_id)
+        entry[1] = mtime
+    return entry[0]
+
+
 def load_memory(user_id: str = "default") -> Dict[str, Any]:
-    with _thread_lock:
-        cached = _cache_get(user_id)
-        if cached is not None:
-            return cached
-        mem_file = _resolve_path(user_id)
-        if os.path.exists(mem_file):
-            try:
-                with open(mem_file, "r", encoding="utf-8") as f:
-                    _acquire_flock(f, shared=True)
-                    memory = json.load(f)
-                for key in DEFAULT_MEMORY:
-                    if key not in memory:
-                        memory[key] = copy.deepcopy(DEFAULT_MEMORY[key])
-                _cache_set(user_id, memory)
-                return copy.deepcopy(memory)
-            except json.JSONDecodeError:
-                logger.error("Memory corrupted for user=%s, resetting", user_id)
-            except Exception as e:
-                logger.error("load_memory user=%s: %s", user_id, e)
-        return copy.deepcopy(DEFAULT_MEMORY)
+    with _lock_for(user_id):
+        return _load_locked(user_id)
+
+
+def load_versioned(user_id: str = "default") -> Tuple[Dict[str, Any], int]:
+    """(memory, version) — pass the version back to compare_and_save()."""
+    with _lock_for(user_id):
+        version = _current_version(user_id)
+        return _load_locked(user_id), version
+
+
+def _load_locked(user_id: str) -> Dict[str, Any]:
+    cached = _cache_get(user_id)
+    if cached is not None:
+        return cached
+    mem_file = _resolve_path(user_id)
+    if os.path.exists(mem_file):
+        try:
+            with open(mem_file, "r", encoding="utf-8") as f:
+                _acquire_flock(f, shared=True)
+                memory = json.load(f)
+            for key in DEFAULT_MEMORY:
+                if key not in memory:
+                    memory[key] = copy.deepcopy(DEFAULT_MEMORY[key])
+            _cache_set(user_id, memory)
+            return copy.deepcopy(memory)
+        except json.JSONDecodeError:
+            logger.error("Memory corrupted for user=%s, resetting", user_id)
+        except Exception as e:
+            logger.error("load_memory user=%s: %s", user_id, e)
+    return copy.deepcopy(DEFAULT_MEMORY)
 
 
 def save_memory(
     memory: Dict[str, Any], user_id: str = "default", history: list = None
 ) -> bool:
-    with _thread_lock:
+    with _lock_for(user_id):
+        _current_version(user_id)
         try:
-            mem_file = _resolve_path(user_id)
-            os.makedirs(os.path.dirname(mem_file), exist_ok=True)
-            tmp = mem_file + ".tmp"
-            with open(tmp, "w", encoding="utf-8") as f:
-                _acquire_flock(f, shared=False)
-                json.dump(memory, f, indent=2, ensure_ascii=False)
-            os.replace(tmp, mem_file)
-            _cache_set(user_id, memory)
+            _write_locked(memory, user_id)
             return True
         except Exception as e:
             logger.error("save_memory user=%s: %s", user_id, e)
@@ -109,8 +146,40 @@ def save_memory(
             return False
 
 
+def compare_and_save(
+    memory: Dict[str, Any], user_id: str = "default", expected_version: int = 0
+) -> Optional[int]:
+    """
+    Write only if nobody has written since `expected_version` was read.
+    Returns the new version, or None on a version conflict. Write errors raise.
+    """
+    with _lock_for(user_id):
+        if _current_version(user_id) != expected_version:
+            return None
+        try:
+            return _write_locked(memory, user_id)
+        except Exception:
+            _cache_invalidate(user_id)
+            raise
+
+
+def _write_locked(memory: Dict[str, Any], user_id: str) -> int:
+    mem_file = _resolve_path(user_id)
+    os.makedirs(os.path.dirname(mem_file), exist_ok=True)
+    tmp = mem_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        _acquire_flock(f, shared=False)
+        json.dump(memory, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, mem_file)
+    _cache_set(user_id, memory)
+    entry = _versions.setdefault(user_id, [0, None])
+    entry[0] += 1
+    entry[1] = _mtime_ns(mem_file)
+    return entry[0]
+
+
 def invalidate_memory_cache(user_id: str = "default"):
-    with _thread_lock:
+    with _lock_for(user_id):
         _cache_invalidate(user_id)
 
 
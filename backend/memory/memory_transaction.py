@@ -1,39 +1,71 @@
 """
-memory/memory_transaction.py — Atomic memory write context manager.
+memory/memory_transaction.py — Optimistic memory transactions.
 
 Fixes the load-modify-save race condition where concurrent requests
-overwrite each other's memory mutations.
+overwrite each other's memory mutations, without a global write lock:
+the snapshot is read with its version, the body runs unlocked, and
+commit() is a compare-and-swap against that version. Contention is scoped
+to one user — other users never wait.
 
 Usage:
-    with MemoryTransaction() as tx:
+    with MemoryTransaction("alice") as tx:
         memory = tx.memory          # snapshot loaded once
         memory["user_facts"].append(fact)
-        tx.commit()                 # single atomic write at end
-    # Outside the with block — write is done or rolled back
+        tx.commit()                 # raises MemoryConflictError if someone
+                                    # wrote alice's memory in the meantime
+
+    # or let it re-run the mutation on conflict, with backoff:
+    run_transaction(lambda m: m["user_facts"].append(fact), user_id="alice")
 """
 
 import copy
 import logging
+import os
+import random
 import threading
-from contextlib import contextmanager
-from typing import Dict, Any
+import time
+from typing import Any, Callable, Dict
 
 logger = logging.getLogger(__name__)
 
-# Module-level write lock — all transactions serialize on writes
-_write_lock = threading.Lock()
+MAX_RETRIES = int(os.getenv("MEMORY_TX_RETRIES", 8))
+BACKOFF_MS = float(os.getenv("MEMORY_TX_BACKOFF_MS", 2))
+BACKOFF_MAX_MS = float(os.getenv("MEMORY_TX_BACKOFF_MAX_MS", 200))
+
+_stats_lock = threading.Lock()
+_stats = {
+    "commits": 0,
+    "noop_commits": 0,
+    "conflicts": 0,
+    "retries": 0,
+    "exhausted": 0,
+}
+_conflicts_by_user: Dict[str, int] = {}
+
+
+class MemoryConflictError(RuntimeError):
+    """Another writer committed this user's memory since the snapshot was taken."""
+
+
+def _count(key: str, user_id: str = None) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+        if user_id is not None:
+            _conflicts_by_user[user_id] = _conflicts_by_user.get(user_id, 0) + 1
 
 
 class MemoryTransaction:
-    def __init__(self):
+    def __init__(self, user_id: str = "default"):
+        self.user_id = user_id
         self._original: Dict[str, Any] = {}
         self.memory: Dict[str, Any] = {}
+        self.version = 0
         self._committed = False
 
     def __enter__(self):
-        from memory.memory_engine import load_memory
+        from memory.memory_engine import load_versioned
 
-        self._original = load_memory()
+        self._original, self.version = load_versioned(self.user_id)
         self.memory = copy.deepcopy(self._original)
         return self
 
@@ -46,16 +78,71 @@ class MemoryTransaction:
         return False  # don't suppress exceptions
 
     def commit(self):
-        """Write memory atomically under the write lock."""
+        """Compare-and-swap write; raises MemoryConflictError on a stale snapshot."""
         if self._committed:
             return
-        with _write_lock:
-            from memory.memory_engine import save_memory
-
-            save_memory(self.memory)
+        if self.memory == self._original:
             self._committed = True
-            logger.debug("MemoryTransaction committed")
+            _count("noop_commits")
+            return
+        from memory.memory_engine import compare_and_save
+
+        version = compare_and_save(self.memory, self.user_id, self.version)
+        if version is None:
+            _count("conflicts", self.user_id)
+            raise MemoryConflictError(
+                f"memory for user={self.user_id} changed since version {self.version}"
+            )
+        self.version = version
+        self._committed = True
+        _count("commits")
+        logger.debug("MemoryTransaction committed (user=%s v%d)", self.user_id, version)
 
     def discard(self):
         """Explicitly discard — don't write anything."""
         self._committed = True  # prevents auto-commit in __exit__
+
+
+def run_transaction(
+    mutate: Callable[[Dict[str, Any]], Any],
+    user_id: str = "default",
+    retries: int = None,
+) -> Dict[str, Any]:
+    """
+    Apply `mutate(memory)` to a fresh snapshot and commit it, re-running it on
+    a version conflict with jittered exponential backoff. `mutate` must be
+    safe to call more than once. Returns the committed memory.
+    """
+    retries = MAX_RETRIES if retries is None else retries
+    attempt = 0
+    while True:
+        try:
+            with MemoryTransaction(user_id) as tx:
+                mutate(tx.memory)
+            return tx.memory
+        except MemoryConflictError:
+            if attempt >= retries:
+                _count("exhausted")
+                logger.warning(
+                    "memory transaction for user=%s gave up after %d retries",
+                    user_id,
+                    retries,
+                )
+                raise
+            attempt += 1
+            _count("retries")
+            delay = min(BACKOFF_MAX_MS, BACKOFF_MS * 2 ** (attempt - 1))
+            time.sleep(delay * random.uniform(0.5, 1.0) / 1000)
+
+
+def get_stats() -> Dict:
+    with _stats_lock:
+        top = sorted(_conflicts_by_user.items(), key=lambda kv: -kv[1])[:10]
+        stats = dict(_stats)
+    attempts = stats["commits"] + stats["conflicts"]
+    return {
+        **stats,
+        "conflict_rate": round(stats["conflicts"] / attempts, 4) if attempts else 0.0,
+        "conflicts_by_user": dict(top),
+        "max_retries": MAX_RETRIES,
+    }
@@ -0,0 +1,291 @@
+# memory/portability.py — Streaming NDJSON export / import of one user's data
+# Records, one JSON object per line, in this order:
+#   header        {"type": "header", "version", "user_id", "exported_at"}
+#   memory        the memory_engine JSON document
+#   fact          memory_db facts
+#   conversation  memory_db conversation history
+#   thread        threads_db thread, followed by its messages
+#   message
+#   checkpoint    {"type": "checkpoint", "resume": <token>} every EXPORT_CHECKPOINT_EVERY
+#                 records and at section boundaries
+#   end           {"type": "end", "counts": {...}}
+# Every store is walked in keyset batches of EXPORT_BATCH rows, so export holds
+# one batch at a time however large the account is. Passing a checkpoint's
+# resume token back to export_records() continues right after it. Import is
+# fed raw bytes (gzip detected by magic) and applies records in batches;
+# re-importing the same records is a no-op, so an interrupted import can be
+# re-sent from the last checkpoint it reported. Once a batch fails to write,
+# last_checkpoint stops advancing, so re-sending from it retries that batch.
+import base64
+import json
+import logging
+import os
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+BATCH = int(os.getenv("EXPORT_BATCH", 500))
+CHECKPOINT_EVERY = int(os.getenv("EXPORT_CHECKPOINT_EVERY", 1000))
+CHUNK_BYTES = 64 * 1024
+MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", 8 * 1024 * 1024))
+
+_SECTIONS = ("memory", "facts", "conversations", "threads", "end")
+
+
+def _token(section: str, key=None) -> str:
+    raw = json.dumps({"s": section, "k": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def parse_resume(token: str) -> Dict:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        pos = json.loads(raw)
+        if pos.get("s") not in _SECTIONS:
+            raise ValueError
+        return pos
+    except Exception:
+        raise ValueError(f"bad resume token: {token!r}")
+
+
+# ── Export ────────────────────────────────────────────────────────────────
+
+
+def export_records(user_id: str, resume: str = None) -> Iterator[Dict]:
+    """Yield the user's records in order, starting after `resume` if given."""
+    import memory_db
+    from memory import threads_db
+    from memory.memory_engine import load_memory
+
+    pos = parse_resume(resume) if resume else {"s": "memory", "k": None}
+    start = _SECTIONS.index(pos["s"])
+    counts: Dict[str, int] = {}
+    since_checkpoint = 0
+
+    def emit(record: Dict) -> Dict:
+        nonlocal since_checkpoint
+        counts[record["type"]] = counts.get(record["type"], 0) + 1
+        since_checkpoint += 1
+        return record
+
+    def checkpoint(section: str, key=None) -> Dict:
+        nonlocal since_checkpoint
+        since_checkpoint = 0
+        return {"type": "checkpoint", "resume": _token(section, key)}
+
+    yield {
+        "type": "header",
+        "version": FORMAT_VERSION,
+        "user_id": user_id,
+        "exported_at": time.time(),
+        "resumed_from": resume,
+    }
+
+    if start <= 0:
+        yield emit({"type": "memory", "data": load_memory(user_id)})
+        yield checkpoint("facts", "")
+
+    if start <= 1:
+        key = pos["k"] if pos["s"] == "facts" else ""
+        while True:
+            rows = memory_db.export_facts(user_id, key or "", BATCH)
+            for r in rows:
+                yield emit({"type": "fact", **r})
+                key = r["key"]
+                if since_checkpoint >= CHECKPOINT_EVERY:
+                    yield checkpoint("facts", key)
+            if len(rows) < BATCH:
+                break
+        yield checkpoint("conversations", 0)
+
+    if start <= 2:
+        last = pos["k"] if pos["s"] == "conversations" else 0
+        while True:
+            rows = memory_db.export_conversations(user_id, last or 0, BATCH)
+            for r in rows:
+                yield emit({"type": "conversation", **r})
+                last = r["id"]
+                if since_checkpoint >= CHECKPOINT_EVERY:
+                    yield checkpoint("conversations", last)
+            if len(rows) < BATCH:
+                break
+        yield checkpoint("threads", None)
+
+    def messages(thread_id: str, cursor: Optional[str]) -> Iterator[Dict]:
+        while True:
+            msgs = threads_db.get_messages(thread_id, limit=BATCH, after=cursor)
+            for m in msgs:
+                cursor = m.pop("cursor")
+                yield emit({"type": "message", **m})
+                if since_checkpoint >= CHECKPOINT_EVERY:
+                    yield checkpoint("threads", [thread_id, cursor])
+            if len(msgs) < BATCH:
+                return
+
+    if start <= 3:
+        # key: [thread id, message cursor] — mid-thread, or [last finished thread, None]
+        after_thread, cursor = (pos["k"] or [None, None]) if pos["s"] == "threads" else (None, None)
+        if cursor:
+            yield from messages(after_thread, cursor)
+        while True:
+            rows = threads_db.export_threads(user_id, after_thread, BATCH)
+            for t in rows:
+                yield emit({"type": "thread", **t})
+                yield from messages(t["id"], None)
+                after_thread = t["id"]
+                if since_checkpoint >= CHECKPOINT_EVERY:
+                    yield checkpoint("threads", [after_thread, None])
+            if len(rows) < BATCH:
+                break
+        yield checkpoint("end")
+
+    yield {"type": "end", "counts": counts}
+
+
+def encode_ndjson(records: Iterable[Dict], gzip: bool = False) -> Iterator[bytes]:
+    """Records → NDJSON bytes in ~CHUNK_BYTES pieces (gzip-compressed if asked)."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    buf: List[bytes] = []
+    size = 0
+    for rec in records:
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+        buf.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            data = b"".join(buf)
+            buf, size = [], 0
+            data = z.compress(data) if z else data
+            if data:
+                yield data
+    data = b"".join(buf)
+    if z:
+        data = z.compress(data) + z.flush()
+    if data:
+        yield data
+
+
+# ── Import ────────────────────────────────────────────────────────────────
+
+
+class Importer:
+    """
+    Incremental NDJSON (or gzip NDJSON) consumer for one user:
+        imp = Importer(user_id)
+        for chunk in body: imp.feed(chunk)
+        summary = imp.finish()
+    Records are applied in batches of EXPORT_BATCH; memory in use is one
+    batch plus one partial line.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self._z = None
+        self._sniffed = False
+        self._tail = b""
+        self._batch: List[Dict] = []
+        self.skipped_threads = 0
+        self.last_checkpoint: Optional[str] = None
+        self.counts: Dict[str, int] = {}
+        self.added: Dict[str, int] = {}
+        self.errors = 0
+        self._write_failed = False  # last_checkpoint is frozen from then on
+
+    def feed(self, data: bytes) -> None:
+        if not data:
+            return
+        if not self._sniffed:
+            self._sniffed = True
+            if data[:2] == b"\x1f\x8b":
+                self._z = zlib.decompressobj(31)
+        if self._z is None:
+            self._lines(data)
+            return
+        while data:  # bounded steps, so a small gzip chunk can't balloon
+            self._lines(self._z.decompress(data, CHUNK_BYTES * 4))
+            data = self._z.unconsumed_tail
+
+    def finish(self) -> Dict:
+        if self._z is not None:
+            self._lines(self._z.flush())
+        if self._tail.strip():
+            self._record(self._tail)
+        self._tail = b""
+        self._apply()
+        return {
+            "records": self.counts,
+            "added": self.added,
+            "skipped_threads": self.skipped_threads,
+            "errors": self.errors,
+            "last_checkpoint": self.last_checkpoint,
+        }
+
+    def _lines(self, data: bytes) -> None:
+        data = self._tail + data
+        *lines, self._tail = data.split(b"\n")
+        if len(self._tail) > MAX_LINE_BYTES:
+            raise ValueError("import record exceeds IMPORT_MAX_LINE_BYTES")
+        for line in lines:
+            if line.strip():
+                self._record(line)
+
+    def _record(self, line: bytes) -> None:
+        try:
+            rec = json.loads(line)
+            kind = rec["type"]
+        except Exception:
+            self.errors += 1
+            return
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if kind == "header":
+            if rec.get("version", FORMAT_VERSION) > FORMAT_VERSION:
+                raise ValueError(f"unsupported export version {rec.get('version')}")
+        elif kind == "checkpoint":
+            self._apply()  # everything before a checkpoint is durable once reported
+            if not self._write_failed:
+                self.last_checkpoint = rec.get("resume")
+        elif kind in ("memory", "fact", "conversation", "thread", "message"):
+            self._batch.append(rec)
+            if len(self._batch) >= BATCH:
+                self._apply()
+
+    def _apply(self) -> None:
+        """Write the pending batch, grouping consecutive records of one type."""
+        batch, self._batch = self._batch, []
+        i = 0
+        while i < len(batch):
+            kind = batch[i]["type"]
+            j = i
+            while j < len(batch) and batch[j]["type"] == kind:
+                j += 1
+            try:
+                n = self._write(kind, batch[i:j])
+                self.added[kind] = self.added.get(kind, 0) + n
+            except Exception as e:
+                self.errors += j - i
+                self._write_failed = True
+                logger.warning("import of %d %s records failed: %s", j - i, kind, e)
+            i = j
+
+    def _write(self, kind: str, rows: List[Dict]) -> int:
+        import memory_db
+        from memory import threads_db
+
+        if kind == "memory":
+            from memory.memory_transaction import run_transaction
+
+            data = rows[-1]["data"]
+            run_transaction(lambda m: (m.clear(), m.update(data)), user_id=self.user_id)
+            return 1
+        if kind == "fact":
+            return memory_db.import_facts(self.user_id, rows)
+        if kind == "conversation":
+            return memory_db.import_conversations(self.user_id, rows)
+        if kind == "thread":
+            self.skipped_threads += len(threads_db.import_threads(self.user_id, rows))
+            return len(rows)
+        if kind == "message":
+            return threads_db.import_messages(self.user_id, rows)
+        return 0
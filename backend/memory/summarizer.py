@@ -71,6 +71,39 @@ Summary:"""
         return f"{user_name} discussed: {', '.join(list(topics)[:5])}."
 
 
+def summarize_lines(
+    lines: List[str],
+    user_name: str,
+    model: str = "phi3:mini",
+    prior: str = "",
+    sentences: str = "2-3",
+) -> str:
+    """
+    Fold already-condensed lines (turn notes or segment summaries) into one
+    summary — the building block of memory/history_compactor.py. `prior` is
+    an earlier summary the result must stay consistent with.
+    """
+    if not lines:
+        return prior
+    earlier = f"Earlier summary:\n{prior}\n\n" if prior else ""
+    prompt = f"""Summarize this part of a conversation between {user_name} and ASTRA in {sentences} sentences.
+Keep names, decisions, open questions and facts {user_name} stated. No fluff.
+
+{earlier}Notes:
+""" + "\n".join(f"- {line}" for line in lines) + "\n\nSummary:"
+    try:
+        response = ollama.chat(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            options={"temperature": 0.3, "num_predict": 200},
+        )
+        return response["message"]["content"].strip()
+    except Exception as e:
+        logger.warning(f"Summarization failed, keeping notes: {e}")
+        merged = " ".join(([prior] if prior else []) + lines)
+        return merged[:600]
+
+
 def store_summary(memory: Dict, summary: str) -> Dict:
     """Add summary to memory's conversation_summary list."""
     if "conversation_summary" not in memory:
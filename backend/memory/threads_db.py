@@ -1,26 +1,136 @@
 """
 Conversation thread store — SQLite backed.
 Each thread belongs to one user, has a title, and stores messages as JSON.
+
+Connections come from a small pool (THREADS_DB_POOL_SIZE) of long-lived WAL
+connections, so readers in other tabs never wait on a writer, and each
+connection keeps its compiled statements in sqlite3's statement cache.
+Long threads and thread lists are paged with keyset cursors: every row carries
+a "cursor" (created_at|rowid for messages, updated_at|id for threads), and
+`after=` / `before=` continue from it with an index range scan instead of an
+OFFSET walk.
+
+messages_fts is an FTS5 index over message text, kept in step by triggers
+inside the same transaction as every insert/delete (add_message, fork_thread,
+delete_thread). It reads text back through the messages_fts_src view, so
+content is not stored twice, and indexes an owner token per message so a
+search only walks the caller's postings. Note: VACUUM can renumber the
+implicit rowids — run rebuild_search_index() after one.
 """
 
 import sqlite3
 import os
-import json
+import json  # noqa: F401
 import logging
+import queue
+import re
+import threading
+from contextlib import contextmanager
 from typing import List, Optional, Dict
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "threads.db")
+POOL_SIZE = int(os.getenv("THREADS_DB_POOL_SIZE", 4))
+
+_pool: Optional[queue.LifoQueue] = None
+_pool_path: Optional[str] = None
+_pool_lock = threading.Lock()
+
+# uuid-shaped id generated inside SQLite (set-based fork)
+_SQL_UUID = (
+    "lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || "
+    "hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))"
+)
+
+
+_SNIPPET_OPEN, _SNIPPET_CLOSE = "<mark>", "</mark>"
+_SNIPPET_TOKENS = 12
+_WORD = re.compile(r"\w+\*?", re.UNICODE)
+
+_SEARCH_SCHEMA = """
+    CREATE VIEW IF NOT EXISTS messages_fts_src AS
+        SELECT m.rowid AS seq, m.content AS content,
+               'u' || lower(hex(t.user_id)) AS owner
+        FROM messages m JOIN threads t ON t.id = m.thread_id;
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        content, owner,
+        content='messages_fts_src', content_rowid='seq', prefix='2 3',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts (rowid, content, owner) VALUES (
+            new.rowid, new.content,
+            (SELECT 'u' || lower(hex(user_id)) FROM threads WHERE id = new.thread_id));
+    END;
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts (messages_fts, rowid, content, owner) VALUES (
+            'delete', old.rowid, old.content,
+            (SELECT 'u' || lower(hex(user_id)) FROM threads WHERE id = old.thread_id));
+    END;
+    CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts (messages_fts, rowid, content, owner) VALUES (
+            'delete', old.rowid, old.content,
+            (SELECT 'u' || lower(hex(user_id)) FROM threads WHERE id = old.thread_id));
+        INSERT INTO messages_fts (rowid, content, owner) VALUES (
+            new.rowid, new.content,
+            (SELECT 'u' || lower(hex(user_id)) FROM threads WHERE id = new.thread_id));
+    END;
+"""
 
 
-def _conn() -> sqlite3.Connection:
+def _connect() -> sqlite3.Connection:
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    c = sqlite3.connect(DB_PATH)
+    c = sqlite3.connect(
+        DB_PATH, check_same_thread=False, timeout=30, cached_statements=256
+    )
     c.row_factory = sqlite3.Row
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
+    c.execute("PRAGMA busy_timeout=30000")
     return c
 
 
+def _get_pool() -> queue.LifoQueue:
+    global _pool, _pool_path
+    with _pool_lock:
+        if _pool is None or _pool_path != DB_PATH:
+            if _pool is not None:
+                close_pool()
+            _pool = queue.LifoQueue()
+            _pool_path = DB_PATH
+            for _ in range(max(POOL_SIZE, 1)):
+                _pool.put(None)  # connections are opened lazily
+        return _pool
+
+
+@contextmanager
+def _conn():
+    """Borrow a pooled connection; commits on success, rolls back on error."""
+    pool = _get_pool()
+    c = pool.get()
+    try:
+        if c is None:
+            c = _connect()
+        with c:
+            yield c
+    finally:
+        pool.put(c)
+
+
+def close_pool() -> None:
+    """Close idle pooled connections (tests / shutdown)."""
+    global _pool
+    pool, _pool = _pool, None
+    while pool is not None:
+        try:
+            c = pool.get_nowait()
+        except queue.Empty:
+            break
+        if c is not None:
+            c.close()
+
+
 def init_db():
     with _conn() as c:
         c.executescript("""
@@ -40,12 +150,48 @@ def init_db():
                 created_at  TEXT NOT NULL,
                 FOREIGN KEY (thread_id) REFERENCES threads(id)
             );
-            CREATE INDEX IF NOT EXISTS idx_threads_user ON threads(user_id);
-            CREATE INDEX IF NOT EXISTS idx_messages_thread ON messages(thread_id);
+            DROP INDEX IF EXISTS idx_threads_user;
+            DROP INDEX IF EXISTS idx_messages_thread;
+            CREATE INDEX IF NOT EXISTS idx_threads_user_updated
+                ON threads(user_id, is_archived, updated_at, id);
+            CREATE INDEX IF NOT EXISTS idx_messages_thread_created
+                ON messages(thread_id, created_at);
         """)
+        fresh = not c.execute(
+            "SELECT 1 FROM sqlite_master WHERE name='messages_fts'"
+        ).fetchone()
+        c.executescript(_SEARCH_SCHEMA)
+        if fresh:
+            # the owner column only scopes; rank on message text alone
+            c.execute("INSERT INTO messages_fts (messages_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')")
+            c.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
     logger.info("✅ threads DB initialised")
 
 
+def rebuild_search_index() -> None:
+    with _conn() as c:
+        c.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+
+
+def _split_cursor(cursor: str) -> tuple:
+    key, _, tail = cursor.rpartition("|")
+    if not key:
+        raise ValueError(f"bad cursor: {cursor!r}")
+    return key, tail
+
+
+def _message(row: sqlite3.Row) -> Dict:
+    d = dict(row)
+    d["cursor"] = f"{d['created_at']}|{d.pop('seq')}"
+    return d
+
+
+def _thread(row: sqlite3.Row) -> Dict:
+    d = dict(row)
+    d["cursor"] = f"{d['updated_at']}|{d['id']}"
+    return d
+
+
 def create_thread(thread_id: str, user_id: str, title: str = "New Chat") -> Dict:
     now = datetime.now(timezone.utc).isoformat()
     with _conn() as c:
@@ -53,17 +199,24 @@ def create_thread(thread_id: str, user_id: str, title: str = "New Chat") -> Dict
             "INSERT INTO threads (id, user_id, title, created_at, updated_at) VALUES (?,?,?,?,?)",
             (thread_id, user_id, title, now, now),
         )
-        c.commit()
     return {"id": thread_id, "user_id": user_id, "title": title, "created_at": now}
 
 
-def get_threads(user_id: str) -> List[Dict]:
+def get_threads(user_id: str, limit: int = None, before: str = None) -> List[Dict]:
+    """Most recently updated first. Pass the last row's cursor as `before` for the next page."""
+    sql = "SELECT * FROM threads WHERE user_id=? AND is_archived=0"
+    args: list = [user_id]
+    if before:
+        updated_at, tid = _split_cursor(before)
+        sql += " AND (updated_at, id) < (?, ?)"
+        args += [updated_at, tid]
+    sql += " ORDER BY updated_at DESC, id DESC"
+    if limit:
+        sql += " LIMIT ?"
+        args.append(limit)
     with _conn() as c:
-        rows = c.execute(
-            "SELECT * FROM threads WHERE user_id=? AND is_archived=0 ORDER BY updated_at DESC",
-            (user_id,),
-        ).fetchall()
-    return [dict(r) for r in rows]
+        rows = c.execute(sql, args).fetchall()
+    return [_thread(r) for r in rows]
 
 
 def get_thread(thread_id: str, user_id: str) -> Optional[Dict]:
@@ -81,7 +234,6 @@ def rename_thread(thread_id: str, user_id: str, title: str) -> bool:
             "UPDATE threads SET title=?, updated_at=? WHERE id=? AND user_id=?",
             (title, now, thread_id, user_id),
         )
-        c.commit()
     return cur.rowcount > 0
 
 
@@ -91,10 +243,21 @@ def archive_thread(thread_id: str, user_id: str) -> bool:
             "UPDATE threads SET is_archived=1 WHERE id=? AND user_id=?",
             (thread_id, user_id),
         )
-        c.commit()
     return cur.rowcount > 0
 
 
+def delete_thread(thread_id: str, user_id: str) -> bool:
+    """Hard delete — the thread, its messages and their search entries."""
+    with _conn() as c:
+        if not c.execute(
+            "SELECT 1 FROM threads WHERE id=? AND user_id=?", (thread_id, user_id)
+        ).fetchone():
+            return False
+        c.execute("DELETE FROM messages WHERE thread_id=?", (thread_id,))
+        c.execute("DELETE FROM threads WHERE id=?", (thread_id,))
+    return True
+
+
 def add_message(msg_id: str, thread_id: str, role: str, content: str):
     now = datetime.now(timezone.utc).isoformat()
     with _conn() as c:
@@ -103,37 +266,182 @@ def add_message(msg_id: str, thread_id: str, role: str, content: str):
             (msg_id, thread_id, role, content, now),
         )
         c.execute("UPDATE threads SET updated_at=? WHERE id=?", (now, thread_id))
-        c.commit()
 
 
-def get_messages(thread_id: str, limit: int = 50) -> List[Dict]:
+def get_messages(
+    thread_id: str, limit: int = 50, after: str = None, before: str = None
+) -> List[Dict]:
+    """
+    A page of messages, oldest first. Without a cursor: the first `limit`.
+    `after=<cursor>`: the next `limit` after it; `before=<cursor>`: the
+    `limit` messages just before it (scrolling back up).
+    """
+    sql = "SELECT rowid AS seq, * FROM messages WHERE thread_id=?"
+    args: list = [thread_id]
+    if after:
+        created_at, seq = _split_cursor(after)
+        sql += " AND (created_at, rowid) > (?, ?) ORDER BY created_at, rowid LIMIT ?"
+        args += [created_at, int(seq), limit]
+    elif before:
+        created_at, seq = _split_cursor(before)
+        sql += " AND (created_at, rowid) < (?, ?) ORDER BY created_at DESC, rowid DESC LIMIT ?"
+        args += [created_at, int(seq), limit]
+    else:
+        sql += " ORDER BY created_at, rowid LIMIT ?"
+        args.append(limit)
+    with _conn() as c:
+        rows = c.execute(sql, args).fetchall()
+    if before:
+        rows.reverse()
+    return [_message(r) for r in rows]
+
+
+def get_recent_messages(thread_id: str, limit: int = 20) -> List[Dict]:
+    """The newest `limit` messages, oldest first."""
     with _conn() as c:
         rows = c.execute(
-            "SELECT * FROM messages WHERE thread_id=? ORDER BY created_at ASC LIMIT ?",
+            "SELECT rowid AS seq, * FROM messages WHERE thread_id=? "
+            "ORDER BY created_at DESC, rowid DESC LIMIT ?",
             (thread_id, limit),
         ).fetchall()
-    return [dict(r) for r in rows]
+    return [_message(r) for r in reversed(rows)]
 
 
 def fork_thread(
     new_id: str, source_thread_id: str, user_id: str, from_message_id: str, title: str
 ) -> Dict:
-    """Branch a conversation from any message point."""
-    import uuid
+    """Branch a conversation from any message point (one INSERT … SELECT)."""
+    now = datetime.now(timezone.utc).isoformat()
+    with _conn() as c:
+        c.execute(
+            "INSERT INTO threads (id, user_id, title, created_at, updated_at) VALUES (?,?,?,?,?)",
+            (new_id, user_id, title, now, now),
+        )
+        cut = c.execute(
+            "SELECT created_at, rowid FROM messages WHERE id=? AND thread_id=?",
+            (from_message_id, source_thread_id),
+        ).fetchone()
+        sql = (
+            f"INSERT INTO messages (id, thread_id, role, content, created_at) "
+            f"SELECT {_SQL_UUID}, ?, role, content, created_at FROM messages "
+            f"WHERE thread_id=?"
+        )
+        args: list = [new_id, source_thread_id]
+        if cut is not None:  # unknown message id → copy the whole thread
+            sql += " AND (created_at, rowid) <= (?, ?)"
+            args += [cut[0], cut[1]]
+        c.execute(sql + " ORDER BY created_at, rowid", args)
+    return {"id": new_id, "user_id": user_id, "title": title, "created_at": now}
 
-    msgs = get_messages(source_thread_id)
-    # Find cutoff index
-    cutoff = next(
-        (i for i, m in enumerate(msgs) if m["id"] == from_message_id), len(msgs)
-    )
-    forked_msgs = msgs[: cutoff + 1]
 
-    thread = create_thread(new_id, user_id, title)
+def _match_expr(user_id: str, query: str) -> Optional[str]:
+    """User text → FTS5 query: every word required; a trailing * makes it a prefix."""
+    words = _WORD.findall(query)
+    if not words:
+        return None
+    terms = [f'"{w[:-1]}"*' if w.endswith("*") else f'"{w}"' for w in words]
+    owner = "u" + user_id.encode("utf-8").hex()
+    return f"owner:{owner} AND ({' '.join(terms)})"
+
+
+def search_messages(
+    user_id: str, query: str, limit: int = 20, after: str = None
+) -> List[Dict]:
+    """
+    Best-ranked messages in the user's live threads matching `query`, with a
+    highlighted snippet. Pass the last hit's cursor as `after` for the next page.
+    """
+    match = _match_expr(user_id, query)
+    if match is None:
+        return []
+    sql = (
+        "SELECT f.rowid AS seq, f.rank AS score, m.id, m.thread_id, m.role, "
+        "m.created_at, t.title AS thread_title "
+        "FROM messages_fts f JOIN messages m ON m.rowid = f.rowid "
+        "JOIN threads t ON t.id = m.thread_id "
+        "WHERE messages_fts MATCH ? AND t.is_archived = 0"
+    )
+    args: list = [match]
+    if after:
+        score, seq = _split_cursor(after)
+        sql += " AND (f.rank > ? OR (f.rank = ? AND f.rowid > ?))"
+        args += [float(score), float(score), int(seq)]
+    sql += " ORDER BY f.rank, f.rowid LIMIT ?"
+    args.append(limit)
     with _conn() as c:
-        for m in forked_msgs:
+        hits = [dict(r) for r in c.execute(sql, args).fetchall()]
+        if not hits:
+            return []
+        # snippets only for the page, not for every match
+        marks = ",".join("?" * len(hits))
+        snippets = dict(
             c.execute(
-                "INSERT INTO messages (id, thread_id, role, content, created_at) VALUES (?,?,?,?,?)",
-                (str(uuid.uuid4()), new_id, m["role"], m["content"], m["created_at"]),
-            )
-        c.commit()
-    return thread
+                f"SELECT rowid, snippet(messages_fts, 0, ?, ?, '…', ?) FROM messages_fts "
+                f"WHERE messages_fts MATCH ? AND rowid IN ({marks})",
+                [_SNIPPET_OPEN, _SNIPPET_CLOSE, _SNIPPET_TOKENS, match]
+                + [h["seq"] for h in hits],
+            ).fetchall()
+        )
+    for h in hits:
+        seq = h.pop("seq")
+        h["snippet"] = snippets.get(seq, "")
+        h["cursor"] = f"{h['score']!r}|{seq}"
+    return hits
+
+
+# ── Bulk export / import (memory/portability) ─────────────────────────────
+
+
+def export_threads(user_id: str, after: str = None, limit: int = 500) -> List[Dict]:
+    """A batch of the user's threads (archived too), in id order after `after`."""
+    with _conn() as c:
+        rows = c.execute(
+            "SELECT * FROM threads WHERE user_id=? AND id > ? ORDER BY id LIMIT ?",
+            (user_id, after or "", limit),
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def import_threads(user_id: str, rows: List[Dict]) -> List[str]:
+    """
+    Insert threads for `user_id`, keeping ids; existing ones are left alone.
+    Returns ids that already belong to another user (their messages must be skipped).
+    """
+    if not rows:
+        return []
+    with _conn() as c:
+        c.executemany(
+            "INSERT OR IGNORE INTO threads (id, user_id, title, created_at, updated_at, is_archived) "
+            "VALUES (?,?,?,?,?,?)",
+            [
+                (r["id"], user_id, r.get("title") or "New Chat", r["created_at"],
+                 r.get("updated_at") or r["created_at"], int(r.get("is_archived") or 0))
+                for r in rows
+            ],
+        )
+        marks = ",".join("?" * len(rows))
+        foreign = c.execute(
+            f"SELECT id FROM threads WHERE id IN ({marks}) AND user_id != ?",
+            [r["id"] for r in rows] + [user_id],
+        ).fetchall()
+    return [r[0] for r in foreign]
+
+
+def import_messages(user_id: str, rows: List[Dict]) -> int:
+    """
+    Insert messages keeping ids (re-imports are no-ops), only into threads
+    `user_id` owns. Returns rows added.
+    """
+    if not rows:
+        return 0
+    with _conn() as c:
+        cur = c.executemany(
+            "INSERT OR IGNORE INTO messages (id, thread_id, role, content, created_at) "
+            "SELECT ?,?,?,?,? WHERE EXISTS (SELECT 1 FROM threads WHERE id=? AND user_id=?)",
+            [
+                (r["id"], r["thread_id"], r["role"], r["content"], r["created_at"],
+                 r["thread_id"], user_id)
+                for r in rows
+            ],
+        )
+    return cur.rowcount
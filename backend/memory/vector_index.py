@@ -0,0 +1,479 @@
+"""
+memory/vector_index.py — Memory-mapped brute-force index for small corpora.
+
+Below a few tens of thousands of rows an exact scan beats the LanceDB round
+trip (table handle, query plan, `to_list()` of Python dicts carrying full
+vectors). This index mirrors the hot astra_memory table as:
+
+  vectors.npy  (N, 384) float32 or float16 — np.load(mmap_mode="r"), so
+               startup is zero-copy and the page cache does the rest
+  meta.npy     compact structured array: id, source/user/user_id/fact_type
+               codes, priority, ts, |v|², text offset/length
+  text.npy     UTF-8 text blob (uint8, memory-mapped), sliced per hit
+  state.json   LanceDB table version, dtype, string tables
+
+A search is one matmul over the mapped matrix plus argpartition. Writes made
+through memory/vector_store.py and rag/vector_store.py are applied in-process
+(appends land in an in-RAM tail, deletes become tombstones, duplicate bumps
+edit meta) and the index is re-persisted from the maintenance tick.
+
+The index is only used while it matches the table's version; any change it
+has not seen (another process, a failed hook) sends searches back to LanceDB
+until the tick rebuilds it. VECTOR_INDEX_BACKEND=auto switches on row count
+(≤ VECTOR_INDEX_MMAP_MAX_ROWS); every VECTOR_INDEX_SHADOW_EVERY-th mmap
+search also times the LanceDB query so both latencies are reported.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "auto")  # auto | mmap | lancedb
+MMAP_MAX_ROWS = int(os.getenv("VECTOR_INDEX_MMAP_MAX_ROWS", 50000))
+INDEX_DTYPE = os.getenv("VECTOR_INDEX_DTYPE", "float32")  # float32 | float16
+SHADOW_EVERY = int(os.getenv("VECTOR_INDEX_SHADOW_EVERY", 50))
+PERSIST_TAIL = int(os.getenv("VECTOR_INDEX_PERSIST_TAIL", 512))
+PERSIST_MAX_DELAY = float(os.getenv("VECTOR_INDEX_PERSIST_MAX_DELAY", 60))
+DIM = 384
+_CHUNK = 8192
+_CODED = ("source", "user", "user_id", "fact_type")
+
+
+def _meta_dtype(id_width: int) -> np.dtype:
+    return np.dtype(
+        [
+            ("id", f"S{id_width}"),
+            ("source", "<i4"),
+            ("user", "<i4"),
+            ("user_id", "<i4"),
+            ("fact_type", "<i4"),
+            ("priority", "<f4"),
+            ("ts", "<f8"),
+            ("norm2", "<f4"),
+            ("text_off", "<i8"),
+            ("text_len", "<i4"),
+        ]
+    )
+
+
+class VectorIndex:
+    def __init__(self, path: str, dtype: str = INDEX_DTYPE):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.ready = False
+        self.version: Optional[int] = None
+        self._vecs = np.zeros((0, DIM), dtype=self.dtype)
+        self._meta = np.zeros(0, dtype=_meta_dtype(36))
+        self._text = np.zeros(0, dtype=np.uint8)
+        self._alive = np.zeros(0, dtype=bool)
+        self._pos: Dict[str, int] = {}
+        self._strings: Dict[str, List[str]] = {c: [] for c in _CODED}
+        self._codes: Dict[str, Dict[str, int]] = {c: {} for c in _CODED}
+        self._tail: List[Dict] = []
+        self._tail_vecs = np.zeros((0, DIM), dtype=np.float32)
+        self._dirty_since = 0.0
+
+    def _f(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    # ── Build / persist / load ────────────────────────────────────────────
+
+    def build(self, rows: List[Dict], vectors: np.ndarray, version: Optional[int]) -> int:
+        """Write a fresh segment from rows + (N, DIM) vectors and map it."""
+        with self._lock:
+            self._write(rows, np.asarray(vectors, dtype=np.float32), version)
+            self._load_files()
+        return len(rows)
+
+    def _write(self, rows: List[Dict], vectors: np.ndarray, version: Optional[int]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        strings = {c: [] for c in _CODED}
+        codes = {c: {} for c in _CODED}
+        id_width = max([36] + [len(str(r["id"]).encode()) for r in rows])
+        meta = np.zeros(len(rows), dtype=_meta_dtype(id_width))
+        blobs, off = [], 0
+        for i, r in enumerate(rows):
+            for c in _CODED:
+                v = "" if r.get(c) is None else str(r.get(c))
+                if v not in codes[c]:
+                    codes[c][v] = len(strings[c])
+                    strings[c].append(v)
+                meta[c][i] = codes[c][v]
+            raw = (r.get("text") or "").encode("utf-8")
+            meta["id"][i] = str(r["id"]).encode()
+            meta["priority"][i] = r.get("priority", 0.0) or 0.0
+            meta["ts"][i] = r.get("ts", 0.0) or 0.0
+            meta["text_off"][i] = off
+            meta["text_len"][i] = len(raw)
+            blobs.append(raw)
+            off += len(raw)
+        if len(rows):
+            meta["norm2"] = (vectors.astype(np.float32) ** 2).sum(axis=1)
+        text = np.frombuffer(b"".join(blobs), dtype=np.uint8)
+        for name, arr in (
+            ("vectors.npy", vectors.astype(self.dtype).reshape(-1, DIM)),
+            ("meta.npy", meta),
+            ("text.npy", text),
+        ):
+            tmp = self._f(name + ".tmp")
+            with open(tmp, "wb") as fh:
+                np.save(fh, arr)
+            os.replace(tmp, self._f(name))
+        state = {
+            "version": version,
+            "dtype": self.dtype.name,
+            "rows": len(rows),
+            "strings": strings,
+            "saved_at": time.time(),
+        }
+        tmp = self._f("state.json.tmp")
+        with open(tmp, "w") as fh:
+            json.dump(state, fh)
+        os.replace(tmp, self._f("state.json"))
+
+    def _load_files(self) -> None:
+        with open(self._f("state.json")) as fh:
+            state = json.load(fh)
+        vecs = np.load(self._f("vectors.npy"), mmap_mode="r")
+        meta = np.load(self._f("meta.npy"))
+        text = np.load(self._f("text.npy"), mmap_mode="r")
+        if len(vecs) != state["rows"] or len(meta) != state["rows"]:
+            raise ValueError("index files out of sync")
+        self._reset()
+        self.dtype = vecs.dtype
+        self._vecs, self._meta, self._text = vecs, meta, text
+        self._alive = np.ones(len(meta), dtype=bool)
+        self._pos = {m.decode(): i for i, m in enumerate(meta["id"])}
+        self._strings = {c: list(state["strings"].get(c, [])) for c in _CODED}
+        self._codes = {c: {s: i for i, s in enumerate(v)} for c, v in self._strings.items()}
+        self.version = state["version"]
+        self.ready = True
+
+    def load(self) -> bool:
+        """Map a persisted segment. False if missing or unreadable."""
+        if not os.path.exists(self._f("state.json")):
+            return False
+        with self._lock:
+            try:
+                self._load_files()
+                return True
+            except Exception as e:
+                logger.warning("vector index unreadable, will rebuild: %s", e)
+                self._reset()
+                return False
+
+    def persist(self) -> bool:
+        """Fold tail + tombstones into a new segment on disk."""
+        with self._lock:
+            if not self.ready or not self._dirty_since:
+                return False
+            rows = self._rows(np.flatnonzero(self._alive)) + [dict(r) for r in self._tail]
+            vecs = np.vstack(
+                [np.asarray(self._vecs[self._alive], dtype=np.float32), self._tail_vecs]
+            )
+            version = self.version
+            try:
+                self._write(rows, vecs, version)
+                self._load_files()
+                return True
+            except Exception as e:
+                logger.warning("vector index persist failed: %s", e)
+                return False
+
+    def drop(self) -> None:
+        """Forget the in-memory segment (corpus outgrew the mmap backend)."""
+        with self._lock:
+            self._reset()
+
+    # ── In-process updates ────────────────────────────────────────────────
+
+    def _touch(self, version: Optional[int]) -> None:
+        if version is not None:
+            self.version = version
+        if not self._dirty_since:
+            self._dirty_since = time.time()
+
+    def add(self, rows: List[Dict], version: Optional[int]) -> None:
+        if not rows:
+            return
+        vecs = np.asarray([r["vector"] for r in rows], dtype=np.float32).reshape(-1, DIM)
+        with self._lock:
+            if not self.ready:
+                return
+            self._tail.extend(
+                {k: v for k, v in r.items() if k != "vector"} for r in rows
+            )
+            self._tail_vecs = np.vstack([self._tail_vecs, vecs])
+            self._touch(version)
+
+    def delete(self, ids: List[str], version: Optional[int]) -> None:
+        with self._lock:
+            if not self.ready:
+                return
+            gone = set(ids)
+            for row_id in gone:
+                pos = self._pos.pop(row_id, None)
+                if pos is not None:
+                    self._alive[pos] = False
+            if self._tail and any(r["id"] in gone for r in self._tail):
+                keep = [i for i, r in enumerate(self._tail) if r["id"] not in gone]
+                self._tail = [self._tail[i] for i in keep]
+                self._tail_vecs = self._tail_vecs[keep]
+            self._touch(version)
+
+    def bump(self, bumps: Dict[str, float], priority_step: float, version: Optional[int]) -> None:
+        """Mirror vector_store's duplicate bump: ts = max(bumps), priority += step."""
+        ts = max(bumps.values())
+        with self._lock:
+            if not self.ready:
+                return
+            for row_id in bumps:
+                pos = self._pos.get(row_id)
+                if pos is not None:
+                    self._meta["ts"][pos] = ts
+                    self._meta["priority"][pos] = min(
+                        1.0, self._meta["priority"][pos] + priority_step
+                    )
+            for r in self._tail:
+                if r["id"] in bumps:
+                    r["ts"] = ts
+                    r["priority"] = min(1.0, r["priority"] + priority_step)
+            self._touch(version)
+
+    def sync_version(self, version: Optional[int]) -> None:
+        """Table version moved without a content change (e.g. compaction)."""
+        with self._lock:
+            if self.ready and version is not None:
+                self.version = version
+
+    # ── Search ────────────────────────────────────────────────────────────
+
+    def _rows(self, positions) -> List[Dict]:
+        out = []
+        for i in positions:
+            m = self._meta[i]
+            off, n = int(m["text_off"]), int(m["text_len"])
+            row = {
+                "id": m["id"].decode(),
+                "text": self._text[off : off + n].tobytes().decode("utf-8", "replace"),
+                "priority": float(m["priority"]),
+                "ts": float(m["ts"]),
+            }
+            for c in _CODED:
+                row[c] = self._strings[c][m[c]]
+            out.append(row)
+        return out
+
+    def _distances(self, q: np.ndarray) -> np.ndarray:
+        qq = float(q @ q)
+        if self._vecs.dtype == np.float32:
+            dots = self._vecs @ q
+        else:
+            dots = np.empty(len(self._vecs), dtype=np.float32)
+            for s in range(0, len(self._vecs), _CHUNK):
+                dots[s : s + _CHUNK] = self._vecs[s : s + _CHUNK].astype(np.float32) @ q
+        return self._meta["norm2"] - 2.0 * dots + qq
+
+    def search(self, vector, limit: int, source: str = None) -> List[Dict]:
+        """Exact k-NN (squared L2, like LanceDB `_distance`) over base + tail."""
+        q = np.asarray(vector, dtype=np.float32).reshape(-1)
+        with self._lock:
+            if not self.ready:
+                return []
+            d = self._distances(q) if len(self._vecs) else np.zeros(0, np.float32)
+            d = np.where(self._alive, d, np.inf)
+            tail = list(self._tail)
+            td = ((self._tail_vecs - q) ** 2).sum(axis=1) if tail else np.zeros(0)
+            if source is not None:
+                code = self._codes["source"].get(source, -1)
+                d = np.where(self._meta["source"] == code, d, np.inf)
+                td = np.where([r["source"] == source for r in tail], td, np.inf)
+            d = np.concatenate([d, td])
+            k = min(limit, int(np.isfinite(d).sum()))
+            if k <= 0:
+                return []
+            top = np.argpartition(d, k - 1)[:k] if k < len(d) else np.arange(len(d))
+            top = top[np.argsort(d[top], kind="stable")]
+            n_base = len(self._meta)
+            out = []
+            for i in top:
+                row = self._rows([i])[0] if i < n_base else dict(tail[i - n_base])
+                row["_distance"] = float(d[i])
+                out.append(row)
+            return out
+
+    def count(self) -> int:
+        return int(self._alive.sum()) + len(self._tail) if self.ready else 0
+
+    def needs_persist(self) -> bool:
+        if not self.ready or not self._dirty_since:
+            return False
+        dead = len(self._alive) - int(self._alive.sum())
+        return (
+            len(self._tail) + dead >= PERSIST_TAIL
+            or time.time() - self._dirty_since >= PERSIST_MAX_DELAY
+        )
+
+    def stats(self) -> Dict:
+        disk = 0
+        for name in ("vectors.npy", "meta.npy", "text.npy", "state.json"):
+            try:
+                disk += os.path.getsize(self._f(name))
+            except OSError:
+                pass
+        return {
+            "ready": self.ready,
+            "rows": self.count(),
+            "tail_rows": len(self._tail),
+            "tombstones": int(len(self._alive) - self._alive.sum()),
+            "dtype": self.dtype.name,
+            "table_version": self.version,
+            "disk_bytes": disk,
+        }
+
+
+# ── Backend selection + latency ──────────────────────────────────────────────
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+_latency: Dict[str, deque] = {"mmap": deque(maxlen=512), "lancedb": deque(maxlen=512)}
+_searches = {"mmap": 0, "lancedb": 0, "shadow": 0}
+_stale_ticks = 0
+
+
+def get_vector_index() -> VectorIndex:
+    """Process-wide index, mapped from DB_DIR/vector_index on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from memory.vector_store import DB_DIR
+
+                idx = VectorIndex(os.path.join(DB_DIR, "vector_index"))
+                if INDEX_BACKEND != "lancedb":
+                    idx.load()
+                _index = idx
+    return _index
+
+
+def active_index(tbl) -> Optional[VectorIndex]:
+    """The index if it may serve this search (enabled, built, in sync)."""
+    if INDEX_BACKEND == "lancedb" or _index is None or not _index.ready:
+        return None
+    try:
+        if _index.version != tbl.version:
+            return None
+    except Exception:
+        return None
+    return _index
+
+
+def record_latency(backend: str, ms: float) -> None:
+    _latency[backend].append(ms)
+    _searches[backend] += 1
+
+
+def should_shadow() -> bool:
+    """Every SHADOW_EVERY-th mmap search is also timed against LanceDB."""
+    if SHADOW_EVERY <= 0 or _searches["mmap"] % SHADOW_EVERY:
+        return False
+    _searches["shadow"] += 1
+    return True
+
+
+def _summary(samples) -> Dict:
+    lat = sorted(samples)
+    if not lat:
+        return {"samples": 0, "avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0}
+    return {
+        "samples": len(lat),
+        "avg_ms": round(sum(lat) / len(lat), 3),
+        "p50_ms": round(lat[len(lat) // 2], 3),
+        "p95_ms": round(lat[int(len(lat) * 0.95)], 3),
+    }
+
+
+def rebuild(tbl) -> int:
+    """Snapshot the whole LanceDB table into a fresh mmap segment."""
+    arrow = tbl.to_arrow()
+    version = tbl.version
+    if arrow.num_rows:
+        vecs = (
+            arrow.column("vector").combine_chunks().flatten()
+            .to_numpy(zero_copy_only=False).reshape(-1, DIM)
+        )
+    else:
+        vecs = np.zeros((0, DIM), dtype=np.float32)
+    rows = arrow.drop_columns(["vector"]).to_pylist()
+    t0 = time.perf_counter()
+    n = get_vector_index().build(rows, vecs, version)
+    logger.info(
+        "vector index built: %d rows in %dms", n, (time.perf_counter() - t0) * 1000
+    )
+    return n
+
+
+def index_tick() -> None:
+    """
+    Polled from the vector maintenance tick: decide the backend for the
+    current corpus size, (re)build the index when it is missing or has
+    missed a write, and persist in-process updates.
+    """
+    global _stale_ticks
+    if INDEX_BACKEND == "lancedb":
+        return
+    from memory.vector_store import _get_table
+
+    tbl = _get_table()
+    if tbl is None:
+        return
+    idx = get_vector_index()
+    rows = idx.count() if idx.ready else tbl.count_rows()
+    if INDEX_BACKEND == "auto" and rows > MMAP_MAX_ROWS:
+        if idx.ready:
+            logger.info("vector index disabled: %d rows > %d", rows, MMAP_MAX_ROWS)
+            idx.drop()
+        return
+    # A single mismatch can be a write whose hook has not run yet
+    if idx.ready and idx.version == tbl.version:
+        _stale_ticks = 0
+    else:
+        _stale_ticks += 1
+    if not idx.ready or _stale_ticks >= 2:
+        rebuild(tbl)
+        _stale_ticks = 0
+    elif idx.needs_persist():
+        idx.persist()
+
+
+def save_index() -> None:
+    """Persist pending in-process updates (shutdown)."""
+    if _index is not None and _index.ready:
+        _index.persist()
+
+
+def get_stats() -> Dict:
+    idx = _index
+    out = idx.stats() if idx is not None else {"ready": False}
+    out.update(
+        {
+            "backend": INDEX_BACKEND,
+            "active": "mmap" if idx is not None and idx.ready else "lancedb",
+            "mmap_max_rows": MMAP_MAX_ROWS,
+            "searches": dict(_searches),
+            "latency": {name: _summary(s) for name, s in _latency.items()},
+        }
+    )
+    return out
@@ -0,0 +1,267 @@
+"""
+memory/vector_maintenance.py — Background upkeep for the LanceDB memory table.
+
+Runs from core/background.py every few seconds:
+  * flushes the vector_store write buffer once it is older than
+    VECTOR_APPEND_MAX_DELAY (batched appends → few, larger fragments)
+  * persists the near-duplicate signature index when it changed
+  * picks the search backend for the corpus size and keeps the mmap
+    brute-force index (memory/vector_index.py) built and persisted
+  * every VECTOR_OPTIMIZE_INTERVAL seconds: applies per-source retention
+    policies, moves old rows to the compressed cold tier
+    (memory/cold_tier.py), then compacts fragments and prunes old versions
+
+Retention is evaluated with filtered, column-projected scans (id/user_id/ts
+only) — vectors and text are never loaded.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZE_INTERVAL = int(os.getenv("VECTOR_OPTIMIZE_INTERVAL", 3600))
+VERSION_RETENTION = int(os.getenv("VECTOR_VERSION_RETENTION_SECONDS", 3600))
+
+# Per-source retention. None = no limit.
+#   max_age_days  — delete rows older than this
+#   max_per_user  — keep only the newest N rows per user_id
+#   max_total     — keep only the newest N rows overall
+# Override with VECTOR_RETENTION='{"exchange": {"max_age_days": 180}}'
+DEFAULT_RETENTION: Dict[str, Dict[str, Optional[int]]] = {
+    "exchange": {"max_age_days": 365, "max_per_user": 5000, "max_total": None},
+    "fact": {"max_age_days": None, "max_per_user": None, "max_total": None},
+    "rag_chunk": {"max_age_days": None, "max_per_user": None, "max_total": None},
+}
+
+_lock = threading.Lock()
+_last_optimize = 0.0
+_stats: Dict = {
+    "runs": 0,
+    "last_run_ts": None,
+    "last_run_ms": 0,
+    "rows_flushed": 0,
+    "rows_expired": 0,
+    "rows_tiered": 0,
+    "fragments_before": None,
+    "fragments_after": None,
+}
+
+
+def retention_policies() -> Dict[str, Dict[str, Optional[int]]]:
+    policies = {k: dict(v) for k, v in DEFAULT_RETENTION.items()}
+    raw = os.getenv("VECTOR_RETENTION", "")
+    if raw:
+        try:
+            for source, rules in json.loads(raw).items():
+                policies.setdefault(source, {}).update(rules)
+        except Exception as e:
+            logger.warning("VECTOR_RETENTION ignored (invalid JSON): %s", e)
+    return policies
+
+
+def _newest_first_excess(rows: List[Dict], keep: int) -> List[str]:
+    rows.sort(key=lambda r: r["ts"], reverse=True)
+    return [r["id"] for r in rows[keep:]]
+
+
+def apply_retention(policies: Dict = None, now: float = None) -> int:
+    """Apply retention rules. Returns number of rows deleted."""
+    from memory.vector_store import _cold_scan, _delete_ids, _get_table, _scan, _sql_str
+
+    tbl = _get_table()
+    if tbl is None:
+        return 0
+    policies = policies or retention_policies()
+    now = now or time.time()
+    deleted = 0
+    for source, rules in policies.items():
+        src = f"source = {_sql_str(source)}"
+        try:
+            max_age = rules.get("max_age_days")
+            if max_age:
+                cutoff = now - max_age * 86400
+                rows = _scan(f"{src} AND ts < {cutoff}", ["id"])
+                rows += _cold_scan(source, before=cutoff)
+                deleted += _delete_ids([r["id"] for r in rows])
+            max_per_user = rules.get("max_per_user")
+            max_total = rules.get("max_total")
+            if not (max_per_user or max_total):
+                continue
+            rows = _scan(src, ["id", "user_id", "ts"]) + _cold_scan(source)
+            doomed = set()
+            if max_per_user:
+                by_user: Dict[str, List[Dict]] = {}
+                for r in rows:
+                    by_user.setdefault(r["user_id"], []).append(r)
+                for user_rows in by_user.values():
+                    if len(user_rows) > max_per_user:
+                        doomed.update(_newest_first_excess(user_rows, max_per_user))
+            if max_total:
+                alive = [r for r in rows if r["id"] not in doomed]
+                if len(alive) > max_total:
+                    doomed.update(_newest_first_excess(alive, max_total))
+            deleted += _delete_ids(list(doomed))
+        except Exception as e:
+            logger.warning("retention [%s] failed: %s", source, e)
+    if deleted:
+        logger.info("vector retention: deleted %d rows", deleted)
+    return deleted
+
+
+def tier_cold_rows(now: float = None, batch: int = 5000) -> int:
+    """
+    Move rows older than VECTOR_COLD_AFTER_DAYS (sources in
+    VECTOR_COLD_SOURCES) from LanceDB float32 storage into the compressed
+    cold segment. Returns rows moved.
+    """
+    from memory.cold_tier import COLD_AFTER_DAYS, COLD_SOURCES, get_cold_tier
+    from memory.vector_store import _delete_ids, _get_table, _sql_str
+
+    tbl = _get_table()
+    if tbl is None or COLD_AFTER_DAYS <= 0 or not COLD_SOURCES:
+        return 0
+    cutoff = (now or time.time()) - COLD_AFTER_DAYS * 86400
+    sources = ", ".join(_sql_str(s) for s in COLD_SOURCES)
+    where = f"source IN ({sources}) AND ts < {cutoff}"
+    moved = 0
+    try:
+        while True:
+            rows = tbl.search().where(where).limit(batch).to_list()
+            if not rows:
+                break
+            get_cold_tier().append(rows)
+            moved += _delete_ids([r["id"] for r in rows], moved=True)
+            if len(rows) < batch:
+                break
+    except Exception as e:
+        logger.warning("cold tiering failed: %s", e)
+    if moved:
+        logger.info("vector tiering: moved %d rows to cold segment", moved)
+    return moved
+
+
+def optimize_table() -> bool:
+    """Compact small fragments and drop table versions older than the retention window."""
+    from memory.vector_store import _get_table
+
+    tbl = _get_table()
+    if tbl is None:
+        return False
+    older_than = timedelta(seconds=VERSION_RETENTION)
+    try:
+        if hasattr(tbl, "optimize"):
+            tbl.optimize(cleanup_older_than=older_than)
+        else:  # lancedb < 0.8
+            tbl.compact_files()
+            tbl.cleanup_old_versions(older_than=older_than)
+        from memory.vector_store import _index_hook
+
+        _index_hook("sync_version", tbl)
+        return True
+    except Exception as e:
+        logger.warning("LanceDB optimize failed: %s", e)
+        return False
+
+
+def table_metrics() -> Dict:
+    """Fragment count, row count and on-disk size of the memory table."""
+    import memory.vector_store as vs
+    from memory.vector_store import DB_DIR, TABLE_NAME, _get_table
+
+    out = {"rows": 0, "fragments": None, "size_bytes": 0, "pending_writes": len(vs._pending)}
+    tbl = _get_table()
+    if tbl is None:
+        return out
+    try:
+        out["rows"] = tbl.count_rows()
+    except Exception:
+        pass
+    try:
+        out["fragments"] = tbl.stats()["fragment_stats"]["num_fragments"]
+    except Exception:
+        data_dir = os.path.join(DB_DIR, f"{TABLE_NAME}.lance", "data")
+        try:
+            out["fragments"] = len(os.listdir(data_dir))
+        except OSError:
+            pass
+    size = 0
+    for root, _, files in os.walk(os.path.join(DB_DIR, f"{TABLE_NAME}.lance")):
+        for f in files:
+            try:
+                size += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    out["size_bytes"] = size
+    return out
+
+
+def run_maintenance() -> Dict:
+    """Flush, apply retention, compact. Safe to call at any time."""
+    from memory.vector_store import flush_writes
+
+    global _last_optimize
+    with _lock:
+        t0 = time.time()
+        _stats["rows_flushed"] += flush_writes()
+        _stats["fragments_before"] = table_metrics()["fragments"]
+        _stats["rows_expired"] += apply_retention()
+        _stats["rows_tiered"] += tier_cold_rows()
+        optimize_table()
+        _stats["fragments_after"] = table_metrics()["fragments"]
+        _last_optimize = time.time()
+        _stats["runs"] += 1
+        _stats["last_run_ts"] = _last_optimize
+        _stats["last_run_ms"] = round((_last_optimize - t0) * 1000)
+        logger.info(
+            "vector maintenance: fragments %s → %s in %dms",
+            _stats["fragments_before"],
+            _stats["fragments_after"],
+            _stats["last_run_ms"],
+        )
+        return dict(_stats)
+
+
+def maintenance_tick() -> None:
+    """Polled every few seconds: flush stale writes, run full maintenance when due."""
+    from memory.vector_store import flush_writes
+
+    _stats["rows_flushed"] += flush_writes(force=False)
+    if time.time() - _last_optimize >= OPTIMIZE_INTERVAL:
+        run_maintenance()
+    _save_dedup_index()
+    try:
+        from memory.vector_index import index_tick
+
+        index_tick()
+    except Exception as e:
+        logger.warning("vector index tick failed: %s", e)
+
+
+def _save_dedup_index() -> None:
+    import memory.dedup_index as di
+
+    if di._index is not None:
+        di._index.save()
+
+
+def get_stats() -> Dict:
+    from memory.cold_tier import get_cold_tier
+    from memory.dedup_index import get_dedup_index
+    from memory.vector_index import get_stats as index_stats
+    from memory.vector_store import write_stats
+
+    return {
+        **_stats,
+        **table_metrics(),
+        "writes": write_stats(),
+        "optimize_interval_s": OPTIMIZE_INTERVAL,
+        "dedup": get_dedup_index().stats(),
+        "cold": get_cold_tier().stats(),
+        "index": index_stats(),
+    }
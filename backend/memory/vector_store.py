@@ -14,43 +14,56 @@ logger = logging.getLogger(__name__)
 DB_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "lancedb")
 TABLE_NAME = "astra_memory"
 TOP_K = 5
-EMBED_MODEL = "BAAI/bge-small-en-v1.5"
 SCORE_THRESHOLD = 0.30
 RECENCY_WEIGHT = 0.30
 SEMANTIC_WEIGHT = 0.70
 
-_embedder = None
-_embedder_lock = threading.Lock()
 
+def _embed(text: str):
+    """Embed via the shared process-wide service (cached + micro-batched)."""
+    from core.embedding_service import get_embedding_service
 
-def _get_embedder():
-    global _embedder
-    if _embedder is None:
-        with _embedder_lock:
-            if _embedder is None:
-                try:
-                    from sentence_transformers import SentenceTransformer
+    vec = get_embedding_service().embed(text)
+    return vec.tolist() if vec is not None else None
 
-                    _embedder = SentenceTransformer(EMBED_MODEL)
-                    logger.info("Embedder loaded: %s", EMBED_MODEL)
-                except Exception as e:
-                    logger.error("Embedder load failed: %s", e)
-    return _embedder
 
+_table = None
+_table_lock = threading.Lock()
 
-def _embed(text: str):
-    emb = _get_embedder()
-    if emb is None:
-        return None
-    try:
-        return emb.encode(text, normalize_embeddings=True).tolist()
-    except Exception as e:
-        logger.error("Embed error: %s", e)
-        return None
+# Write buffer — rows are appended to LanceDB in batches so each turn does not
+# create its own single-row fragment. Pending rows stay searchable in-process.
+APPEND_BATCH = int(os.getenv("VECTOR_APPEND_BATCH", 32))
+APPEND_MAX_DELAY = float(os.getenv("VECTOR_APPEND_MAX_DELAY", 5))
+# While the table is failing, rows stay buffered (oldest dropped beyond
+# VECTOR_PENDING_MAX) and unforced flushes back off up to FLUSH_RETRY_MAX s.
+PENDING_MAX = int(os.getenv("VECTOR_PENDING_MAX", 2048))
+FLUSH_RETRY_MAX = 60.0
+_pending: List[Dict] = []
+_pending_bumps: Dict[str, float] = {}  # row id → ts of latest near-duplicate
+_pending_since = 0.0
+_pending_lock = threading.Lock()
+_retry_at = 0.0
+_backoff = 0.0
+_write_stats = {"flush_failures": 0, "dropped_rows": 0}
+DUP_PRIORITY_BUMP = 0.05
 
 
-_table = None
-_table_lock = threading.Lock()
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            pa.field("id", pa.string()),
+            pa.field("text", pa.string()),
+            pa.field("vector", pa.list_(pa.float32(), 384)),
+            pa.field("source", pa.string()),
+            pa.field("user", pa.string()),
+            pa.field("user_id", pa.string()),
+            pa.field("fact_type", pa.string()),
+            pa.field("priority", pa.float32()),
+            pa.field("ts", pa.float64()),
+        ]
+    )
 
 
 def _get_table():
@@ -62,27 +75,13 @@ def _get_table():
             return _table
         try:
             import lancedb
-            import pyarrow as pa
 
             os.makedirs(DB_DIR, exist_ok=True)
             db = lancedb.connect(DB_DIR)
-            schema = pa.schema(
-                [
-                    pa.field("id", pa.string()),
-                    pa.field("text", pa.string()),
-                    pa.field("vector", pa.list_(pa.float32(), 384)),
-                    pa.field("source", pa.string()),
-                    pa.field("user", pa.string()),
-                    pa.field("user_id", pa.string()),
-                    pa.field("fact_type", pa.string()),
-                    pa.field("priority", pa.float32()),
-                    pa.field("ts", pa.float64()),
-                ]
-            )
             if TABLE_NAME in db.table_names():
                 _table = db.open_table(TABLE_NAME)
             else:
-                _table = db.create_table(TABLE_NAME, schema=schema)
+                _table = db.create_table(TABLE_NAME, schema=_schema())
                 logger.info("LanceDB table created: %s", TABLE_NAME)
             logger.info("LanceDB connected at %s", DB_DIR)
             return _table
@@ -91,6 +90,247 @@ def _get_table():
             return None
 
 
+def _append(row: Dict) -> None:
+    """Queue a row for the next batched append; flush if the batch is full."""
+    global _pending_since
+    with _pending_lock:
+        if not (_pending or _pending_bumps):
+            _pending_since = time.time()
+        _pending.append(row)
+        _trim_pending()
+        full = len(_pending) >= APPEND_BATCH
+    if full:
+        flush_writes(force=False)
+
+
+def _trim_pending() -> None:
+    """Drop the oldest buffered rows beyond PENDING_MAX (caller holds _pending_lock)."""
+    excess = len(_pending) - PENDING_MAX
+    if excess > 0:
+        del _pending[:excess]
+        _write_stats["dropped_rows"] += excess
+        logger.error("vector write buffer full: dropped %d unflushed rows", excess)
+
+
+def _flush_failed() -> None:
+    global _retry_at, _backoff
+    _write_stats["flush_failures"] += 1
+    _backoff = min(FLUSH_RETRY_MAX, _backoff * 2 or 1.0)
+    _retry_at = time.time() + _backoff
+
+
+def _bump(row_id: str) -> None:
+    """
+    Merge a suppressed near-duplicate into its existing row: refresh ts and
+    nudge priority. Buffered rows are edited in place; stored rows are
+    updated in one batched UPDATE at the next flush.
+    """
+    global _pending_since
+    now = time.time()
+    with _pending_lock:
+        for row in _pending:
+            if row["id"] == row_id:
+                row["ts"] = now
+                row["priority"] = min(1.0, row["priority"] + DUP_PRIORITY_BUMP)
+                return
+        if not (_pending or _pending_bumps):
+            _pending_since = now
+        _pending_bumps[row_id] = now
+
+
+def flush_writes(force: bool = True) -> int:
+    """
+    Write buffered rows to LanceDB in one tbl.add() and apply buffered
+    duplicate bumps in one UPDATE. With force=False only flushes once a
+    batch is full or the oldest buffered change is older than
+    APPEND_MAX_DELAY, and not while backing off after a failed flush.
+    Returns number of rows written.
+    """
+    global _pending, _pending_bumps, _backoff
+    with _pending_lock:
+        if not (_pending or _pending_bumps):
+            return 0
+        if not force:
+            if time.time() < _retry_at:
+                return 0
+            if len(_pending) < APPEND_BATCH and time.time() - _pending_since < APPEND_MAX_DELAY:
+                return 0
+    tbl = _get_table()
+    with _pending_lock:
+        if tbl is None:  # keep the buffers for the next attempt
+            _flush_failed()
+            return 0
+        rows, _pending = _pending, []
+        bumps, _pending_bumps = _pending_bumps, {}
+    written = 0
+    try:
+        if rows:
+            import pyarrow as pa
+
+            tbl.add(pa.Table.from_pylist(rows, schema=_schema()))
+            written = len(rows)
+            _index_hook("add", tbl, rows)
+    except Exception as e:
+        logger.error("flush_writes error: %s", e)
+        with _pending_lock:
+            _pending = rows + _pending
+            _trim_pending()
+            _flush_failed()
+    else:
+        _backoff = 0.0
+    if bumps:
+        try:
+            ids_sql = ", ".join(_sql_str(i) for i in bumps)
+            tbl.update(
+                where=f"id IN ({ids_sql})",
+                values_sql={
+                    "ts": repr(max(bumps.values())),
+                    "priority": f"least(priority + {DUP_PRIORITY_BUMP}, 1.0)",
+                },
+            )
+            _index_hook("bump", tbl, bumps, DUP_PRIORITY_BUMP)
+        except Exception as e:
+            logger.warning("duplicate bump update failed: %s", e)
+    return written
+
+
+def write_stats() -> Dict:
+    with _pending_lock:
+        return {
+            "pending_rows": len(_pending),
+            "pending_bumps": len(_pending_bumps),
+            "pending_max": PENDING_MAX,
+            **_write_stats,
+            "retry_in_s": round(max(0.0, _retry_at - time.time()), 1),
+        }
+
+
+def _pending_hits(vector: List[float], limit: int) -> List[Dict]:
+    """Brute-force search over not-yet-flushed rows (same metric as LanceDB)."""
+    with _pending_lock:
+        rows = list(_pending)
+    if not rows:
+        return []
+    import numpy as np
+
+    q = np.asarray(vector, dtype=np.float32)
+    mat = np.asarray([r["vector"] for r in rows], dtype=np.float32)
+    dists = ((mat - q) ** 2).sum(axis=1)
+    order = np.argsort(dists)[:limit]
+    return [{**rows[i], "_distance": float(dists[i])} for i in order]
+
+
+def _index_hook(op: str, tbl, *args) -> None:
+    """Mirror a table write into the mmap index (no-op while it is inactive)."""
+    try:
+        import memory.vector_index as vi
+
+        if vi._index is not None and vi._index.ready:
+            getattr(vi._index, op)(*args, version=tbl.version)
+    except Exception as e:
+        logger.debug("vector index %s: %s", op, e)
+
+
+def _search_rows(vector, limit: int, source: str = None) -> List[Dict]:
+    """
+    Nearest hot-table rows: exact mmap scan while the corpus is small
+    (memory/vector_index.py), LanceDB otherwise. Same row dicts either way.
+    """
+    import memory.vector_index as vi
+
+    tbl = _get_table()
+    if tbl is None:
+        return []
+    idx = vi.active_index(tbl)
+    if idx is not None:
+        t0 = time.perf_counter()
+        rows = idx.search(vector, limit, source=source)
+        vi.record_latency("mmap", (time.perf_counter() - t0) * 1000)
+        if not vi.should_shadow():
+            return rows
+    t0 = time.perf_counter()
+    query = tbl.search(vector)
+    if source is not None:
+        query = query.where(f"source = {_sql_str(source)}", prefilter=True)
+    lance_rows = query.limit(limit).to_list()
+    vi.record_latency("lancedb", (time.perf_counter() - t0) * 1000)
+    return rows if idx is not None else lance_rows
+
+
+def _sql_str(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _scan(where: str, columns: List[str]) -> List[Dict]:
+    """Filtered, column-projected table scan (never materializes vectors)."""
+    tbl = _get_table()
+    if tbl is None:
+        return []
+    n = tbl.count_rows(where)
+    if not n:
+        return []
+    return tbl.search().where(where).select(columns).limit(n).to_list()
+
+
+def _cold_scan(source: str, before: float = None) -> List[Dict]:
+    """(id, user_id, source, ts) of cold-tier rows — merged into retention scans."""
+    try:
+        from memory.cold_tier import get_cold_tier
+
+        return get_cold_tier().scan(source, before=before)
+    except Exception as e:
+        logger.debug("cold tier scan: %s", e)
+        return []
+
+
+def _delete_ids(ids: List[str], chunk: int = 500, moved: bool = False) -> int:
+    """
+    Delete rows by id in bounded IN (...) batches. moved=True means the rows
+    now live in the cold tier, so their cold copy and signatures are kept.
+    """
+    tbl = _get_table()
+    if tbl is None or not ids:
+        return 0
+    for i in range(0, len(ids), chunk):
+        ids_sql = ", ".join(_sql_str(x) for x in ids[i : i + chunk])
+        tbl.delete(f"id IN ({ids_sql})")
+    _index_hook("delete", tbl, ids)
+    if moved:
+        return len(ids)
+    try:
+        from memory.cold_tier import get_cold_tier
+
+        get_cold_tier().delete(ids)
+    except Exception as e:
+        logger.debug("cold tier delete: %s", e)
+    try:
+        from memory.dedup_index import get_dedup_index
+
+        get_dedup_index().remove(ids)
+    except Exception as e:
+        logger.debug("dedup index remove: %s", e)
+    return len(ids)
+
+
+def _find_duplicate(user_id: str, source: str, text: str) -> Optional[str]:
+    try:
+        from memory.dedup_index import get_dedup_index
+
+        return get_dedup_index().find_duplicate(user_id, source, text)
+    except Exception as e:
+        logger.debug("dedup check skipped: %s", e)
+        return None
+
+
+def _index_signature(user_id: str, source: str, text: str, row_id: str) -> None:
+    try:
+        from memory.dedup_index import get_dedup_index
+
+        get_dedup_index().add(user_id, source, text, row_id)
+    except Exception as e:
+        logger.debug("dedup index add: %s", e)
+
+
 def store_fact(
     fact: str,
     fact_type: str = "fact",
@@ -98,6 +338,10 @@ def store_fact(
     user_id: str = "default",
     priority: float = 0.8,
 ) -> bool:
+    dup = _find_duplicate(user_id, "fact", fact)
+    if dup:
+        _bump(dup)
+        return False
     vector = _embed(fact)
     if vector is None:
         return False
@@ -108,23 +352,21 @@ def store_fact(
         existing, _ = semantic_search(fact, top_k=1, user_id=user_id)
         if existing and existing[0]["score"] > 0.92:
             return False
-        import pyarrow as pa
-
-        tbl.add(
-            pa.table(
-                {
-                    "id": [str(uuid.uuid4())],
-                    "text": [fact],
-                    "vector": [vector],
-                    "source": ["fact"],
-                    "user": [user_name],
-                    "user_id": [user_id],
-                    "fact_type": [fact_type],
-                    "priority": [float(priority)],
-                    "ts": [time.time()],
-                }
-            )
+        row_id = str(uuid.uuid4())
+        _append(
+            {
+                "id": row_id,
+                "text": fact,
+                "vector": vector,
+                "source": "fact",
+                "user": user_name,
+                "user_id": user_id,
+                "fact_type": fact_type,
+                "priority": float(priority),
+                "ts": time.time(),
+            }
         )
+        _index_signature(user_id, "fact", fact, row_id)
         logger.info("stored fact | user=%s text=%s", user_name, fact[:60])
         return True
     except Exception as e:
@@ -138,6 +380,10 @@ def store_exchange(
     if len(user_msg.strip()) < 10 or len(assistant_msg.strip()) < 10:
         return False
     combined = f"User: {user_msg}\nASTRA: {assistant_msg}"
+    dup = _find_duplicate(user_id, "exchange", combined)
+    if dup:
+        _bump(dup)
+        return False
     vector = _embed(combined)
     if vector is None:
         return False
@@ -145,29 +391,39 @@ def store_exchange(
     if tbl is None:
         return False
     try:
-        import pyarrow as pa
-
-        tbl.add(
-            pa.table(
-                {
-                    "id": [str(uuid.uuid4())],
-                    "text": [combined],
-                    "vector": [vector],
-                    "source": ["exchange"],
-                    "user": [user_name],
-                    "user_id": [user_id],
-                    "fact_type": ["exchange"],
-                    "priority": [0.5],
-                    "ts": [time.time()],
-                }
-            )
+        row_id = str(uuid.uuid4())
+        _append(
+            {
+                "id": row_id,
+                "text": combined,
+                "vector": vector,
+                "source": "exchange",
+                "user": user_name,
+                "user_id": user_id,
+                "fact_type": "exchange",
+                "priority": 0.5,
+                "ts": time.time(),
+            }
         )
+        _index_signature(user_id, "exchange", combined, row_id)
         return True
     except Exception as e:
         logger.error("store_exchange error: %s", e)
         return False
 
 
+def _cold_hits(vector: List[float], limit: int, user_id: str = None) -> List[Dict]:
+    from memory.cold_tier import COLD_AFTER_DAYS, get_cold_tier
+
+    if COLD_AFTER_DAYS <= 0:
+        return []
+    try:
+        return get_cold_tier().search(vector, limit, user_id=user_id)
+    except Exception as e:
+        logger.warning("cold tier search failed: %s", e)
+        return []
+
+
 def semantic_search(
     query: str, top_k: int = TOP_K, user_id: str = None
 ) -> Tuple[List[Dict], List[Dict]]:
@@ -180,7 +436,12 @@ def semantic_search(
     try:
         now = time.time()
         oldest = now - 60 * 60 * 24 * 90
-        results = tbl.search(vector).limit(top_k * 3).to_list()
+        results = _search_rows(vector, top_k * 3)
+        extra = _pending_hits(vector, top_k * 3) + _cold_hits(
+            vector, top_k * 3, user_id
+        )
+        if extra:
+            results = sorted(results + extra, key=lambda r: r["_distance"])
         facts, exchanges = [], []
         for r in results:
             if user_id and r.get("user_id", "default") != user_id:
@@ -213,29 +474,33 @@ def get_memory_count() -> int:
     if tbl is None:
         return 0
     try:
-        return tbl.count_rows()
+        from memory.cold_tier import get_cold_tier
+
+        return tbl.count_rows() + len(_pending) + get_cold_tier().count()
     except Exception:
         return 0
 
 
 def compress_memory(max_exchanges: int = 200, user_id: str = None) -> int:
+    """Drop the oldest 20% of exchanges once there are more than max_exchanges."""
     tbl = _get_table()
     if tbl is None:
         return 0
     try:
-        df = tbl.to_pandas()
-        exchanges = df[df["source"] == "exchange"]
+        flush_writes()
+        where = "source = 'exchange'"
         if user_id:
-            exchanges = exchanges[exchanges["user_id"] == user_id]
-        if len(exchanges) <= max_exchanges:
+            where += f" AND user_id = {_sql_str(user_id)}"
+        rows = _scan(where, ["id", "user_id", "ts"]) + _cold_scan("exchange")
+        if user_id:
+            rows = [r for r in rows if r["user_id"] == user_id]
+        if len(rows) <= max_exchanges:
             return 0
-        cutoff = int(len(exchanges) * 0.20)
-        oldest = exchanges.nsmallest(cutoff, "ts")
-        ids = oldest["id"].tolist()
-        ids_sql = ", ".join(f'"{i}"' for i in ids)
-        tbl.delete(f"id IN ({ids_sql})")
-        logger.info("compressed %d exchanges", len(ids))
-        return len(ids)
+        cutoff = int(len(rows) * 0.20)
+        rows.sort(key=lambda r: r["ts"])
+        n = _delete_ids([r["id"] for r in rows[:cutoff]])
+        logger.info("compressed %d exchanges", n)
+        return n
     except Exception as e:
         logger.error("compress_memory error: %s", e)
         return 0
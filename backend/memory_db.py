@@ -2,18 +2,38 @@
 memory_db.py — SQLite-backed conversation history and facts store.
 Uses WAL mode and thread-local connections for concurrency safety.
 Scoped per user_id.
+
+Conversation writes are group-committed: save_exchange() appends to a
+per-user ring of recent messages and queues the rows for a single writer
+thread, which commits whatever has accumulated (across users) at most
+MEMORY_DB_FLUSH_MS later, in one transaction. load_recent_history() is
+answered from the ring without touching SQLite; only requests for more than
+MEMORY_DB_RING_SIZE messages flush and query the database. flush() (called
+on shutdown and at exit) blocks until every queued row is durable, and
+returns False if a batch had to be dropped (commit failed three times;
+counted in stats["dropped"]). The ring assumes this process is the only
+writer of the conversations table.
 """
+import atexit
 import sqlite3
 import threading
 import os
 import logging
-from typing import Optional
+import time
+from collections import deque
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "memory.db")
+RING_SIZE = int(os.getenv("MEMORY_DB_RING_SIZE", 64))  # messages kept per user
+FLUSH_MS = float(os.getenv("MEMORY_DB_FLUSH_MS", 50))
+MAX_BATCH = int(os.getenv("MEMORY_DB_MAX_BATCH", 512))
 
 _local = threading.local()
+_INSERT_CONVERSATION = (
+    "INSERT INTO conversations (user_id, role, content, intent, ts) VALUES (?, ?, ?, ?, ?)"
+)
 
 
 def _conn() -> sqlite3.Connection:
@@ -51,22 +71,181 @@ def init_db():
     """)
     c.execute("CREATE INDEX IF NOT EXISTS idx_facts_user ON facts(user_id)")
     c.commit()
+    _reset_cache()
+
+
+class _GroupWriter:
+    """Single writer thread: batches queued conversation rows into one commit."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._rows: deque = deque()
+        self._cv = threading.Condition()
+        self._enqueued = 0
+        self._settled = 0  # rows committed or dropped, in submit order
+        self._drop_end = 0  # _settled right after the latest dropped batch
+        self._reported = 0  # rows already covered by a flush() result
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            "commits": 0, "rows": 0, "max_batch": 0, "errors": 0, "dropped": 0,
+            "last_commit_ms": 0.0,
+        }
+
+    def submit(self, rows: list) -> None:
+        with self._cv:
+            self._rows.extend(rows)
+            self._enqueued += len(rows)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="memory-db-writer", daemon=True
+                )
+                self._thread.start()
+            self._cv.notify_all()
+
+    def pending(self) -> int:
+        with self._cv:
+            return self._enqueued - self._settled
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait for the rows queued so far; False on timeout or if any were dropped."""
+        with self._cv:
+            target, since = self._enqueued, self._reported
+            if not self._cv.wait_for(lambda: self._settled >= target, timeout):
+                return False
+            self._reported = max(self._reported, target)
+            return self._drop_end <= since
+
+    def close(self, timeout: float = 10.0) -> bool:
+        ok = self.flush(timeout)
+        with self._cv:
+            self._stop = True
+            self._cv.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1)
+        return ok
+
+    def _commit(self, conn: sqlite3.Connection, batch: list) -> bool:
+        error = None
+        for attempt in range(3):
+            try:
+                t0 = time.perf_counter()
+                with conn:
+                    conn.executemany(_INSERT_CONVERSATION, batch)
+                self.stats["last_commit_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+                return True
+            except sqlite3.OperationalError as e:  # locked/busy — retry
+                error = e
+                logger.warning("memory_db group commit retry %d: %s", attempt + 1, e)
+                time.sleep(0.1 * (attempt + 1))
+            except Exception as e:
+                error = e
+                break
+        self.stats["errors"] += 1
+        logger.error("memory_db group commit dropped %d rows: %s", len(batch), error)
+        return False
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            while True:
+                with self._cv:
+                    self._cv.wait_for(lambda: self._rows or self._stop)
+                    if not self._rows:
+                        return
+                    # bounded wait for more rows so one commit covers the burst
+                    deadline = time.monotonic() + FLUSH_MS / 1000.0
+                    while len(self._rows) < MAX_BATCH and not self._stop:
+                        left = deadline - time.monotonic()
+                        if left <= 0:
+                            break
+                        self._cv.wait(left)
+                    batch = [self._rows.popleft() for _ in range(min(len(self._rows), MAX_BATCH))]
+                ok = self._commit(conn, batch)
+                with self._cv:
+                    self._settled += len(batch)
+                    if ok:
+                        self.stats["commits"] += 1
+                        self.stats["rows"] += len(batch)
+                        self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+                    else:
+                        self.stats["dropped"] += len(batch)
+                        self._drop_end = self._settled
+                    self._cv.notify_all()
+        finally:
+            conn.close()
+
+
+_writer: Optional[_GroupWriter] = None
+_ring: Dict[str, deque] = {}
+_ring_lock = threading.RLock()
+_ring_stats = {"hits": 0, "misses": 0}
+
+
+def _get_writer() -> _GroupWriter:
+    global _writer
+    with _ring_lock:
+        if _writer is None or _writer.path != DB_PATH:
+            if _writer is not None:
+                _writer.close()
+            _writer = _GroupWriter(DB_PATH)
+        return _writer
+
+
+def _reset_cache() -> None:
+    """Flush queued rows and drop the rings (DB_PATH changed / re-init)."""
+    global _writer
+    with _ring_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+        _ring.clear()
+
+
+def _user_ring(user_id: str) -> deque:
+    """The user's ring, loaded from SQLite on first use (caller holds _ring_lock)."""
+    ring = _ring.get(user_id)
+    if ring is None:
+        rows = _conn().execute(
+            """
+            SELECT role, content FROM (
+                SELECT id, role, content FROM conversations
+                WHERE user_id = ?
+                ORDER BY id DESC LIMIT ?
+            ) ORDER BY id ASC
+            """,
+            (user_id, RING_SIZE),
+        ).fetchall()
+        ring = deque(
+            ({"role": r["role"], "content": r["content"]} for r in rows), maxlen=RING_SIZE
+        )
+        _ring[user_id] = ring
+    return ring
 
 
 def save_exchange(user_msg: str, assistant_msg: str, intent: str = None, user_id: str = "default"):
-    c = _conn()
-    c.execute(
-        "INSERT INTO conversations (user_id, role, content, intent) VALUES (?, ?, ?, ?)",
-        (user_id, "user", user_msg, intent),
-    )
-    c.execute(
-        "INSERT INTO conversations (user_id, role, content, intent) VALUES (?, ?, ?, ?)",
-        (user_id, "assistant", assistant_msg, intent),
-    )
-    c.commit()
+    ts = time.time()
+    rows = [
+        (user_id, "user", user_msg, intent, ts),
+        (user_id, "assistant", assistant_msg, intent, ts),
+    ]
+    with _ring_lock:
+        ring = _user_ring(user_id)
+        ring.append({"role": "user", "content": user_msg})
+        ring.append({"role": "assistant", "content": assistant_msg})
+        # submitted under the ring lock so SQLite row order matches the ring
+        _get_writer().submit(rows)
 
 
 def load_recent_history(n: int = 15, user_id: str = "default") -> list:
+    if n <= RING_SIZE:
+        with _ring_lock:
+            ring = _user_ring(user_id)
+            _ring_stats["hits"] += 1
+            return [dict(m) for m in list(ring)[-n:]] if n > 0 else []
+    _ring_stats["misses"] += 1
+    flush()
     c = _conn()
     rows = c.execute(
         """
@@ -81,12 +260,38 @@ def load_recent_history(n: int = 15, user_id: str = "default") -> list:
     return [{"role": r["role"], "content": r["content"]} for r in rows]
 
 
+def flush(timeout: float = 10.0) -> bool:
+    """Block until every queued conversation row is committed (False if any were dropped)."""
+    writer = _writer
+    return writer.flush(timeout) if writer is not None else True
+
+
+def get_stats() -> dict:
+    lookups = _ring_stats["hits"] + _ring_stats["misses"]
+    writer = _writer
+    wstats = dict(writer.stats) if writer else {"commits": 0, "rows": 0}
+    commits = wstats.get("commits", 0)
+    return {
+        **_ring_stats,
+        "hit_rate": round(_ring_stats["hits"] / lookups, 3) if lookups else 0.0,
+        "users_cached": len(_ring),
+        "ring_size": RING_SIZE,
+        **wstats,
+        "avg_batch": round(wstats.get("rows", 0) / commits, 2) if commits else 0.0,
+        "pending": writer.pending() if writer else 0,
+        "flush_ms": FLUSH_MS,
+    }
+
+
+atexit.register(flush)
+
+
 def save_fact(key: str, value: str, user_id: str = "default"):
     c = _conn()
     c.execute(
-        "INSERT INTO facts (user_id, key, value) VALUES (?, ?, ?) "
-        "ON CONFLICT(user_id, key) DO UPDATE SET value=excluded.value, updated=unixepoch('now','subsec')",
-        (user_id, key, value),
+        "INSERT INTO facts (user_id, key, value, updated) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(user_id, key) DO UPDATE SET value=excluded.value, updated=excluded.updated",
+        (user_id, key, value, time.time()),
     )
     c.commit()
 
@@ -95,3 +300,63 @@ def get_fact(key: str, user_id: str = "default") -> Optional[str]:
     c = _conn()
     row = c.execute("SELECT value FROM facts WHERE user_id=? AND key=?", (user_id, key)).fetchone()
     return row["value"] if row else None
+
+
+# ── Bulk export / import (memory/portability) ─────────────────────────────
+
+
+def export_conversations(user_id: str, after_id: int = 0, limit: int = 500) -> list:
+    flush()
+    rows = _conn().execute(
+        "SELECT id, role, content, intent, ts FROM conversations "
+        "WHERE user_id=? AND id > ? ORDER BY id LIMIT ?",
+        (user_id, after_id, limit),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def export_facts(user_id: str, after_key: str = "", limit: int = 500) -> list:
+    rows = _conn().execute(
+        "SELECT key, value, updated FROM facts WHERE user_id=? AND key > ? ORDER BY key LIMIT ?",
+        (user_id, after_key, limit),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def import_conversations(user_id: str, rows: list) -> int:
+    """
+    Append imported messages; a row already present (same ts, role, content)
+    is skipped so an interrupted import can simply be re-run. Returns rows added.
+    """
+    if not rows:
+        return 0
+    flush()
+    c = _conn()
+    added = 0
+    with c:
+        for r in rows:
+            if c.execute(
+                "SELECT 1 FROM conversations WHERE user_id=? AND ts=? AND role=? AND content=?",
+                (user_id, r["ts"], r["role"], r["content"]),
+            ).fetchone():
+                continue
+            c.execute(_INSERT_CONVERSATION, (user_id, r["role"], r["content"], r.get("intent"), r["ts"]))
+            added += 1
+    with _ring_lock:
+        _ring.pop(user_id, None)  # reload from SQLite on next read
+    return added
+
+
+def import_facts(user_id: str, rows: list) -> int:
+    """Upsert facts; the newer `updated` wins."""
+    if not rows:
+        return 0
+    c = _conn()
+    with c:
+        c.executemany(
+            "INSERT INTO facts (user_id, key, value, updated) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(user_id, key) DO UPDATE SET value=excluded.value, updated=excluded.updated "
+            "WHERE excluded.updated > facts.updated",
+            [(user_id, r["key"], r["value"], r.get("updated") or time.time()) for r in rows],
+        )
+    return len(rows)
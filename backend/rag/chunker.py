@@ -1,6 +1,9 @@
 # rag/chunker.py — Semantic overlap chunking
 import re
 
+# Bump when chunk boundaries change so the ingest manifest re-chunks files
+CHUNKER_VERSION = "paragraph-600/1"
+
 
 def chunk_text(text: str, size: int = 500, overlap: int = 100) -> list[str]:
     text = re.sub(r"\s+", " ", text).strip()
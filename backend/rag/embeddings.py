@@ -1,29 +1,21 @@
 # rag/embeddings.py — Sentence transformer embeddings
+# Thin wrapper over core.embedding_service so RAG chunks and memory rows share
+# one model (and one vector space) in the astra_memory table.
 import numpy as np
 
-_model = None
-
-
-def _get_model():
-    global _model
-    if _model is None:
-        from sentence_transformers import SentenceTransformer
-
-        _model = SentenceTransformer("all-MiniLM-L6-v2")  # 384-dim, fast, good quality
-    return _model
+from core.embedding_service import EMBED_DIM, get_embedding_service
 
 
 def embed(text: str) -> np.ndarray:
-    """Embed a single string. Returns normalized 384-dim vector."""
-    model = _get_model()
-    vec = model.encode([text], normalize_embeddings=True)
-    return vec.astype(np.float32)
+    """Embed a single string. Returns normalized (1, 384) vector."""
+    vec = get_embedding_service().embed(text)
+    if vec is None:
+        raise RuntimeError("embedding failed")
+    return vec.reshape(1, -1)
 
 
 def embed_batch(texts: list[str]) -> np.ndarray:
     """Embed a list of strings. Returns (N, 384) array."""
     if not texts:
-        return np.zeros((0, 384), dtype=np.float32)
-    model = _get_model()
-    vecs = model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
-    return vecs.astype(np.float32)
+        return np.zeros((0, EMBED_DIM), dtype=np.float32)
+    return get_embedding_service().embed_batch(texts)
@@ -1,8 +1,19 @@
 # rag/ingest.py — Multi-source document ingestion
+# Files are tracked in a persistent manifest (rag/manifest.py): unchanged files
+# are skipped from a stat() alone, edited files only re-embed the chunks whose
+# text changed, and files that vanished are purged by reconcile().
+import hashlib
+import logging
 import os
-from rag.chunker import chunk_text, chunk_by_paragraph
+import time
+
+from rag.chunker import CHUNKER_VERSION, chunk_text, chunk_by_paragraph  # noqa: F401
 from rag.embeddings import embed_batch
-from rag.vector_store import add_chunks
+from rag.vector_store import add_chunks, delete_chunks, delete_source  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTS = [".pdf", ".md", ".txt", ".py", ".js", ".ts"]
 
 
 def ingest_text(text: str, source: str = "manual", tags: list = None):
@@ -14,21 +25,230 @@ def ingest_text(text: str, source: str = "manual", tags: list = None):
     return len(chunks)
 
 
-def ingest_file(path: str, tags: list = None):
+def _read_pages(path: str) -> tuple:
+    """(text, page count) — text files count as one page."""
     ext = os.path.splitext(path)[1].lower()
     if ext == ".pdf":
         from pypdf import PdfReader
 
         reader = PdfReader(path)
-        text = "\n".join(p.extract_text() or "" for p in reader.pages)
-    elif ext in [".md", ".txt", ".py", ".js", ".ts"]:
-        with open(path) as f:
-            text = f.read()
-    else:
+        return "\n".join(p.extract_text() or "" for p in reader.pages), len(reader.pages)
+    with open(path) as f:
+        return f.read(), 1
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8", "ignore")).hexdigest()[:16]
+
+
+def _embed_model() -> str:
+    from core.embedding_service import get_embedding_service
+
+    return get_embedding_service().model_name
+
+
+def _unchanged(entry: dict, st: os.stat_result, model: str) -> bool:
+    return (
+        entry is not None
+        and entry.get("size") == st.st_size
+        and entry.get("mtime") == st.st_mtime
+        and entry.get("chunker") == CHUNKER_VERSION
+        and entry.get("model") == model
+    )
+
+
+def _check(path: str, model: str, force: bool = False):
+    """stat()-only change check → (entry, stat, known sha256) or None if unchanged."""
+    from rag.manifest import get_manifest
+
+    entry = get_manifest().get(path)
+    st = os.stat(path)
+    if not force and _unchanged(entry, st, model):
+        return None
+    same_recipe = (
+        entry is not None
+        and entry.get("chunker") == CHUNKER_VERSION
+        and entry.get("model") == model
+    )
+    known = entry.get("sha256") if same_recipe and not force else None
+    return entry, st, known
+
+
+def parse_file(path: str, known_sha256: str = None) -> dict:
+    """
+    Hash, read and chunk one file. Pure (no DB, no model) so the ingestion
+    pipeline can run it in worker processes. If the content hash equals
+    `known_sha256` the file was only touched and is not parsed.
+    """
+    digest = _file_hash(path)
+    if known_sha256 and digest == known_sha256:
+        return {"path": path, "sha256": digest, "touched": True, "pages": 0, "chunks": [], "hashes": []}
+    text, pages = _read_pages(path)
+    chunks = chunk_by_paragraph(text)
+    return {
+        "path": path,
+        "sha256": digest,
+        "touched": False,
+        "pages": pages,
+        "chunks": chunks,
+        "hashes": [_chunk_hash(c) for c in chunks],
+    }
+
+
+def plan_chunks(parsed: dict, entry: dict, model: str, force: bool = False) -> dict:
+    """
+    Diff parsed chunks against the manifest entry: ids of chunks that can be
+    reused, indices that need embedding, and stale ids to delete.
+    """
+    from rag.manifest import get_manifest
+
+    source = os.path.basename(parsed["path"])
+    reusable = {}
+    if entry and entry.get("model") == model and not force:
+        for chunk_id, h in entry.get("chunks", []):
+            reusable.setdefault(h, []).append(chunk_id)
+    ids = [reusable[h].pop() if reusable.get(h) else None for h in parsed["hashes"]]
+    stale = [chunk_id for left in reusable.values() for chunk_id in left]
+    if entry and (force or entry.get("model") != model):
+        stale = [pair[0] for pair in entry.get("chunks", [])]
+    return {
+        "ids": ids,
+        "todo": [i for i, chunk_id in enumerate(ids) if chunk_id is None],
+        "stale": stale,
+        # chunks stored before the manifest existed would be duplicated
+        "legacy": entry is None and get_manifest().sources().get(source, 0) == 0,
+    }
+
+
+def commit_file(parsed: dict, st: os.stat_result, plan: dict, model: str, entry: dict = None) -> None:
+    """Delete stale chunks and record the file in the manifest (not saved)."""
+    from rag.manifest import get_manifest
+
+    if parsed["touched"]:
+        get_manifest().put(parsed["path"], {**entry, "size": st.st_size, "mtime": st.st_mtime})
+        return
+    delete_chunks(plan["stale"])
+    get_manifest().put(
+        parsed["path"],
+        {
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha256": parsed["sha256"],
+            "chunker": CHUNKER_VERSION,
+            "model": model,
+            "chunks": [[chunk_id, h] for chunk_id, h in zip(plan["ids"], parsed["hashes"])],
+            "ingested_at": time.time(),
+        },
+    )
+    if plan["stale"] or plan["todo"]:
+        logger.info(
+            "ingest %s: %d chunks embedded, %d reused, %d removed",
+            os.path.basename(parsed["path"]), len(plan["todo"]),
+            len(plan["ids"]) - len(plan["todo"]), len(plan["stale"]),
+        )
+
+
+def ingest_file(path: str, tags: list = None, force: bool = False):
+    """
+    Ingest (or re-ingest) one file. Returns the number of chunks embedded —
+    0 when the manifest shows the file is unchanged.
+    """
+    from rag.manifest import get_manifest
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SUPPORTED_EXTS:
         print(f"Unsupported: {ext}")
         return 0
+    path = os.path.abspath(path)
     source = os.path.basename(path)
-    return ingest_text(text, source=source, tags=tags or [ext.strip(".")])
+    model = _embed_model()
+    check = _check(path, model, force)
+    if check is None:
+        return 0
+    entry, st, known = check
+    parsed = parse_file(path, known)
+    plan = plan_chunks(parsed, entry, model, force)
+    if parsed["touched"]:
+        commit_file(parsed, st, plan, model, entry)
+        get_manifest().save()
+        return 0
+    if plan["legacy"]:
+        delete_source(source)
+    todo = plan["todo"]
+    if todo:
+        texts = [parsed["chunks"][i] for i in todo]
+        new_ids = add_chunks(texts, embed_batch(texts), source=source, tags=tags or [ext.strip(".")])
+        if len(new_ids) != len(todo):
+            raise RuntimeError(f"storing chunks for '{source}' failed")
+        for i, chunk_id in zip(todo, new_ids):
+            plan["ids"][i] = chunk_id
+    commit_file(parsed, st, plan, model)
+    get_manifest().save()
+    return len(todo)
+
+
+def purge_file(path: str) -> int:
+    """Drop a file's chunks and manifest entry. Returns chunks deleted."""
+    from rag.manifest import get_manifest
+
+    manifest = get_manifest()
+    entry = manifest.remove(os.path.abspath(path))
+    if entry is None:
+        return 0
+    n = delete_chunks([pair[0] for pair in entry.get("chunks", [])])
+    manifest.save()
+    logger.info("purged %s: %d chunks", os.path.basename(path), n)
+    return n
+
+
+def reconcile(folder: str, extensions: list = None, tags: list = None, progress=None) -> dict:
+    """
+    Bring the index in line with `folder`: ingest new/edited files through
+    the parallel pipeline (rag/pipeline.py), purge deleted ones. Unchanged
+    files cost one stat(). Returns {filename: n} for files that were
+    (re-)ingested, removed or failed.
+    """
+    from rag.manifest import get_manifest
+    from rag.pipeline import ingest_files
+
+    extensions = extensions or [".md", ".txt", ".pdf"]
+    folder = os.path.abspath(folder)
+    model = _embed_model()
+    changed, seen = [], set()
+    for root, _, files in os.walk(folder):
+        for fname in files:
+            if os.path.splitext(fname)[1].lower() not in extensions:
+                continue
+            path = os.path.join(root, fname)
+            seen.add(path)
+            try:
+                if _check(path, model) is not None:
+                    changed.append(path)
+            except OSError:
+                continue  # vanished between listdir and stat
+    results = {}
+    if changed:
+        tags_for = (lambda p: tags) if tags else (
+            lambda p: ["docs", os.path.splitext(p)[1].lower().strip(".")]
+        )
+        results = {
+            name: n for name, n in ingest_files(changed, tags_for=tags_for, progress=progress).items() if n
+        }
+    prefix = folder + os.sep
+    for path in get_manifest().paths():
+        if path.startswith(prefix) and path not in seen:
+            if os.path.splitext(path)[1].lower() in extensions or not os.path.exists(path):
+                purge_file(path)
+                results[os.path.basename(path)] = "removed"
+    return results
 
 
 def ingest_folder(folder: str, extensions: list = None, tags: list = None):
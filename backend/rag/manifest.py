@@ -0,0 +1,123 @@
+# rag/manifest.py — Persistent record of what has been ingested
+# One entry per source file: size, mtime, sha256, chunker version, embedding
+# model and the (chunk id, chunk hash) pairs it produced. ingest_file uses it
+# to skip unchanged files without reading them, to re-embed only the chunks
+# whose text changed, and to purge the chunks of files that disappeared.
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IngestManifest:
+    def __init__(self, path: str):
+        self.path = path
+        self._files: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def load(self) -> bool:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning("ingest manifest unreadable, starting fresh: %s", e)
+            return False
+        with self._lock:
+            self._files = data.get("files", {})
+        return True
+
+    def save(self) -> bool:
+        with self._lock:
+            if not self._dirty:
+                return False
+            data = {"version": 1, "saved_at": time.time(), "files": self._files}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            return True
+        except Exception as e:
+            logger.warning("ingest manifest save failed: %s", e)
+            self._dirty = True
+            return False
+
+    def get(self, path: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._files.get(path)
+            return dict(entry) if entry else None
+
+    def put(self, path: str, entry: Dict) -> None:
+        with self._lock:
+            self._files[path] = entry
+            self._dirty = True
+
+    def remove(self, path: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._files.pop(path, None)
+            if entry is not None:
+                self._dirty = True
+            return entry
+
+    def paths(self) -> List[str]:
+        with self._lock:
+            return list(self._files)
+
+    def sources(self) -> Dict[str, int]:
+        """basename → number of manifest entries using it as chunk source."""
+        out: Dict[str, int] = {}
+        with self._lock:
+            for path in self._files:
+                name = os.path.basename(path)
+                out[name] = out.get(name, 0) + 1
+        return out
+
+    def remap_ids(self, mapping: Dict[str, str]) -> None:
+        """Follow chunk ids rewritten elsewhere (re-embedding migration)."""
+        with self._lock:
+            for entry in self._files.values():
+                for pair in entry.get("chunks", []):
+                    if pair[0] in mapping:
+                        pair[0] = mapping[pair[0]]
+                        self._dirty = True
+
+    def set_model(self, model: str) -> None:
+        """Every recorded chunk is now embedded with `model`."""
+        with self._lock:
+            for entry in self._files.values():
+                if entry.get("model") != model:
+                    entry["model"] = model
+                    self._dirty = True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "chunks": sum(len(e.get("chunks", [])) for e in self._files.values()),
+            }
+
+
+_manifest: Optional[IngestManifest] = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest() -> IngestManifest:
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                from memory.vector_store import DB_DIR
+
+                m = IngestManifest(os.path.join(DB_DIR, "rag_manifest.json"))
+                m.load()
+                _manifest = m
+    return _manifest
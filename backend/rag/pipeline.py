@@ -0,0 +1,347 @@
+# rag/pipeline.py — Staged, parallel document ingestion
+#
+#   files ─▶ parse pool ─▶ embed stage ─▶ writer ─▶ LanceDB + manifest
+#            (processes)    (1 thread)     (1 thread)
+#
+# * parse: rag.ingest.parse_file (hash, pypdf/text read, chunk) runs in a
+#   spawn-context process pool, at most 2 × workers files in flight, so one
+#   500-page PDF no longer blocks the others
+# * embed: unchanged chunks are reused from the manifest; the rest are
+#   embedded in batches of RAG_EMBED_BATCH texts, across file boundaries
+# * write: one add_chunk_rows() (a single tbl.add) per ~RAG_WRITE_BATCH rows,
+#   then stale-chunk deletes and manifest updates for the files it completed
+#
+# Stages are joined by bounded queues (RAG_PIPELINE_QUEUE), so a slow stage
+# blocks the one before it instead of buffering whole documents in RAM.
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PARSE_WORKERS = int(os.getenv("RAG_PARSE_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+EMBED_BATCH = int(os.getenv("RAG_EMBED_BATCH", 64))
+WRITE_BATCH = int(os.getenv("RAG_WRITE_BATCH", 512))
+QUEUE_DEPTH = int(os.getenv("RAG_PIPELINE_QUEUE", 8))
+_DONE = object()
+
+_last_progress: Dict = {}
+
+
+class IngestProgress:
+    """Counters shared by the stages; snapshot() is what callers see."""
+
+    def __init__(self, files_total: int):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counts = {
+            "files_total": files_total,
+            "files_parsed": 0,
+            "files_written": 0,
+            "files_touched": 0,
+            "errors": 0,
+            "pages": 0,
+            "chunks_embedded": 0,
+            "chunks_reused": 0,
+            "chunks_removed": 0,
+            "write_batches": 0,
+        }
+
+    def add(self, **deltas) -> None:
+        with self._lock:
+            for k, v in deltas.items():
+                self.counts[k] += v
+
+    def snapshot(self, **extra) -> Dict:
+        with self._lock:
+            out = dict(self.counts)
+        elapsed = max(time.time() - self.started, 1e-6)
+        out.update(
+            elapsed_s=round(elapsed, 3),
+            pages_per_sec=round(out["pages"] / elapsed, 2),
+            chunks_per_sec=round(out["chunks_embedded"] / elapsed, 2),
+            done=out["files_written"] + out["errors"] >= out["files_total"],
+            **extra,
+        )
+        return out
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> None:
+    """Blocking put that still notices a pipeline abort."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return
+        except queue.Full:
+            continue
+
+
+def ingest_files(
+    paths: List[str],
+    tags_for: Callable[[str], list] = None,
+    force: bool = False,
+    workers: int = None,
+    progress: Optional[Callable[[Dict], None]] = None,
+) -> Dict[str, object]:
+    """
+    Ingest many files concurrently. Returns {filename: chunks embedded | error}.
+    workers=0 parses on a thread in this process (no pool).
+    """
+    from rag.ingest import _check, _embed_model, parse_file, plan_chunks
+
+    workers = PARSE_WORKERS if workers is None else workers
+    tags_for = tags_for or (lambda p: [os.path.splitext(p)[1].lower().strip(".")])
+    model = _embed_model()
+    prog = IngestProgress(len(paths))
+    results: Dict[str, object] = {}
+    stop = threading.Event()
+    parsed_q: queue.Queue = queue.Queue(maxsize=QUEUE_DEPTH)
+    write_q: queue.Queue = queue.Queue(maxsize=QUEUE_DEPTH)
+
+    def report(stage: str) -> None:
+        global _last_progress
+        snap = prog.snapshot(
+            stage=stage, parsed_queue=parsed_q.qsize(), write_queue=write_q.qsize()
+        )
+        _last_progress = snap
+        if progress:
+            try:
+                progress(snap)
+            except Exception as e:
+                logger.debug("ingest progress callback: %s", e)
+
+    def fail(path: str, e: Exception) -> None:
+        logger.warning("Ingest failed for '%s': %s", os.path.basename(path), e)
+        results[os.path.basename(path)] = f"error: {e}"
+        prog.add(errors=1)
+
+    # ── Stage 1: parse (process pool) ─────────────────────────────────────
+    def parse_stage() -> None:
+        jobs = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                check = _check(path, model, force)
+            except OSError as e:
+                fail(path, e)
+                continue
+            if check is None:
+                prog.add(files_total=-1)
+                continue
+            jobs.append((path, check))
+        pool = None
+        try:
+            if workers > 0 and len(jobs) > 1:
+                pool = ProcessPoolExecutor(
+                    max_workers=min(workers, len(jobs)),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            in_flight = {}
+            pending = list(jobs)
+            while (pending or in_flight) and not stop.is_set():
+                while pending and len(in_flight) < max(2 * workers, 1):
+                    path, check = pending.pop(0)
+                    if pool is None:
+                        try:
+                            _put(parsed_q, (path, check, parse_file(path, check[2])), stop)
+                            prog.add(files_parsed=1)
+                        except Exception as e:
+                            fail(path, e)
+                        continue
+                    in_flight[pool.submit(parse_file, path, check[2])] = (path, check)
+                if not in_flight:
+                    continue
+                done, _ = wait(list(in_flight), timeout=0.5, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    path, check = in_flight.pop(fut)
+                    try:
+                        _put(parsed_q, (path, check, fut.result()), stop)
+                        prog.add(files_parsed=1)
+                    except Exception as e:
+                        fail(path, e)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            _put(parsed_q, _DONE, stop)
+
+    # ── Stage 2: embed (batched across files) ─────────────────────────────
+    def embed_stage() -> None:
+        from rag.embeddings import embed_batch
+
+        batch, texts = [], []
+
+        def flush() -> None:
+            if not batch:
+                return
+            try:
+                vecs = embed_batch(texts) if texts else np.zeros((0, 384), np.float32)
+            except Exception as e:
+                for job in batch:
+                    fail(job["path"], e)
+                batch.clear()
+                texts.clear()
+                return
+            off = 0
+            for job in batch:
+                n = len(job["plan"]["todo"])
+                job["vectors"] = vecs[off : off + n]
+                off += n
+                _put(write_q, job, stop)
+            prog.add(chunks_embedded=len(texts))
+            batch.clear()
+            texts.clear()
+            report("embed")
+
+        while not stop.is_set():
+            try:
+                item = parsed_q.get(timeout=0.2 if batch else 1.0)
+            except queue.Empty:
+                flush()  # parse stage is slow — don't sit on a partial batch
+                continue
+            if item is _DONE:
+                break
+            path, (entry, st, _), parsed = item
+            try:
+                plan = plan_chunks(parsed, entry, model, force)
+            except Exception as e:
+                fail(path, e)
+                continue
+            prog.add(pages=parsed["pages"])
+            job = {"path": path, "entry": entry, "st": st, "parsed": parsed, "plan": plan}
+            todo_texts = [parsed["chunks"][i] for i in plan["todo"]]
+            if len(texts) + len(todo_texts) > EMBED_BATCH and batch:
+                flush()
+            if len(todo_texts) > EMBED_BATCH:
+                # one large document: embed it in CPU-sized slices
+                try:
+                    job["vectors"] = np.vstack([
+                        embed_batch(todo_texts[i : i + EMBED_BATCH])
+                        for i in range(0, len(todo_texts), EMBED_BATCH)
+                    ])
+                except Exception as e:
+                    fail(path, e)
+                    continue
+                prog.add(chunks_embedded=len(todo_texts))
+                _put(write_q, job, stop)
+                report("embed")
+                continue
+            batch.append(job)
+            texts.extend(todo_texts)
+        flush()
+        _put(write_q, _DONE, stop)
+
+    # ── Stage 3: single writer (bulk tbl.add + manifest) ──────────────────
+    def write_stage() -> None:
+        from rag.ingest import commit_file
+        from rag.manifest import get_manifest
+        from rag.vector_store import add_chunk_rows, delete_source
+
+        jobs, rows = [], 0
+
+        def flush() -> None:
+            nonlocal rows
+            if not jobs:
+                return
+            texts, vecs, sources, fact_types = [], [], [], []
+            for job in jobs:
+                parsed, plan = job["parsed"], job["plan"]
+                if parsed["touched"]:
+                    continue
+                source = os.path.basename(job["path"])
+                if plan["legacy"]:
+                    delete_source(source)
+                fact_type = ",".join(tags_for(job["path"]) or []) or "rag"
+                for i in plan["todo"]:
+                    texts.append(parsed["chunks"][i])
+                    sources.append(source)
+                    fact_types.append(fact_type)
+                if plan["todo"]:
+                    vecs.append(job["vectors"])
+            ids = add_chunk_rows(texts, np.vstack(vecs), sources, fact_types) if texts else []
+            if len(ids) != len(texts):
+                for job in jobs:
+                    fail(job["path"], RuntimeError("storing chunks failed"))
+            else:
+                off = 0
+                for job in jobs:
+                    parsed, plan = job["parsed"], job["plan"]
+                    for i in plan["todo"]:
+                        plan["ids"][i] = ids[off]
+                        off += 1
+                    try:
+                        commit_file(parsed, job["st"], plan, model, job["entry"])
+                    except Exception as e:
+                        fail(job["path"], e)
+                        continue
+                    results[os.path.basename(job["path"])] = len(plan["todo"])
+                    prog.add(
+                        files_written=1,
+                        files_touched=int(parsed["touched"]),
+                        chunks_reused=len(plan["ids"]) - len(plan["todo"]),
+                        chunks_removed=len(plan["stale"]),
+                    )
+                get_manifest().save()
+            prog.add(write_batches=1)
+            jobs.clear()
+            rows = 0
+            report("write")
+
+        while True:
+            try:
+                item = write_q.get(timeout=0.2 if jobs else 1.0)
+            except queue.Empty:
+                flush()
+                if stop.is_set():
+                    break
+                continue
+            if item is _DONE:
+                break
+            jobs.append(item)
+            rows += len(item["plan"]["todo"])
+            if rows >= WRITE_BATCH:
+                flush()
+        flush()
+
+    def guarded(stage: Callable[[], None]) -> Callable[[], None]:
+        def run() -> None:
+            try:
+                stage()
+            except Exception as e:
+                logger.error("ingest pipeline %s crashed: %s", stage.__name__, e)
+                stop.set()
+
+        return run
+
+    threads = [
+        threading.Thread(target=guarded(fn), name=f"ingest-{fn.__name__}", daemon=True)
+        for fn in (parse_stage, embed_stage, write_stage)
+    ]
+    for t in threads:
+        t.start()
+    try:
+        for t in threads:
+            t.join()
+    except BaseException:
+        stop.set()
+        raise
+    report("done")
+    snap = _last_progress
+    logger.info(
+        "ingested %d files: %d chunks embedded, %d reused in %.1fs "
+        "(%.1f pages/s, %.1f chunks/s)",
+        snap["files_written"], snap["chunks_embedded"], snap["chunks_reused"],
+        snap["elapsed_s"], snap["pages_per_sec"], snap["chunks_per_sec"],
+    )
+    return results
+
+
+def get_progress() -> Dict:
+    """Progress of the running (or last) ingest_files() call."""
+    return dict(_last_progress)
@@ -1,19 +1,95 @@
 # rag/rag_engine.py — Main RAG interface
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
 from rag.retriever import hybrid_search
 from rag.reranker import rerank
-from rag.vector_store import count
+from rag.vector_store import corpus_version, count
+
+# Retrieval result cache — (normalized query, top_k, reranked, corpus version).
+# Any ingest/delete bumps the corpus version and empties the cache, so a
+# cached answer can never cite a removed document.
+QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", 256))
+_cache: "OrderedDict[tuple, list]" = OrderedDict()
+_cache_version = None
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+_STAGES = ("vector_ms", "bm25_ms", "fuse_ms", "rerank_ms", "total_ms")
+_stage_ms = {stage: deque(maxlen=256) for stage in _STAGES}
+
+
+def _record(timings: dict) -> None:
+    for stage in _STAGES:
+        if stage in timings:
+            _stage_ms[stage].append(timings[stage])
+
+
+def _normalize(query: str) -> str:
+    return re.sub(r"\s+", " ", query.lower()).strip()
+
+
+def _cache_get(key: tuple, version):
+    global _cache_version
+    with _cache_lock:
+        if version != _cache_version:
+            if _cache:
+                _cache_stats["invalidations"] += 1
+            _cache.clear()
+            _cache_version = version
+        hit = _cache.get(key)
+        if hit is None:
+            _cache_stats["misses"] += 1
+            return None
+        _cache.move_to_end(key)
+        _cache_stats["hits"] += 1
+        return copy.deepcopy(hit)
+
+
+def _cache_put(key: tuple, version, results: list) -> None:
+    with _cache_lock:
+        if version != _cache_version:
+            return  # corpus changed while we were retrieving
+        _cache[key] = copy.deepcopy(results)
+        while len(_cache) > QUERY_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def retrieve(query: str, top_k: int = 3, use_reranker: bool = True) -> list[dict]:
+    """Ranked chunks for a query (cached per corpus version)."""
+    version = corpus_version()
+    key = (_normalize(query), top_k, bool(use_reranker))
+    cached = _cache_get(key, version)
+    if cached is not None:
+        return cached
+    t0 = time.perf_counter()
+    timings = {}
+    try:
+        results = hybrid_search(query, top_k=top_k * 2, timings=timings)
+        if results and use_reranker and len(results) > 1:
+            results = rerank(query, results, top_k=top_k, timings=timings)
+        else:
+            results = results[:top_k]
+    finally:
+        timings["total_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        _record(timings)
+    _cache_put(key, version, results)
+    return results
 
 
 def query_rag(query: str, top_k: int = 3, use_reranker: bool = True) -> str:
     if count() == 0:
         return ""
-    results = hybrid_search(query, top_k=top_k * 2)
-    if not results:
-        return ""
-    if use_reranker and len(results) > 1:
-        results = rerank(query, results, top_k=top_k)
-    else:
-        results = results[:top_k]
+    results = retrieve(query, top_k=top_k, use_reranker=use_reranker)
     if not results:
         return ""
     context_parts = []
@@ -56,3 +132,31 @@ def should_use_rag(query: str) -> bool:
     if any(p in q for p in personal):
         return False
     return True
+
+
+def get_stats() -> dict:
+    """Per-stage latency (avg / p95 ms over recent queries) + reranker stats."""
+    from rag.pipeline import get_progress
+    from rag.reranker import get_stats as reranker_stats
+
+    stages = {}
+    for stage, samples in _stage_ms.items():
+        lat = sorted(samples)
+        stages[stage] = {
+            "samples": len(lat),
+            "avg_ms": round(sum(lat) / len(lat), 2) if lat else 0.0,
+            "p95_ms": round(lat[int(len(lat) * 0.95)], 2) if lat else 0.0,
+        }
+    lookups = _cache_stats["hits"] + _cache_stats["misses"]
+    return {
+        "stages": stages,
+        "query_cache": {
+            **_cache_stats,
+            "size": len(_cache),
+            "capacity": QUERY_CACHE_SIZE,
+            "hit_rate": round(_cache_stats["hits"] / lookups, 3) if lookups else 0.0,
+            "corpus_version": corpus_version(),
+        },
+        "reranker": reranker_stats(),
+        "ingest": get_progress(),
+    }
@@ -1,5 +1,40 @@
 # rag/reranker.py — Cross-encoder reranking
+# The CrossEncoder is the most expensive stage of a RAG turn, so it is guarded:
+#   * scores are cached per (normalized query hash, chunk id) and dropped when
+#     the RAG corpus version changes
+#   * a clear first-stage winner (fused_score margin ≥ RERANK_SKIP_MARGIN)
+#     skips the model entirely
+#   * uncached candidates are capped so predicted model time stays within
+#     RERANK_BUDGET_MS, using a running per-pair latency estimate
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+RERANK_MODEL = os.getenv("RERANK_MODEL", "BAAI/bge-reranker-base")
+CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", 4096))
+SKIP_MARGIN = float(os.getenv("RERANK_SKIP_MARGIN", 0.15))  # ≤ 0 disables
+BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 150))  # ≤ 0 disables the cap
+_EWMA_ALPHA = 0.2
+
 _reranker = None
+_lock = threading.Lock()
+_cache: "OrderedDict[tuple, float]" = OrderedDict()
+_cache_version = None
+_pair_ms = None  # running estimate of CrossEncoder ms per pair
+_stats = {
+    "calls": 0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "skipped_margin": 0,
+    "capped": 0,
+    "pairs_scored": 0,
+}
 
 
 def _get_reranker():
@@ -7,20 +42,151 @@ def _get_reranker():
     if _reranker is None:
         from sentence_transformers import CrossEncoder
 
-        _reranker = CrossEncoder("BAAI/bge-reranker-base")
+        _reranker = CrossEncoder(RERANK_MODEL)
     return _reranker
 
 
-def rerank(query: str, chunks: list[dict], top_k: int = 3) -> list[dict]:
+def _query_hash(query: str) -> str:
+    norm = re.sub(r"\s+", " ", query.lower()).strip()
+    return hashlib.sha256(norm.encode("utf-8", "ignore")).hexdigest()[:32]
+
+
+def _chunk_key(chunk: dict) -> str:
+    return chunk.get("id") or hashlib.sha256(
+        chunk["text"].encode("utf-8", "ignore")
+    ).hexdigest()[:32]
+
+
+def _corpus_version():
+    try:
+        from rag.vector_store import corpus_version
+
+        return corpus_version()
+    except Exception:
+        return None
+
+
+def _cached_scores(qh: str, chunks: list[dict], version) -> list:
+    global _cache_version
+    with _lock:
+        if version != _cache_version:
+            _cache.clear()
+            _cache_version = version
+        out = []
+        for c in chunks:
+            key = (qh, _chunk_key(c))
+            score = _cache.get(key)
+            if score is not None:
+                _cache.move_to_end(key)
+                _stats["cache_hits"] += 1
+            else:
+                _stats["cache_misses"] += 1
+            out.append(score)
+        return out
+
+
+def _cache_put(qh: str, chunks: list[dict], scores, version) -> None:
+    with _lock:
+        if version != _cache_version:
+            return
+        for c, s in zip(chunks, scores):
+            _cache[(qh, _chunk_key(c))] = float(s)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _clear_winner(chunks: list[dict]) -> bool:
+    if SKIP_MARGIN <= 0 or len(chunks) < 2:
+        return False
+    if "fused_score" not in chunks[0] or "fused_score" not in chunks[1]:
+        return False
+    first, second = chunks[0]["fused_score"], chunks[1]["fused_score"]
+    return first >= second and first - second >= SKIP_MARGIN
+
+
+def candidate_cap(top_k: int) -> int:
+    """Uncached pairs affordable within BUDGET_MS (never fewer than top_k)."""
+    if BUDGET_MS <= 0 or not _pair_ms:
+        return 1 << 30
+    return max(top_k, int(BUDGET_MS / _pair_ms))
+
+
+def rerank(
+    query: str, chunks: list[dict], top_k: int = 3, timings: dict = None
+) -> list[dict]:
+    """
+    Reorder first-stage candidates (best first) with the cross-encoder.
+    Candidates left unscored by the budget cap keep their first-stage order
+    after the scored ones. `timings` (if given) receives per-stage ms.
+    """
+    global _pair_ms
     if not chunks:
         return []
+    t0 = time.perf_counter()
+    timings = timings if timings is not None else {}
+    _stats["calls"] += 1
+    if _clear_winner(chunks):
+        _stats["skipped_margin"] += 1
+        timings["rerank_skipped"] = True
+        timings["rerank_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        return chunks[:top_k]
     try:
-        reranker = _get_reranker()
-        pairs = [(query, c["text"]) for c in chunks]
-        scores = reranker.predict(pairs)
-        for i, chunk in enumerate(chunks):
-            chunk["rerank_score"] = float(scores[i])
-        reranked = sorted(chunks, key=lambda x: x["rerank_score"], reverse=True)
-        return reranked[:top_k]
-    except Exception:
+        version = _corpus_version()
+        qh = _query_hash(query)
+        scores = _cached_scores(qh, chunks, version)
+        todo = [i for i, s in enumerate(scores) if s is None]
+        cap = candidate_cap(top_k)
+        if len(todo) > cap:
+            _stats["capped"] += 1
+            todo = todo[:cap]
+        timings["rerank_cache_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        if todo:
+            model = _get_reranker()
+            t1 = time.perf_counter()
+            fresh = model.predict([(query, chunks[i]["text"]) for i in todo])
+            ms = (time.perf_counter() - t1) * 1000
+            timings["rerank_model_ms"] = round(ms, 2)
+            per_pair = ms / len(todo)
+            _pair_ms = (
+                per_pair
+                if _pair_ms is None
+                else _EWMA_ALPHA * per_pair + (1 - _EWMA_ALPHA) * _pair_ms
+            )
+            _stats["pairs_scored"] += len(todo)
+            for i, s in zip(todo, fresh):
+                scores[i] = float(s)
+            _cache_put(qh, [chunks[i] for i in todo], fresh, version)
+        scored, rest = [], []
+        for chunk, s in zip(chunks, scores):
+            if s is None:
+                rest.append(chunk)
+            else:
+                chunk["rerank_score"] = s
+                scored.append(chunk)
+        scored.sort(key=lambda x: x["rerank_score"], reverse=True)
+        return (scored + rest)[:top_k]
+    except Exception as e:
+        logger.warning("rerank failed, using first-stage order: %s", e)
         return chunks[:top_k]
+    finally:
+        timings["rerank_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
+
+
+def get_stats() -> dict:
+    lookups = _stats["cache_hits"] + _stats["cache_misses"]
+    return {
+        **_stats,
+        "model": RERANK_MODEL,
+        "loaded": _reranker is not None,
+        "cache_size": len(_cache),
+        "cache_hit_rate": round(_stats["cache_hits"] / lookups, 3) if lookups else 0.0,
+        "skip_margin": SKIP_MARGIN,
+        "budget_ms": BUDGET_MS,
+        "pair_ms_estimate": round(_pair_ms, 3) if _pair_ms else None,
+        "candidate_cap": candidate_cap(0) if _pair_ms and BUDGET_MS > 0 else None,
+    }
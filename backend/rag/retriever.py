@@ -1,9 +1,15 @@
 # rag/retriever.py — Hybrid search: FAISS + BM25
+import time
+
 import numpy as np
 from rank_bm25 import BM25Okapi
 from rag.embeddings import embed
 from rag.vector_store import search, _load_meta
 
+# First-stage fusion: vector cosine score + BM25 normalized to the best hit
+VECTOR_WEIGHT = 0.7
+BM25_WEIGHT = 0.3
+
 
 def _bm25_search(query: str, top_k: int = 5) -> list[dict]:
     meta = _load_meta()
@@ -20,20 +26,34 @@ def _bm25_search(query: str, top_k: int = 5) -> list[dict]:
     ]
 
 
-def hybrid_search(query: str, top_k: int = 5) -> list[dict]:
+def hybrid_search(query: str, top_k: int = 5, timings: dict = None) -> list[dict]:
+    timings = timings if timings is not None else {}
+    t0 = time.perf_counter()
     query_vec = embed(query)
     vec_results = search(query_vec, top_k=top_k)
     for r in vec_results:
         r["method"] = "vector"
+        r["fused_score"] = VECTOR_WEIGHT * r["score"]
+    t1 = time.perf_counter()
     bm25_results = _bm25_search(query, top_k=top_k)
-    # Merge — deduplicate by text
-    seen = set()
-    merged = []
+    t2 = time.perf_counter()
+    best_bm25 = max((r["score"] for r in bm25_results), default=0.0) or 1.0
+    # Merge — deduplicate by text; a chunk found by both gets both contributions
+    merged = {}
     for r in vec_results + bm25_results:
         key = r["text"][:80]
-        if key not in seen:
-            seen.add(key)
-            merged.append(r)
-    # Sort by score descending
-    merged.sort(key=lambda x: x["score"], reverse=True)
-    return merged[:top_k]
+        part = (
+            BM25_WEIGHT * r["score"] / best_bm25
+            if r["method"] == "bm25"
+            else r["fused_score"]
+        )
+        if key in merged:
+            merged[key]["fused_score"] += part
+            merged[key]["method"] = "hybrid"
+        else:
+            merged[key] = {**r, "fused_score": part}
+    results = sorted(merged.values(), key=lambda x: x["fused_score"], reverse=True)
+    timings["vector_ms"] = round((t1 - t0) * 1000, 2)
+    timings["bm25_ms"] = round((t2 - t1) * 1000, 2)
+    timings["fuse_ms"] = round((time.perf_counter() - t2) * 1000, 2)
+    return results[:top_k]
@@ -7,24 +7,45 @@ so that rag/ingest.py, rag/retriever.py, and rag/rag_engine.py continue to work
 without modification.
 """
 
+import json
 import logging
+import os
 from typing import List, Dict
 import numpy as np
 
 logger = logging.getLogger(__name__)
 _RAG_SOURCE = "rag_chunk"
+_CHUNK_COLUMNS = ["id", "text", "source", "user", "user_id", "fact_type", "priority", "ts"]
+_corpus_version = 0
 
 
-def add_chunks(chunks: List[str], embeddings: np.ndarray, source: str = "manual", tags: List[str] = None) -> None:
+def corpus_version() -> int:
+    """Bumped on every RAG chunk write/delete — keys the reranker and query caches."""
+    return _corpus_version
+
+
+def _bump_corpus_version() -> None:
+    global _corpus_version
+    _corpus_version += 1
+
+
+def add_chunks(chunks: List[str], embeddings: np.ndarray, source: str = "manual", tags: List[str] = None) -> List[str]:
+    """Store chunks with their embeddings. Returns the new chunk ids ([] on failure)."""
+    fact_type = ",".join(tags) if tags else "rag"
+    return add_chunk_rows(chunks, embeddings, [source] * len(chunks), [fact_type] * len(chunks))
+
+
+def add_chunk_rows(chunks: List[str], embeddings: np.ndarray, sources: List[str], fact_types: List[str]) -> List[str]:
+    """One bulk tbl.add() for chunks from any number of files. Returns new ids."""
     try:
         import pyarrow as pa
         import time
         import uuid
-        from memory.vector_store import _get_table
+        from memory.vector_store import _get_table, _index_hook
         tbl = _get_table()
         if tbl is None:
             logger.error("add_chunks: LanceDB table unavailable")
-            return
+            return []
         rows = {"id": [], "text": [], "vector": [], "source": [], "user": [], "user_id": [], "fact_type": [], "priority": [], "ts": []}
         now = time.time()
         for i, chunk in enumerate(chunks):
@@ -33,42 +54,70 @@ def add_chunks(chunks: List[str], embeddings: np.ndarray, source: str = "manual"
             rows["text"].append(chunk)
             rows["vector"].append(vec)
             rows["source"].append(_RAG_SOURCE)
-            rows["user"].append(source)
+            rows["user"].append(sources[i])
             rows["user_id"].append("rag")
-            rows["fact_type"].append(",".join(tags) if tags else "rag")
+            rows["fact_type"].append(fact_types[i])
             rows["priority"].append(0.7)
             rows["ts"].append(now)
         tbl.add(pa.table(rows))
-        logger.info("add_chunks: stored %d chunks from source=%s", len(chunks), source)
+        _index_hook("add", tbl, [dict(zip(rows, vals)) for vals in zip(*rows.values())])
+        _bump_corpus_version()
+        names = sorted(set(sources))
+        logger.info("add_chunks: stored %d chunks from source=%s", len(chunks), names[0] if len(names) == 1 else f"{len(names)} files")
+        return rows["id"]
     except Exception as e:
         logger.error("add_chunks error: %s", e)
+        return []
+
+
+def delete_chunks(ids: List[str]) -> int:
+    """Remove chunks by id. Returns rows deleted."""
+    if not ids:
+        return 0
+    try:
+        from memory.vector_store import _delete_ids
+        return _delete_ids(list(ids))
+    except Exception as e:
+        logger.error("delete_chunks error: %s", e)
+        return 0
+    finally:
+        _bump_corpus_version()
 
 
 def search(query_vec: np.ndarray, top_k: int = 5) -> List[Dict]:
     try:
-        from memory.vector_store import _get_table
-        tbl = _get_table()
-        if tbl is None:
-            return []
+        from memory.vector_store import _search_rows
         vec = query_vec.tolist() if hasattr(query_vec, "tolist") else list(query_vec)
         if isinstance(vec[0], list):
             vec = vec[0]
-        results = tbl.search(vec).where(f"source = '{_RAG_SOURCE}'", prefilter=True).limit(top_k).to_list()
-        return [{"text": r["text"], "score": round(1.0 - float(r.get("_distance", 1.0)), 3), "source": r.get("user", "unknown")} for r in results]
+        results = _search_rows(vec, top_k, source=_RAG_SOURCE)
+        return [{"id": r["id"], "text": r["text"], "score": round(1.0 - float(r.get("_distance", 1.0)), 3), "source": r.get("user", "unknown")} for r in results]
     except Exception as e:
         logger.error("search error: %s", e)
         return []
 
 
+def delete_source(source: str) -> int:
+    """Remove every chunk ingested from `source` (file name). Returns rows deleted."""
+    try:
+        from memory.vector_store import _delete_ids, _scan, _sql_str
+        ids = [r["id"] for r in _scan(f"source = '{_RAG_SOURCE}' AND user = {_sql_str(source)}", ["id"])]
+        n = _delete_ids(ids) if ids else 0
+        if n:
+            logger.info("delete_source: removed %d chunks from source=%s", n, source)
+        return n
+    except Exception as e:
+        logger.error("delete_source error: %s", e)
+        return 0
+    finally:
+        _bump_corpus_version()
+
+
 def _load_meta() -> List[Dict]:
     try:
-        from memory.vector_store import _get_table
-        tbl = _get_table()
-        if tbl is None:
-            return []
-        df = tbl.to_pandas()
-        rag_rows = df[df["source"] == _RAG_SOURCE]
-        return [{"text": row["text"], "source": row["user"]} for _, row in rag_rows.iterrows()]
+        from memory.vector_store import _scan
+        rows = _scan(f"source = '{_RAG_SOURCE}'", ["id", "text", "user"])
+        return [{"id": r["id"], "text": r["text"], "source": r["user"]} for r in rows]
     except Exception as e:
         logger.error("_load_meta error: %s", e)
         return []
@@ -80,8 +129,81 @@ def count() -> int:
         tbl = _get_table()
         if tbl is None:
             return 0
-        df = tbl.to_pandas()
-        return int((df["source"] == _RAG_SOURCE).sum())
+        return int(tbl.count_rows(f"source = '{_RAG_SOURCE}'"))
     except Exception as e:
         logger.error("count error: %s", e)
         return 0
+
+
+# ── Migration: re-embed chunks into the shared embedding space ────────────────
+
+
+def _marker_path() -> str:
+    from memory.vector_store import DB_DIR
+    return os.path.join(DB_DIR, "rag_embed_model.json")
+
+
+def embedded_with() -> str:
+    """Model that embedded the stored RAG chunks ("" if never recorded)."""
+    try:
+        with open(_marker_path()) as f:
+            return json.load(f).get("model", "")
+    except Exception:
+        return ""
+
+
+def _mark_embedded(model: str) -> None:
+    os.makedirs(os.path.dirname(_marker_path()), exist_ok=True)
+    with open(_marker_path(), "w") as f:
+        json.dump({"model": model}, f)
+
+
+def reembed_chunks(batch_size: int = 64, force: bool = False) -> int:
+    """
+    Re-embed every stored RAG chunk with the shared embedding model.
+    Chunks ingested before the embedding service existed were encoded with
+    all-MiniLM-L6-v2 and are not comparable to memory query vectors.
+    New rows are written before the old ones are deleted, so an interrupted
+    run never loses chunks. Returns number of chunks re-embedded.
+    """
+    from core.embedding_service import get_embedding_service
+    from memory.vector_store import _get_table, _index_hook
+    from rag.manifest import get_manifest
+
+    svc = get_embedding_service()
+    if not force and embedded_with() == svc.model_name:
+        return 0
+    tbl = _get_table()
+    if tbl is None:
+        return 0
+    try:
+        import pyarrow as pa
+        import uuid
+        manifest = get_manifest()
+        where = f"source = '{_RAG_SOURCE}'"
+        n = tbl.count_rows(where)
+        rows = tbl.search().where(where).select(_CHUNK_COLUMNS).limit(max(n, 1)).to_list() if n else []
+        done = 0
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            vecs = svc.embed_batch([r["text"] for r in batch])
+            new = {c: [r[c] for r in batch] for c in _CHUNK_COLUMNS}
+            new["id"] = [str(uuid.uuid4()) for _ in batch]
+            new["vector"] = [v.tolist() for v in vecs]
+            tbl.add(pa.table(new))
+            _index_hook("add", tbl, [dict(zip(new, vals)) for vals in zip(*new.values())])
+            ids_sql = ", ".join(f"'{r['id']}'" for r in batch)
+            tbl.delete(f"id IN ({ids_sql})")
+            _index_hook("delete", tbl, [r["id"] for r in batch])
+            _bump_corpus_version()
+            manifest.remap_ids({r["id"]: i for r, i in zip(batch, new["id"])})
+            manifest.save()
+            done += len(batch)
+        manifest.set_model(svc.model_name)
+        manifest.save()
+        _mark_embedded(svc.model_name)
+        logger.info("reembed_chunks: %d chunks re-embedded with %s", done, svc.model_name)
+        return done
+    except Exception as e:
+        logger.error("reembed_chunks error: %s", e)
+        return 0
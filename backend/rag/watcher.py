@@ -1,76 +1,72 @@
 # rag/watcher.py — Watch ~/ASTRA/docs/ and auto-ingest new files
+# What has been ingested lives in the persistent manifest (rag/manifest.py), so
+# a restart only stats the folder: new and edited files are (diff-)ingested,
+# deleted files are purged, everything else is skipped. Changes are pushed by
+# the shared file watcher (core/file_watcher.py) instead of a 30 s poll.
 import os
-import time
 import logging
 import threading
 
 logger = logging.getLogger(__name__)
 DOCS_DIR = os.path.expanduser("~/ASTRA/docs")
-_EXTS = {".pdf", ".txt", ".md"}  # .py excluded — never index source code
-_ingested = set()  # track already-processed files in this session
-_thread = None
+_EXTS = [".pdf", ".txt", ".md"]  # .py excluded — never index source code
+_started = False
+_scan_lock = threading.Lock()  # watcher callback vs. ingest_now()
 
 
-def _scan_and_ingest():
-    from rag.ingest import ingest_file
+def _scan_and_ingest() -> dict:
+    from rag.ingest import reconcile
 
     os.makedirs(DOCS_DIR, exist_ok=True)
-    for fname in os.listdir(DOCS_DIR):
-        path = os.path.join(DOCS_DIR, fname)
-        ext = os.path.splitext(fname)[1].lower()
-        if not os.path.isfile(path) or ext not in _EXTS:
-            continue
-        # Use (path, mtime) as cache key so re-saved files re-ingest
-        key = (path, os.path.getmtime(path))
-        if key in _ingested:
-            continue
-        try:
-            n = ingest_file(path, tags=["docs", ext.strip(".")])
-            logger.info(f"📄 Ingested '{fname}' → {n} chunks")
-            _ingested.add(key)
-        except Exception as e:
-            logger.warning(f"Ingest failed for '{fname}': {e}")
+    with _scan_lock:
+        results = reconcile(DOCS_DIR, extensions=_EXTS)
+    for fname, n in results.items():
+        if n == "removed":
+            logger.info(f"🗑️ Removed '{fname}' from the index")
+        elif isinstance(n, int):
+            logger.info(f"📄 Ingested '{fname}' → {n} chunks embedded")
+    return results
 
 
-def _watch_loop(interval: int):
-    logger.info(f"📂 Doc watcher started — watching {DOCS_DIR}")
-    while True:
-        try:
-            _scan_and_ingest()
-        except Exception as e:
-            logger.warning(f"Watcher scan error: {e}")
-        time.sleep(interval)
+def _on_change(changes: dict) -> None:
+    """File-watch callback: reconcile is a stat() per file, so just rerun it."""
+    try:
+        _scan_and_ingest()
+    except Exception as e:
+        logger.warning(f"Watcher scan error: {e}")
 
 
-def start_watcher(interval: int = 30):
-    """Start background thread that checks DOCS_DIR every `interval` seconds."""
-    global _thread
-    if _thread and _thread.is_alive():
+def start_watcher(interval: int = None):
+    """
+    Ingest what changed while we were down, then subscribe DOCS_DIR to the
+    shared file watcher (core/file_watcher.py). Ingestion starts within
+    FILE_WATCH_DEBOUNCE_MS of a file landing. `interval` is kept for callers
+    of the old polling loop; the poll backend uses FILE_WATCH_POLL_INTERVAL.
+    """
+    global _started
+    if _started:
         return
+    from core.file_watcher import get_file_watcher
+
     os.makedirs(DOCS_DIR, exist_ok=True)
-    _thread = threading.Thread(target=_watch_loop, args=(interval,), daemon=True)
-    _thread.start()
+    _started = True
+    try:
+        _scan_and_ingest()
+    except Exception as e:
+        logger.warning(f"Watcher scan error: {e}")
+    watcher = get_file_watcher()
+    watcher.watch(
+        "docs",
+        DOCS_DIR,
+        _on_change,
+        recursive=True,
+        accept=lambda p: os.path.splitext(p)[1].lower() in _EXTS,
+    )
     logger.info(
-        f"✅ Doc watcher running (interval={interval}s) — drop files into {DOCS_DIR}"
+        f"✅ Doc watcher running ({watcher.backend}) — drop files into {DOCS_DIR}"
     )
 
 
 def ingest_now() -> dict:
-    """Manually trigger a scan. Returns {filename: chunk_count}."""
-    from rag.ingest import ingest_file
-
-    os.makedirs(DOCS_DIR, exist_ok=True)
-    results = {}
-    for fname in os.listdir(DOCS_DIR):
-        path = os.path.join(DOCS_DIR, fname)
-        ext = os.path.splitext(fname)[1].lower()
-        if not os.path.isfile(path) or ext not in _EXTS:
-            continue
-        try:
-            n = ingest_file(path, tags=["docs", ext.strip(".")])
-            results[fname] = n
-            key = (path, os.path.getmtime(path))
-            _ingested.add(key)
-        except Exception as e:
-            results[fname] = f"error: {e}"
-    return results
+    """Manually trigger a scan. Returns {filename: chunks embedded | "removed" | error}."""
+    return _scan_and_ingest()
@@ -0,0 +1,70 @@
+"""
+Benchmark the cold memory tier: recall@k, RAM, disk and query latency for
+float32 brute force vs float16 / PQ codes, with and without exact re-rank.
+
+    python scripts/bench_cold_tier.py [rows] [queries]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _corpus(n: int, seed: int = 0) -> np.ndarray:
+    # Clustered unit vectors — closer to real sentence embeddings than pure noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n // 200), 384))
+    x = centers[rng.integers(0, len(centers), n)] + 0.35 * rng.standard_normal((n, 384))
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x.astype(np.float32)
+
+
+def main() -> int:
+    from memory.cold_tier import ColdSegment
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    nq = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    k = 10
+    x = _corpus(n)
+    queries = x[np.random.default_rng(1).choice(n, nq, replace=False)]
+    truth = [set(np.argsort(((x - q) ** 2).sum(1))[:k]) for q in queries]
+    rows = [
+        {"id": str(i), "text": f"row {i}", "vector": x[i], "source": "exchange",
+         "user": "user", "user_id": "default", "fact_type": "exchange",
+         "priority": 0.5, "ts": float(i)}
+        for i in range(n)
+    ]
+
+    t0 = time.perf_counter()
+    for q in queries:
+        np.argpartition(((x - q) ** 2).sum(1), k)[:k]
+    base_ms = (time.perf_counter() - t0) * 1000 / nq
+    print(f"[bench_cold_tier] rows={n} queries={nq} k={k}")
+    print(f"{'variant':<26}{'recall@k':>9}{'ram MB':>9}{'disk MB':>9}{'ms/query':>10}")
+    print(f"{'float32 brute force':<26}{1.0:>9.3f}{x.nbytes / 1e6:>9.1f}{'-':>9}{base_ms:>10.2f}")
+
+    for codec, keep_exact in (("float16", True), ("float16", False), ("pq", True), ("pq", False)):
+        with tempfile.TemporaryDirectory() as tmp:
+            seg = ColdSegment(tmp, codec=codec, keep_exact=keep_exact)
+            seg.append(rows)
+            hits = 0
+            t0 = time.perf_counter()
+            for q, want in zip(queries, truth):
+                hits += len(want & {int(r["id"]) for r in seg.search(q, k)})
+            ms = (time.perf_counter() - t0) * 1000 / nq
+            st = seg.stats()
+            label = f"{codec}{' + exact rerank' if keep_exact else ''}"
+            print(
+                f"{label:<26}{hits / (k * nq):>9.3f}{st['ram_bytes'] / 1e6:>9.1f}"
+                f"{st['disk_bytes'] / 1e6:>9.1f}{ms:>10.2f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+"""
+Entity linking: token Aho-Corasick (knowledge/entity_linker.py) against
+checking every node name as a substring of the lowercased message, at
+growing entity counts. Also times the build and incremental adds; the build
+runs under tracemalloc, so its time is pessimistic.
+
+    python scripts/bench_entity_linker.py [--entities 100000]
+"""
+
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _vocab(rnd, n):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rnd.choice(letters) for _ in range(rnd.randint(3, 9))) for _ in range(n)]
+
+
+def _naive(names, text):
+    """The per-node loop: substring test, then a boundary check on each hit."""
+    low = text.lower()
+    hits = []
+    for node_id, name in names:
+        i = low.find(name)
+        if i >= 0 and re.search(rf"(?<!\w){re.escape(name)}(?!\w)", low):
+            hits.append(node_id)
+    return hits
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    biggest = int(args[args.index("--entities") + 1]) if "--entities" in args else 100_000
+    from knowledge.entity_linker import EntityLinker
+
+    rnd = random.Random(3)
+    words = _vocab(rnd, 30_000)
+    for n in (biggest // 100, biggest // 10, biggest):
+        names = [(f"n{i}", " ".join(rnd.sample(words, rnd.choice((1, 1, 2, 2, 3))))) for i in range(n)]
+        texts = []
+        for _ in range(200):
+            body = rnd.sample(words, 40)
+            for _, name in rnd.sample(names, 3):
+                body.insert(rnd.randrange(len(body)), name.title())
+            texts.append(" ".join(body) + ".")
+
+        tracemalloc.start()
+        t = time.perf_counter()
+        linker = EntityLinker(names)
+        t_build = time.perf_counter() - t
+        mem = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+        new_ms = []
+        for text in texts:
+            t = time.perf_counter()
+            linker.find(text)
+            new_ms.append((time.perf_counter() - t) * 1000)
+        old_ms = []
+        for text in texts[:20]:
+            t = time.perf_counter()
+            _naive(names, text)
+            old_ms.append((time.perf_counter() - t) * 1000)
+
+        # one new entity per turn, then a lookup: the delta path
+        add_ms = []
+        for i in range(200):
+            t = time.perf_counter()
+            linker.add(f"new{i}", f"{words[i]} {words[-i - 1]}")
+            linker.find(texts[i])
+            add_ms.append((time.perf_counter() - t) * 1000)
+
+        print(
+            f"{n:7d} entities | build {t_build:5.2f}s {mem:6.1f} MB | "
+            f"find p50 {statistics.median(new_ms):6.3f} ms vs per-node loop {statistics.median(old_ms):8.2f} ms | "
+            f"add+find p50 {statistics.median(add_ms):6.3f} ms max {max(add_ms):7.2f} ms "
+            f"({linker.stats()['rebuilds'] - 1} merges)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
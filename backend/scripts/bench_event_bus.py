@@ -0,0 +1,101 @@
+"""
+EventBus: fixed worker pool with bounded per-subscriber queues
+(core/event_bus.py) against the old publish() that started one thread per
+handler per event. Three subscribers, one of them slow; events are
+published as fast as possible, like a burst of requests. The default queue
+bound drops most of such a burst by design; the second pool run raises it
+to --events so every event is delivered.
+
+    python scripts/bench_event_bus.py [--events 20000]
+"""
+
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class _OldBus:
+    def __init__(self):
+        self._subscribers = {}
+
+    def subscribe(self, event, handler):
+        self._subscribers.setdefault(event, []).append(handler)
+
+    def publish(self, event, data=None):
+        payload = {"event": event, "data": data, "ts": time.time()}
+        for handler in self._subscribers.get(event, []):
+            threading.Thread(target=handler, args=(payload,), daemon=True).start()
+
+
+def _handlers(counter):
+    lock = threading.Lock()
+
+    def count(p):
+        with lock:
+            counter[0] += 1
+
+    def fast(p):
+        count(p)
+
+    def json_log(p):
+        str(p)
+        count(p)
+
+    def slow(p):
+        time.sleep(0.001)
+        count(p)
+
+    return fast, json_log, slow
+
+
+def _run(label, bus, n, flush):
+    counter = [0]
+    for h in _handlers(counter):
+        bus.subscribe("response_done", h)
+    peak = threading.active_count()
+    lat = []
+    t0 = time.perf_counter()
+    for i in range(n):
+        t = time.perf_counter()
+        bus.publish("response_done", {"i": i})
+        lat.append((time.perf_counter() - t) * 1e6)
+        if i % 100 == 0:
+            peak = max(peak, threading.active_count())
+    publish_s = time.perf_counter() - t0
+    flush()
+    total_s = time.perf_counter() - t0
+    lat.sort()
+    print(
+        f"{label:10s} publish p50 {statistics.median(lat):7.1f} us  p99 {lat[int(len(lat) * 0.99)]:8.1f} us | "
+        f"{n / publish_s:9,.0f} events/s published | peak threads {peak:5d} | "
+        f"handled {counter[0]:6d}/{3 * n} in {total_s:5.1f}s"
+    )
+    return bus
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    n = int(args[args.index("--events") + 1]) if "--events" in args else 20_000
+    from core.event_bus import EventBus
+
+    def wait_threads():
+        while threading.active_count() > base:
+            time.sleep(0.05)
+
+    base = threading.active_count()
+    _run("thread/evt", _OldBus(), n, wait_threads)
+    for label, maxsize in (("pool", None), ("pool n", n)):
+        bus = EventBus()
+        bus.configure_topic("response_done", maxsize=maxsize)
+        _run(label, bus, n, lambda: bus.flush(600))
+        for s in bus.get_stats()["subscribers"]:
+            print(f"  {s['handler'].split('.')[-1]:9s} p95 {s['p95_ms']:6.2f} ms  dropped {s['dropped']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
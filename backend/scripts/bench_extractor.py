@@ -0,0 +1,73 @@
+"""
+Graph extraction under a chat burst: the worker in knowledge/auto_extractor.py
+with the old behaviour (one LLM call per message, no rate limit, never yields)
+against batching + yielding. One simulated Ollama model serves chat replies
+and extraction prompts one at a time, so extraction work delays replies.
+
+    python scripts/bench_extractor.py [--messages 40] [--scale 1.0]
+
+Latencies are simulated (--scale stretches them); no Ollama is needed.
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _run(label, n, scale, batch, interval, grace, max_defer):
+    import knowledge.auto_extractor as ax
+    from core.activity import interactive
+
+    model = threading.Lock()  # one model, one generation at a time
+    gen_s, gap_s = 0.30 * scale, 0.45 * scale
+    llm_base, llm_per_text = 0.80 * scale, 0.10 * scale
+
+    def fake_complete(prompt, n_texts):
+        with model:
+            time.sleep(llm_base + llm_per_text * n_texts)
+        return "{}"
+
+    ax._complete = fake_complete
+    ax.BATCH, ax.MIN_INTERVAL, ax.IDLE_GRACE, ax.MAX_DEFER = batch, interval, grace, max_defer
+    w = ax.ExtractionWorker(os.path.join(tempfile.mkdtemp(prefix="bench_ax_"), "q.db"))
+
+    replies = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        with interactive():
+            with model:
+                time.sleep(gen_s)
+        replies.append((time.perf_counter() - t0) * 1000)
+        w.enqueue(f"message {i}: I have been moving our services from Heroku to Fly.io", "User")
+        time.sleep(gap_s)
+    t_end = time.perf_counter()
+    w.flush(600)
+    drain = time.perf_counter() - t_end
+    s = w.stats()
+    print(
+        f"{label:16s} reply p50 {statistics.median(replies):6.0f} ms  max {max(replies):6.0f} ms | "
+        f"llm calls {s['llm_calls']:3d}  avg batch {s['avg_batch_size']:4.1f}  "
+        f"deferred {s['deferred']:3d} | backlog drained {drain:5.2f}s after the last message"
+    )
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    n = int(args[args.index("--messages") + 1]) if "--messages" in args else 40
+    scale = float(args[args.index("--scale") + 1]) if "--scale" in args else 1.0
+    from knowledge import graph
+
+    graph.GRAPH_DB = os.path.join(tempfile.mkdtemp(prefix="bench_ax_kg_"), "kg.db")
+    print(f"reply alone: {300 * scale:.0f} ms")
+    _run("per message", n, scale, batch=1, interval=0.0, grace=0.0, max_defer=0.0)
+    _run("batched+yield", n, scale, batch=4, interval=2.0 * scale, grace=1.0 * scale, max_defer=60.0)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+"""
+File watching: idle wakeups and change-to-callback latency for the inotify
+and polling backends of core/file_watcher.py.
+
+    python scripts/bench_file_watch.py [--idle SECONDS] [--files N]
+
+The old setup polled plugins/ every 3 s and docs/ every 30 s (22 wakeups a
+minute while idle, 1.5 s / 15 s mean latency); both now share one watcher.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _run(backend: str, idle: float, n: int) -> dict:
+    import core.file_watcher as fw
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(n):
+            with open(os.path.join(tmp, f"doc{i}.md"), "w") as f:
+                f.write("x")
+        got = threading.Event()
+        w = fw.FileWatcher(backend)
+        w.watch("bench", tmp, lambda changes: got.set(), recursive=True)
+        time.sleep(0.2)
+        cpu0, wake0 = time.process_time(), w.stats()["wakeups"]
+        time.sleep(idle)
+        wakeups = w.stats()["wakeups"] - wake0
+        cpu = time.process_time() - cpu0
+        lat = []
+        for i in range(5):
+            got.clear()
+            t0 = time.perf_counter()
+            with open(os.path.join(tmp, f"new{i}.md"), "w") as f:
+                f.write("y")
+            got.wait(10)
+            lat.append((time.perf_counter() - t0) * 1000)
+        w.stop()
+    return {
+        "backend": w.backend,
+        "wakeups_per_min": wakeups * 60 / idle,
+        "idle_cpu_ms": cpu * 1000,
+        "latency_ms": sum(lat) / len(lat),
+    }
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    idle = float(args[args.index("--idle") + 1]) if "--idle" in args else 10.0
+    n = int(args[args.index("--files") + 1]) if "--files" in args else 2000
+    import core.file_watcher as fw
+
+    print(
+        f"[bench_file_watch] idle={idle}s files={n} "
+        f"debounce={fw.DEBOUNCE * 1000:.0f}ms poll_interval={fw.POLL_INTERVAL}s"
+    )
+    backends = ["poll"] + (["inotify"] if sys.platform.startswith("linux") else [])
+    for backend in backends:
+        r = _run(backend, idle, n)
+        print(
+            f"{r['backend']:8s} {r['wakeups_per_min']:7.1f} wakeups/min  "
+            f"{r['idle_cpu_ms']:8.1f} ms idle CPU  {r['latency_ms']:8.1f} ms to callback"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+"""
+Ingestion throughput: serial ingest_file() loop vs the staged pipeline
+(rag/pipeline.py), in pages/sec and chunks/sec.
+
+    python scripts/bench_ingest.py [folder] [--files N] [--fake-embed]
+
+Without a folder, N synthetic text documents are generated. --fake-embed
+swaps the sentence-transformer for a hash-based stub to isolate parsing and
+write throughput (also used automatically when sentence_transformers is
+missing).
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class _FakeModel:
+    def encode(self, texts, normalize_embeddings=True, show_progress_bar=False):
+        out = np.stack(
+            [np.random.default_rng(abs(hash(t)) % 2**32).standard_normal(384) for t in texts]
+        ).astype(np.float32)
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+
+def _synthetic(folder: str, n: int) -> None:
+    rng = np.random.default_rng(0)
+    words = [f"w{i}" for i in range(5000)]
+    for i in range(n):
+        paras = [" ".join(rng.choice(words, 120)) for _ in range(40)]
+        with open(os.path.join(folder, f"doc{i}.txt"), "w") as f:
+            f.write("\n\n".join(paras))
+
+
+def _reset(db_dir: str) -> None:
+    import memory.vector_store as vs
+    import memory.dedup_index as di
+    import memory.cold_tier as ct
+    import memory.vector_index as vi
+    import rag.manifest as manifest
+
+    vs.DB_DIR = db_dir
+    vs._table = None
+    di._index = None
+    ct._segment = None
+    vi._index = None
+    manifest._manifest = None
+
+
+def _files(folder: str):
+    exts = (".pdf", ".md", ".txt")
+    return sorted(
+        os.path.join(root, f)
+        for root, _, files in os.walk(folder)
+        for f in files
+        if f.lower().endswith(exts)
+    )
+
+
+def main() -> int:
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = 24
+    if "--files" in sys.argv:
+        n = int(sys.argv[sys.argv.index("--files") + 1])
+        args = [a for a in args if a != str(n)]
+    fake = "--fake-embed" in sys.argv
+    try:
+        import sentence_transformers  # noqa: F401
+    except ImportError:
+        fake = True
+    if fake:
+        import core.embedding_service as es
+
+        es._service = es.EmbeddingService(model_name="fake")
+        es._service._model = _FakeModel()
+
+    from rag.ingest import ingest_file
+    from rag.pipeline import PARSE_WORKERS, get_progress, ingest_files
+    from rag.vector_store import count
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args[0] if args else os.path.join(tmp, "docs")
+        if not args:
+            os.makedirs(folder)
+            _synthetic(folder, n)
+        paths = _files(folder)
+        print(f"[bench_ingest] files={len(paths)} workers={PARSE_WORKERS} fake_embed={fake}")
+
+        _reset(os.path.join(tmp, "serial"))
+        from rag.ingest import parse_file
+
+        pages = sum(parse_file(p)["pages"] for p in paths)
+        t0 = time.perf_counter()
+        chunks = sum(ingest_file(p) for p in paths)
+        serial = time.perf_counter() - t0
+        print(
+            f"serial    {serial:7.2f}s  {pages / serial:8.1f} pages/s  "
+            f"{chunks / serial:8.1f} chunks/s  ({count()} chunks)"
+        )
+
+        _reset(os.path.join(tmp, "pipeline"))
+        t0 = time.perf_counter()
+        ingest_files(paths)
+        piped = time.perf_counter() - t0
+        prog = get_progress()
+        print(
+            f"pipeline  {piped:7.2f}s  {prog['pages'] / piped:8.1f} pages/s  "
+            f"{prog['chunks_embedded'] / piped:8.1f} chunks/s  ({count()} chunks, "
+            f"{prog['write_batches']} writes)"
+        )
+        print(f"speedup   {serial / piped:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+"""
+Knowledge graph: SQLite store with neighbourhood cache (knowledge/graph.py)
+against the old NetworkX graph that rewrote knowledge_graph.json on every
+relation and scanned all edges for queries.
+
+    python scripts/bench_knowledge_graph.py [--nodes 10000] [--edges 50000]
+"""
+
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+RELATIONS = ["uses", "likes", "works_on", "knows", "part_of", "related_to", "has"]
+
+
+class _OldGraph:
+    """The previous behaviour, reduced to what the benchmark touches."""
+
+    def __init__(self, path):
+        import networkx as nx
+
+        self.G, self.path = nx.DiGraph(), path
+
+    def add_relation(self, s, r, o, save=True):
+        self.G.add_edge(s, o, relation=r, weight=1.0, ts="t")
+        if save:
+            with open(self.path, "w") as f:
+                json.dump(
+                    {
+                        "nodes": [{"id": n, "attrs": {}} for n in self.G.nodes],
+                        "edges": [{"src": u, "dst": v, **d} for u, v, d in self.G.edges(data=True)],
+                    },
+                    f,
+                    indent=2,
+                )
+
+    def get_relations(self, node):
+        G = self.G
+        out = [(node, d["relation"], v, d["weight"]) for _, v, d in G.out_edges(node, data=True)]
+        out += [(u, d["relation"], node, d["weight"]) for u, _, d in G.in_edges(node, data=True)]
+        return sorted(out, key=lambda x: -x[3])
+
+    def query(self, relation):
+        return [(u, v) for u, v, d in self.G.edges(data=True) if d["relation"] == relation]
+
+    def context(self, text, user):
+        hits = []
+        for w in (w.lower().strip(".,?!") for w in text.split() if len(w) > 3):
+            if self.G.has_node(w):
+                hits.extend(self.get_relations(w)[:3])
+        hits.extend(self.get_relations(user)[:4] if self.G.has_node(user) else [])
+        return hits
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))]
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    n_nodes = int(args[args.index("--nodes") + 1]) if "--nodes" in args else 10_000
+    n_edges = int(args[args.index("--edges") + 1]) if "--edges" in args else 50_000
+    from knowledge import graph
+    from utils.logger import system_logger
+
+    system_logger.disabled = True  # one graph_add_relation event per new edge
+    tmp = tempfile.mkdtemp(prefix="bench_kg_")
+    graph.GRAPH_DB = os.path.join(tmp, "kg.db")
+    graph.GRAPH_FILE = os.path.join(tmp, "none.json")
+    old = _OldGraph(os.path.join(tmp, "kg.json"))
+
+    rnd = random.Random(7)
+    # skewed degrees: a few hub entities, a long tail
+    pick = lambda: f"e{int(n_nodes ** rnd.random()) - 1}"  # noqa: E731
+    triples = [(pick(), rnd.choice(RELATIONS), pick()) for _ in range(n_edges)]
+    t0 = time.perf_counter()
+    with graph.batch():
+        for s, r, o in triples:
+            graph.add_relation(s, r, o)
+    for s, r, o in triples:
+        old.add_relation(s, r, o, save=False)
+    print(f"loaded {n_edges} edges in {time.perf_counter() - t0:.1f}s")
+
+    # per-turn writes: a handful of relations each
+    turn = [(pick(), rnd.choice(RELATIONS), pick()) for _ in range(5)]
+    t = time.perf_counter()
+    for s, r, o in turn:
+        old.add_relation(s, r, o)
+    t_old = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    with graph.batch():
+        for s, r, o in turn:
+            graph.add_relation(s, r, o)
+    t_new = (time.perf_counter() - t) * 1000
+    print(f"5-relation turn write:  old {t_old:9.2f} ms   new {t_new:7.3f} ms")
+
+    t = time.perf_counter()
+    old.query("knows")
+    t_old = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    graph.query_graph(subject="e3", relation="knows")
+    t_new = (time.perf_counter() - t) * 1000
+    print(f"query_graph subject+rel: old {t_old:8.2f} ms   new {t_new:7.3f} ms")
+
+    texts = [f"how does e{rnd.randint(0, 50)} relate to e{rnd.randint(0, 500)} today" for _ in range(500)]
+    old_ms, new_ms = [], []
+    for text in texts:
+        t = time.perf_counter()
+        old.context(text, "e0")
+        old_ms.append((time.perf_counter() - t) * 1000)
+        t = time.perf_counter()
+        graph.build_graph_context(text, "e0")
+        new_ms.append((time.perf_counter() - t) * 1000)
+    print(
+        f"build_graph_context:    old p50 {statistics.median(old_ms):6.3f} ms   "
+        f"new p50 {statistics.median(new_ms):6.3f} ms p95 {_pct(new_ms, 0.95):6.3f} ms "
+        f"(cache hits {graph.get_stats()['cache']['hits']})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
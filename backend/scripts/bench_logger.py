@@ -0,0 +1,112 @@
+"""
+astra.* logging: cost of a log_event() call on the request thread with the
+queue-based pipeline (utils/logger.py) against the old synchronous
+FileHandler + StreamHandler, from 4 threads, on a normal disk and on a
+"slow disk" that stalls 2 ms every 100 writes. Burst runs log back to back
+(more than the listener can write, so the bounded queue drops); paced runs
+sleep 200 us between log lines, like a handler waiting on I/O.
+
+    python scripts/bench_logger.py [--calls 20000]
+"""
+
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class _SlowStream:
+    def __init__(self, stream):
+        self._stream, self._n = stream, 0
+
+    def write(self, s):
+        self._n += 1
+        if self._n % 100 == 0:
+            time.sleep(0.002)
+        return self._stream.write(s)
+
+    def __getattr__(self, name):  # seek/tell for RotatingFileHandler, close, ...
+        return getattr(self._stream, name)
+
+
+def _old_logger(name, path, devnull):
+    """The previous utils.logger setup: FileHandler + console on the calling thread."""
+    from utils.logger import JSONFormatter
+
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    fh = logging.FileHandler(path)
+    fh.setFormatter(JSONFormatter())
+    ch = logging.StreamHandler(devnull)
+    ch.setFormatter(logging.Formatter("%(asctime)s [%(name)s] %(message)s", datefmt="%H:%M:%S"))
+    logger.addHandler(fh)
+    logger.addHandler(ch)
+    return logger, fh
+
+
+def _run(label, logger, n, threads=4, pace_us=0):
+    from utils.logger import log_event
+
+    lat = [[] for _ in range(threads)]
+
+    def work(k):
+        out = lat[k]
+        for i in range(n // threads):
+            t = time.perf_counter()
+            log_event(logger, "react_step", step=i, action="web_search", thread=k)
+            out.append((time.perf_counter() - t) * 1e6)
+            if pace_us:  # a handler waiting on I/O between two log lines
+                time.sleep(pace_us / 1e6)
+
+    t0 = time.perf_counter()
+    ts = [threading.Thread(target=work, args=(k,)) for k in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    wall = time.perf_counter() - t0
+    all_lat = sorted(x for part in lat for x in part)
+    print(
+        f"{label:29s} p50 {statistics.median(all_lat):6.1f} us  p99 {all_lat[int(len(all_lat) * 0.99)]:8.1f} us  "
+        f"max {all_lat[-1]:8.1f} us | {len(all_lat) / wall:9,.0f} calls/s"
+    )
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    n = int(args[args.index("--calls") + 1]) if "--calls" in args else 20_000
+    import utils.logger as L
+
+    root = tempfile.mkdtemp(prefix="bench_logger_")
+    devnull = open(os.devnull, "w")
+    L._pipeline.console.setStream(devnull)
+
+    for disk, pace in (("normal", 0), ("slow", 0), ("slow", 200)):
+        key = f"{disk}{pace}"
+        old, old_fh = _old_logger(f"bench.old.{key}", os.path.join(root, f"old-{key}.log"), devnull)
+        new = L._make_logger(f"bench.new.{key}", os.path.join(root, f"new-{key}.log"), logging.INFO)
+        new.propagate = False
+        new_fh = L._pipeline.files[new.name]
+        if disk == "slow":
+            old_fh.stream = _SlowStream(old_fh.stream)
+            new_fh.stream = _SlowStream(new_fh._open())
+        disk = f"{disk}, paced" if pace else f"{disk}, burst"
+        _run(f"sync handlers, {disk}", old, n, pace_us=pace)
+        _run(f"queue pipeline, {disk}", new, n, pace_us=pace)
+        t = time.perf_counter()
+        L.flush(120)
+        print(
+            f"{'':29s} listener drained the rest in {time.perf_counter() - t:.2f}s, "
+            f"dropped {L.get_stats()['dropped'].get(new.name, 0)} (LOG_QUEUE_MAX={L.QUEUE_MAX})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
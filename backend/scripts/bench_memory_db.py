@@ -0,0 +1,95 @@
+"""
+Conversation history: per-turn save + reload latency with the ring cache and
+group-commit writer (memory_db.py) against a commit-per-call baseline.
+
+    python scripts/bench_memory_db.py [--turns N] [--users U]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _baseline(path: str, turns: int, users: int) -> float:
+    """The old path: one transaction per save, a sorted re-query per load."""
+    local = threading.local()
+
+    def conn():
+        if not getattr(local, "c", None):
+            local.c = sqlite3.connect(path, timeout=30)
+            local.c.execute("PRAGMA journal_mode=WAL")
+        return local.c
+
+    def user(uid):
+        c = conn()
+        for i in range(turns):
+            for role, text in (("user", f"q{i}"), ("assistant", f"a{i}")):
+                c.execute(
+                    "INSERT INTO conversations (user_id, role, content, ts) VALUES (?, ?, ?, ?)",
+                    (uid, role, text, time.time()),
+                )
+                c.commit()
+            c.execute(
+                "SELECT role, content FROM (SELECT id, role, content FROM conversations "
+                "WHERE user_id=? ORDER BY id DESC LIMIT 15) ORDER BY id ASC",
+                (uid,),
+            ).fetchall()
+
+    return _timed(user, users)
+
+
+def _timed(fn, users: int) -> float:
+    threads = [threading.Thread(target=fn, args=(f"u{k}",)) for k in range(users)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    turns = int(args[args.index("--turns") + 1]) if "--turns" in args else 500
+    users = int(args[args.index("--users") + 1]) if "--users" in args else 4
+    import memory_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory_db.DB_PATH = os.path.join(tmp, "base.db")
+        memory_db.init_db()
+        base = _baseline(memory_db.DB_PATH, turns, users)
+
+        memory_db.DB_PATH = os.path.join(tmp, "ring.db")
+        memory_db._local.__dict__.clear()
+        memory_db.init_db()
+
+        def user(uid):
+            for i in range(turns):
+                memory_db.save_exchange(f"q{i}", f"a{i}", user_id=uid)
+                memory_db.load_recent_history(n=15, user_id=uid)
+
+        ring = _timed(user, users)
+        t0 = time.perf_counter()
+        memory_db.flush()
+        drain = time.perf_counter() - t0
+        stats = memory_db.get_stats()
+
+    n = turns * users
+    print(f"[bench_memory_db] turns={turns} users={users}")
+    print(f"baseline  {base * 1e6 / n:8.1f} µs/turn")
+    print(f"ring      {ring * 1e6 / n:8.1f} µs/turn  (+{drain * 1000:.1f} ms final flush)")
+    print(
+        f"          hit_rate={stats['hit_rate']}  commits={stats['commits']}  "
+        f"avg_batch={stats['avg_batch']}  max_batch={stats['max_batch']}"
+    )
+    print(f"speedup   {base / ring:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
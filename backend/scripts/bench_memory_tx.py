@@ -0,0 +1,82 @@
+"""
+Memory transactions: one global lock around load → mutate → save (the old
+MemoryTransaction) against per-user optimistic commits (run_transaction).
+Each transaction spends --work-ms in its body, standing in for an emotion
+update or summarization step.
+
+    python scripts/bench_memory_tx.py [--users 8] [--tx 50] [--work-ms 2]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _mutate(work_s: float):
+    def fn(memory):
+        time.sleep(work_s)
+        memory["preferences"]["count"] = memory["preferences"].get("count", 0) + 1
+
+    return fn
+
+
+def _run(users, tx: int, fn) -> float:
+    threads = [threading.Thread(target=lambda u=u: [fn(u) for _ in range(tx)]) for u in users]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    n_users = int(args[args.index("--users") + 1]) if "--users" in args else 8
+    tx = int(args[args.index("--tx") + 1]) if "--tx" in args else 50
+    work = float(args[args.index("--work-ms") + 1]) / 1000 if "--work-ms" in args else 0.002
+
+    import memory.memory_engine as me
+    from memory.memory_transaction import get_stats, run_transaction
+
+    me.DATA_DIR = tempfile.mkdtemp(prefix="bench_memtx_")
+    me.MEMORY_FILE = os.path.join(me.DATA_DIR, "default", "memory.json")
+    mutate = _mutate(work)
+    global_lock = threading.Lock()
+
+    def old(user):
+        with global_lock:
+            memory = me.load_memory(user)
+            mutate(memory)
+            me.save_memory(memory, user)
+
+    def new(user):
+        run_transaction(mutate, user_id=user, retries=1000)
+
+    for k in (1, n_users):
+        users = [f"u{i}" for i in range(k)]
+        t_old = _run(users, tx, old)
+        t_new = _run(users, tx, new)
+        n = k * tx
+        print(
+            f"{k:2d} users x {tx} tx: global lock {n / t_old:7.0f} tx/s   "
+            f"per-user CAS {n / t_new:7.0f} tx/s"
+        )
+
+    before = get_stats()
+    t = _run(["shared"] * n_users, tx, new)
+    after = get_stats()
+    print(
+        f"{n_users} writers, one user: {n_users * tx / t:7.0f} tx/s, "
+        f"conflicts {after['conflicts'] - before['conflicts']}, "
+        f"retries {after['retries'] - before['retries']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+"""
+Trace store: append-only segments + windowed DDSketches (core/observability.py)
+against the old ring buffer that rewrote traces.json every 10 writes and
+sorted every latency for p95 on each get_stats(), at growing history sizes.
+
+    python scripts/bench_observability.py [--traces 50000]
+"""
+
+import collections
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class _OldStore:
+    """The previous ObservabilityStore, with its file path made a parameter."""
+
+    def __init__(self, path, maxlen, flush_every=10):
+        self.path, self.flush_every = path, flush_every
+        self._buffer = collections.deque(maxlen=maxlen)
+        self._n = 0
+
+    def add(self, trace):
+        self._buffer.append(trace)
+        self._n += 1
+        if self._n % self.flush_every == 0:
+            with open(self.path, "w") as f:
+                json.dump(list(self._buffer), f)
+
+    def get_stats(self):
+        traces = list(self._buffer)
+        totals = [t["total_ms"] for t in traces]
+        step_times = {}
+        for t in traces:
+            for s in t.get("steps", []):
+                step_times.setdefault(s["step"], []).append(s["ms"])
+        return {
+            "requests": len(traces),
+            "avg_total_ms": round(sum(totals) / len(totals)),
+            "p95_ms": sorted(totals)[int(len(totals) * 0.95)],
+            "per_step_avg": {k: round(sum(v) / len(v)) for k, v in step_times.items()},
+        }
+
+
+def _traces(rnd, n):
+    models = ["phi3:mini", "llama3:8b", "qwen2.5:7b", "mistral:7b"]
+    for i in range(n):
+        total = rnd.lognormvariate(7, 0.8)
+        yield {
+            "request_id": f"{i:08x}",
+            "total_ms": round(total),
+            "intent": rnd.choice(["chat", "coding", "research"]),
+            "agent": "ollama/" + rnd.choice(models) if i % 5 else "chain_executor",
+            "steps": [
+                {"step": "retrieval", "ms": round(total * 0.1), "meta": ""},
+                {"step": "llm", "ms": round(total * 0.85), "meta": ""},
+            ],
+        }
+
+
+def _time(fn, reps):
+    t = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - t) / reps * 1000
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    biggest = int(args[args.index("--traces") + 1]) if "--traces" in args else 50_000
+    from core.observability import ObservabilityStore
+
+    rnd = random.Random(11)
+    for n in (500, biggest // 10, biggest):
+        root = tempfile.mkdtemp(prefix="bench_obs_")
+        traces = list(_traces(rnd, n))
+        old = _OldStore(os.path.join(root, "traces.json"), maxlen=n)
+        new = ObservabilityStore(os.path.join(root, "segments"))
+
+        # fill both to n traces, then time the last 200 adds at that size
+        head, last = traces[:-200], traces[-200:]
+        old._buffer.extend(head)
+        for tr in head:
+            new.add(tr)
+        t = time.perf_counter()
+        for tr in last:
+            old.add(tr)
+        old_add = (time.perf_counter() - t) / len(last) * 1e6
+        t = time.perf_counter()
+        for tr in last:
+            new.add(tr)
+        new_add = (time.perf_counter() - t) / len(last) * 1e6
+
+        old_stats = _time(old.get_stats, 20)
+        new_stats = _time(new.get_stats, 20)
+        new_summary = _time(lambda: new.summary("5m"), 20)
+        slow = [_time(lambda: new.query(limit=20, min_ms=5000), 1) for _ in range(5)]
+        print(
+            f"{n:6d} traces | add: old {old_add:8.1f} us  new {new_add:5.1f} us | "
+            f"get_stats: old {old_stats:7.2f} ms  new {new_stats:5.2f} ms | "
+            f"summary(5m) {new_summary:5.2f} ms | query slow x20 {statistics.median(slow):6.2f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+"""
+Account export/import: peak Python heap and throughput of the streaming NDJSON
+path (memory/portability.py) against building the whole account as lists and
+serializing it in one piece, for growing account sizes. Timings run under
+tracemalloc, so compare them with each other, not with production.
+
+    python scripts/bench_portability.py [--messages 200000]
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _host(root: str) -> None:
+    import memory_db
+    import memory.memory_engine as me
+    from memory import threads_db
+
+    os.makedirs(root, exist_ok=True)
+    threads_db.close_pool()
+    threads_db.DB_PATH = os.path.join(root, "threads.db")
+    threads_db.init_db()
+    memory_db.flush()
+    memory_db.DB_PATH = os.path.join(root, "memory.db")
+    memory_db._local.__dict__.clear()
+    memory_db.init_db()
+    me.DATA_DIR = os.path.join(root, "users")
+    me._user_caches.clear()
+
+
+def _seed(user: str, messages: int) -> None:
+    import memory_db
+    from memory import threads_db
+
+    text = "a reasonably long chat message about deploying services and fixing bugs " * 3
+    with threads_db._conn() as c:
+        for t in range(messages // 200):
+            tid = str(uuid.uuid4())
+            c.execute(
+                "INSERT INTO threads (id, user_id, title, created_at, updated_at) VALUES (?,?,?,?,?)",
+                (tid, user, f"chat {t}", f"2025-01-01T00:{t:06d}", f"2025-01-01T00:{t:06d}"),
+            )
+            c.executemany(
+                "INSERT INTO messages VALUES (?,?,?,?,?)",
+                [(str(uuid.uuid4()), tid, "user", text, f"2025-01-01T00:{t:06d}.{i:04d}") for i in range(200)],
+            )
+    c = memory_db._conn()
+    with c:
+        c.executemany(
+            memory_db._INSERT_CONVERSATION,
+            [(user, "user", text, None, float(i)) for i in range(messages // 4)],
+        )
+
+
+def _old_export(user: str) -> bytes:
+    """Everything in lists first, then one json.dumps — what the naive endpoint does."""
+    import memory_db
+    from memory import threads_db
+    from memory.memory_engine import load_memory
+
+    threads = threads_db.export_threads(user, None, 1 << 30)
+    for t in threads:
+        t["messages"] = threads_db.get_messages(t["id"], limit=1 << 30)
+    doc = {
+        "memory": load_memory(user),
+        "conversations": memory_db.export_conversations(user, 0, 1 << 30),
+        "threads": threads,
+    }
+    return json.dumps(doc).encode()
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, dt, peak / 1e6
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    biggest = int(args[args.index("--messages") + 1]) if "--messages" in args else 200_000
+    from memory.portability import Importer, encode_ndjson, export_records
+
+    root = tempfile.mkdtemp(prefix="bench_port_")
+    for n in (biggest // 8, biggest // 2, biggest):
+        _host(os.path.join(root, f"src{n}"))
+        _seed("alice", n)
+
+        _, t_old, peak_old = _measure(lambda: len(_old_export("alice")))
+
+        def stream():
+            sink = io.BytesIO()
+            for chunk in encode_ndjson(export_records("alice"), gzip=True):
+                sink.write(chunk)
+                sink.seek(0)
+                sink.truncate()  # discard: we only care about the producer
+            return None
+
+        _, t_new, peak_new = _measure(stream)
+        blob = b"".join(encode_ndjson(export_records("alice"), gzip=True))
+
+        _host(os.path.join(root, f"dst{n}"))
+
+        def load():
+            imp = Importer("alice")
+            for i in range(0, len(blob), 64 * 1024):
+                imp.feed(blob[i : i + 64 * 1024])
+            return imp.finish()
+
+        summary, t_imp, peak_imp = _measure(load)
+        rec = sum(summary["records"].values())
+        print(
+            f"{n:7d} msgs + {n // 4:6d} history | export: lists {peak_old:7.1f} MB {t_old:5.1f}s   "
+            f"stream {peak_new:5.1f} MB {t_new:5.1f}s ({len(blob) / 1e6:.1f} MB gz) | "
+            f"import {peak_imp:5.1f} MB {t_imp:5.1f}s ({rec / t_imp:,.0f} rec/s)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
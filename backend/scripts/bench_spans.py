@@ -0,0 +1,67 @@
+"""
+Span recorder (core/spans.py): cost of one span() outside a trace, in an
+unsampled trace and in a sampled one, and of a whole 40-span request
+exported to the trace store, against an empty loop.
+
+    python scripts/bench_spans.py [--spans 200000]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _per_span(n, fn):
+    t = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t) / n * 1e9
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    n = int(args[args.index("--spans") + 1]) if "--spans" in args else 200_000
+    logging.getLogger("core.spans").disabled = True
+    import core.observability as obs
+    from core import spans
+
+    obs._store = obs.ObservabilityStore(tempfile.mkdtemp(prefix="bench_spans_"))
+
+    def one():
+        with spans.span("retrieval.graph"):
+            pass
+
+    base = _per_span(n, lambda: None)
+    print(f"empty call          {base:7.0f} ns")
+    print(f"span, no trace      {_per_span(n, one) - base:7.0f} ns")
+    for label, rate in (("span, unsampled", 0.0), ("span, sampled", 1.0)):
+        spans.SAMPLE_RATE = rate
+        spans.MAX_SPANS = n + 1
+        root = spans.start_trace("bench", request_id="bench")
+        cost = _per_span(n, one) - base
+        spans.discard_trace(root)
+        print(f"{label:19s} {cost:7.0f} ns")
+
+    spans.MAX_SPANS = 256
+    reqs = max(1, n // 200)
+    t = time.perf_counter()
+    for i in range(reqs):
+        root = spans.start_trace("brain.process", request_id=f"r{i}")
+        for k in range(10):
+            with spans.span(f"handler.h{k}"):
+                with spans.span("retrieval"):
+                    for stage in ("memory", "graph"):
+                        with spans.span(f"retrieval.{stage}"):
+                            pass
+        spans.finish_trace(root, intent="chat", agent="ollama/phi3:mini")
+    per_req = (time.perf_counter() - t) / reqs * 1e6
+    print(f"request, 40 spans   {per_req:7.1f} us incl. JSONL append + sketches")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+"""
+Thread search: FTS5 query latency (threads_db.search_messages) per query shape
+for one user, against the client-side alternative of loading every thread's
+messages and scanning them.
+
+    python scripts/bench_thread_search.py [--threads 10000] [--messages 1000000]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+QUERIES = {
+    "tail term": "w4363",
+    "mid term": "w100",
+    "common term": "w2",
+    "stopword": "of",
+    "two terms": "w2 w50",
+    "prefix": "w12*",
+}
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))]
+
+
+def main() -> int:
+    from bench_threads_db import _build
+
+    args = sys.argv[1:]
+    n_threads = int(args[args.index("--threads") + 1]) if "--threads" in args else 10_000
+    n_messages = int(args[args.index("--messages") + 1]) if "--messages" in args else 1_000_000
+    from memory import threads_db
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_search_"), "threads.db")
+    t0 = time.perf_counter()
+    _build(path, n_threads, n_messages)
+    print(f"built {n_threads} threads / {n_messages} messages (indexed) in {time.perf_counter() - t0:.1f}s")
+    user = "u7"
+
+    for label, q in QUERIES.items():
+        first, nxt = [], []
+        for _ in range(30):
+            t = time.perf_counter()
+            page = threads_db.search_messages(user, q, limit=20)
+            first.append((time.perf_counter() - t) * 1000)
+            if len(page) == 20:
+                t = time.perf_counter()
+                threads_db.search_messages(user, q, limit=20, after=page[-1]["cursor"])
+                nxt.append((time.perf_counter() - t) * 1000)
+        more = f"   next page p50 {_pct(nxt, 0.5):7.2f} ms" if nxt else ""
+        print(
+            f"{label:12s} {q!r:10s} first page p50 {_pct(first, 0.5):7.2f} ms "
+            f"p95 {_pct(first, 0.95):7.2f} ms{more}"
+        )
+
+    # what the UI had to do before: page every thread in and scan
+    t = time.perf_counter()
+    hits = 0
+    for th in threads_db.get_threads(user):
+        after = None
+        while True:
+            page = threads_db.get_messages(th["id"], limit=500, after=after)
+            hits += sum("w4363" in m["content"].split() for m in page)
+            if len(page) < 500:
+                break
+            after = page[-1]["cursor"]
+    print(f"client-side scan for 'w4363': {(time.perf_counter() - t) * 1000:8.1f} ms ({hits} hits)")
+    threads_db.close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
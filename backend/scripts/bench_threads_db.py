@@ -0,0 +1,185 @@
+"""
+Thread store: pooled WAL connections, keyset pages and set-based fork
+(memory/threads_db.py) against the old per-call connection / OFFSET / row-by-row
+access patterns, on one synthetic database.
+
+    python scripts/bench_threads_db.py [--threads 10000] [--messages 1000000]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+USERS = 50
+HOT = 20_000  # messages in the one long thread that is paged and forked
+COMMON = "the a to is and of it you that in for on with can how what".split()
+
+
+def _text(k: int) -> str:
+    """Deterministic chat-like text: common words plus a Zipf-ish tail."""
+    words = []
+    x = k * 2654435761 % 2**32
+    for i in range(8 + k % 17):
+        x = x * 1103515245 + 12345 & 0x7FFFFFFF
+        if x % 3:
+            words.append(COMMON[x % len(COMMON)])
+        else:
+            words.append(f"w{int(5000 ** ((x >> 8) % 1000 / 1000))}")
+    return " ".join(words)
+
+
+def _build(path: str, n_threads: int, n_messages: int) -> str:
+    from memory import threads_db
+
+    threads_db.DB_PATH = path
+    threads_db.init_db()
+    t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    ts = lambda s: (t0 + timedelta(seconds=s)).isoformat()  # noqa: E731
+    with threads_db._conn() as c:
+        c.executemany(
+            "INSERT INTO threads (id, user_id, title, created_at, updated_at) VALUES (?,?,?,?,?)",
+            ((f"t{i}", f"u{i % USERS}", f"chat {i}", ts(i), ts(i)) for i in range(n_threads)),
+        )
+        hot = min(HOT, n_messages // 2)
+        rest = n_messages - hot
+        rows = ((str(uuid.uuid4()), "t0", "user", _text(k), ts(k)) for k in range(hot))
+        c.executemany("INSERT INTO messages VALUES (?,?,?,?,?)", rows)
+        rows = (
+            (str(uuid.uuid4()), f"t{1 + k % (n_threads - 1)}", "user", _text(hot + k), ts(k))
+            for k in range(rest)
+        )
+        c.executemany("INSERT INTO messages VALUES (?,?,?,?,?)", rows)
+        # the indexes the old schema had, for the baseline queries
+        c.execute("CREATE INDEX legacy_messages_thread ON messages(thread_id)")
+        c.execute("CREATE INDEX legacy_threads_user ON threads(user_id)")
+    with threads_db._conn() as c:
+        # one huge build transaction leaves a WAL no real workload would have
+        c.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return "t0"
+
+
+def _legacy_conn(path: str) -> sqlite3.Connection:
+    c = sqlite3.connect(path, timeout=30)
+    c.row_factory = sqlite3.Row
+    return c
+
+
+def _ms(fn, reps: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - t0) * 1000 / reps
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    n_threads = int(args[args.index("--threads") + 1]) if "--threads" in args else 10_000
+    n_messages = int(args[args.index("--messages") + 1]) if "--messages" in args else 1_000_000
+    from memory import threads_db
+
+    tmp = tempfile.mkdtemp(prefix="bench_threads_")
+    path = os.path.join(tmp, "threads.db")
+    t0 = time.perf_counter()
+    hot = _build(path, n_threads, n_messages)
+    print(f"built {n_threads} threads / {n_messages} messages in {time.perf_counter() - t0:.1f}s")
+    total = threads_db.get_messages(hot, limit=1 << 30)
+    deep = len(total) - 100
+
+    # 1. deep page of a long thread: OFFSET walk vs keyset
+    def old_page():
+        with _legacy_conn(path) as c:
+            c.execute(
+                "SELECT * FROM messages INDEXED BY legacy_messages_thread WHERE thread_id=? "
+                "ORDER BY created_at LIMIT 50 OFFSET ?",
+                (hot, deep),
+            ).fetchall()
+
+    cursor = total[deep - 1]["cursor"]
+    new_page = lambda: threads_db.get_messages(hot, limit=50, after=cursor)  # noqa: E731
+    print(f"deep page (offset {deep}):  old {_ms(old_page, 20):8.2f} ms   new {_ms(new_page, 200):8.3f} ms")
+
+    # 2. first page of a user's thread list
+    def old_list():
+        with _legacy_conn(path) as c:
+            c.execute(
+                "SELECT * FROM threads INDEXED BY legacy_threads_user "
+                "WHERE user_id=? AND is_archived=0 ORDER BY updated_at DESC LIMIT 50",
+                ("u1",),
+            ).fetchall()
+
+    new_list = lambda: threads_db.get_threads("u1", limit=50)  # noqa: E731
+    print(f"thread list page:       old {_ms(old_list, 200):8.3f} ms   new {_ms(new_list, 200):8.3f} ms")
+
+    # 3. concurrent add_message: connection per call + FULL sync vs pool
+    writers, per = 8, 250
+
+    def old_writer(k):
+        for i in range(per):
+            c = _legacy_conn(path)
+            c.execute("PRAGMA synchronous=FULL")
+            with c:
+                now = datetime.now(timezone.utc).isoformat()
+                c.execute(
+                    "INSERT INTO messages VALUES (?,?,?,?,?)",
+                    (str(uuid.uuid4()), f"t{k + 1}", "user", "x", now),
+                )
+                c.execute("UPDATE threads SET updated_at=? WHERE id=?", (now, f"t{k + 1}"))
+            c.close()
+
+    def new_writer(k):
+        for i in range(per):
+            threads_db.add_message(str(uuid.uuid4()), f"t{k + 1}", "user", "x")
+
+    for label, fn in (("old", old_writer), ("new", new_writer)):
+        ts = [threading.Thread(target=fn, args=(k,)) for k in range(writers)]
+        t0 = time.perf_counter()
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        dt = time.perf_counter() - t0
+        print(f"add_message x{writers * per} ({writers} threads): {label} {writers * per / dt:8.0f} msg/s")
+
+    # 4. fork 5k messages into a new thread
+    cut = total[min(4_999, len(total) - 1)]["id"]
+
+    def old_fork():
+        c = _legacy_conn(path)
+        with c:
+            now = datetime.now(timezone.utc).isoformat()
+            new_id = str(uuid.uuid4())
+            c.execute(
+                "INSERT INTO threads (id, user_id, title, created_at, updated_at) VALUES (?,?,?,?,?)",
+                (new_id, "u0", "fork", now, now),
+            )
+        msgs = [
+            dict(r)
+            for r in c.execute(
+                "SELECT * FROM messages WHERE thread_id=? ORDER BY created_at", (hot,)
+            )
+        ]
+        upto = next(i for i, m in enumerate(msgs) if m["id"] == cut)
+        for m in msgs[: upto + 1]:
+            with c:
+                c.execute(
+                    "INSERT INTO messages VALUES (?,?,?,?,?)",
+                    (str(uuid.uuid4()), new_id, m["role"], m["content"], m["created_at"]),
+                )
+        c.close()
+
+    new_fork = lambda: threads_db.fork_thread(str(uuid.uuid4()), hot, "u0", cut, "fork")  # noqa: E731
+    print(f"fork 5k messages:       old {_ms(old_fork, 3):8.1f} ms   new {_ms(new_fork, 3):8.1f} ms")
+
+    threads_db.close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+"""
+Side-by-side search latency: LanceDB vs the memory-mapped brute-force index
+(memory/vector_index.py) at several corpus sizes.
+
+    python scripts/bench_vector_index.py [sizes] [queries]
+    python scripts/bench_vector_index.py 1000,10000,50000 100
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _table(path: str, n: int, rng):
+    import lancedb
+    import pyarrow as pa
+    from memory.vector_store import _schema
+
+    x = rng.standard_normal((n, 384)).astype(np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    tbl = lancedb.connect(path).create_table("bench", schema=_schema())
+    step = 10000
+    for s in range(0, n, step):
+        rows = [
+            {"id": f"r{i}", "text": f"exchange text number {i} " * 8, "vector": x[i],
+             "source": "exchange", "user": "user", "user_id": "default",
+             "fact_type": "exchange", "priority": 0.5, "ts": float(i)}
+            for i in range(s, min(n, s + step))
+        ]
+        tbl.add(pa.Table.from_pylist(rows, schema=_schema()))
+    return tbl, x
+
+
+def _time(fn, queries) -> float:
+    fn(queries[0])  # warm up
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - t0) * 1000 / len(queries)
+
+
+def main() -> int:
+    from memory.vector_index import VectorIndex
+
+    sizes = [int(s) for s in (sys.argv[1] if len(sys.argv) > 1 else "1000,10000,50000").split(",")]
+    nq = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    limit = 15  # semantic_search asks for top_k * 3
+    rng = np.random.default_rng(0)
+    print(f"[bench_vector_index] queries={nq} limit={limit}")
+    print(f"{'rows':>8}{'lancedb ms':>12}{'mmap f32 ms':>13}{'mmap f16 ms':>13}{'speedup':>9}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            tbl, x = _table(os.path.join(tmp, "db"), n, rng)
+            queries = x[rng.choice(n, nq)] + 0.01
+            lance = _time(lambda q: tbl.search(q).limit(limit).to_list(), queries)
+            rows = tbl.to_arrow().drop_columns(["vector"]).to_pylist()
+            out = []
+            for dtype in ("float32", "float16"):
+                idx = VectorIndex(os.path.join(tmp, dtype), dtype=dtype)
+                idx.build(rows, x, tbl.version)
+                idx.load()
+                out.append(_time(lambda q: idx.search(q, limit), queries))
+            print(f"{n:>8}{lance:>12.2f}{out[0]:>13.2f}{out[1]:>13.2f}{lance / out[0]:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
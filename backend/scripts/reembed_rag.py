@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def main() -> int:
+    """
+    Re-embeds all stored RAG chunks with the shared embedding model
+    (core/embedding_service.py) so they live in the same vector space as
+    memory facts/exchanges. Safe to run multiple times; pass --force to
+    re-embed even if the chunks are already marked as current.
+    """
+    from core.embedding_service import get_embedding_service
+    from rag.vector_store import embedded_with, reembed_chunks
+
+    force = "--force" in sys.argv[1:]
+    model = get_embedding_service().model_name
+    print(f"[reembed_rag] stored chunks embedded with: {embedded_with() or 'unknown'}")
+    print(f"[reembed_rag] target model: {model}")
+    n = reembed_chunks(force=force)
+    print(f"[reembed_rag] re-embedded {n} chunks")
+    print("[reembed_rag] done")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+"""Tests for knowledge/auto_extractor — batched, yielding, persistent extraction worker."""
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def ax(tmp_path, monkeypatch):
+    import knowledge.auto_extractor as ax
+    from knowledge import graph
+
+    prompts = []
+
+    def fake_complete(prompt, n_texts):
+        prompts.append((prompt, n_texts))
+        names = [line.split(". ", 1)[1].split()[0] for line in prompt.splitlines() if line[:1].isdigit()]
+        return json.dumps({
+            "entities": [{"name": n, "type": "tool"} for n in names],
+            "relations": [{"from": "User", "to": n, "relation": "uses"} for n in names],
+        })
+
+    monkeypatch.setattr(ax, "_complete", fake_complete)
+    monkeypatch.setattr(ax, "BATCH", 3)
+    monkeypatch.setattr(ax, "MIN_INTERVAL", 0)
+    monkeypatch.setattr(ax, "IDLE_GRACE", 0.05)
+    monkeypatch.setattr(graph, "GRAPH_DB", str(tmp_path / "kg.db"))
+    monkeypatch.setattr(graph, "GRAPH_FILE", str(tmp_path / "none.json"))
+    graph._reset_cache()
+    ax.prompts = prompts
+    yield ax
+    graph._reset_cache()
+
+
+def test_batches_while_chat_is_in_flight(ax, tmp_path):
+    from core.activity import interactive
+    from knowledge.graph import query_graph
+
+    w = ax.ExtractionWorker(str(tmp_path / "q.db"))
+    with interactive():
+        for tool in ("Docker", "Redis", "Postgres", "Kafka", "Nginx"):
+            w.enqueue(f"{tool} is what I use at work these days", "User")
+        time.sleep(0.2)
+        assert ax.prompts == []  # yielded to the chat request
+        assert w.stats()["deferred"] == 1
+    assert w.flush(5)
+    assert [n for _, n in ax.prompts] == [3, 2]
+    s = w.stats()
+    assert (s["processed"], s["batches"], s["queued"], s["avg_batch_size"]) == (5, 2, 0, 2.5)
+    assert {r["object"] for r in query_graph(subject="User", relation="uses")} >= {"Docker", "Nginx"}
+
+
+def test_backlog_is_bounded_and_survives_restart(ax, tmp_path, monkeypatch):
+    monkeypatch.setattr(ax, "QUEUE_MAX", 3)
+    start = ax.ExtractionWorker._start_locked
+    gate = threading.Event()
+    monkeypatch.setattr(ax.ExtractionWorker, "_start_locked", lambda self: gate.set())
+    w = ax.ExtractionWorker(str(tmp_path / "q.db"))
+    for i in range(5):
+        w.enqueue(f"message number {i} about Terraform", "User")
+    assert gate.is_set()
+    assert w.stats()["dropped"] == 2 and w.stats()["queued"] == 3
+
+    # "restart": a worker that runs, on the same queue file
+    monkeypatch.setattr(ax.ExtractionWorker, "_start_locked", start)
+    monkeypatch.setattr(ax, "_complete", lambda prompt, n: ax.prompts.append(prompt) or "{}")
+    w2 = ax.ExtractionWorker(str(tmp_path / "q.db"))
+    assert w2.stats()["queued"] == 3
+    w2.start()
+    assert w2.flush(5)
+    assert "message number 2" in ax.prompts[0] and "message number 1" not in ax.prompts[0]
+    assert ax.ExtractionWorker(str(tmp_path / "q.db")).stats()["queued"] == 0
+
+
+def test_batches_split_by_user_and_failures_are_retried(ax, tmp_path, monkeypatch):
+    from core.activity import interactive
+
+    calls = []
+
+    def flaky(prompt, n):
+        calls.append(prompt)
+        if len(calls) == 1:
+            raise ConnectionError("ollama down")
+        return "not json"
+
+    monkeypatch.setattr(ax, "_complete", flaky)
+    monkeypatch.setattr(ax, "RETRY_MAX", 0.01)
+    monkeypatch.setattr(ax, "MIN_INTERVAL", 0.01)
+    w = ax.ExtractionWorker(str(tmp_path / "q.db"))
+    with interactive():  # hold the worker until both are queued
+        w.enqueue("alice talks about her garden project", "Alice")
+        w.enqueue("bob talks about his bicycle repairs", "Bob")
+    assert w.flush(5)
+    assert "messages by Alice" in calls[0] and calls[1] == calls[0]  # retried after the error
+    assert "messages by Bob" in calls[2] and "garden" not in calls[2]
+    s = w.stats()
+    assert (s["errors"], s["parse_failures"], s["processed"]) == (1, 2, 2)
+
+
+def test_off_schema_replies_are_skipped_not_retried(ax, tmp_path, monkeypatch):
+    replies = iter([
+        json.dumps({"entities": 5, "relations": "x"}),
+        json.dumps({"entities": [{"name": "Vim", "type": "tool"}], "relations": {"a": 1}}),
+        json.dumps({"entities": [], "relations": []}),
+    ])
+    monkeypatch.setattr(ax, "_complete", lambda prompt, n: next(replies))
+    monkeypatch.setattr(ax, "BATCH", 1)
+    w = ax.ExtractionWorker(str(tmp_path / "q.db"))
+    w.enqueue("first message", "User")
+    w.enqueue("I switched my editor to Vim", "User")
+    assert w.flush(5)
+
+    def broken(data):
+        raise TypeError("unexpected reply shape")
+
+    monkeypatch.setattr(ax, "_store", broken)
+    w.enqueue("third message", "User")
+    assert w.flush(5)
+    s = w.stats()
+    assert (s["errors"], s["parse_failures"], s["processed"], s["queued"]) == (0, 1, 3, 0)
+    assert s["items_added"] == 1  # the valid entity next to an off-schema "relations"
@@ -0,0 +1,158 @@
+"""Tests for memory/cold_tier — float16/PQ codecs, re-ranking, tombstones, reload."""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _data(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, 384))
+    x = centers[rng.integers(0, 20, n)] + 0.3 * rng.standard_normal((n, 384))
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x.astype(np.float32)
+
+
+def _rows(x, user_id="u1"):
+    return [
+        {
+            "id": f"r{i}",
+            "text": f"text {i}",
+            "vector": x[i],
+            "source": "exchange",
+            "user": "user",
+            "user_id": user_id,
+            "fact_type": "exchange",
+            "priority": 0.5,
+            "ts": float(i),
+        }
+        for i in range(len(x))
+    ]
+
+
+def _recall(seg, x, k=10, queries=20):
+    hits = 0
+    for q in x[:queries]:
+        truth = set(np.argsort(((x - q) ** 2).sum(1))[:k])
+        got = {int(r["id"][1:]) for r in seg.search(q, k)}
+        hits += len(truth & got)
+    return hits / (k * queries)
+
+
+@pytest.mark.parametrize("codec", ["float16", "pq"])
+def test_recall_with_exact_rerank(tmp_path, codec):
+    from memory.cold_tier import ColdSegment
+
+    x = _data()
+    seg = ColdSegment(str(tmp_path), codec=codec, pq_m=48, keep_exact=True, pq_min_train=256)
+    assert seg.append(_rows(x)) == len(x)
+    assert seg.codec == codec
+    assert _recall(seg, x) >= 0.9
+
+
+def test_distances_match_lancedb_metric(tmp_path):
+    from memory.cold_tier import ColdSegment
+
+    x = _data(50)
+    seg = ColdSegment(str(tmp_path), codec="float16")
+    seg.append(_rows(x))
+    hit = seg.search(x[3], 1)[0]
+    assert hit["id"] == "r3"
+    assert hit["_distance"] == pytest.approx(0.0, abs=1e-5)
+    assert hit["text"] == "text 3"
+
+
+def test_pq_uses_less_ram_than_float16(tmp_path):
+    from memory.cold_tier import ColdSegment
+
+    x = _data(300)
+    f16 = ColdSegment(str(tmp_path / "f16"), codec="float16")
+    pq = ColdSegment(str(tmp_path / "pq"), codec="pq", pq_m=48, pq_min_train=256)
+    f16.append(_rows(x))
+    pq.append(_rows(x))
+    assert f16.stats()["bytes_per_row_ram"] == 768
+    assert pq.stats()["bytes_per_row_ram"] == 48
+    assert pq.stats()["codebook_bytes"] > 0
+
+
+def test_user_filter_and_tombstones(tmp_path):
+    from memory.cold_tier import ColdSegment
+
+    x = _data(40)
+    seg = ColdSegment(str(tmp_path))
+    seg.append(_rows(x[:20], "a") + [dict(r, id=f"b{i}") for i, r in enumerate(_rows(x[20:], "b"))])
+    assert all(r["user_id"] == "b" for r in seg.search(x[0], 5, user_id="b"))
+    assert seg.search(x[0], 5, user_id="nobody") == []
+    assert seg.delete(["r0", "r1", "missing"]) == 2
+    assert seg.count() == 38
+    assert "r0" not in {r["id"] for r in seg.search(x[0], 40)}
+
+
+def test_reload_and_compaction(tmp_path):
+    from memory.cold_tier import ColdSegment
+
+    x = _data(50)
+    seg = ColdSegment(str(tmp_path), codec="pq", pq_m=24, pq_min_train=16)
+    seg.append(_rows(x))
+    seg.delete([f"r{i}" for i in range(5)])
+    again = ColdSegment(str(tmp_path), pq_min_train=16)
+    assert again.codec == "pq"
+    assert again.count() == 45
+    again.delete([f"r{i}" for i in range(5, 20)])  # > 20% dead → compact
+    assert again.stats()["tombstones"] == 0
+    assert ColdSegment(str(tmp_path)).count() == 30
+    assert again.search(x[30], 1)[0]["id"] == "r30"
+
+
+def test_pq_waits_for_enough_rows_and_retrains_on_compaction(tmp_path):
+    from memory.cold_tier import ColdSegment
+
+    x = _data(600)
+    rows = _rows(x)
+    seg = ColdSegment(str(tmp_path), codec="pq", pq_m=48, pq_min_train=400)
+    seg.append(rows[:20])  # a small first tiering batch: no codebook from 20 rows
+    assert seg.codec == "float16" and seg.stats()["codebook_bytes"] == 0
+    seg.append(rows[20:300])
+    assert seg.codec == "float16"
+    seg.append(rows[300:])  # 600 rows: train on all of them, re-encode the segment
+    assert seg.codec == "pq" and seg.stats()["bytes_per_row_ram"] == 48
+    assert seg._book.shape[1] == 256
+    assert _recall(seg, x) >= 0.9
+    assert ColdSegment(str(tmp_path)).codec == "pq"
+
+    seg.delete([f"r{i}" for i in range(300)])  # compacts to 300 < 400 rows
+    assert seg.codec == "float16" and seg.count() == 300
+    assert not os.path.exists(os.path.join(str(tmp_path), "codebook.npy"))
+    assert seg.search(x[450], 1)[0]["id"] == "r450"
+
+
+def test_failed_rewrite_keeps_the_old_segment(tmp_path, monkeypatch):
+    from memory.cold_tier import ColdSegment
+
+    x = _data(40)
+    path = str(tmp_path / "cold")
+    seg = ColdSegment(path)
+    seg.append(_rows(x))
+
+    def boom(self, rows):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ColdSegment, "append", boom)
+    assert seg.delete([f"r{i}" for i in range(10)]) == 10  # > 20% dead → compaction fails
+    assert not os.path.exists(path + ".rewrite")
+    for s in (seg, ColdSegment(path)):
+        assert s.count() == 30
+        assert s.search(x[25], 1)[0]["id"] == "r25"
+        assert s.read_text(["r39"])[0]["text"] == "text 39"
+    monkeypatch.undo()
+
+    seg.compact()
+    assert ColdSegment(path).count() == 30 and seg.stats()["tombstones"] == 0
+    assert sorted(os.listdir(tmp_path)) == ["cold"]
+    os.replace(path, path + ".old")  # crash between the two renames of a swap
+    os.makedirs(path + ".rewrite")
+    assert ColdSegment(path).count() == 30
+    assert sorted(os.listdir(tmp_path)) == ["cold"]
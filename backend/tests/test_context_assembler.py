@@ -0,0 +1,88 @@
+"""Tests for core/context_assembler — budgeted selection, dedupe, compression, usage."""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def ca(monkeypatch):
+    import core.context_assembler as ca
+    from collections import deque
+
+    monkeypatch.setattr(ca, "_ratios", {})
+    monkeypatch.setattr(ca, "_tokenizers", {})
+    monkeypatch.setattr(ca, "_recent", deque(maxlen=200))
+    monkeypatch.setattr(ca, "_totals", {})
+    return ca
+
+
+LONG = (
+    "The warranty covers manufacturing defects for two years. "
+    "Shipping is free within the EU. "
+    "Returns are accepted within thirty days if the item is unused. "
+    "The battery is rated for five hundred charge cycles. "
+    "Support is available on weekdays from nine to five."
+)
+
+
+def test_selection_stays_within_budget_and_keeps_required(ca):
+    cands = [
+        ca.Candidate("style", "Be terse.", 1.0, required=True),
+        ca.Candidate("semantic", "  * User likes green tea in the morning", 0.9),
+        ca.Candidate("rag", "[manual.pdf]\n" + LONG, 0.7),
+        ca.Candidate("ambient", "Active app: VS Code", 0.2),
+    ]
+    out = ca.assemble("what does the warranty cover", cands, budget=60)
+    assert out.used <= 60
+    assert "Be terse." in out.text
+    assert sum(out.usage.values()) == out.used
+    assert set(out.usage) <= {"style", "semantic", "rag", "ambient"}
+    assert out.text.index("SEMANTIC CONTEXT:") < out.text.index("STYLE:")
+
+
+def test_near_duplicates_are_dropped_keeping_higher_score(ca):
+    cands = [
+        ca.Candidate("semantic", "User's favourite language is Python and they use it daily", 0.5),
+        ca.Candidate("graph", "User's favourite language is Python and they use it daily.", 0.8),
+        ca.Candidate("semantic", "User lives in Pune", 0.6),
+    ]
+    out = ca.assemble("language", cands, budget=500)
+    assert out.duplicates == 1
+    assert out.text.count("favourite language") == 1
+    assert "KNOWLEDGE GRAPH:" in out.text
+
+
+def test_long_candidate_is_compressed_to_relevant_sentences(ca):
+    text = ca.compress(LONG, "battery charge cycles", max_tokens=20)
+    assert "battery" in text
+    assert ca.count_tokens(text) <= 20
+    out = ca.assemble(
+        "battery charge cycles", [ca.Candidate("rag", LONG, 0.7)], budget=40
+    )
+    assert out.compressed == 1 and "battery" in out.text and out.used <= 40
+
+
+def test_budget_reserves_reply_and_fixed_prompt(ca, monkeypatch):
+    monkeypatch.setattr(ca, "_WINDOWS_ENV", "tiny:1b=2048")
+    assert ca.context_window("tiny:1b") == 2048
+    b = ca.budget_for("tiny:1b", "coding", fixed_tokens=300)
+    assert b == 2048 - 1500 - 300 - ca.SAFETY_TOKENS
+    assert ca.budget_for("tiny:1b", "coding", fixed_tokens=5000) == 0
+
+
+def test_calibration_scales_estimates_and_usage_is_recorded(ca):
+    text = "word " * 200
+    before = ca.count_tokens(text, "m1")
+    msgs = [{"role": "user", "content": text}]
+    ca.calibrate("m1", msgs, int(ca.count_messages(msgs, "m1") * 1.5))
+    assert ca.count_tokens(text, "m1") == pytest.approx(before * 1.5, rel=0.05)
+    assert ca.count_tokens(text, "other") == before
+
+    ca.assemble("q", [ca.Candidate("semantic", "a fact", 0.5)], budget=100, model="m1")
+    stats = ca.get_stats()
+    assert stats["requests"] == 1
+    assert stats["tokens_by_source"]["semantic"] > 0
+    assert stats["last"]["model"] == "m1"
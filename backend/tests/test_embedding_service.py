@@ -0,0 +1,91 @@
+"""Tests for EmbeddingService — LRU cache, micro-batching, metrics (fake model)."""
+
+import os
+import sys
+import threading
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, normalize_embeddings=True, show_progress_bar=False):
+        self.calls.append(list(texts))
+        out = np.zeros((len(texts), 384), dtype=np.float32)
+        for i, t in enumerate(texts):
+            out[i, hash(t) % 384] = 1.0
+        return out
+
+
+@pytest.fixture
+def svc():
+    from core.embedding_service import EmbeddingService
+
+    s = EmbeddingService(model_name="fake", cache_size=4, batch_window_ms=50)
+    s._model = _FakeModel()
+    return s
+
+
+def test_embed_returns_384_vector(svc):
+    vec = svc.embed("hello world")
+    assert vec.shape == (384,)
+    assert vec.dtype == np.float32
+
+
+def test_repeat_embed_hits_cache(svc):
+    a = svc.embed("same text")
+    b = svc.embed("same text")
+    assert np.array_equal(a, b)
+    assert len(svc._model.calls) == 1
+    s = svc.stats()
+    assert s["hits"] == 1
+    assert s["misses"] == 1
+
+
+def test_cache_is_lru_bounded(svc):
+    for i in range(6):
+        svc.embed(f"text {i}")
+    assert svc.stats()["cache_size"] == 4
+    svc.embed("text 0")  # evicted → re-encoded
+    assert len(svc._model.calls) == 7
+
+
+def test_concurrent_embeds_coalesce_into_one_batch(svc):
+    barrier = threading.Barrier(8)
+
+    def worker(i):
+        barrier.wait()
+        svc.embed(f"concurrent {i}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(svc._model.calls) < 8
+    assert svc.stats()["max_batch_size"] > 1
+
+
+def test_embed_batch_uses_cache_and_single_encode(svc):
+    svc.embed("cached")
+    out = svc.embed_batch(["cached", "new one", "new two", "new one"])
+    assert out.shape == (4, 384)
+    assert svc._model.calls[-1] == ["new one", "new two"]
+    assert np.array_equal(out[1], out[3])
+
+
+def test_embed_batch_empty(svc):
+    assert svc.embed_batch([]).shape == (0, 384)
+
+
+def test_encode_failure_returns_none(svc):
+    class _Broken:
+        def encode(self, *a, **k):
+            raise RuntimeError("boom")
+
+    svc._model = _Broken()
+    assert svc.embed("anything") is None
@@ -0,0 +1,60 @@
+"""Tests for knowledge.entity_linker — token Aho-Corasick, spans, incremental adds."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from knowledge import entity_linker as el  # noqa: E402
+from knowledge.entity_linker import EntityLinker, Match  # noqa: E402
+
+
+def _ids(linker, text):
+    return [m.node_id for m in linker.find(text)]
+
+
+def test_word_boundaries_case_and_spans():
+    linker = EntityLinker([("new_york", "New York"), ("york", "York"), ("c++", "C++"), ("java", "Java")])
+    text = "Moved to NEW  york, wrote C++ and javascript in Yorkshire"
+    matches = linker.find(text)
+    assert matches == [Match(9, 18, "new_york"), Match(26, 29, "c++")]
+    assert text[9:18] == "NEW  york"
+    # names shorter than MIN_CHARS never match
+    assert _ids(EntityLinker([("go", "Go")]), "I write go") == []
+
+
+def test_overlaps_resolve_leftmost_longest():
+    linker = EntityLinker(
+        [("a", "machine learning"), ("b", "learning rate"), ("c", "machine learning rate"), ("d", "rate")]
+    )
+    assert _ids(linker, "tune the machine learning rate today") == ["c"]
+    assert _ids(linker, "machine learning rate and learning rate") == ["c", "b"]
+    assert _ids(linker, "the learning rate of machine learning") == ["b", "a"]
+
+
+def test_incremental_adds_use_delta_then_merge(monkeypatch):
+    monkeypatch.setattr(el, "_DELTA_FLOOR", 3)
+    linker = EntityLinker([(f"n{i}", f"entity {i}") for i in range(10)])
+    linker.add("x", "Rust")
+    linker.add("y", "rust")  # same name, second node: shares the pattern
+    assert _ids(linker, "I like rust") == ["x", "y"]
+    assert linker.stats()["rebuilds"] == 1
+    for name in ("alpha", "beta", "gamma", "delta"):
+        linker.add(name, name)
+    assert _ids(linker, "alpha then delta then rust") == ["alpha", "delta", "x", "y"]
+    assert linker.stats()["rebuilds"] == 2 and linker.stats()["pending"] == 0
+
+
+def test_graph_links_aliases_added_after_build(tmp_path, monkeypatch):
+    from knowledge import graph
+
+    monkeypatch.setattr(graph, "GRAPH_DB", str(tmp_path / "kg.db"))
+    monkeypatch.setattr(graph, "GRAPH_FILE", str(tmp_path / "none.json"))
+    graph._reset_cache()
+    try:
+        graph.add_relation("New York", "located_in", "USA")
+        assert [m.node_id for m in graph.link_entities("flying to new york")] == ["new_york"]
+        graph.add_entity("New York", "place", aliases=["NYC", "the Big Apple"])
+        assert [m.node_id for m in graph.link_entities("nyc or the big apple?")] == ["new_york"] * 2
+        assert "• New York located in USA" in graph.build_graph_context("Weather in NYC?")
+    finally:
+        graph._reset_cache()
@@ -0,0 +1,94 @@
+"""Tests for core/event_bus — worker pool, bounded queues, overflow policies, ordering."""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import event_bus as eb  # noqa: E402
+
+
+@pytest.fixture
+def bus():
+    return eb.EventBus(workers=3)
+
+
+def test_publish_never_waits_and_pool_is_fixed(bus):
+    seen = []
+    bus.subscribe("tick", lambda p: (time.sleep(0.01), seen.append(p["data"])))
+    threads = threading.active_count()
+    t0 = time.perf_counter()
+    for i in range(200):
+        bus.publish("tick", i)
+    assert time.perf_counter() - t0 < 0.1
+    assert threading.active_count() == threads  # no thread per event
+    assert bus.flush(10)
+    assert sorted(seen) == list(range(200))
+    stats = bus.get_stats()
+    assert stats["workers"] == 3 and stats["topics"]["tick"]["published"] == 200
+
+
+def test_ordered_subscriber_sees_publish_order(bus):
+    got = []
+
+    def slow_then_fast(p):
+        time.sleep(0.02 if p["data"] % 3 == 0 else 0)
+        got.append(p["data"])
+
+    bus.subscribe("memory_updated", slow_then_fast, ordered=True)
+    for i in range(30):
+        bus.publish("memory_updated", i)
+    assert bus.flush(5)
+    assert got == list(range(30))
+
+
+@pytest.mark.parametrize(
+    "overflow, expect",
+    [("drop_oldest", [0, 7, 8, 9]), ("coalesce", [0, 9]), ("block", [0, 1, 2, 3])],
+)
+def test_overflow_policies(bus, monkeypatch, overflow, expect):
+    monkeypatch.setattr(eb, "BLOCK_TIMEOUT", 0.01)
+    gate = threading.Event()
+    got = []
+
+    def handler(p):
+        gate.wait(5)
+        got.append(p["data"])
+
+    bus.configure_topic("llm_done", maxsize=3, overflow=overflow)
+    bus.subscribe("llm_done", handler, ordered=True)
+    bus.publish("llm_done", 0)
+    time.sleep(0.05)  # 0 is now in the handler, the rest queue behind it
+    for i in range(1, 10):
+        bus.publish("llm_done", i)
+    gate.set()
+    assert bus.flush(5)
+    assert got == expect
+    sub = bus.get_stats()["subscribers"][0]
+    assert sub["dropped"] + sub["coalesced"] == 10 - len(expect)
+
+
+def test_stats_point_at_the_slow_subscriber(bus):
+    def fast(p):
+        pass
+
+    def slow(p):
+        time.sleep(0.01)
+
+    def broken(p):
+        raise RuntimeError("boom")
+
+    for h in (fast, slow, broken):
+        bus.subscribe("response_done", h)
+    for i in range(10):
+        bus.publish("response_done", {"i": i})
+    assert bus.flush(5)
+    subs = bus.get_stats()["subscribers"]
+    assert subs[0]["handler"].endswith("slow") and subs[0]["p95_ms"] >= 9
+    assert next(s for s in subs if s["handler"].endswith("broken"))["errors"] == 10
+    assert bus.unsubscribe("response_done", slow)
+    with pytest.raises(ValueError):
+        bus.configure_topic("x", overflow="spill")
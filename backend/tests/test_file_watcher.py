@@ -0,0 +1,174 @@
+"""Tests for core/file_watcher — inotify + poll backends, debounce/coalescing, consumers."""
+
+import os
+import sys
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class _Sink:
+    def __init__(self):
+        self.batches = []
+        self.event = threading.Event()
+
+    def __call__(self, changes):
+        self.batches.append(dict(changes))
+        self.event.set()
+
+    def wait(self, timeout=3.0):
+        ok = self.event.wait(timeout)
+        self.event.clear()
+        return ok
+
+
+@pytest.fixture
+def fw(monkeypatch):
+    import core.file_watcher as fw
+
+    monkeypatch.setattr(fw, "DEBOUNCE", 0.05)
+    monkeypatch.setattr(fw, "MAX_DELAY", 0.5)
+    monkeypatch.setattr(fw, "POLL_INTERVAL", 0.1)
+    watchers = []
+
+    def make(backend="auto"):
+        w = fw.FileWatcher(backend)
+        watchers.append(w)
+        return w
+
+    yield make
+    for w in watchers:
+        w.stop()
+
+
+def test_merge_rules():
+    from core.file_watcher import _merge
+
+    c = {}
+    _merge(c, "a", "created")
+    _merge(c, "a", "modified")
+    assert c == {"a": "created"}
+    _merge(c, "a", "deleted")
+    assert c == {}
+    _merge(c, "b", "deleted")
+    _merge(c, "b", "created")
+    assert c == {"b": "modified"}
+    _merge(c, "b", "deleted")
+    assert c == {"b": "deleted"}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_inotify_delivers_within_a_second(fw, tmp_path):
+    w = fw("inotify")
+    sink = _Sink()
+    w.watch("t", str(tmp_path), sink)
+    assert w.backend == "inotify"
+    t0 = time.monotonic()
+    (tmp_path / "doc.md").write_text("hello")
+    assert sink.wait()
+    assert time.monotonic() - t0 < 1.0
+    assert sink.batches == [{str(tmp_path / "doc.md"): "created"}]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_atomic_save_coalesces_to_one_change(fw, tmp_path):
+    target = tmp_path / "notes.md"
+    target.write_text("v1")
+    w = fw("inotify")
+    sink = _Sink()
+    w.watch("t", str(tmp_path), sink)
+    for i in range(5):  # burst of editor saves: write temp, rename over target
+        tmp = tmp_path / ".notes.md.swp"
+        tmp.write_text(f"v{i + 2}")
+        os.replace(tmp, target)
+    assert sink.wait()
+    time.sleep(0.2)
+    assert len(sink.batches) == 1
+    assert list(sink.batches[0]) == [str(target)]
+    assert sink.batches[0][str(target)] in ("created", "modified")
+    stats = w.stats()
+    assert stats["raw_events"] > stats["paths_delivered"] == 1
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_inotify_follows_new_subdirectories_and_filters(fw, tmp_path):
+    w = fw("inotify")
+    sink = _Sink()
+    w.watch("t", str(tmp_path), sink, recursive=True, accept=lambda p: p.endswith(".md"))
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    time.sleep(0.1)
+    (sub / "a.md").write_text("x")
+    (sub / "a.tmp").write_text("x")
+    assert sink.wait()
+    assert sink.batches[-1] == {str(sub / "a.md"): "created"}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_vanished_subdirectory_does_not_kill_the_watcher(fw, tmp_path):
+    w = fw("inotify")
+    sink = _Sink()
+    w.watch("t", str(tmp_path), sink, recursive=True)
+    w._lock.acquire()  # hold the loop in _record so the events are read late
+    try:
+        os.mkdir(tmp_path / "gone")
+        time.sleep(0.1)
+        os.rmdir(tmp_path / "gone")
+    finally:
+        w._lock.release()
+    time.sleep(0.2)
+    (tmp_path / "after.txt").write_text("x")
+    assert sink.wait()
+    assert w._thread.is_alive()
+    assert str(tmp_path / "after.txt") in sink.batches[-1]
+
+
+def test_poll_backend(fw, tmp_path):
+    (tmp_path / "old.txt").write_text("x")
+    w = fw("poll")
+    sink = _Sink()
+    w.watch("t", str(tmp_path), sink)
+    assert w.backend == "poll"
+    (tmp_path / "new.txt").write_text("y")
+    os.remove(tmp_path / "old.txt")
+    assert sink.wait()
+    changes = {}
+    for b in sink.batches:
+        changes.update(b)
+    assert changes == {str(tmp_path / "new.txt"): "created", str(tmp_path / "old.txt"): "deleted"}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_idle_watcher_does_not_wake(fw, tmp_path):
+    w = fw("inotify")
+    w.watch("t", str(tmp_path), _Sink())
+    time.sleep(0.1)
+    before = w.stats()["wakeups"]
+    time.sleep(0.5)
+    assert w.stats()["wakeups"] == before
+
+
+def test_plugin_watcher_hot_loads(fw, tmp_path, monkeypatch):
+    import core.file_watcher as cfw
+    import tools.plugin_watcher as pw
+
+    w = fw()
+    monkeypatch.setattr(cfw, "_watcher", w)
+    monkeypatch.setattr(pw, "PLUGINS_DIR", str(tmp_path))
+    monkeypatch.setattr(pw, "_watched", {})
+    monkeypatch.setattr(pw, "_running", False)
+    loaded = threading.Event()
+    real_load = pw._load_plugin
+    monkeypatch.setattr(pw, "_load_plugin", lambda p: (real_load(p), loaded.set())[0])
+    pw.start()
+    try:
+        plugin = tmp_path / "hello_plugin_fw.py"
+        plugin.write_text("VALUE = 42\n")
+        assert loaded.wait(3)
+        assert sys.modules["plugins.hello_plugin_fw"].VALUE == 42
+        assert pw.list_plugins() == ["hello_plugin_fw.py"]
+    finally:
+        pw.stop()
+        sys.modules.pop("plugins.hello_plugin_fw", None)
@@ -0,0 +1,74 @@
+"""Tests for memory/history_compactor — background turn → segment → session summaries."""
+
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def hc(monkeypatch):
+    import memory.history_compactor as hc
+    import memory.summarizer as summarizer
+
+    calls = []
+
+    def fake_summarize(lines, user_name, model="m", prior="", sentences="2-3"):
+        calls.append(list(lines))
+        time.sleep(0.2)  # a slow LLM
+        return f"S({len(lines)}{'+prior' if prior else ''})"
+
+    monkeypatch.setattr(summarizer, "summarize_lines", fake_summarize)
+    monkeypatch.setattr(hc, "SEGMENT_TURNS", 2)
+    monkeypatch.setattr(hc, "SESSION_SEGMENTS", 1)
+    monkeypatch.setattr(hc, "RAW_TURNS", 1)
+    hc.calls = calls
+    return hc
+
+
+def test_record_turn_does_not_wait_for_summarization(hc, tmp_path):
+    c = hc.HistoryCompactor(str(tmp_path))
+    t0 = time.perf_counter()
+    for i in range(6):
+        c.record_turn("s1", f"question {i}?", f"answer {i}.", "Sam")
+    assert time.perf_counter() - t0 < 0.1
+    assert c.flush(10)
+    assert c.stats()["turns_compacted"] == 6 and hc.calls
+
+
+def test_levels_roll_up_incrementally(hc, tmp_path):
+    c = hc.HistoryCompactor(str(tmp_path))
+    c.compact("s1", [(f"q{i}", f"a{i}") for i in range(5)], "Sam")
+    # 5 notes, 1 kept verbatim-only → 2 segments of 2 → second rolls into session
+    levels = [lvl for lvl, _ in c.context_lines("s1")]
+    assert levels == ["session", "segment"]
+    assert len(hc.calls) == 3
+    calls_before = len(hc.calls)
+    c.compact("s1", [("q5", "a5")], "Sam")
+    # only the new turn was processed: no new LLM call until a segment fills
+    assert len(hc.calls) == calls_before
+    assert [lvl for lvl, _ in c.context_lines("s1")] == ["session", "segment", "turn"]
+    assert c.context_lines("s1")[-1][1] == "Sam: q4 → ASTRA: a4"
+
+
+def test_digest_is_persisted_per_session(hc, tmp_path):
+    c = hc.HistoryCompactor(str(tmp_path))
+    c.compact("a", [("hello there", "hi.")] * 2, "Sam")
+    c.compact("b/../x", [("other", "reply")] * 2, "Sam")
+    fresh = hc.HistoryCompactor(str(tmp_path))
+    assert fresh.latest("a") == c.latest("a") == "Sam: hello there → ASTRA: hi."
+    assert fresh.latest("b/../x") == "Sam: other → ASTRA: reply"
+    assert all(os.path.dirname(p) == str(tmp_path) for p in map(fresh._path, ["a", "b/../x"]))
+
+
+def test_context_builder_reads_session_digest(hc, tmp_path, monkeypatch):
+    from core.context_builder import ContextBuilder
+
+    c = hc.HistoryCompactor(str(tmp_path))
+    c.compact("s1", [("my dog is called Rex", "Noted.")] * 2, "Sam")
+    monkeypatch.setattr(hc, "_compactor", c)
+    cands, _ = ContextBuilder()._candidates("hello", "Sam", {}, "casual", session_id="s1")
+    summary = [x for x in cands if x.source == "summary"]
+    assert [x.text for x in summary] == ["• Sam: my dog is called Rex → ASTRA: Noted."]
@@ -0,0 +1,67 @@
+"""Tests for knowledge.graph — SQLite store, upserts, batches, cache invalidation."""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture(autouse=True)
+def graph(tmp_path, monkeypatch):
+    from knowledge import graph as g
+
+    monkeypatch.setattr(g, "GRAPH_DB", str(tmp_path / "kg.db"))
+    monkeypatch.setattr(g, "GRAPH_FILE", str(tmp_path / "knowledge_graph.json"))
+    g._reset_cache()
+    yield g
+    g._reset_cache()
+
+
+def test_upsert_strengthens_existing_edge(graph):
+    graph.add_relation("Arnav", "works_on", "ASTRA")
+    graph.add_relation("Arnav", "works_on", "ASTRA")
+    graph.add_relation("Arnav", "likes", "ASTRA")
+    rels = graph.query_graph(subject="arnav", obj="astra")
+    assert {(r["relation"], round(r["weight"], 2)) for r in rels} == {("works_on", 1.1), ("likes", 1.0)}
+    assert graph.query_graph(relation="WORKS_ON")[0]["object"] == "ASTRA"
+
+
+def test_cached_neighbourhood_invalidated_on_write(graph):
+    graph.add_relation("Arnav", "uses", "Python")
+    graph.add_relation("Python", "is_a", "language")
+    two_hop = graph.get_relations("arnav", depth=2)
+    assert ("Python", "is_a", "language") in {(r["subject"], r["relation"], r["object"]) for r in two_hop}
+    assert graph.get_relations("arnav", depth=2) == two_hop  # served from cache
+    assert graph.get_stats()["cache"]["hits"] >= 1
+
+    # a write on the neighbour changes arnav's 2-hop view
+    graph.add_relation("Python", "created_by", "Guido")
+    objs = {r["object"] for r in graph.get_relations("arnav", depth=2)}
+    assert "Guido" in objs
+
+
+def test_batch_rolls_back_on_error(graph):
+    with pytest.raises(RuntimeError):
+        with graph.batch():
+            graph.add_relation("a", "knows", "b")
+            raise RuntimeError("boom")
+    assert graph.query_graph(subject="a") == []
+    with graph.batch():
+        graph.add_relation("a", "knows", "b")
+        graph.add_entity("b", "person", mood="happy")
+    assert graph.get_relations("b")[0]["subject"] == "a"
+
+
+def test_legacy_json_is_migrated_and_context_built(graph, tmp_path):
+    data = {
+        "nodes": [{"id": "user", "attrs": {"label": "User", "entity_type": "person"}},
+                  {"id": "fastapi", "attrs": {"label": "FastAPI"}}],
+        "edges": [{"src": "user", "dst": "fastapi", "relation": "uses", "weight": 1.3}],
+    }
+    (tmp_path / "knowledge_graph.json").write_text(json.dumps(data))
+    ctx = graph.build_graph_context("tell me about fastapi", "User")
+    assert "• User uses FastAPI" in ctx
+    assert not (tmp_path / "knowledge_graph.json").exists()
+    assert graph.get_stats()["edges"] == 1
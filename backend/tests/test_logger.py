@@ -0,0 +1,119 @@
+"""Tests for utils/logger — queued JSON logging, drops, sampling, rotation."""
+import json
+import logging
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import utils.logger as L  # noqa: E402
+
+
+def _lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_keep_the_callers_request_id(tmp_path):
+    from utils.request_id import set_request_id
+
+    path = str(tmp_path / "t.log")
+    lg = L._make_logger("astra.test.rid", path, logging.INFO)
+
+    def request(rid):
+        set_request_id(rid)
+        L.log_event(lg, "react_step", step=1, rid=rid)
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            lg.exception("failed %s", rid)
+
+    threads = [threading.Thread(target=request, args=(f"r{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert L.flush(5)
+    lines = _lines(path)
+    assert len(lines) == 8
+    for line in lines:
+        assert line["request_id"] in line["msg"]  # set on the logging thread, not the listener
+    errors = [x for x in lines if x["level"] == "ERROR"]
+    assert len(errors) == 4 and all("ValueError: bad" in x["exc"] for x in errors)
+    assert {x["event"] for x in lines if "event" in x} == {"react_step"}
+
+
+def test_non_str_keys_and_huge_ints_are_encoded(tmp_path):
+    path = str(tmp_path / "k.log")
+    lg = L._make_logger("astra.test.keys", path, logging.INFO)
+    L.log_event(lg, "counts", counts={1: "a", None: "b"}, big=2**70)
+    assert L.flush(5)
+    (line,) = _lines(path)
+    assert line["data"]["counts"] == {"1": "a", "null": "b"}
+    assert line["data"]["big"] == 2**70
+
+
+def test_full_queue_drops_and_counts(monkeypatch):
+    monkeypatch.setattr(L, "QUEUE_MAX", 2)
+    pipeline = L._Pipeline()
+    pipeline.listener.stop()  # nothing drains: the queue fills up
+    lg = logging.getLogger("astra.test.drop")
+    lg.propagate = False
+    lg.addHandler(L._QueueHandler(pipeline))
+    for i in range(5):
+        lg.warning("line %d", i)
+    assert pipeline.dropped == {"astra.test.drop": 3}
+    assert pipeline.queue.get_nowait().msg == "line 0"  # rendered before queuing
+
+
+def test_debug_sampling_per_logger(tmp_path):
+    path = str(tmp_path / "s.log")
+    lg = L._make_logger("astra.test.sample", path, logging.DEBUG)
+    L.set_sampling("astra.test.sample", 0.25)
+    try:
+        for i in range(8):
+            lg.debug("tick %d", i)
+        lg.info("kept")
+        assert L.flush(5)
+    finally:
+        L.set_sampling("astra.test.sample", 1.0)
+    msgs = [x["msg"] for x in _lines(path)]
+    assert msgs == ["tick 3", "tick 7", "kept"]
+    assert L.get_stats()["sampled_out"]["astra.test.sample"] == 6
+
+
+def test_rotation_by_size_and_age(tmp_path):
+    path = str(tmp_path / "r.log")
+    h = L.SizeTimeRotatingFileHandler(path, max_bytes=400, backups=2, max_age_s=3600)
+    h.setFormatter(L.JSONFormatter())
+    rec = logging.LogRecord("astra.test", logging.INFO, "", 0, "x" * 60, None, None)
+    for _ in range(12):
+        h.emit(rec)
+    h.flush()
+    assert os.path.exists(path + ".1") and os.path.exists(path + ".2")
+    assert not os.path.exists(path + ".3")
+    assert all(os.path.getsize(p) < 400 for p in (path, path + ".1"))
+
+    before = len(_lines(path))
+    h._opened -= 3600  # the current file is now an hour old
+    h.emit(rec)
+    h.flush()
+    assert len(_lines(path)) == 1 and before >= 1
+    h.close()
+
+
+def test_file_age_survives_a_restart(tmp_path):
+    path = str(tmp_path / "old.log")
+    fmt = L.JSONFormatter()
+    rec = logging.LogRecord("astra.test", logging.INFO, "", 0, "before restart", None, None)
+    rec.created -= 2 * 3600
+    with open(path, "w") as f:
+        f.write(fmt.format(rec) + "\n")  # begun two hours ago, written until just now
+
+    h = L.SizeTimeRotatingFileHandler(path, max_bytes=10**6, backups=2, max_age_s=3600)
+    h.setFormatter(fmt)
+    h.emit(logging.LogRecord("astra.test", logging.INFO, "", 0, "after restart", None, None))
+    h.close()
+    assert [x["msg"] for x in _lines(path + ".1")] == ["before restart"]
+    assert [x["msg"] for x in _lines(path)] == ["after restart"]
@@ -79,3 +79,80 @@ def test_save_fact_upserts(tmp_db):
 def test_get_fact_missing_returns_none(tmp_db):
     import memory_db
     assert memory_db.get_fact("nonexistent") is None
+
+
+def test_recent_history_is_served_from_ring(tmp_db, monkeypatch):
+    import memory_db
+    memory_db.save_exchange("q1", "a1")
+    memory_db.load_recent_history(n=4)
+    before = memory_db.get_stats()
+    # the ring answers without touching SQLite
+    monkeypatch.setattr(memory_db, "_conn", lambda: (_ for _ in ()).throw(AssertionError("I/O")))
+    memory_db.save_exchange("q2", "a2")
+    assert [m["content"] for m in memory_db.load_recent_history(n=3)] == ["a1", "q2", "a2"]
+    stats = memory_db.get_stats()
+    assert stats["hits"] == before["hits"] + 1 and stats["misses"] == before["misses"]
+
+
+def test_writes_are_group_committed_and_durable_after_flush(tmp_db):
+    import sqlite3
+    import threading
+    import memory_db
+
+    def user(uid):
+        for i in range(20):
+            memory_db.save_exchange(f"{uid}-q{i}", f"{uid}-a{i}", user_id=uid)
+
+    threads = [threading.Thread(target=user, args=(f"u{k}",)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert memory_db.flush(5)
+    conn = sqlite3.connect(tmp_db)
+    n = conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+    order = [r[0] for r in conn.execute(
+        "SELECT content FROM conversations WHERE user_id='u1' ORDER BY id").fetchall()]
+    conn.close()
+    assert n == 160
+    assert order == [x for i in range(20) for x in (f"u1-q{i}", f"u1-a{i}")]
+    stats = memory_db.get_stats()
+    assert stats["rows"] == 160 and stats["commits"] < 160 and stats["pending"] == 0
+
+
+def test_dropped_batches_are_counted_and_fail_flush(tmp_path):
+    import sqlite3
+    import memory_db
+
+    path = str(tmp_path / "no_table.db")
+    w = memory_db._GroupWriter(path)
+    w.submit([("u", "user", "lost", None, 1.0), ("u", "assistant", "lost", None, 1.0)])
+    assert w.flush(5) is False  # commit failed: the rows never reached disk
+    assert (w.stats["dropped"], w.stats["rows"], w.stats["commits"]) == (2, 0, 0)
+    assert w.pending() == 0
+
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE conversations (id INTEGER PRIMARY KEY, user_id TEXT, role TEXT, "
+        "content TEXT, intent TEXT, ts REAL)"
+    )
+    conn.commit()
+    w.submit([("u", "user", "kept", None, 2.0)])
+    assert w.flush(5)  # later rows are durable again
+    assert w.stats["rows"] == 1
+    assert conn.execute("SELECT content FROM conversations").fetchall() == [("kept",)]
+    conn.close()
+    w.close()
+
+
+def test_long_history_request_falls_back_to_sqlite(tmp_db, monkeypatch):
+    import memory_db
+    monkeypatch.setattr(memory_db, "RING_SIZE", 4)
+    memory_db.init_db()
+    for i in range(5):
+        memory_db.save_exchange(f"q{i}", f"a{i}")
+    assert [m["content"] for m in memory_db.load_recent_history(n=4)] == ["q3", "a3", "q4", "a4"]
+    misses = memory_db.get_stats()["misses"]
+    full = memory_db.load_recent_history(n=100)
+    assert len(full) == 10 and full[0]["content"] == "q0"
+    assert memory_db.get_stats()["misses"] == misses + 1
@@ -0,0 +1,74 @@
+"""Tests for memory_transaction — versioned compare-and-swap commits, retry."""
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture(autouse=True)
+def mem_dir(tmp_path, monkeypatch):
+    import memory.memory_engine as me
+
+    me._user_caches.clear()
+    me._versions.clear()
+    monkeypatch.setattr(me, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(me, "MEMORY_FILE", str(tmp_path / "default" / "memory.json"))
+    yield tmp_path
+    me._user_caches.clear()
+    me._versions.clear()
+
+
+def test_stale_snapshot_conflicts():
+    from memory.memory_transaction import MemoryConflictError, MemoryTransaction
+
+    a = MemoryTransaction("alice").__enter__()
+    b = MemoryTransaction("alice").__enter__()
+    a.memory["user_facts"].append({"value": "a"})
+    a.commit()
+    b.memory["user_facts"].append({"value": "b"})
+    with pytest.raises(MemoryConflictError):
+        b.commit()
+    # another user's snapshot is unaffected
+    with MemoryTransaction("bob") as tx:
+        tx.memory["user_facts"].append({"value": "c"})
+
+
+def test_concurrent_run_transaction_loses_no_updates():
+    import memory.memory_engine as me
+    from memory.memory_transaction import get_stats, run_transaction
+
+    before = get_stats()
+
+    def bump(memory):
+        memory["preferences"]["count"] = memory["preferences"].get("count", 0) + 1
+
+    def worker():
+        for _ in range(25):
+            run_transaction(bump, user_id="alice", retries=1000)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert me.load_memory("alice")["preferences"]["count"] == 150
+    after = get_stats()
+    assert after["commits"] - before["commits"] == 150
+    assert after["retries"] - before["retries"] == after["conflicts"] - before["conflicts"]
+
+
+def test_external_rewrite_bumps_version(mem_dir):
+    import memory.memory_engine as me
+
+    me.save_memory({"user_facts": []}, "alice")
+    _, version = me.load_versioned("alice")
+    path = mem_dir / "alice" / "memory.json"
+    path.write_text(json.dumps({"user_facts": [{"value": "edited"}]}))
+    os.utime(path, ns=(1, 1))
+    assert me.compare_and_save({"user_facts": []}, "alice", version) is None
+    memory, _ = me.load_versioned("alice")
+    assert memory["user_facts"] == [{"value": "edited"}]
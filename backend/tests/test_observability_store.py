@@ -0,0 +1,85 @@
+"""Tests for core/observability.ObservabilityStore and core/sketch — segments, sketches, windows."""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _trace(i, total, agent="ollama/phi3:mini", ts=None):
+    t = {
+        "request_id": f"r{i}",
+        "total_ms": total,
+        "intent": "chat" if i % 2 else "coding",
+        "agent": agent,
+        "steps": [{"step": "llm", "ms": total - 5, "meta": ""}],
+    }
+    if ts is not None:
+        t["ts"] = ts
+    return t
+
+
+def test_sketch_quantiles_within_relative_error_and_merge():
+    from core.sketch import DDSketch
+
+    rnd = random.Random(5)
+    xs = [rnd.lognormvariate(6, 1.2) for _ in range(20000)]
+    a, b, both = DDSketch(), DDSketch(), DDSketch()
+    for i, x in enumerate(xs):
+        (a if i % 2 else b).add(x)
+        both.add(x)
+    merged = a.copy().merge(b)
+    assert merged.bins == both.bins and merged.count == both.count
+    xs.sort()
+    for q, got in zip((0.5, 0.95, 0.99), merged.quantiles((0.5, 0.95, 0.99))):
+        exact = xs[int(q * (len(xs) - 1))]
+        assert abs(got - exact) / exact < 0.03
+    assert DDSketch().quantiles((0.5,)) == [0.0]
+
+
+def test_stats_and_summary_come_from_windows(tmp_path):
+    from core.observability import ObservabilityStore
+
+    store = ObservabilityStore(str(tmp_path))
+    now = time.time()
+    store.add(_trace(0, 9000, ts=now - 1800))  # inside 1h, outside 5m
+    for i in range(1, 101):
+        store.add(_trace(i, 100 + i, agent="ollama/llama3" if i % 4 == 0 else "ollama/phi3:mini"))
+    store.add(_trace(101, 40, agent="chain_executor"))
+    store.observe("route", "POST /chat", 250.0)
+
+    stats = store.get_stats()
+    assert stats["requests"] == 102
+    assert stats["windows"]["5m"]["count"] == 101
+    assert stats["windows"]["1h"]["max_ms"] == 9000
+    assert 190 <= stats["p95_ms"] <= 200
+    assert stats["per_step_avg"]["llm"] > 0
+
+    summary = store.summary("5m")
+    assert set(summary["handler"]) == {"ollama", "chain_executor"}
+    assert summary["model"]["llama3"]["count"] == 25
+    assert summary["route"]["POST /chat"]["p50_ms"] == 250.0
+    assert list(store.summary("5m", "model")) == ["model"]
+
+
+def test_segments_rotate_and_are_queried_lazily(tmp_path, monkeypatch):
+    import core.observability as obs
+
+    monkeypatch.setattr(obs, "SEGMENT_BYTES", 2000)
+    monkeypatch.setattr(obs, "SEGMENTS_KEEP", 3)
+    store = obs.ObservabilityStore(str(tmp_path), maxlen=5)
+    for i in range(60):
+        store.add(_trace(i, 100 + i))
+    segments = store._segments()
+    assert len(segments) == 3
+    assert [t["request_id"] for t in store.get_recent(3)] == ["r57", "r58", "r59"]
+    older = store.get_recent(12)  # beyond the in-memory tail → read from segments
+    assert [t["request_id"] for t in older][-1] == "r59" and len(older) == 12
+    slow = store.query(limit=4, min_ms=150, intent="chat")
+    assert [t["request_id"] for t in slow] == ["r59", "r57", "r55", "r53"]
+    # a restart rebuilds windows and tail from what is still on disk
+    again = obs.ObservabilityStore(str(tmp_path), maxlen=5)
+    on_disk = len(again.query(limit=None))
+    assert again.get_stats()["requests"] == on_disk
+    assert again.get_recent(1)[0]["request_id"] == "r59"
@@ -0,0 +1,156 @@
+"""Tests for portability — streaming NDJSON export/import, resume, gzip."""
+import json
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _use_host(root, monkeypatch):
+    """Point every store at a fresh directory — a different host."""
+    import memory_db
+    import memory.memory_engine as me
+    from memory import threads_db
+
+    threads_db.close_pool()
+    monkeypatch.setattr(threads_db, "DB_PATH", str(root / "threads.db"))
+    threads_db.init_db()
+    memory_db.flush()
+    monkeypatch.setattr(memory_db, "DB_PATH", str(root / "memory.db"))
+    memory_db._local.__dict__.clear()
+    memory_db.init_db()
+    monkeypatch.setattr(me, "DATA_DIR", str(root / "users"))
+    me._user_caches.clear()
+    me._versions.clear()
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    import memory_db
+    import memory.memory_engine as me
+    from memory import portability, threads_db
+
+    _use_host(tmp_path / "a", monkeypatch)
+    monkeypatch.setattr(portability, "BATCH", 7)
+    monkeypatch.setattr(portability, "CHECKPOINT_EVERY", 10)
+    yield
+    memory_db.flush()
+    memory_db._local.__dict__.clear()
+    threads_db.close_pool()
+    me._user_caches.clear()
+
+
+def _seed(user="alice"):
+    import memory_db
+    import memory.memory_engine as me
+    from memory import threads_db
+
+    me.save_memory({"user_facts": [{"value": "likes chess"}], "preferences": {"name": "Al"}}, user)
+    for i in range(12):
+        memory_db.save_fact(f"k{i}", f"v{i}", user_id=user)
+    for i in range(20):
+        memory_db.save_exchange(f"q{i}", f"a{i}", user_id=user)
+    for t in range(5):
+        tid = str(uuid.uuid4())
+        threads_db.create_thread(tid, user, f"chat {t}")
+        for i in range(9):
+            threads_db.add_message(str(uuid.uuid4()), tid, "user", f"t{t} m{i}")
+
+
+def _ndjson(user="alice", resume=None, gzip=False):
+    from memory.portability import encode_ndjson, export_records
+
+    return b"".join(encode_ndjson(export_records(user, resume), gzip=gzip))
+
+
+def _import(blob, user, chunk=37):
+    from memory.portability import Importer
+
+    imp = Importer(user)
+    for i in range(0, len(blob), chunk):
+        imp.feed(blob[i : i + chunk])
+    return imp.finish()
+
+
+def test_round_trip_to_another_host_gzip(tmp_path, monkeypatch):
+    import memory_db
+    import memory.memory_engine as me
+    from memory import threads_db
+
+    _seed()
+    blob = _ndjson(gzip=True)
+    assert blob[:2] == b"\x1f\x8b"
+    # on the same host, another account can't take over alice's threads
+    assert _import(blob, "bob")["skipped_threads"] == 5
+    assert threads_db.get_threads("bob") == []
+
+    _use_host(tmp_path / "b", monkeypatch)
+    summary = _import(blob, "bob")
+    assert summary["errors"] == 0
+    assert summary["added"] == {"memory": 1, "fact": 12, "conversation": 40, "thread": 5, "message": 45}
+    assert me.load_memory("bob")["preferences"]["name"] == "Al"
+    assert memory_db.get_fact("k3", user_id="bob") == "v3"
+    assert memory_db.load_recent_history(2, user_id="bob")[-1]["content"] == "a19"
+    threads = threads_db.get_threads("bob")
+    assert len(threads) == 5
+    assert len(threads_db.get_messages(threads[0]["id"])) == 9
+
+
+def test_reimport_is_idempotent():
+    from memory import threads_db
+
+    _seed()
+    blob = _ndjson()
+    for t in threads_db.get_threads("alice"):
+        threads_db.delete_thread(t["id"], "alice")
+    first = _import(blob, "alice")
+    again = _import(blob, "alice")
+    assert first["added"]["message"] == 45
+    assert again["added"].get("message", 0) == 0
+    assert again["added"].get("conversation", 0) == 0
+
+
+def test_resume_from_any_checkpoint_completes_the_stream():
+    _seed()
+    lines = [json.loads(x) for x in _ndjson().splitlines()]
+    body = [r for r in lines if r["type"] not in ("header", "checkpoint", "end")]
+    tokens = [r["resume"] for r in lines if r["type"] == "checkpoint"]
+    assert len(tokens) > 5
+    for token in tokens:
+        seen = lines.index({"type": "checkpoint", "resume": token})
+        before = [r for r in lines[:seen] if r["type"] not in ("header", "checkpoint")]
+        rest = [json.loads(x) for x in _ndjson(resume=token).splitlines()]
+        after = [r for r in rest if r["type"] not in ("header", "checkpoint", "end")]
+        assert before + after == body
+
+
+def test_failed_batch_freezes_the_checkpoint(tmp_path, monkeypatch):
+    import memory_db
+
+    _seed()
+    blob = _ndjson()
+    tokens = [json.loads(x).get("resume") for x in blob.splitlines()]
+    tokens = [t for t in tokens if t]
+    resumes = {t: _ndjson(resume=t) for t in tokens}  # exported on the source host
+    _use_host(tmp_path / "b", monkeypatch)
+    real = memory_db.import_conversations
+    calls = []
+
+    def flaky(user_id, rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return real(user_id, rows)
+
+    monkeypatch.setattr(memory_db, "import_conversations", flaky)
+    summary = _import(blob, "bob")
+    assert summary["errors"] > 0
+    assert summary["last_checkpoint"] != tokens[-1]  # stopped before the failed batch
+
+    monkeypatch.setattr(memory_db, "import_conversations", real)
+    resumed = _import(resumes[summary["last_checkpoint"]], "bob")
+    assert resumed["errors"] == 0
+    assert len(memory_db.load_recent_history(100, user_id="bob")) == 40
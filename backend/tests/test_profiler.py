@@ -0,0 +1,100 @@
+"""Tests for core/profiler — sampling, folded output, flamegraph, sessions."""
+import os
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import profiler as prof  # noqa: E402
+
+
+def _hot_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(500))
+
+
+@pytest.fixture
+def busy():
+    stop = threading.Event()
+    t = threading.Thread(target=_hot_loop, args=(stop,), name="busy-worker-3")
+    t.start()
+    yield
+    stop.set()
+    t.join()
+
+
+def test_record_finds_the_hot_function(busy):
+    p = prof.SamplingProfiler()
+    profile = p.record(0.5, hz=100)
+    stats = profile.stats()
+    assert stats["samples"] >= 10 and 0 < stats["overhead_pct"] < 50
+    folded = profile.folded(idle=False)
+    hot = [line for line in folded.splitlines() if line.startswith("busy-worker;")]
+    assert hot and all("test_profiler.py:_hot_loop" in line for line in hot)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+    assert profile.top(3)[0]["frame"].startswith("test_profiler.py:")
+    # the parked main thread (waiting on the session) is idle
+    assert "MainThread;" in profile.folded(idle=True)
+    assert "MainThread;" not in folded
+    assert p.stats()["session"] is None
+
+
+def test_threads_sleeping_in_c_calls_are_idle(busy):
+    stop = threading.Event()
+
+    def nap():
+        while not stop.is_set():
+            time.sleep(0.05)  # parked in C, leaf frame is this file
+
+    nappers = [threading.Thread(target=nap, name=f"napper-{i}") for i in range(3)]
+    for t in nappers:
+        t.start()
+    try:
+        profile = prof.SamplingProfiler().record(0.5, hz=100)
+    finally:
+        stop.set()
+        for t in nappers:
+            t.join()
+    assert all(frame["frame"] != "test_profiler.py:nap" for frame in profile.top(20))
+    assert "napper;" in profile.folded(idle=True)
+    assert "napper;" not in profile.folded(idle=False)
+
+
+def test_one_session_at_a_time(busy):
+    p = prof.SamplingProfiler()
+    t = threading.Thread(target=p.record, args=(0.5, 50))
+    t.start()
+    time.sleep(0.1)
+    with pytest.raises(prof.ProfilerBusy):
+        p.record(0.2)
+    t.join()
+    assert p.record(0.2, 50).samples > 0  # free again afterwards
+
+
+def test_continuous_buckets_merge(busy):
+    p = prof.SamplingProfiler()
+    assert p.continuous() is None
+    assert p.start_continuous(50)
+    time.sleep(0.4)
+    merged = p.continuous(minutes=2)
+    p.stop()
+    assert merged.samples >= 5 and merged.hz == 50
+    assert any(s.startswith("busy-worker;") for s in merged.stacks)
+
+
+def test_flamegraph_svg_is_self_contained():
+    stacks = {
+        "MainThread;a.py:main;b.py:work": 30,
+        "MainThread;a.py:main;c.py:<lambda> & <io>": 10,
+        "event-worker;x.py:run#idle": 60,
+    }
+    svg = prof.flamegraph_svg(stacks, title="t")
+    root = ET.fromstring(svg)  # well-formed, names escaped
+    titles = [t.text for t in root.iter("{http://www.w3.org/2000/svg}title")]
+    assert "a.py:main (40 samples, 40.00%)" in titles
+    assert any(t.startswith("c.py:<lambda> & <io>") for t in titles)
+    assert "http" not in svg.replace("http://www.w3.org/2000/svg", "")  # no external refs
@@ -0,0 +1,71 @@
+"""Tests for rag/rag_engine — query result cache and corpus-version invalidation."""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    pytest.importorskip("rank_bm25")
+    import rag.rag_engine as engine
+    import rag.vector_store as rvs
+    from collections import OrderedDict
+
+    calls = []
+
+    def fake_hybrid(query, top_k=5, timings=None):
+        calls.append(query)
+        return [
+            {"id": f"{query}-{i}", "text": f"chunk {i} about {query}", "source": "doc.md",
+             "score": 1.0 - i / 10, "fused_score": 0.5 - i / 100}
+            for i in range(top_k)
+        ]
+
+    monkeypatch.setattr(engine, "hybrid_search", fake_hybrid)
+    monkeypatch.setattr(engine, "rerank", lambda q, r, top_k=3, timings=None: r[:top_k])
+    monkeypatch.setattr(engine, "count", lambda: 10)
+    monkeypatch.setattr(engine, "_cache", OrderedDict())
+    monkeypatch.setattr(engine, "_cache_version", None)
+    monkeypatch.setattr(engine, "_cache_stats", {"hits": 0, "misses": 0, "invalidations": 0})
+    monkeypatch.setattr(rvs, "_corpus_version", 0)
+    engine.calls = calls
+    yield engine
+
+
+def test_identical_queries_hit_cache(engine):
+    first = engine.query_rag("What is the warranty period?")
+    assert engine.query_rag("  what is the   WARRANTY period? ") == first
+    assert len(engine.calls) == 1
+    # different top_k is a different entry
+    engine.query_rag("what is the warranty period?", top_k=2)
+    assert len(engine.calls) == 2
+    stats = engine.get_stats()["query_cache"]
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_cached_results_are_isolated_copies(engine):
+    out = engine.retrieve("battery life", top_k=2)
+    out[0]["text"] = "mutated"
+    assert engine.retrieve("battery life", top_k=2)[0]["text"] != "mutated"
+
+
+def test_ingest_or_delete_invalidates(engine):
+    import rag.vector_store as rvs
+
+    engine.query_rag("battery life")
+    rvs._bump_corpus_version()  # what add_chunks / delete_source do
+    engine.query_rag("battery life")
+    assert len(engine.calls) == 2
+    assert engine.get_stats()["query_cache"]["invalidations"] == 1
+
+
+def test_cache_is_bounded(engine, monkeypatch):
+    monkeypatch.setattr(engine, "QUERY_CACHE_SIZE", 3)
+    for i in range(5):
+        engine.retrieve(f"question {i}")
+    assert len(engine._cache) == 3
+    engine.retrieve("question 0")
+    assert len(engine.calls) == 6
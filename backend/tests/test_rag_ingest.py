@@ -0,0 +1,156 @@
+"""Tests for rag/ingest — manifest-driven incremental ingestion (fake embedder)."""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+pytest.importorskip("lancedb")
+
+from tests.test_vector_store import vs  # noqa: E402,F401 — shared LanceDB fixture
+
+PARAS = [
+    f"Paragraph {name}: " + " ".join(f"{name}word{i}" for i in range(40))
+    for name in ("alpha", "bravo", "charlie")
+]
+
+
+@pytest.fixture
+def docs(vs, tmp_path, monkeypatch):
+    import rag.manifest as manifest
+    import rag.pipeline as pipeline
+
+    monkeypatch.setattr(manifest, "_manifest", None)
+    monkeypatch.setattr(pipeline, "PARSE_WORKERS", 0)
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    return folder
+
+
+def _embedded():
+    from core.embedding_service import get_embedding_service
+
+    return get_embedding_service()._batched_texts
+
+
+def _write(path, paras, mtime=None):
+    path.write_text("\n\n".join(paras))
+    if mtime:
+        os.utime(path, (mtime, mtime))
+
+
+def test_restart_reconcile_skips_unchanged_files(docs):
+    import rag.manifest as manifest
+    from rag.ingest import reconcile
+    from rag.vector_store import count
+
+    _write(docs / "a.md", PARAS)
+    assert reconcile(str(docs)) == {"a.md": 1}  # 3 short paragraphs → 1 chunk
+    embedded = _embedded()
+    # simulated restart: manifest reloaded from disk, nothing re-embedded
+    manifest._manifest = None
+    assert reconcile(str(docs)) == {}
+    assert _embedded() == embedded and count() == 1
+
+    # touched but identical content: hash check, no re-embed
+    os.utime(docs / "a.md", (1, 1))
+    assert reconcile(str(docs)) == {}
+    assert _embedded() == embedded
+
+
+def test_edited_file_only_reembeds_changed_chunks(docs, monkeypatch):
+    import rag.ingest as ingest
+    from rag.ingest import reconcile
+    from rag.manifest import get_manifest
+    from rag.vector_store import count
+
+    # one chunk per paragraph
+    monkeypatch.setattr(ingest, "chunk_by_paragraph", lambda t: t.split("\n\n"))
+    path = docs / "notes.md"
+    _write(path, PARAS, mtime=1000)
+    assert reconcile(str(docs)) == {"notes.md": 3}
+    before = {h: i for i, h in get_manifest().get(str(path))["chunks"]}
+    embedded = _embedded()
+
+    _write(path, [PARAS[0], "Paragraph delta: " + "new " * 40, PARAS[2]], mtime=2000)
+    assert reconcile(str(docs)) == {"notes.md": 1}
+    assert _embedded() == embedded + 1
+    assert count() == 3
+    after = {h: i for i, h in get_manifest().get(str(path))["chunks"]}
+    kept = set(before) & set(after)
+    assert len(kept) == 2 and all(before[h] == after[h] for h in kept)
+
+
+def test_removed_file_is_purged(docs):
+    from rag.ingest import reconcile
+    from rag.manifest import get_manifest
+    from rag.vector_store import count, search
+    from rag.embeddings import embed
+
+    _write(docs / "keep.md", PARAS[:1])
+    _write(docs / "gone.md", PARAS[1:])
+    reconcile(str(docs))
+    assert count() == 2
+    (docs / "gone.md").unlink()
+    assert reconcile(str(docs)) == {"gone.md": "removed"}
+    assert count() == 1
+    assert get_manifest().stats() == {"files": 1, "chunks": 1}
+    assert {h["source"] for h in search(embed(PARAS[1]), top_k=5)} == {"keep.md"}
+
+
+def test_legacy_chunks_are_replaced_not_duplicated(docs):
+    from rag.embeddings import embed_batch
+    from rag.ingest import reconcile
+    from rag.vector_store import add_chunks, count
+
+    # ingested by the old watcher: no manifest entry
+    add_chunks(["old copy of the doc " * 10], embed_batch(["old copy of the doc " * 10]), source="a.md")
+    _write(docs / "a.md", PARAS)
+    reconcile(str(docs))
+    assert count() == 1
+
+
+def test_pipeline_parses_in_worker_processes_and_bulk_writes(docs):
+    from rag.pipeline import get_progress, ingest_files
+    from rag.vector_store import count
+
+    paths = []
+    for i in range(4):
+        path = docs / f"doc{i}.txt"
+        _write(path, [p.replace("Paragraph", f"Doc {i} paragraph") for p in PARAS])
+        paths.append(str(path))
+    seen = []
+    results = ingest_files(paths, workers=2, progress=seen.append)
+    assert results == {f"doc{i}.txt": 1 for i in range(4)}
+    assert count() == 4
+    final = get_progress()
+    assert final["done"] and final["files_written"] == 4 and final["pages"] == 4
+    assert final["write_batches"] >= 1 and final["chunks_per_sec"] > 0
+    assert seen and seen[-1]["stage"] == "done"
+    # second run: nothing to do
+    assert ingest_files(paths, workers=2) == {}
+
+
+def test_doc_watcher_ingests_new_file_within_a_second(docs, monkeypatch):
+    import time
+    import core.file_watcher as cfw
+    import rag.watcher as watcher
+    from rag.vector_store import count
+
+    monkeypatch.setattr(cfw, "DEBOUNCE", 0.05)
+    w = cfw.FileWatcher()
+    monkeypatch.setattr(cfw, "_watcher", w)
+    monkeypatch.setattr(watcher, "DOCS_DIR", str(docs))
+    monkeypatch.setattr(watcher, "_started", False)
+    try:
+        watcher.start_watcher()
+        t0 = time.monotonic()
+        _write(docs / "landed.md", PARAS)
+        while count() == 0 and time.monotonic() - t0 < 5:
+            time.sleep(0.02)
+        assert count() == 1
+        if w.backend == "inotify":
+            assert time.monotonic() - t0 < 1.0
+    finally:
+        w.stop()
@@ -0,0 +1,124 @@
+"""Tests for rag/reranker — score cache, margin skip, budget cap (fake CrossEncoder)."""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class _FakeCrossEncoder:
+    """Scores a pair by word overlap; records every pair it sees."""
+
+    def __init__(self):
+        self.pairs = []
+
+    def predict(self, pairs):
+        self.pairs.extend(pairs)
+        return [len(set(q.lower().split()) & set(t.lower().split())) for q, t in pairs]
+
+
+@pytest.fixture
+def rr(monkeypatch):
+    import rag.reranker as rr
+    import rag.vector_store as rvs
+    from collections import OrderedDict
+
+    monkeypatch.setattr(rr, "_reranker", _FakeCrossEncoder())
+    monkeypatch.setattr(rr, "_cache", OrderedDict())
+    monkeypatch.setattr(rr, "_cache_version", None)
+    monkeypatch.setattr(rr, "_pair_ms", None)
+    monkeypatch.setattr(rr, "SKIP_MARGIN", 0.15)
+    monkeypatch.setattr(rr, "BUDGET_MS", 150)
+    monkeypatch.setattr(rr, "_stats", {k: 0 for k in rr._stats})
+    monkeypatch.setattr(rvs, "_corpus_version", 0)
+    yield rr
+
+
+def _chunks(fused=(0.50, 0.45, 0.40, 0.35)):
+    texts = [
+        "the cat sat on the mat",
+        "solar panels charge the battery",
+        "how to charge the car battery at home",
+        "a recipe for tomato soup",
+    ]
+    return [
+        {"id": f"c{i}", "text": t, "fused_score": f}
+        for i, (t, f) in enumerate(zip(texts, fused))
+    ]
+
+
+def test_rerank_orders_by_cross_encoder_and_caches(rr):
+    timings = {}
+    out = rr.rerank("how do I charge the battery", _chunks(), top_k=2, timings=timings)
+    assert [c["id"] for c in out] == ["c2", "c1"]
+    assert len(rr._reranker.pairs) == 4
+    assert "rerank_model_ms" in timings and "rerank_ms" in timings
+
+    # same query modulo case/whitespace → served from cache
+    out = rr.rerank("How do I  charge the battery ", _chunks(), top_k=2)
+    assert [c["id"] for c in out] == ["c2", "c1"]
+    assert len(rr._reranker.pairs) == 4
+    assert rr.get_stats()["cache_hits"] == 4
+
+    # new ingest bumps the corpus version → cache dropped
+    import rag.vector_store as rvs
+
+    rvs._bump_corpus_version()
+    rr.rerank("how do I charge the battery", _chunks(), top_k=2)
+    assert len(rr._reranker.pairs) == 8
+
+
+def test_clear_first_stage_winner_skips_model(rr):
+    timings = {}
+    chunks = _chunks(fused=(0.9, 0.5, 0.4, 0.3))
+    out = rr.rerank("anything at all", chunks, top_k=2, timings=timings)
+    assert [c["id"] for c in out] == ["c0", "c1"]
+    assert rr._reranker.pairs == [] and timings["rerank_skipped"]
+    assert rr.get_stats()["skipped_margin"] == 1
+
+
+def test_candidate_cap_follows_latency_budget(rr, monkeypatch):
+    monkeypatch.setattr(rr, "_pair_ms", 60.0)  # 150ms budget → 2 pairs
+    assert rr.candidate_cap(top_k=1) == 2
+    out = rr.rerank("charge the car battery at home", _chunks(), top_k=2)
+    assert len(rr._reranker.pairs) == 2
+    assert [c["id"] for c in out] == ["c1", "c0"]
+    # a later, cached call scores the rest; cached ones come at no model cost
+    out = rr.rerank("charge the car battery at home", _chunks(), top_k=4)
+    assert len(rr._reranker.pairs) == 4
+    assert [c["id"] for c in out] == ["c2", "c1", "c0", "c3"]
+    assert rr.get_stats()["capped"] == 1
+    assert rr.candidate_cap(top_k=3) >= 3
+
+
+def test_model_failure_falls_back_to_first_stage(rr, monkeypatch):
+    class _Broken:
+        def predict(self, pairs):
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(rr, "_reranker", _Broken())
+    out = rr.rerank("charge the battery", _chunks(), top_k=2)
+    assert [c["id"] for c in out] == ["c0", "c1"]
+
+
+def test_hybrid_search_fuses_vector_and_bm25(monkeypatch):
+    pytest.importorskip("rank_bm25")
+    import numpy as np
+    import rag.retriever as rt
+
+    meta = [
+        {"id": "a", "text": "battery charging guide", "source": "a.md"},
+        {"id": "b", "text": "tomato soup recipe", "source": "b.md"},
+        {"id": "c", "text": "garden watering schedule", "source": "c.md"},
+    ]
+    monkeypatch.setattr(rt, "embed", lambda q: np.zeros((1, 384)))
+    monkeypatch.setattr(
+        rt, "search", lambda v, top_k: [dict(meta[1], score=0.6), dict(meta[0], score=0.5)]
+    )
+    monkeypatch.setattr(rt, "_load_meta", lambda: meta)
+    timings = {}
+    out = rt.hybrid_search("battery charging", top_k=3, timings=timings)
+    assert out[0]["id"] == "a" and out[0]["method"] == "hybrid"
+    assert out[0]["fused_score"] == pytest.approx(0.7 * 0.5 + 0.3)
+    assert {"vector_ms", "bm25_ms", "fuse_ms"} <= set(timings)
@@ -0,0 +1,99 @@
+"""Tests for core/spans — propagation across threads and tasks, sampling, export."""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import spans  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    import core.observability as obs
+
+    s = obs.ObservabilityStore(str(tmp_path))
+    monkeypatch.setattr(obs, "_store", s)
+    return s
+
+
+def _by_name(record):
+    return {s["name"]: s for s in record["spans"]}
+
+
+def test_spans_follow_work_into_executors_and_tasks(store):
+    root = spans.start_trace("brain.process", request_id="abc123", log_text="my password is hunter2")
+
+    def tool(name):
+        with spans.span(f"chain.{name}"):
+            spans.event("inner")
+        return spans.current_request_id()
+
+    with spans.span("handler.chain"):
+        with ThreadPoolExecutor(2) as ex:
+            bound = ex.submit(spans.bind(tool, "a")).result()
+            unbound = ex.submit(tool, "lost").result()  # no bind → no context
+
+        async def main():
+            async def task():
+                with spans.span("async.task"):
+                    await asyncio.to_thread(tool, "to_thread")
+
+            await asyncio.gather(task())
+
+        asyncio.run(main())
+    record = spans.finish_trace(root, intent="chain", agent="chain_executor")
+
+    assert bound == "abc123" and unbound is None
+    named = _by_name(record)
+    assert "chain.lost" not in named
+    assert named["chain.a"]["parent"] == named["handler.chain"]["id"]
+    assert named["chain.a"]["thread"] != named["handler.chain"]["thread"]
+    assert named["chain.to_thread"]["parent"] == named["async.task"]["id"]
+    assert named["handler.chain"]["parent"] == named["brain.process"]["id"]
+    assert spans.current() is None
+    assert store.get_recent(1)[0]["request_id"] == "abc123"
+    assert "hunter2" not in repr(store.query())  # user text never reaches the store
+    assert store.summary("5m", "step")["step"]["chain.a"]["count"] == 1
+
+
+def test_errors_are_recorded_and_reraised(store):
+    root = spans.start_trace("brain.process", request_id="err1")
+    with pytest.raises(ValueError):
+        with spans.span("llm.chat", model="phi3:mini"):
+            raise ValueError("model gone")
+    record = spans.finish_trace(root, intent="error", agent="error")
+    chat = _by_name(record)["llm.chat"]
+    assert chat["error"].startswith("ValueError") and chat["attrs"] == {"model": "phi3:mini"}
+    assert spans.finish_trace(root) == {}  # idempotent
+
+
+def test_unsampled_traces_keep_totals_only(store, monkeypatch):
+    monkeypatch.setattr(spans, "SAMPLE_RATE", 0.0)
+    root = spans.start_trace("brain.process", request_id="u1")
+    with spans.span("retrieval") as s:
+        assert s is None
+    record = spans.finish_trace(root, intent="chat", agent="ollama/phi3:mini")
+    assert "spans" not in record and record["steps"] == []
+    assert store.get_stats()["requests"] == 1
+
+    # outside any trace span() is a no-op too
+    with spans.span("orphan") as s:
+        assert s is None
+
+
+def test_span_cap_and_discard(store, monkeypatch):
+    monkeypatch.setattr(spans, "MAX_SPANS", 3)
+    root = spans.start_trace("brain.process", request_id="cap")
+    for i in range(5):
+        spans.event(f"e{i}")
+    record = spans.finish_trace(root)
+    assert len(record["spans"]) == 4 and record["spans_dropped"] == 2
+
+    early = spans.start_trace("brain.process", request_id="early")
+    spans.discard_trace(early)
+    assert spans.current() is None
+    assert [t["request_id"] for t in store.get_recent(5)] == ["cap"]
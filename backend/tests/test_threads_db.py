@@ -0,0 +1,112 @@
+"""Tests for threads_db — pooled WAL store, keyset pages, set-based fork."""
+import os
+import sqlite3
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture(autouse=True)
+def tmp_db(tmp_path, monkeypatch):
+    from memory import threads_db
+    db = str(tmp_path / "threads.db")
+    monkeypatch.setattr(threads_db, "DB_PATH", db)
+    threads_db.init_db()
+    yield db
+    threads_db.close_pool()
+
+
+def _thread_with(n):
+    from memory import threads_db
+    tid = str(uuid.uuid4())
+    threads_db.create_thread(tid, "u1", "t")
+    ids = []
+    for i in range(n):
+        ids.append(str(uuid.uuid4()))
+        threads_db.add_message(ids[-1], tid, "user" if i % 2 == 0 else "assistant", f"m{i}")
+    return tid, ids
+
+
+def test_wal_and_indexes(tmp_db):
+    conn = sqlite3.connect(tmp_db)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = " ".join(
+        str(r) for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM messages WHERE thread_id=? "
+            "ORDER BY created_at, rowid LIMIT 50", ("x",)
+        )
+    )
+    conn.close()
+    assert "idx_messages_thread_created" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_message_pages_follow_cursors():
+    from memory import threads_db
+    tid, _ = _thread_with(25)
+    first = threads_db.get_messages(tid, limit=10)
+    assert [m["content"] for m in first] == [f"m{i}" for i in range(10)]
+    second = threads_db.get_messages(tid, limit=10, after=first[-1]["cursor"])
+    assert [m["content"] for m in second] == [f"m{i}" for i in range(10, 20)]
+    back = threads_db.get_messages(tid, limit=5, before=second[0]["cursor"])
+    assert [m["content"] for m in back] == [f"m{i}" for i in range(5, 10)]
+    recent = threads_db.get_recent_messages(tid, limit=3)
+    assert [m["content"] for m in recent] == ["m22", "m23", "m24"]
+
+
+def test_thread_list_pages_newest_first():
+    from memory import threads_db
+    made = [_thread_with(1)[0] for _ in range(5)]
+    page = threads_db.get_threads("u1", limit=2)
+    rest = threads_db.get_threads("u1", before=page[-1]["cursor"])
+    assert [t["id"] for t in page + rest] == made[::-1]
+    with pytest.raises(ValueError):
+        threads_db.get_threads("u1", before="garbage")
+
+
+def test_fork_copies_prefix_in_order():
+    from memory import threads_db
+    tid, ids = _thread_with(80)
+    threads_db.fork_thread("f1", tid, "u1", ids[59], "fork")
+    copied = threads_db.get_messages("f1", limit=500)
+    assert [m["content"] for m in copied] == [f"m{i}" for i in range(60)]
+    assert not {m["id"] for m in copied} & set(ids)
+    # unknown message id copies the whole thread
+    threads_db.fork_thread("f2", tid, "u1", "missing", "fork")
+    assert len(threads_db.get_messages("f2", limit=500)) == 80
+
+
+def test_search_is_scoped_ranked_and_paged():
+    from memory import threads_db
+    tid, ids = _thread_with(0)
+    for i in range(30):
+        threads_db.add_message(str(uuid.uuid4()), tid, "user", f"deploy the kubernetes cluster {i}")
+    threads_db.add_message(str(uuid.uuid4()), tid, "user", "kubernetes kubernetes kubernetes")
+    threads_db.create_thread("other", "u2", "x")
+    threads_db.add_message("o1", "other", "user", "kubernetes for someone else")
+
+    first = threads_db.search_messages("u1", "kubern*", limit=10)
+    assert first[0]["snippet"].count("<mark>kubernetes</mark>") == 3
+    assert first[0]["thread_title"] == "t"
+    rest = threads_db.search_messages("u1", "kubern*", limit=50, after=first[-1]["cursor"])
+    seen = [h["id"] for h in first + rest]
+    assert len(seen) == len(set(seen)) == 31
+    assert "o1" not in seen
+    assert threads_db.search_messages("u1", "kubern") == []
+    assert threads_db.search_messages("u1", "!!!") == []
+
+
+def test_search_index_follows_fork_and_delete():
+    from memory import threads_db
+    tid, ids = _thread_with(4)
+    threads_db.fork_thread("f1", tid, "u1", ids[1], "fork")
+    assert {h["thread_id"] for h in threads_db.search_messages("u1", "m1")} == {tid, "f1"}
+    assert threads_db.delete_thread(tid, "u1")
+    assert {h["thread_id"] for h in threads_db.search_messages("u1", "m1")} == {"f1"}
+    threads_db.archive_thread("f1", "u1")
+    assert threads_db.search_messages("u1", "m1") == []
+    with threads_db._conn() as c:
+        c.execute("INSERT INTO messages_fts (messages_fts) VALUES ('integrity-check')")
@@ -0,0 +1,82 @@
+"""Tests for memory/vector_index — mmap brute-force search, in-process updates, reload."""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _rows(n, seed=0, source="exchange"):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((n, 384)).astype(np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    rows = [
+        {
+            "id": f"{source}-{seed}-{i}",
+            "text": f"row {i} — ünïcode",
+            "source": source,
+            "user": "user",
+            "user_id": "u1",
+            "fact_type": source,
+            "priority": 0.5,
+            "ts": float(i),
+        }
+        for i in range(n)
+    ]
+    return rows, x
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_search_matches_exact_scan(tmp_path, dtype):
+    from memory.vector_index import VectorIndex
+
+    rows, x = _rows(500)
+    idx = VectorIndex(str(tmp_path), dtype=dtype)
+    idx.build(rows, x, version=3)
+    q = x[7] + 0.01
+    truth = np.argsort(((x - q) ** 2).sum(1))[:10]
+    hits = idx.search(q, 10)
+    assert [h["id"] for h in hits] == [rows[i]["id"] for i in truth]
+    assert hits[0]["_distance"] == pytest.approx(float(((x[7] - q) ** 2).sum()), abs=1e-2)
+    assert hits[0]["text"] == "row 7 — ünïcode"
+    assert hits[0]["user_id"] == "u1" and hits[0]["ts"] == 7.0
+
+
+def test_reload_is_memory_mapped(tmp_path):
+    from memory.vector_index import VectorIndex
+
+    rows, x = _rows(50)
+    VectorIndex(str(tmp_path)).build(rows, x, version=9)
+    idx = VectorIndex(str(tmp_path))
+    assert idx.load()
+    assert isinstance(idx._vecs, np.memmap)
+    assert idx.version == 9 and idx.count() == 50
+    assert idx.search(x[3], 1)[0]["id"] == rows[3]["id"]
+
+
+def test_tail_tombstones_bumps_and_persist(tmp_path):
+    from memory.vector_index import VectorIndex
+
+    rows, x = _rows(20)
+    idx = VectorIndex(str(tmp_path))
+    idx.build(rows, x, version=1)
+    new, nx = _rows(3, seed=1, source="rag_chunk")
+    idx.add([dict(r, vector=v) for r, v in zip(new, nx)], version=2)
+    assert idx.search(nx[1], 1)[0]["id"] == new[1]["id"]
+    assert [h["source"] for h in idx.search(x[0], 5, source="rag_chunk")] == ["rag_chunk"] * 3
+
+    idx.delete([rows[0]["id"], new[0]["id"]], version=3)
+    assert idx.count() == 21
+    assert rows[0]["id"] not in {h["id"] for h in idx.search(x[0], 21)}
+    idx.bump({rows[1]["id"]: 99.0}, 0.05, version=4)
+    hit = idx.search(x[1], 1)[0]
+    assert hit["ts"] == 99.0 and hit["priority"] == pytest.approx(0.55)
+
+    assert idx.persist()
+    again = VectorIndex(str(tmp_path))
+    assert again.load()
+    assert again.version == 4 and again.count() == 21 and again.stats()["tail_rows"] == 0
+    assert again.search(nx[2], 1)[0]["id"] == new[2]["id"]
+    assert again.search(x[1], 1)[0]["ts"] == 99.0
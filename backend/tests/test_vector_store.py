@@ -0,0 +1,323 @@
+"""Tests for memory/vector_store — batched appends, retention, maintenance (fake embedder)."""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+pytest.importorskip("lancedb")
+
+
+class _FakeModel:
+    def encode(self, texts, normalize_embeddings=True, show_progress_bar=False):
+        out = []
+        for t in texts:
+            rng = np.random.default_rng(abs(hash(t)) % 2**32)
+            out.append(rng.standard_normal(384))
+        a = np.asarray(out, dtype=np.float32)
+        return a / np.linalg.norm(a, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def vs(tmp_path, monkeypatch):
+    import memory.vector_store as vs
+    from core.embedding_service import EmbeddingService
+    import core.embedding_service as es
+
+    svc = EmbeddingService(model_name="fake")
+    svc._model = _FakeModel()
+    monkeypatch.setattr(es, "_service", svc)
+    monkeypatch.setattr(vs, "DB_DIR", str(tmp_path / "lancedb"))
+    monkeypatch.setattr(vs, "_table", None)
+    monkeypatch.setattr(vs, "_pending", [])
+    monkeypatch.setattr(vs, "_pending_bumps", {})
+    monkeypatch.setattr(vs, "APPEND_BATCH", 4)
+    monkeypatch.setattr(vs, "_retry_at", 0.0)
+    monkeypatch.setattr(vs, "_backoff", 0.0)
+    monkeypatch.setattr(vs, "_write_stats", {"flush_failures": 0, "dropped_rows": 0})
+    import memory.dedup_index as di
+
+    monkeypatch.setattr(di, "_index", None)
+    import memory.cold_tier as ct
+
+    monkeypatch.setattr(ct, "_segment", None)
+    import memory.vector_index as vi
+
+    monkeypatch.setattr(vi, "_index", None)
+    monkeypatch.setattr(vi, "_searches", {"mmap": 0, "lancedb": 0, "shadow": 0})
+    yield vs
+
+
+_VOCAB = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima "
+    "mike november oscar papa quebec romeo sierra tango uniform victor whiskey"
+).split()
+
+
+def _exchange(vs, i, user_id="u1"):
+    """Distinct (non near-duplicate) exchange per i."""
+    import random
+
+    rng = random.Random(i)
+    words = lambda: " ".join(rng.choice(_VOCAB) for _ in range(8))  # noqa: E731
+    return vs.store_exchange(words(), words(), user_id=user_id)
+
+
+def test_appends_are_buffered_until_batch_full(vs):
+    for i in range(3):
+        assert _exchange(vs, i)
+    assert vs._get_table().count_rows() == 0
+    assert vs.get_memory_count() == 3
+    _exchange(vs, 3)
+    assert vs._get_table().count_rows() == 4
+    assert vs._pending == []
+
+
+def test_pending_rows_are_searchable(vs):
+    assert vs.store_fact("my favourite colour is teal", user_id="u1")
+    facts, _ = vs.semantic_search("my favourite colour is teal", user_id="u1")
+    assert facts and facts[0]["text"] == "my favourite colour is teal"
+    # dedup sees the buffered row too
+    assert vs.store_fact("my favourite colour is teal!", user_id="u1") is False
+
+
+def test_flush_writes_respects_max_delay(vs, monkeypatch):
+    _exchange(vs, 0)
+    monkeypatch.setattr(vs, "APPEND_MAX_DELAY", 3600)
+    assert vs.flush_writes(force=False) == 0
+    assert vs.flush_writes() == 1
+
+
+def test_failing_table_keeps_a_bounded_buffer(vs, monkeypatch):
+    real_table = vs._get_table
+    _exchange(vs, 0)
+    vs._bump("some-stored-row")
+    monkeypatch.setattr(vs, "_get_table", lambda: None)
+    assert vs.flush_writes() == 0
+    assert (len(vs._pending), len(vs._pending_bumps)) == (1, 1)  # nothing thrown away
+
+    class _Broken:
+        def add(self, data):
+            raise OSError("disk full")
+
+        def update(self, **kw):
+            raise OSError("disk full")
+
+    monkeypatch.setattr(vs, "_get_table", lambda: _Broken())
+    monkeypatch.setattr(vs, "PENDING_MAX", 6)
+    vs._retry_at = 0.0
+    for i in range(1, 10):
+        _exchange(vs, i)
+    stats = vs.write_stats()
+    assert stats["pending_rows"] == 6 and stats["dropped_rows"] == 4
+    assert stats["flush_failures"] == 2  # later full batches waited for the back-off
+    assert stats["retry_in_s"] > 0
+    assert vs.flush_writes(force=False) == 0
+
+    monkeypatch.setattr(vs, "_get_table", real_table)
+    assert vs.flush_writes() == 6
+    assert vs.write_stats()["pending_rows"] == 0
+
+
+def test_compress_memory_drops_oldest_fifth(vs):
+    for i in range(10):
+        _exchange(vs, i)
+    assert vs.compress_memory(max_exchanges=5) == 2
+    assert vs._get_table().count_rows() == 8
+
+
+def test_retention_per_user_and_age(vs):
+    import time
+    import memory.vector_maintenance as vm
+
+    for i in range(6):
+        _exchange(vs, i, user_id="a")
+    for i in range(2):
+        _exchange(vs, 100 + i, user_id="b")
+    vs.flush_writes()
+    policies = {"exchange": {"max_per_user": 3}}
+    assert vm.apply_retention(policies) == 3
+    assert vs._get_table().count_rows("user_id = 'b'") == 2
+    future = time.time() + 10 * 86400
+    assert vm.apply_retention({"exchange": {"max_age_days": 1}}, now=future) == 5
+
+
+def test_run_maintenance_reports_fragments(vs):
+    import memory.vector_maintenance as vm
+
+    for i in range(9):
+        _exchange(vs, i)
+    stats = vm.run_maintenance()
+    assert stats["runs"] >= 1
+    metrics = vm.table_metrics()
+    assert metrics["rows"] == 9
+    assert metrics["pending_writes"] == 0
+    assert metrics["fragments"] is not None
+
+
+def test_near_duplicate_exchange_skips_embedding(vs):
+    import core.embedding_service as es
+    from memory.dedup_index import get_dedup_index
+
+    assert vs.store_exchange("what's my cpu usage", "Your CPU is at 23% right now.")
+    misses = es._service.stats()["misses"]
+    assert vs.store_exchange("what's my cpu usage?", "Your CPU is at 41% right now.") is False
+    assert es._service.stats()["misses"] == misses  # never embedded
+    assert get_dedup_index().stats()["suppressed_by_source"] == {"exchange": 1}
+    assert vs.get_memory_count() == 1
+
+
+def test_duplicate_bump_updates_stored_row(vs):
+    _exchange(vs, 1)
+    vs.flush_writes()
+    before = vs._scan("source = 'exchange'", ["ts", "priority"])[0]
+    assert _exchange(vs, 1) is False
+    vs.flush_writes()
+    after = vs._scan("source = 'exchange'", ["ts", "priority"])[0]
+    assert after["ts"] > before["ts"]
+    assert after["priority"] > before["priority"]
+
+
+def test_dedup_index_persists_and_forgets_deleted_rows(vs):
+    from memory.dedup_index import DedupIndex, get_dedup_index
+
+    for i in range(10):
+        _exchange(vs, i)
+    idx = get_dedup_index()
+    assert idx.save()
+    reloaded = DedupIndex(idx.path)
+    assert reloaded.load()
+    assert reloaded.stats()["signatures"] == 10
+    vs.compress_memory(max_exchanges=5)
+    assert idx.stats()["signatures"] == 8
+
+
+def test_outdated_dedup_index_is_rebuilt(vs, monkeypatch):
+    import json
+    import memory.dedup_index as di
+
+    assert vs.store_fact("I am 30 years old", user_id="u1")
+    vs.flush_writes()
+    idx = di.get_dedup_index()
+    assert idx.save(force=True)
+    with open(idx.path) as f:
+        data = json.load(f)
+    # as written before FORMAT_VERSION: no version, digits collapsed for facts too
+    del data["version"]
+    for bucket in data["buckets"]:
+        bucket["entries"] = [[r, format(di.simhash("I am 30 years old"), "x")] for r, _ in bucket["entries"]]
+    with open(idx.path, "w") as f:
+        json.dump(data, f)
+
+    assert di.DedupIndex(idx.path).load() is False
+    monkeypatch.setattr(di, "_index", None)
+    assert vs.store_fact("I am 31 years old", user_id="u1")  # old signature not trusted
+    with open(di.get_dedup_index().path) as f:
+        assert json.load(f)["version"] == di.FORMAT_VERSION
+
+
+def test_fact_updates_that_only_change_a_number_are_stored(vs):
+    from memory.dedup_index import simhash
+
+    assert vs.store_fact("I am 30 years old", user_id="u1")
+    assert vs.store_fact("I am 31 years old", user_id="u1")
+    assert vs.store_fact("My meeting is at 3pm", user_id="u1")
+    assert vs.store_fact("My meeting is at 5pm", user_id="u1")
+    assert vs.store_fact("I am 31 years old", user_id="u1") is False  # true repeat
+    for a, b in (("call me on 555 0134", "call me on 555 0178"), ("age 30", "age 31")):
+        assert (simhash(a, numbers=True) ^ simhash(b, numbers=True)).bit_count() > 10
+    assert simhash("CPU is at 23%") == simhash("CPU is at 41%")  # exchanges still collapse
+
+
+def test_simhash_distinguishes_unrelated_text():
+    from memory.dedup_index import simhash
+
+    a = simhash("User: run git status\nASTRA: nothing to commit, working tree clean")
+    b = simhash("User: run git status\nASTRA: nothing to commit, working tree clean.")
+    c = simhash("User: tell me a joke about cats\nASTRA: Why did the cat sit on it?")
+    assert (a ^ b).bit_count() <= 3
+    assert (a ^ c).bit_count() > 10
+
+
+def test_old_exchanges_move_to_cold_tier_and_stay_searchable(vs):
+    import time
+    import memory.vector_maintenance as vm
+    from memory.cold_tier import get_cold_tier
+
+    assert vs.store_exchange("where did I park the car", "You parked on level three.")
+    for i in range(5):
+        _exchange(vs, i)
+    vs.flush_writes()
+    assert vm.tier_cold_rows(now=time.time() + 365 * 86400) == 6
+    assert vs._get_table().count_rows() == 0
+    assert get_cold_tier().count() == 6
+    assert vs.get_memory_count() == 6
+    _, exchanges = vs.semantic_search(
+        "User: where did I park the car\nASTRA: You parked on level three.",
+        user_id="default",
+    )
+    assert exchanges and "level three" in exchanges[0]["text"]
+    # retention sees cold rows too
+    assert vs.compress_memory(max_exchanges=2) == 1
+    assert get_cold_tier().count() == 5
+
+
+def test_small_corpus_switches_to_mmap_index(vs):
+    import memory.vector_index as vi
+
+    for i in range(8):
+        _exchange(vs, i)
+    vs.flush_writes()
+    query = "User: where did I park the car\nASTRA: You parked on level three."
+    before = vs.semantic_search(query, user_id="u1")
+    assert vi._searches["lancedb"] == 1
+
+    vi.index_tick()  # builds the index: 8 rows ≤ MMAP_MAX_ROWS
+    assert vi.get_vector_index().count() == 8
+    assert vs.semantic_search(query, user_id="u1") == before
+    assert vi._searches["mmap"] == 1
+
+    # writes through the store keep the index in sync with the table
+    assert vs.store_exchange("where did I park the car", "You parked on level three.")
+    vs.flush_writes()
+    assert vi.active_index(vs._get_table()) is not None
+    _, exchanges = vs.semantic_search(query, user_id="default")
+    assert "level three" in exchanges[0]["text"]
+    vs._delete_ids([vs._scan("user_id = 'default'", ["id"])[0]["id"]])
+    assert vi.active_index(vs._get_table()) is not None
+    assert vs.semantic_search(query, user_id="default") == ([], [])
+    assert vi._searches["lancedb"] == 1
+
+
+def test_rag_search_uses_mmap_index(vs):
+    import memory.vector_index as vi
+    from rag.embeddings import embed, embed_batch
+    from rag.vector_store import add_chunks, search
+
+    _exchange(vs, 0)
+    vs.flush_writes()
+    vi.index_tick()
+    chunks = ["the router password is on the fridge", "tomatoes need six hours of sun"]
+    add_chunks(chunks, embed_batch(chunks), source="notes.md")
+    assert vi.active_index(vs._get_table()) is not None
+    hits = search(embed(chunks[1]), top_k=5)
+    assert [h["text"] for h in hits] == [chunks[1], chunks[0]]
+    assert hits[0]["source"] == "notes.md" and hits[0]["score"] == pytest.approx(1.0, abs=1e-4)
+    assert vi._searches["mmap"] == 1
+
+
+def test_delete_source_purges_chunks_and_bumps_corpus_version(vs):
+    import rag.vector_store as rvs
+    from rag.embeddings import embed, embed_batch
+
+    a = ["warranty lasts two years", "returns within thirty days"]
+    b = ["the fridge manual says defrost monthly"]
+    rvs.add_chunks(a, embed_batch(a), source="policy.pdf")
+    rvs.add_chunks(b, embed_batch(b), source="fridge.pdf")
+    before = rvs.corpus_version()
+    assert rvs.delete_source("policy.pdf") == 2
+    assert rvs.corpus_version() > before
+    assert rvs.count() == 1
+    assert {h["source"] for h in rvs.search(embed(a[0]), top_k=5)} == {"fridge.pdf"}
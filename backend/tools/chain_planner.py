@@ -4,6 +4,8 @@ import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict
 
+from core.spans import bind, span
+
 logger = logging.getLogger(__name__)
 
 CHAIN_KEYWORDS = {
@@ -146,6 +148,11 @@ def _run_step(step: Dict, prev_result: str) -> str:
     return f"[{tool}] no handler"
 
 
+def _run_step_traced(step: Dict, prev_result: str) -> str:
+    with span(f"chain.{step['tool']}"):
+        return _run_step(step, prev_result)
+
+
 def execute_chain(plan: list, brain=None) -> str:
     """
     Execute chain plan. Parallel-safe steps run concurrently via ThreadPoolExecutor.
@@ -169,7 +176,9 @@ def execute_chain(plan: list, brain=None) -> str:
     # Run parallel steps concurrently
     if parallel_steps:
         with ThreadPoolExecutor(max_workers=min(4, len(parallel_steps))) as ex:
-            future_to_step = {ex.submit(_run_step, s, ""): s for s in parallel_steps}
+            future_to_step = {
+                ex.submit(bind(_run_step_traced, s, "")): s for s in parallel_steps
+            }
             for future in as_completed(future_to_step):
                 step = future_to_step[future]
                 result = future.result()
@@ -179,7 +188,7 @@ def execute_chain(plan: list, brain=None) -> str:
 
     # Run sequential steps in order
     for step in sequential_steps:
-        result = _run_step(step, prev_result)
+        result = _run_step_traced(step, prev_result)
         results[step["tool"]] = result
         ordered_output.append(f"[{step['tool'].upper()}] {result}")
         prev_result = result
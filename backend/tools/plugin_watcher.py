@@ -1,9 +1,7 @@
 # tools/plugin_watcher.py
 # Hot-reload plugin system — drop a .py file in plugins/ and ASTRA
-# picks it up immediately without restart
+# picks it up immediately without restart (events from core/file_watcher.py)
 import os
-import time
-import threading
 import importlib
 import logging
 
@@ -48,13 +46,24 @@ def _scan():
             _watched[fpath] = mtime
 
 
-def _watch_loop():
-    while _running:
-        try:
+def _is_plugin(path: str) -> bool:
+    fname = os.path.basename(path)
+    return fname.endswith(".py") and not fname.startswith("_")
+
+
+def _on_change(changes: dict) -> None:
+    """Shared file-watcher callback: (re)load written plugins, forget deleted ones."""
+    for fpath, kind in changes.items():
+        if kind == "rescan":
             _scan()
-        except Exception as e:
-            logger.debug("plugin_watcher scan error: %s", e)
-        time.sleep(3)
+        elif kind == "deleted":
+            if _watched.pop(fpath, None) is not None:
+                logger.info("🗑️  Plugin removed: %s", os.path.basename(fpath))
+        elif os.path.isfile(fpath):
+            mtime = os.path.getmtime(fpath)
+            if _watched.get(fpath) != mtime:
+                _load_plugin(fpath)
+                _watched[fpath] = mtime
 
 
 def start():
@@ -66,23 +75,29 @@ def start():
         with open(readme, "w") as f:
             f.write("""# ASTRA Plugins
 
-Drop any .py file here and ASTRA hot-loads it within 3 seconds.
+Drop any .py file here and ASTRA hot-loads it as soon as it is saved.
 
 ## Example plugin
 ```python
 After saving, ASTRA's ReAct agent can immediately use:
   Action: weather(London)
 """)
+    if _running:
+        return
     _running = True
     _scan()  # load existing plugins immediately
-    t = threading.Thread(target=_watch_loop, daemon=True, name="plugin-watcher")
-    t.start()
+    from core.file_watcher import get_file_watcher
+
+    get_file_watcher().watch("plugins", PLUGINS_DIR, _on_change, accept=_is_plugin)
     logger.info("🔌 Plugin watcher started (dir=%s)", PLUGINS_DIR)
 
 
 def stop():
     global _running
     _running = False
+    from core.file_watcher import get_file_watcher
+
+    get_file_watcher().unwatch("plugins")
 
 
 def list_plugins() -> list:
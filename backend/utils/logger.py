@@ -1,7 +1,28 @@
+# utils/logger.py — Structured JSON logs for the astra.* loggers
+# Log calls never touch the disk: a QueueHandler puts the record on a bounded
+# queue (LOG_QUEUE_MAX) and one QueueListener thread encodes JSON and writes
+# the files, rotating each by size (LOG_MAX_BYTES) and age (LOG_ROTATE_HOURS).
+# When the queue is full the record is dropped and counted, never waited on.
+# DEBUG records can be sampled per logger (LOG_DEBUG_SAMPLE="astra.agent=0.1"
+# keeps one in ten). Counters are in get_stats().
+import atexit
+import copy
+import json as _json
 import logging
-import json
+import logging.handlers
 import os
-from datetime import datetime, timezone, timezone
+import queue
+import time
+from datetime import datetime
+from typing import Dict
+
+from utils.request_id import get_request_id
+from utils.telemetry import get_current_trace_id
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
 
 LOG_DIR = os.path.join(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs"
@@ -12,11 +33,48 @@ AGENT_LOG = os.path.join(LOG_DIR, "agent.log")
 SYSTEM_LOG = os.path.join(LOG_DIR, "system.log")
 CHAT_LOG = os.path.join(LOG_DIR, "chat.log")
 
+QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", 10000))
+MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 20 * 1024 * 1024))
+BACKUPS = int(os.getenv("LOG_BACKUPS", 5))
+ROTATE_S = float(os.getenv("LOG_ROTATE_HOURS", 24)) * 3600
+LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+
+def _parse_sampling(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, rate = part.partition("=")
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            pass
+    return rates
+
+
+def _dumps(obj) -> str:
+    if _orjson is not None:
+        try:  # non-str keys are stringified like json.dumps would
+            return _orjson.dumps(obj, default=str, option=_orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:  # e.g. ints beyond 64 bits
+            pass
+    return _json.dumps(obj, default=str)
+
 
 class JSONFormatter(logging.Formatter):
+    _sec = None
+    _sec_text = ""
+
+    def _ts(self, created: float) -> str:
+        # ISO-8601 UTC like datetime.isoformat(); the seconds part is cached
+        sec = int(created)
+        if sec != self._sec:
+            self._sec = sec
+            self._sec_text = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        return f"{self._sec_text}.{int((created - sec) * 1e6):06d}+00:00"
+
     def format(self, record):
         log = {
-            "ts": datetime.now(timezone.utc).isoformat(),
+            "ts": self._ts(record.created),
             "level": record.levelname,
             "logger": record.name,
             "request_id": getattr(record, "request_id", "-"),
@@ -27,26 +85,190 @@ class JSONFormatter(logging.Formatter):
             log["event"] = record.event
         if hasattr(record, "data"):
             log["data"] = record.data
-        return json.dumps(log)
+        if record.exc_text:
+            log["exc"] = record.exc_text
+        return _dumps(log)
 
 
-def _make_logger(name: str, filepath: str, level=logging.INFO) -> logging.Logger:
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    if not logger.handlers:
-        fh = logging.FileHandler(filepath)
-        fh.setFormatter(JSONFormatter())
-        logger.addHandler(fh)
-        # Also print to console in human-readable form
-        ch = logging.StreamHandler()
-        ch.setFormatter(
+class SizeTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that also rolls over once the file is max_age_s old.
+    Runs on the listener thread only: keeps its own size count instead of
+    seek()/tell() per record, and leaves flushing to the caller (_Router
+    flushes whenever the queue runs empty).
+    """
+
+    def __init__(self, filename, max_bytes: int, backups: int, max_age_s: float):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups, delay=True)
+        self.max_age_s = max_age_s
+        self._opened = time.time()  # when the current file was started
+        self._size = 0
+
+    def _started(self) -> float:
+        """
+        When the existing file was begun, so restarts don't reset its age.
+        mtime/ctime move on every append; use the birth time where the OS
+        has one, else the first record's "ts".
+        """
+        st = os.stat(self.baseFilename)
+        born = getattr(st, "st_birthtime", None)
+        if born:
+            return born
+        try:
+            with open(self.baseFilename, "rb") as f:
+                ts = _json.loads(f.readline())["ts"]
+            return datetime.fromisoformat(ts).timestamp()
+        except Exception:
+            return st.st_mtime
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+                self._size = self.stream.seek(0, 2)
+                self._opened = self._started() if self._size else time.time()
+            aged = self.max_age_s and time.time() - self._opened >= self.max_age_s
+            full = self.maxBytes and self._size + len(line) >= self.maxBytes
+            if self._size and (aged or full):
+                self.doRollover()
+            self.stream.write(line)
+            self._size += len(line)  # characters, not bytes: close enough for rotation
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.stream is None:
+            self.stream = self._open()
+        self._opened = time.time()
+        self._size = 0
+
+
+class _Pipeline:
+    """The queue, its listener and the per-logger counters shared by all astra.* loggers."""
+
+    def __init__(self):
+        self.queue: queue.Queue = queue.Queue(maxsize=QUEUE_MAX)
+        self.files: Dict[str, logging.Handler] = {}
+        self.console = logging.StreamHandler()
+        self.console.setFormatter(
             logging.Formatter(
                 "\x1b[36m%(asctime)s\x1b[0m \x1b[33m[%(name)s]\x1b[0m %(message)s",
                 datefmt="%H:%M:%S",
             )
         )
-        ch.setLevel(level)
-        logger.addHandler(ch)
+        self.sampling = _parse_sampling(os.getenv("LOG_DEBUG_SAMPLE", ""))
+        self._seen: Dict[str, int] = {}
+        self.dropped: Dict[str, int] = {}
+        self.sampled_out: Dict[str, int] = {}
+        self.written = 0
+        self.listener = logging.handlers.QueueListener(
+            self.queue, _Router(self), respect_handler_level=False
+        )
+        self.listener.start()
+        self._stopped = False
+
+    def keep(self, record) -> bool:
+        """Per-logger sampling of DEBUG records (1 in round(1/rate))."""
+        if record.levelno > logging.DEBUG or not self.sampling:
+            return True
+        rate = self.sampling.get(record.name)
+        if rate is None or rate >= 1.0:
+            return True
+        n = self._seen.get(record.name, 0) + 1  # racy by design: approximate is fine
+        self._seen[record.name] = n
+        if rate > 0 and n % max(1, round(1 / rate)) == 0:
+            return True
+        self.sampled_out[record.name] = self.sampled_out.get(record.name, 0) + 1
+        return False
+
+    def stop(self) -> None:
+        if self._stopped:
+            return
+        self._stopped = True
+        self.listener.stop()  # drains what is queued
+        for h in self.files.values():
+            h.close()
+
+
+class _Router(logging.Handler):
+    """Runs on the listener thread: file by logger name, plus the console."""
+
+    def __init__(self, pipeline: _Pipeline):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def handle(self, record):
+        pipeline = self.pipeline
+        fh = pipeline.files.get(record.name)
+        if fh is not None and record.levelno >= fh.level:
+            fh.handle(record)
+        if record.levelno >= pipeline.console.level:
+            pipeline.console.handle(record)
+        pipeline.written += 1
+        if pipeline.queue.empty():  # a burst is written out before one flush
+            for h in pipeline.files.values():
+                h.flush()
+        return True
+
+    def emit(self, record):
+        self.handle(record)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Bounded, never blocks: a full queue drops the record and counts it."""
+
+    def __init__(self, pipeline: _Pipeline):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def prepare(self, record):
+        # Resolve everything tied to the calling thread/context before the
+        # record changes threads: the message, the traceback and request ids.
+        # A copy goes on the queue — the original still propagates to root.
+        msg = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg, record.args, record.exc_info = msg, None, None
+        if not hasattr(record, "request_id"):
+            record.request_id = get_request_id()
+        if not hasattr(record, "trace_id"):
+            record.trace_id = get_current_trace_id()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            name = record.name
+            self.pipeline.dropped[name] = self.pipeline.dropped.get(name, 0) + 1
+
+    def emit(self, record):
+        if not self.pipeline.keep(record):
+            return
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+_EXC_FORMATTER = logging.Formatter()
+
+
+_pipeline = _Pipeline()
+atexit.register(_pipeline.stop)
+
+
+def _make_logger(name: str, filepath: str, level=None) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.setLevel(level if level is not None else LEVEL)
+    if not logger.handlers:
+        fh = SizeTimeRotatingFileHandler(filepath, MAX_BYTES, BACKUPS, ROTATE_S)
+        fh.setFormatter(JSONFormatter())
+        _pipeline.files[name] = fh
+        logger.addHandler(_QueueHandler(_pipeline))
     return logger
 
 
@@ -61,6 +283,8 @@ def log_event(logger: logging.Logger, event: str, **data):
     Structured log helper.
     Usage: log_event(agent_logger, "react_step", step=1, action="web_search")
     """
+    if not logger.isEnabledFor(logging.INFO):
+        return
     record = logging.LogRecord(
         name=logger.name,
         level=logging.INFO,
@@ -73,3 +297,36 @@ def log_event(logger: logging.Logger, event: str, **data):
     record.event = event
     record.data = data
     logger.handle(record)
+
+
+def set_sampling(logger_name: str, rate: float) -> None:
+    """Keep roughly `rate` of the DEBUG records from logger_name (1.0 = all)."""
+    _pipeline.sampling[logger_name] = min(1.0, max(0.0, rate))
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """Wait until everything queued so far has been written (tests, shutdown)."""
+    deadline = time.monotonic() + timeout
+    while _pipeline.queue.unfinished_tasks:  # files are flushed once the queue runs empty
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def shutdown() -> None:
+    """Drain and stop the listener (also registered with atexit); not restartable."""
+    _pipeline.stop()
+
+
+def get_stats() -> dict:
+    return {
+        "queue_depth": _pipeline.queue.qsize(),
+        "queue_max": QUEUE_MAX,
+        "written": _pipeline.written,
+        "dropped": dict(_pipeline.dropped),
+        "sampled_out": dict(_pipeline.sampled_out),
+        "sampling": dict(_pipeline.sampling),
+        "encoder": "orjson" if _orjson is not None else "json",
+        "files": {name: h.baseFilename for name, h in _pipeline.files.items()},
+    }
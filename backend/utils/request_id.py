@@ -1,21 +1,24 @@
-import threading
+import contextvars
 import uuid
 import logging
 
-_local = threading.local()
+# a ContextVar, not thread-local: the id set by the HTTP middleware follows the
+# request into asyncio.to_thread() and core.spans.bind()-wrapped executor calls
+_request_id: contextvars.ContextVar = contextvars.ContextVar("request_id", default="-")
 
 
 def set_request_id(rid: str = None) -> str:
-    _local.request_id = rid or uuid.uuid4().hex[:8]
-    return _local.request_id
+    rid = rid or uuid.uuid4().hex[:8]
+    _request_id.set(rid)
+    return rid
 
 
 def get_request_id() -> str:
-    return getattr(_local, "request_id", "-")
+    return _request_id.get()
 
 
 def clear_request_id():
-    _local.request_id = "-"
+    _request_id.set("-")
 
 
 class RequestIdFilter(logging.Filter):
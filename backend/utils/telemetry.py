@@ -5,6 +5,7 @@ Provides:
   - init_telemetry()     call once at startup
   - get_tracer()         returns the module tracer
   - start_span()         context manager for manual spans
+  - is_enabled()         True once init_telemetry() set up a tracer
   - trace_brain_step()   decorator for Brain pipeline steps
 
 Export targets (via env vars):
@@ -79,6 +80,10 @@ def init_telemetry(service_name: str = None):
         _enabled = False
 
 
+def is_enabled() -> bool:
+    return bool(_enabled and _tracer)
+
+
 def get_tracer():
     """Return the OTel tracer, or a no-op stub if disabled."""
     if _tracer:
@@ -101,15 +106,16 @@ def start_span(name: str, attributes: dict = None):
         return
 
     try:
-        from opentelemetry import trace
-
-        with _tracer.start_as_current_span(name) as span:
-            if attributes and span:
-                for k, v in attributes.items():
-                    span.set_attribute(k, str(v))
-            yield span
+        cm = _tracer.start_as_current_span(name)
     except Exception:
         yield None
+        return
+    # errors raised by the caller's block propagate; only span setup is guarded
+    with cm as span:
+        if attributes and span:
+            for k, v in attributes.items():
+                span.set_attribute(k, str(v))
+        yield span
 
 
 def get_current_trace_id() -> str: